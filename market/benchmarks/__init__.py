@@ -0,0 +1,3 @@
+"""
+This package contains benchmarks for the performance critical parts of the market.
+"""
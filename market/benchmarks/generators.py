@@ -0,0 +1,187 @@
+"""
+Generate synthetic market data for the benchmarks.
+
+The contracts follow the same chains as the market itself: a mortgage contract (bank -> borrower), followed by
+investment contracts (investor -> bank), each followed by alternating transfer (owner -> buyer) and confirmation
+(buyer -> owner) contracts.
+"""
+
+import time
+import random
+
+from dispersy.crypto import LibNaCLSK
+
+from market.community.blockchain.community import BLOCK_DIFFICULTY_MIN, BLOCK_GENESIS_HASH, BLOCK_TARGET_SPACING
+from market.models import ObjectType
+from market.models.block import Block
+from market.models.campaign import Campaign
+from market.models.confirmation import Confirmation
+from market.models.contract import Contract
+from market.models.house import House
+from market.models.investment import Investment, InvestmentStatus
+from market.models.loanrequest import LoanRequest, LoanRequestStatus
+from market.models.mortgage import Mortgage, MortgageType, MortgageStatus
+from market.models.transfer import Transfer, TransferStatus
+from market.models.user import User, Role
+
+# Blocks are spaced further apart than the target spacing, so that the difficulty stays at its minimum
+BLOCK_SPACING = 2 * BLOCK_TARGET_SPACING
+# The generated blockchain starts this many seconds in the past, so that it never ends in the future
+CHAIN_START_OFFSET = 365 * 24 * 60 * 60
+
+POSTAL_CODE_LETTERS = [u'AB', u'CD', u'EF', u'GH', u'KL']
+
+
+class MarketDataGenerator(object):
+    """
+    This class creates signed contracts and valid blocks for a community, and fills its database with market data.
+    """
+
+    def __init__(self, community, seed=None):
+        self.community = community
+        self.random = random.Random(seed)
+        self.start_time = int(time.time()) - CHAIN_START_OFFSET
+        self.num_objects = 0
+
+    def next_id(self):
+        self.num_objects += 1
+        return self.num_objects
+
+    def create_member(self):
+        return self.community.dispersy.get_member(private_key=LibNaCLSK().key_to_bin())
+
+    def create_house(self):
+        return House(u'%04d%s' % (self.random.randint(1000, 9999), self.random.choice(POSTAL_CODE_LETTERS)),
+                     unicode(self.random.randint(1, 200)), u'Generated street', self.random.randint(10, 50) * 10000,
+                     u'http://example.org', u'0123456789', u'seller@example.org')
+
+    def create_mortgage(self, user_id, bank_id, status=MortgageStatus.ACCEPTED):
+        house = self.create_house()
+        amount = house.price
+        return Mortgage(self.next_id(), user_id, bank_id, house, amount, amount * self.random.choice([0.5, 0.6, 0.7]),
+                        self.random.choice(list(MortgageType)), self.random.choice([2.5, 3.0, 3.5, 4.0]), 4.5, 5.0,
+                        self.random.choice([120, 240, 360]), u'A', status, self.next_id(), user_id)
+
+    def create_contract(self, contract_type, document, from_member, to_member, previous_hash='', contract_time=None):
+        contract = Contract()
+        contract.previous_hash = previous_hash
+        contract.from_public_key = from_member.public_key
+        contract.to_public_key = to_member.public_key
+        contract.document = document
+        contract.type = contract_type
+        contract.time = self.start_time if contract_time is None else contract_time
+        contract.sign(from_member)
+        contract.sign(to_member)
+        return contract
+
+    def create_mortgage_contract(self, bank, borrower):
+        mortgage = self.create_mortgage(self.community.member_to_id(borrower), self.community.member_to_id(bank))
+        return self.create_contract(ObjectType.MORTGAGE, mortgage.to_bin(), bank, borrower)
+
+    def create_investment_contract(self, mortgage_contract, investor, bank, amount=1000):
+        mortgage = mortgage_contract.get_object()
+        investment = Investment(self.next_id(), self.community.member_to_id(investor), amount, 4.0, self.next_id(),
+                                mortgage.bank_id, InvestmentStatus.ACCEPTED)
+        return self.create_contract(ObjectType.INVESTMENT, investment.to_bin(), investor, bank, mortgage_contract.id)
+
+    def create_transfer_chain(self, investment_contract, owner, buyers):
+        """
+        Create the transfer and confirmation contracts for selling an investment to each of the buyers in turn.
+        :return: a list with the contracts, in order
+        """
+        investment = investment_contract.get_object()
+        contracts = []
+        previous_hash = investment_contract.id
+        for buyer in buyers:
+            transfer = Transfer(self.next_id(), self.community.member_to_id(buyer), u'NL00BANK0123456789',
+                                investment.amount, investment.id, investment.user_id, TransferStatus.ACCEPTED)
+            transfer_contract = self.create_contract(ObjectType.TRANSFER, transfer.to_bin(), owner, buyer,
+                                                     previous_hash)
+            confirmation = Confirmation(transfer.id, transfer.user_id, u'NL00BANK0123456789', transfer.iban,
+                                        transfer.amount)
+            confirmation_contract = self.create_contract(ObjectType.CONFIRMATION, confirmation.to_bin(), buyer, owner,
+                                                         transfer_contract.id)
+            contracts += [transfer_contract, confirmation_contract]
+            previous_hash = confirmation_contract.id
+            owner = buyer
+        return contracts
+
+    def create_block(self, previous_block, contracts):
+        """
+        Create a block on top of the given block, with a valid proof for the creator of the community.
+        :param previous_block: the previous block, or None to create a block on top of the genesis block
+        :param contracts: the contracts that are put in the block (the size of the block is not limited)
+        """
+        block = Block()
+        block.previous_hash = previous_block.id if previous_block is not None else BLOCK_GENESIS_HASH
+        block.target_difficulty = BLOCK_DIFFICULTY_MIN
+        block.time = (previous_block.time if previous_block is not None else self.start_time) + BLOCK_SPACING
+        block.contracts = list(contracts)
+        block.merkle_root_hash = block.merkle_tree.build()
+        block.creator = self.community.my_member.public_key
+
+        # The time is part of the proof, so we change it until we find a valid proof
+        while not self.community.check_proof(block):
+            block.time += 1
+        block.sign(self.community.my_member)
+        return block
+
+    def create_chain(self, previous_block, length, contracts_per_block=()):
+        """
+        Create a chain of blocks.
+        :param previous_block: the block the chain starts from, or None to start from the genesis block
+        :param length: the number of blocks
+        :param contracts_per_block: lists of contracts for the first blocks of the chain
+        :return: a list with the blocks
+        """
+        contracts_per_block = list(contracts_per_block)
+        blocks = []
+        for index in range(length):
+            contracts = contracts_per_block[index] if index < len(contracts_per_block) else []
+            previous_block = self.create_block(previous_block, contracts)
+            blocks.append(previous_block)
+        return blocks
+
+    def add_to_blockchain(self, contracts):
+        """
+        Put the contracts in a new block on top of the best chain of the community.
+        :return: the new block
+        """
+        data_manager = self.community.data_manager
+        tip = data_manager.get_block_header(data_manager.get_block_indexes(limit=1)[0].block_id)
+        block = self.create_block(tip, contracts)
+        self.community.process_block(block)
+        return block
+
+    def populate_market(self, num_mortgages, investments_per_campaign=3):
+        """
+        Fill the database of the community with loan requests, mortgages, campaigns and investments, as if the
+        community is run by a bank.
+        """
+        data_manager = self.community.data_manager
+        bank_id = self.community.my_user_id
+
+        for _ in range(num_mortgages):
+            user = User(str(self.next_id()), role=Role.BORROWER)
+            data_manager.add_user(user)
+
+            mortgage = self.create_mortgage(user.id, bank_id,
+                                            self.random.choice([MortgageStatus.PENDING, MortgageStatus.ACCEPTED]))
+            loan_request = LoanRequest(mortgage.loan_request_id, user.id, mortgage.house, mortgage.mortgage_type,
+                                       bank_id, u'Generated loan request', mortgage.amount,
+                                       LoanRequestStatus.ACCEPTED)
+            user.loan_requests.add(loan_request)
+            user.mortgages.add(mortgage)
+
+            if mortgage.status == MortgageStatus.ACCEPTED:
+                campaign = Campaign(self.next_id(), bank_id, mortgage.id, mortgage.user_id,
+                                    mortgage.amount - mortgage.bank_amount, 0, self.start_time + CHAIN_START_OFFSET)
+                data_manager.you.campaigns.add(campaign)
+
+                for _ in range(self.random.randint(0, investments_per_campaign)):
+                    investment = Investment(self.next_id(), str(self.next_id()), 1000, 4.0, campaign.id,
+                                            campaign.user_id, InvestmentStatus.ACCEPTED)
+                    campaign.investments.add(investment)
+                    campaign.amount_invested += investment.amount
+
+        data_manager.commit()
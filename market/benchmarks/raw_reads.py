@@ -0,0 +1,122 @@
+"""
+Compare reading through the Storm ORM with reading through the DatabaseReader.
+
+Usage: python -m market.benchmarks.raw_reads [--blocks N] [--contracts N] [--mortgages N] [--rounds N]
+"""
+
+import os
+import sys
+import argparse
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from timeit import default_timer
+
+from market.database.datamanager import MarketDataManager
+from market.models import ObjectType
+from market.models.block import Block
+from market.models.contract import Contract
+from market.models.house import House
+from market.models.mortgage import Mortgage, MortgageType, MortgageStatus
+
+
+def populate(data_manager, num_blocks, num_contracts, num_mortgages):
+    previous_hash = ''
+    for block_number in range(num_blocks):
+        block = Block()
+        block.previous_hash = previous_hash
+        block.creator = 'creator'
+        block.creator_signature = 'signature'
+        block.target_difficulty = 1
+        block.time = block_number
+        for contract_number in range(num_contracts):
+            contract = Contract()
+            contract.from_public_key = 'from'
+            contract.to_public_key = 'to'
+            contract.document = 'document %d %d' % (block_number, contract_number)
+            contract.type = ObjectType.MORTGAGE
+            contract.time = block_number
+            block.contracts.append(contract)
+        block.merkle_root_hash = block.merkle_tree.build()
+        data_manager.store.add(block)
+        data_manager.flush()
+        previous_hash = block.id
+
+    for mortgage_id in range(num_mortgages):
+        house = House(u'1234AB', unicode(mortgage_id), u'Address', 200000, u'url', u'phone', u'email')
+        data_manager.store.add(Mortgage(mortgage_id, 'user', 'bank', house, 200000, 150000, MortgageType.FIXEDRATE,
+                                        2.5, 3.5, 4.5, 30, u'A', MortgageStatus.ACCEPTED, mortgage_id, 'user'))
+
+    data_manager.commit()
+    return previous_hash
+
+
+def measure(func, rounds, data_manager):
+    best = None
+    for _ in range(rounds):
+        # Storm clears its cache on every commit, which happens every few seconds
+        data_manager.store.invalidate()
+        start = default_timer()
+        func()
+        duration = default_timer() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def run(num_blocks, num_contracts, num_mortgages, rounds):
+    state_dir = mkdtemp()
+    data_manager = MarketDataManager(os.path.join(state_dir, 'market.db'), threaded=False)
+    tip = populate(data_manager, num_blocks, num_contracts, num_mortgages)
+    contract_ids = [contract_id for contract_id, in data_manager.store.execute('SELECT id FROM contract')]
+
+    def walk(get_block):
+        def func():
+            block = get_block(tip)
+            while block is not None:
+                block = get_block(block.previous_hash)
+        return func
+
+    def lookup_contracts_orm():
+        for contract_id in contract_ids:
+            data_manager.find_contracts_by_previous_hash(str(contract_id))
+
+    def lookup_contracts_raw():
+        for contract_id in contract_ids:
+            data_manager.get_contract_ids_by_previous_hash(str(contract_id))
+
+    def list_mortgages_orm():
+        return [mortgage.to_dict(api_response=True) for mortgage in data_manager.get_mortgages()]
+
+    benchmarks = [('chain walk (%d blocks)' % num_blocks, walk(data_manager.get_block),
+                   walk(data_manager.get_block_header)),
+                  ('previous_hash lookups (%d contracts)' % len(contract_ids), lookup_contracts_orm,
+                   lookup_contracts_raw),
+                  ('/mortgages (%d mortgages)' % num_mortgages, list_mortgages_orm,
+                   data_manager.get_mortgage_dicts)]
+
+    results = []
+    for name, orm_func, raw_func in benchmarks:
+        orm_time = measure(orm_func, rounds, data_manager)
+        raw_time = measure(raw_func, rounds, data_manager)
+        results.append((name, orm_time, raw_time))
+
+    data_manager.close()
+    rmtree(state_dir, ignore_errors=True)
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Compare the Storm ORM with raw SQL reads')
+    parser.add_argument('--blocks', help='Number of blocks', type=int, default=1000)
+    parser.add_argument('--contracts', help='Number of contracts per block', type=int, default=5)
+    parser.add_argument('--mortgages', help='Number of mortgages', type=int, default=1000)
+    parser.add_argument('--rounds', help='Number of rounds (the best round is reported)', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print '%-40s %12s %12s %8s' % ('benchmark', 'storm (ms)', 'raw (ms)', 'speedup')
+    for name, orm_time, raw_time in run(args.blocks, args.contracts, args.mortgages, args.rounds):
+        print '%-40s %12.2f %12.2f %7.1fx' % (name, orm_time * 1000, raw_time * 1000, orm_time / raw_time)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,185 @@
+"""
+Run the microbenchmarks of the blockchain and market layers, and compare the results with an earlier run.
+
+Usage: python -m market.benchmarks.runner [--filter PATTERN] [--rounds N] [--scale N] [--seed N]
+                                          [--output FILE] [--compare FILE] [--threshold FRACTION]
+
+The results are written as JSON:
+
+    {
+        "format": 1,
+        "commit": "<git commit of the tree that was benchmarked>",
+        "time": <unix time>,
+        "python": "2.7.18",
+        "platform": "Linux-...",
+        "scale": 1,
+        "benchmarks": {
+            "<name>": {"rounds": 5, "number": 100, "min": <seconds>, "median": <seconds>, "max": <seconds>},
+            ...
+        }
+    }
+
+All times are per call. The minimum is used for comparisons, since it is the least affected by other processes.
+"""
+
+import sys
+import json
+import time
+import fnmatch
+import logging
+import argparse
+import platform
+import subprocess
+
+from timeit import default_timer
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.python import log
+
+from market.defs import BASE_DIR
+
+RESULTS_FORMAT = 1
+# Benchmarks that became this much slower (as a fraction of the baseline) are reported as regressions
+DEFAULT_THRESHOLD = 0.1
+
+
+class Benchmark(object):
+    """
+    This class represents a single benchmark. Every round, setup is called once, after which func is called number
+    times.
+    """
+
+    def __init__(self, name, func, number=1, setup=None):
+        self.name = name
+        self.func = func
+        self.number = number
+        self.setup = setup
+
+    def run(self, rounds):
+        timings = []
+        for _ in range(rounds):
+            if self.setup is not None:
+                self.setup()
+
+            func = self.func
+            start = default_timer()
+            for _ in xrange(self.number):
+                func()
+            timings.append((default_timer() - start) / self.number)
+
+        timings.sort()
+        return {'rounds': rounds,
+                'number': self.number,
+                'min': timings[0],
+                'median': timings[len(timings) / 2],
+                'max': timings[-1]}
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, stderr=subprocess.STDOUT).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(benchmarks, rounds, pattern='*'):
+    results = {}
+    for benchmark in benchmarks:
+        if fnmatch.fnmatch(benchmark.name, pattern):
+            results[benchmark.name] = benchmark.run(rounds)
+    return results
+
+
+def create_results(benchmark_results, scale):
+    return {'format': RESULTS_FORMAT,
+            'commit': get_commit(),
+            'time': int(time.time()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': scale,
+            'benchmarks': benchmark_results}
+
+
+def load_results(filename):
+    with open(filename) as fp:
+        results = json.load(fp)
+    if results.get('format') != RESULTS_FORMAT:
+        raise ValueError('%s has an unsupported format' % filename)
+    return results
+
+
+def compare_results(baseline, results, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the results of two runs.
+    :return: a list of (name, baseline time, time, ratio, regressed) tuples for the benchmarks that are in both runs
+    """
+    comparison = []
+    for name in sorted(results['benchmarks']):
+        if name not in baseline['benchmarks']:
+            continue
+        before = baseline['benchmarks'][name]['min']
+        after = results['benchmarks'][name]['min']
+        ratio = after / before if before else float('inf')
+        comparison.append((name, before, after, ratio, ratio > 1 + threshold))
+    return comparison
+
+
+def print_results(results, baseline=None, threshold=DEFAULT_THRESHOLD):
+    print 'Commit %s, Python %s on %s' % (results['commit'], results['python'], results['platform'])
+    if baseline is None:
+        print '%-50s %12s %12s' % ('benchmark', 'min (us)', 'median (us)')
+        for name, result in sorted(results['benchmarks'].iteritems()):
+            print '%-50s %12.1f %12.1f' % (name, result['min'] * 1e6, result['median'] * 1e6)
+        return
+
+    print 'Compared with commit %s' % baseline['commit']
+    if baseline.get('scale') != results['scale']:
+        print 'Warning: the baseline was run with a different scale'
+    print '%-50s %12s %12s %8s' % ('benchmark', 'before (us)', 'after (us)', 'ratio')
+    for name, before, after, ratio, regressed in compare_results(baseline, results, threshold):
+        print '%-50s %12.1f %12.1f %7.2fx%s' % (name, before * 1e6, after * 1e6, ratio,
+                                                ' REGRESSION' if regressed else '')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run the market microbenchmarks')
+    parser.add_argument('--filter', help='Only run benchmarks whose name matches this pattern', default='*')
+    parser.add_argument('--rounds', help='Number of rounds per benchmark', type=int, default=5)
+    parser.add_argument('--scale', help='Multiplier for the size of the generated data', type=int, default=1)
+    parser.add_argument('--seed', help='Seed for the data generators', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Compare the results with the results in this file')
+    parser.add_argument('--threshold', help='Fraction by which a benchmark may become slower before it is reported',
+                        type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.compare) if args.compare else None
+
+    logging.basicConfig(level=logging.WARNING)
+    observer = log.PythonLoggingObserver()
+    observer.start()
+
+    # The suite imports the Benchmark class from this module
+    from market.benchmarks.suite import BenchmarkSuite
+
+    @inlineCallbacks
+    def run():
+        suite = BenchmarkSuite(scale=args.scale, seed=args.seed)
+        try:
+            suite.set_up()
+            results = create_results(run_benchmarks(suite.get_benchmarks(), args.rounds, args.filter), args.scale)
+            print_results(results, baseline, args.threshold)
+            if args.output:
+                with open(args.output, 'w') as fp:
+                    json.dump(results, fp, indent=2, sort_keys=True)
+        finally:
+            yield suite.tear_down()
+            reactor.stop()
+
+    reactor.callWhenRunning(run)
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,321 @@
+"""
+The microbenchmarks of the blockchain and market layers.
+
+The benchmarks run against a single MarketCommunity of a bank, with an in-memory database that is filled by a
+MarketDataGenerator. Benchmarks that modify the database get a new database every round.
+"""
+
+import time
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from protobuf_to_dict import dict_to_protobuf, protobuf_to_dict
+from twisted.internet.defer import inlineCallbacks
+from twisted.web.test.requesthelper import DummyRequest
+
+from dispersy.crypto import LibNaCLSK
+from dispersy.dispersy import Dispersy
+
+from market.benchmarks.generators import MarketDataGenerator
+from market.benchmarks.runner import Benchmark
+from market.community.blockchain.conversion_pb2 import BlockMessage
+from market.community.market.community import MarketCommunity
+from market.community.market.funding import FundingTotals
+from market.database.datamanager import MarketDataManager
+from market.models import ObjectType
+from market.models.block import Block
+from market.models.contract import Contract
+from market.models.mortgage import Mortgage
+from market.models.user import Role
+from market.restapi.blocks_endpoint import BlocksEndpoint, MAX_BLOCKS_PER_PAGE
+from market.restapi.campaigns_endpoint import CampaignsEndpoint
+from market.restapi.loanrequests_endpoint import LoanRequestsEndpoint
+from market.restapi.mortgages_endpoint import MortgagesEndpoint
+from market.simulation.network import SimulatedNetwork
+from market.simulation.simulator import register_verified_bank, restore_verified_banks, save_verified_banks
+
+MEMPOOL_SIZES = [10, 100, 10000]
+REORG_DEPTHS = [1, 10, 100]
+TRANSFER_CHAIN_LENGTHS = [10, 100, 1000]
+NUM_MEMBERS = 10
+
+# Sizes of the generated data that are multiplied by the scale of the suite
+NUM_STAKE_INVESTMENTS = 1000
+NUM_REST_MORTGAGES = 10000
+NUM_REST_BLOCKS = 250
+
+
+def copy_contract(contract):
+    # Objects can only be added to a single store, so every database gets its own copies
+    return Contract.from_dict(contract.to_dict())
+
+
+def copy_block(block):
+    return Block.from_dict(block.to_dict())
+
+
+class BenchmarkSuite(object):
+    """
+    This class creates the community and the data for the benchmarks.
+    """
+
+    def __init__(self, scale=1, seed=None):
+        self.scale = scale
+        self.seed = seed
+        self.working_directory = None
+        self.dispersy = None
+        self.community = None
+        self.generator = None
+        self.borrowers = []
+        self.investors = []
+        self.databases = {}
+        self.saved_banks = None
+
+    def set_up(self):
+        self.working_directory = mkdtemp(suffix='_market_benchmarks')
+        endpoint = SimulatedNetwork().create_endpoint()
+        self.dispersy = Dispersy(endpoint, unicode(self.working_directory), database_filename=u':memory:')
+        self.dispersy.start(autoload_discovery=False)
+
+        member = self.dispersy.get_member(private_key=LibNaCLSK().key_to_bin())
+        self.saved_banks = save_verified_banks()
+        register_verified_bank('Benchmark bank', member.public_key)
+        self.community = MarketCommunity.create_community(self.dispersy, member, role=Role.FINANCIAL_INSTITUTION)
+        # The benchmarks decide when blocks are created
+        self.community.cancel_pending_task('create_block')
+
+        self.generator = MarketDataGenerator(self.community, self.seed)
+        self.borrowers = [self.generator.create_member() for _ in range(NUM_MEMBERS)]
+        self.investors = [self.generator.create_member() for _ in range(NUM_MEMBERS)]
+
+    @inlineCallbacks
+    def tear_down(self):
+        if self.dispersy is not None:
+            yield self.dispersy.stop()
+        if self.working_directory is not None:
+            rmtree(self.working_directory, ignore_errors=True)
+        if self.saved_banks is not None:
+            restore_verified_banks(self.saved_banks)
+
+    def reset_database(self):
+        """
+        Give the community a new empty database, and forget about the contracts and blocks it has received.
+        """
+        community = self.community
+        community.data_manager = MarketDataManager('')
+        community.data_manager.initialize(community.my_user_id, Role.FINANCIAL_INSTITUTION)
+        community.funding = FundingTotals()
+        community.incoming_contracts.clear()
+        community.incoming_blocks.clear()
+        community.stake_cache.clear()
+
+    def use_database(self, name, populate):
+        """
+        Switch the community to a database that is only read by the benchmarks. The database is created and filled
+        using populate the first time it is used.
+        """
+        community = self.community
+        if name not in self.databases:
+            self.reset_database()
+            populate()
+            community.data_manager.commit()
+            self.databases[name] = (community.data_manager, community.funding)
+
+        community.data_manager, community.funding = self.databases[name]
+        community.incoming_contracts.clear()
+        community.incoming_blocks.clear()
+        community.stake_cache.clear()
+
+    def create_mortgage_contracts(self, num_mortgages):
+        bank = self.community.my_member
+        return [self.generator.create_mortgage_contract(bank, self.borrowers[index % NUM_MEMBERS])
+                for index in range(num_mortgages)]
+
+    def create_investment_contracts(self, mortgage_contracts):
+        bank = self.community.my_member
+        return [self.generator.create_investment_contract(mortgage_contract, self.investors[index % NUM_MEMBERS], bank)
+                for index, mortgage_contract in enumerate(mortgage_contracts)]
+
+    def get_benchmarks(self):
+        return self.get_model_benchmarks() + \
+               self.get_create_block_benchmarks() + \
+               self.get_check_block_benchmarks() + \
+               self.get_process_block_benchmarks() + \
+               self.get_stake_benchmarks() + \
+               self.get_traversal_benchmarks() + \
+               self.get_rest_benchmarks()
+
+    def get_model_benchmarks(self):
+        investor = self.investors[0]
+        mortgage_contract, = self.create_mortgage_contracts(1)
+        contract, = self.create_investment_contracts([mortgage_contract])
+        mortgage = mortgage_contract.get_object()
+        mortgage_document = mortgage_contract.document
+
+        contracts = self.create_investment_contracts(self.create_mortgage_contracts(10))
+        block = self.generator.create_block(None, contracts)
+        block_dict = block.to_dict()
+        block_message = dict_to_protobuf(BlockMessage, {'block': block_dict}).SerializeToString()
+
+        def decode_block_message():
+            message = BlockMessage()
+            message.ParseFromString(block_message)
+            return protobuf_to_dict(message)
+
+        return [Benchmark('contract.sign', lambda: contract.sign(investor), number=100),
+                Benchmark('contract.verify', contract.verify, number=100),
+                Benchmark('contract.id', lambda: contract.id, number=10000),
+                Benchmark('block.to_dict (10 contracts)', block.to_dict, number=1000),
+                Benchmark('block.from_dict (10 contracts)', lambda: Block.from_dict(block_dict), number=1000),
+                Benchmark('protobuf.block.encode (10 contracts)',
+                          lambda: dict_to_protobuf(BlockMessage, {'block': block_dict}).SerializeToString(),
+                          number=100),
+                Benchmark('protobuf.block.decode (10 contracts)', decode_block_message, number=100),
+                Benchmark('protobuf.mortgage.encode', mortgage.to_bin, number=1000),
+                Benchmark('protobuf.mortgage.decode', lambda: Mortgage.from_bin(mortgage_document), number=1000)]
+
+    def get_create_block_benchmarks(self):
+        community = self.community
+        benchmarks = []
+
+        for mempool_size in MEMPOOL_SIZES:
+            # The mempool contains investments in mortgages that are already on the blockchain
+            mortgage_contracts = self.create_mortgage_contracts(mempool_size)
+            investment_contracts = self.create_investment_contracts(mortgage_contracts)
+            base_block = self.generator.create_block(None, mortgage_contracts)
+
+            def setup(base_block=base_block, investment_contracts=investment_contracts):
+                self.reset_database()
+                assert community.process_block(copy_block(base_block))
+                for contract in investment_contracts:
+                    community.add_incoming_contract(copy_contract(contract))
+                # Make sure every attempt results in a block, instead of depending on the proof that is found
+                community.stake_cache[community.my_member.public_key] = (time.time(), 2 ** 256)
+
+            benchmarks.append(Benchmark('create_block (mempool %d)' % mempool_size, community.create_block,
+                                        setup=setup))
+        return benchmarks
+
+    def get_check_block_benchmarks(self):
+        community = self.community
+        mortgage_contracts = self.create_mortgage_contracts(2)
+        investment_contracts = self.create_investment_contracts(mortgage_contracts)
+        holder = {}
+
+        def populate():
+            base_block = self.generator.add_to_blockchain(mortgage_contracts)
+            holder['block'] = self.generator.create_block(base_block, investment_contracts)
+
+        def setup():
+            self.use_database('check_block', populate)
+            assert community.check_block(holder['block'])
+
+        return [Benchmark('check_block (2 contracts)', lambda: community.check_block(holder['block']), number=100,
+                          setup=setup)]
+
+    def get_process_block_benchmarks(self):
+        community = self.community
+        benchmarks = []
+
+        for depth in REORG_DEPTHS:
+            # The best chain and the competing chain both contain investments in mortgages from the first block
+            mortgage_contracts = self.create_mortgage_contracts(2 * depth + 1)
+            investment_contracts = self.create_investment_contracts(mortgage_contracts)
+            base_block = self.generator.create_block(None, mortgage_contracts)
+            best_chain = self.generator.create_chain(base_block, depth,
+                                                     [[contract] for contract in investment_contracts[:depth]])
+            competing_chain = self.generator.create_chain(base_block, depth + 1,
+                                                          [[contract] for contract in investment_contracts[depth:]])
+            holder = {}
+
+            def setup(base_block=base_block, best_chain=best_chain, competing_chain=competing_chain, holder=holder):
+                self.reset_database()
+                for block in [base_block] + best_chain + competing_chain[:-1]:
+                    assert community.process_block(copy_block(block))
+                holder['block'] = copy_block(competing_chain[-1])
+
+            benchmarks.append(Benchmark('process_block (reorg depth %d)' % depth,
+                                        lambda holder=holder: community.process_block(holder['block']), setup=setup))
+        return benchmarks
+
+    def get_stake_benchmarks(self):
+        community = self.community
+        public_key = community.my_member.public_key
+        num_investments = NUM_STAKE_INVESTMENTS * self.scale
+
+        def populate():
+            # Every mortgage gets 10 investments
+            mortgage_contracts = self.create_mortgage_contracts(num_investments / 10)
+            self.generator.add_to_blockchain(mortgage_contracts)
+            self.generator.add_to_blockchain(self.create_investment_contracts(mortgage_contracts * 10))
+
+        def get_stake():
+            community.stake_cache.clear()
+            return community.get_stake(public_key)
+
+        return [Benchmark('get_stake (%d investments)' % num_investments, get_stake,
+                          setup=lambda: self.use_database('stake', populate))]
+
+    def get_traversal_benchmarks(self):
+        community = self.community
+        benchmarks = []
+
+        for length in TRANSFER_CHAIN_LENGTHS:
+            mortgage_contracts = self.create_mortgage_contracts(1)
+            investment_contract, = self.create_investment_contracts(mortgage_contracts)
+            buyers = [self.investors[index % NUM_MEMBERS] for index in range(1, length + 1)]
+            transfer_contracts = self.generator.create_transfer_chain(investment_contract, self.investors[0], buyers)
+
+            def populate(mortgage_contracts=mortgage_contracts, investment_contract=investment_contract,
+                         transfer_contracts=transfer_contracts):
+                self.generator.add_to_blockchain(mortgage_contracts + [investment_contract])
+                self.generator.add_to_blockchain(transfer_contracts)
+
+            benchmarks.append(Benchmark('traverse_contracts (%d transfers)' % length,
+                                        lambda contract_id=investment_contract.id:
+                                        community.traverse_contracts(contract_id, ObjectType.CONFIRMATION),
+                                        number=10,
+                                        setup=lambda length=length, populate=populate:
+                                        self.use_database('transfers %d' % length, populate)))
+        return benchmarks
+
+    def get_rest_benchmarks(self):
+        num_mortgages = NUM_REST_MORTGAGES * self.scale
+        num_blocks = NUM_REST_BLOCKS * self.scale
+
+        def populate():
+            self.generator.populate_market(num_mortgages)
+            previous_block = None
+            for _ in range(num_blocks):
+                contracts = self.create_investment_contracts(self.create_mortgage_contracts(1))
+                previous_block = self.generator.create_block(previous_block, contracts)
+                assert self.community.process_block(previous_block)
+
+        def render(endpoint, **args):
+            def func():
+                # Measure the time it takes to create the response, instead of getting it from the cache
+                if hasattr(endpoint, 'cache'):
+                    endpoint.cache.entries.clear()
+                request = DummyRequest([''])
+                request.args = dict([(name, [value]) for name, value in args.iteritems()])
+                return endpoint.render_GET(request)
+            return func
+
+        setup = lambda: self.use_database('rest', populate)
+        community = self.community
+        return [Benchmark('GET /mortgages (%d mortgages)' % num_mortgages,
+                          render(MortgagesEndpoint(community)), setup=setup),
+                Benchmark('GET /mortgages?status=PENDING&sort=-interest_rate&limit=50',
+                          render(MortgagesEndpoint(community), status='PENDING', sort='-interest_rate', limit='50'),
+                          number=10, setup=setup),
+                Benchmark('GET /loanrequests (%d loan requests)' % num_mortgages,
+                          render(LoanRequestsEndpoint(community)), setup=setup),
+                Benchmark('GET /campaigns', render(CampaignsEndpoint(community)), setup=setup),
+                Benchmark('GET /campaigns?completed=false&sort=end_time&limit=50',
+                          render(CampaignsEndpoint(community), completed='false', sort='end_time', limit='50'),
+                          number=10, setup=setup),
+                Benchmark('GET /blocks (%d blocks)' % min(num_blocks, MAX_BLOCKS_PER_PAGE),
+                          render(BlocksEndpoint(community)), number=10, setup=setup),
+                Benchmark('GET /blocks?contracts=ids', render(BlocksEndpoint(community), contracts='ids'),
+                          number=10, setup=setup)]
@@ -1,12 +1,11 @@
 import os
 import time
-import hashlib
 import logging
 
-from base64 import b64encode
+from base64 import b64encode, urlsafe_b64encode
 from collections import OrderedDict, defaultdict
 from twisted.internet.task import LoopingCall
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import Deferred, inlineCallbacks, returnValue
 
 from dispersy.authentication import MemberAuthentication
 from dispersy.candidate import Candidate
@@ -19,16 +18,28 @@ from dispersy.resolution import PublicResolution
 from dispersy.requestcache import RandomNumberCache
 
 from market.community.blockchain.conversion import BlockchainConversion
+from market.community.blockchain.validation import BlockValidator, check_proof, load_checkpoints, verify_block, \
+    verify_contents, verify_header
+from market.community.blockchain.snapshot import ChainSnapshot
+from market.community.blockchain.lifecycle import LifecycleTracker, BEGIN, GOSSIP, MEMPOOL, SIGNATURE_REQUEST, \
+    SIGNATURE_RESPONSE
 from market.community.payload import ProtobufPayload
 from market.database.datamanager import BlockchainDataManager
+from market.defs import CHECKPOINTS
+from market.metrics import BLOCK_CREATION_ATTEMPTS, BLOCK_VALIDATION_SECONDS, BLOCKS_CREATED, INCOMING_BLOCKS, \
+    INCOMING_CONTRACTS, MESSAGES_DROPPED, MESSAGES_RECEIVED, TRAVERSAL_REQUEST_SECONDS
 from market.models.block import Block
 from market.models.block_index import BlockIndex
 from market.models.contract import Contract
+from market.models.merkle_proof import MerkleProof
+from market.util.events import EventNotifier, BLOCK_CONNECTED, BLOCK_DISCONNECTED
+from market.util.metrics import timed
+from market.util.profiling import profile_handler, profile_task
 from market.util.misc import median
-from market.util.uint256 import full_to_uint256, compact_to_uint256, uint256_to_compact
+from market.util.uint256 import compact_to_uint256, uint256_to_compact
 from market.models import ObjectType
 
-COMMIT_INTERVAL = 60
+COMMIT_INTERVAL = 5
 
 BLOCK_CREATION_INTERNAL = 1
 BLOCK_TARGET_SPACING = 30  # 10 * 60
@@ -41,6 +52,18 @@ BLOCK_GENESIS_HASH = '\00' * 32
 MAX_CLOCK_DRIFT = 15 * 60
 MAX_PACKET_SIZE = 1500
 
+HEADER_SYNC_INTERVAL = 10
+PROOF_UPDATE_INTERVAL = 30
+SNAPSHOT_INTERVAL = 10 * 60
+ARCHIVE_INTERVAL = 60
+MAX_HEADERS_PER_MESSAGE = 5
+# Light nodes ask this many verifiers for headers. Since they can't check everything about a header themselves, some
+# headers are only accepted when at least MIN_HEADER_VOTES of the verifiers (or all of them, if fewer were asked) agree.
+HEADER_REQUEST_VERIFIERS = 3
+MIN_HEADER_VOTES = 2
+MAX_PROOF_REQUESTS = 5
+MAX_LOCATOR_STEPS = 10
+
 
 class SignatureRequestCache(RandomNumberCache):
 
@@ -63,6 +86,40 @@ class BlockRequestCache(RandomNumberCache):
         self.community.send_block_request(self.block_id)
 
 
+class HeaderRequestCache(RandomNumberCache):
+
+    def __init__(self, community, num_verifiers):
+        super(HeaderRequestCache, self).__init__(community.request_cache, u'header-request')
+        self.community = community
+        self.num_verifiers = num_verifiers
+        # (candidate, headers) tuples
+        self.responses = []
+        self.public_keys = []
+
+    def add_response(self, public_key, candidate, headers):
+        # Only allow 1 response per peer
+        if public_key in self.public_keys:
+            return False
+        self.public_keys.append(public_key)
+        self.responses.append((candidate, headers))
+        return len(self.responses) >= self.num_verifiers
+
+    def on_timeout(self):
+        self.community.process_headers(self)
+
+
+class ProofRequestCache(RandomNumberCache):
+
+    def __init__(self, community, contract_id, contract_type, deferred):
+        super(ProofRequestCache, self).__init__(community.request_cache, u'proof-request')
+        self.contract_id = contract_id
+        self.contract_type = contract_type
+        self.deferred = deferred
+
+    def on_timeout(self):
+        self.deferred.callback(None)
+
+
 class TraversalRequestCache(RandomNumberCache):
 
     def __init__(self, community, contract_id, contract_type, deferred, min_responses, max_responses):
@@ -75,8 +132,10 @@ class TraversalRequestCache(RandomNumberCache):
         self.max_responses = max_responses
         self.responses = {}
         self.public_keys = []
+        self.start_time = time.time()
 
     def callback(self):
+        TRAVERSAL_REQUEST_SECONDS.observe(time.time() - self.start_time)
         responses_sorted = sorted(self.responses.items(), key=lambda item: item[1])
         if responses_sorted and responses_sorted[-1][1] >= self.min_responses:
             self.deferred.callback(responses_sorted[-1][0])
@@ -102,6 +161,33 @@ class TraversalRequestCache(RandomNumberCache):
         self.callback()
 
 
+def calculate_next_difficulty(block, past_blocks):
+    """
+    Determine the difficulty for the block after a given block.
+    :param block: the previous block, or None if the next block is the first block
+    :param past_blocks: the BLOCK_TARGET_BLOCKSPAN blocks before the previous block (newest first), or None if the
+    chain is not that long
+    """
+    if block is not None:
+        target_difficulty = block.target_difficulty
+        if past_blocks:
+            target_difficulty *= float(block.time - past_blocks[-1].time) / BLOCK_TARGET_TIMESPAN
+    else:
+        target_difficulty = BLOCK_DIFFICULTY_INIT
+
+    target_difficulty = min(target_difficulty, BLOCK_DIFFICULTY_MIN)
+    return compact_to_uint256(uint256_to_compact(target_difficulty))
+
+
+def count_messages(name, handle_callback):
+    handle_callback = profile_handler(getattr(handle_callback, '__name__', name), handle_callback)
+
+    def invoke_func(messages):
+        MESSAGES_RECEIVED.inc(name, len(messages))
+        return handle_callback(messages)
+    return invoke_func
+
+
 class BlockchainCommunity(Community):
 
     def __init__(self, dispersy, master, my_member):
@@ -110,23 +196,135 @@ class BlockchainCommunity(Community):
         self.incoming_contracts = OrderedDict()
         self.incoming_blocks = {}
         self.data_manager = None
-
-    def initialize(self, verifier=True, **db_kwargs):
+        self.light = False
+        self.notifier = EventNotifier()
+        self.gauge_functions = []
+        self.lifecycle = LifecycleTracker()
+        self.validator = None
+        # Blocks that are waiting for the result of the stateless checks
+        self.verifying_blocks = {}
+        self.snapshot_fn = ''
+        self.snapshot_height = None
+        # Ids of the blocks that are assumed to be valid. Initially these are the checkpoints, and every time we get
+        # one of these blocks its previous block is assumed to be valid as well.
+        self.assumed_valid = set(load_checkpoints(CHECKPOINTS).values())
+        # Contract id -> time at which we last requested a proof for the contract
+        self.proof_requested = {}
+        # Ids of the headers that enough verifiers agree on, while a light node is processing headers
+        self.agreed_headers = set()
+
+    def initialize(self, verifier=True, light=False, validator=None, **db_kwargs):
+        """
+        :param validator: a started BlockValidator for checking received blocks, or None to check them on the reactor
+        thread. The validator is owned by the caller, who should stop it after unloading the community.
+        """
         super(BlockchainCommunity, self).initialize()
 
         self.initialize_database(**db_kwargs)
 
+        # Only verifiers receive complete blocks, so only they may need worker processes to check them
+        self.validator = validator if verifier and validator is not None else BlockValidator()
+
+        # Light nodes only download block headers, and use merkle proofs to check if contracts are on the blockchain
+        self.light = light
+
         if verifier:
-            self.register_task('create_block', LoopingCall(self.create_block)).start(BLOCK_CREATION_INTERNAL)
-        self.register_task('commit', LoopingCall(self.data_manager.commit)).start(COMMIT_INTERVAL)
+            self.register_looping_call('create_block', self.create_block, BLOCK_CREATION_INTERNAL)
+        if light:
+            self.register_looping_call('sync_headers', self.send_header_request, HEADER_SYNC_INTERVAL)
+            self.register_looping_call('update_proofs', self.update_proofs, PROOF_UPDATE_INTERVAL, now=False)
+        self.register_looping_call('commit', self.data_manager.commit, COMMIT_INTERVAL)
+        if self.snapshot_fn and not light:
+            self.register_looping_call('snapshot', self.write_snapshot, SNAPSHOT_INTERVAL, now=False)
+        if self.data_manager.hot_blocks and not light:
+            self.register_looping_call('archive', self.data_manager.archive_blocks, ARCHIVE_INTERVAL, now=False)
+
+        # Count and profile the incoming messages of every meta-message before they are handled
+        for meta_message in self.get_meta_messages():
+            meta_message._handle_callback = count_messages(meta_message.name, meta_message.handle_callback)
+        self.add_gauge_function(INCOMING_CONTRACTS, lambda: len(self.incoming_contracts))
+        self.add_gauge_function(INCOMING_BLOCKS, lambda: len(self.incoming_blocks))
 
         self.logger.info('BlockchainCommunity initialized')
 
-    def initialize_database(self, database_fn=''):
+    def initialize_database(self, database_fn='', block_files=False, hot_blocks=0):
         if database_fn:
             database_fn = os.path.join(self.dispersy.working_directory, database_fn)
-        self.data_manager = BlockchainDataManager(database_fn)
-        self.data_manager.initialize()
+        self.data_manager = BlockchainDataManager(database_fn, block_files=block_files, hot_blocks=hot_blocks)
+        snapshot = self.load_snapshot(database_fn)
+        if self.data_manager.initialize(snapshot):
+            self.apply_snapshot(snapshot)
+
+    def load_snapshot(self, database_fn):
+        """
+        Load the snapshot that belongs to a database file. Snapshots are only used with database files.
+        :return: a ChainSnapshot, or None if there is no valid snapshot
+        """
+        if not database_fn:
+            return None
+        self.snapshot_fn = database_fn + '.snapshot'
+        return ChainSnapshot.load(self.snapshot_fn)
+
+    def apply_snapshot(self, snapshot):
+        """
+        Restore the state from a snapshot that matches the best chain, and bring it up to date by processing the
+        blocks above the height of the snapshot as if they were just added to the best chain.
+        """
+        self.set_snapshot_state(snapshot.state)
+        self.snapshot_height = snapshot.height
+
+        connected = [self.data_manager.get_block_index_at_height(height)
+                     for height in range(snapshot.height + 1, len(self.data_manager.best_chain))]
+        if connected:
+            self.on_best_chain_changed([], connected)
+        self.logger.info('Loaded snapshot at height %d (%d block(s) above it)', snapshot.height, len(connected))
+
+    def write_snapshot(self):
+        height = len(self.data_manager.best_chain) - 1
+        if height == self.snapshot_height:
+            return
+
+        start_time = time.time()
+        ChainSnapshot(height, list(self.data_manager.best_chain), self.get_snapshot_state()).save(self.snapshot_fn)
+        self.snapshot_height = height
+        self.logger.info('Wrote snapshot at height %d in %.2fs', height, time.time() - start_time)
+
+    def get_snapshot_state(self):
+        """
+        Get the state that has been derived from the best chain, to be included in a snapshot.
+        :return: a dictionary that can be converted to JSON
+        """
+        return {}
+
+    def set_snapshot_state(self, state):
+        """
+        Restore the state returned by get_snapshot_state.
+        """
+        pass
+
+    @inlineCallbacks
+    def unload_community(self):
+        for gauge, function in self.gauge_functions:
+            gauge.remove_function(function)
+        yield super(BlockchainCommunity, self).unload_community()
+        if self.snapshot_fn and not self.light:
+            self.write_snapshot()
+        # Make sure all pending writes end up in the database
+        yield self.data_manager.close()
+
+    def register_looping_call(self, name, func, interval, now=True):
+        """
+        Call func every interval seconds until this community is unloaded, recording every invocation like the
+        message handlers.
+        """
+        return self.register_task(name, LoopingCall(profile_task(name, func))).start(interval, now=now)
+
+    def add_gauge_function(self, gauge, function):
+        """
+        Let a gauge include the value returned by function, until this community is unloaded.
+        """
+        gauge.add_function(function)
+        self.gauge_functions.append((gauge, function))
 
     @classmethod
     def get_master_members(cls, dispersy):
@@ -212,7 +410,39 @@ class BlockchainCommunity(Community):
                     CandidateDestination(),
                     ProtobufPayload(),
                     self._generic_timeline_check,
-                    self.on_traversal_response)
+                    self.on_traversal_response),
+            Message(self, u"header-request",
+                    MemberAuthentication(),
+                    PublicResolution(),
+                    DirectDistribution(),
+                    CandidateDestination(),
+                    ProtobufPayload(),
+                    self._generic_timeline_check,
+                    self.on_header_request),
+            Message(self, u"headers",
+                    MemberAuthentication(),
+                    PublicResolution(),
+                    DirectDistribution(),
+                    CandidateDestination(),
+                    ProtobufPayload(),
+                    self._generic_timeline_check,
+                    self.on_headers),
+            Message(self, u"proof-request",
+                    MemberAuthentication(),
+                    PublicResolution(),
+                    DirectDistribution(),
+                    CandidateDestination(),
+                    ProtobufPayload(),
+                    self._generic_timeline_check,
+                    self.on_proof_request),
+            Message(self, u"proof-response",
+                    MemberAuthentication(),
+                    PublicResolution(),
+                    DirectDistribution(),
+                    CandidateDestination(),
+                    ProtobufPayload(),
+                    self._generic_timeline_check,
+                    self.on_proof_response)
         ]
 
     def initiate_conversions(self):
@@ -248,16 +478,19 @@ class BlockchainCommunity(Community):
             contract = Contract.from_dict(message.payload.dictionary['contract'])
             if contract is None:
                 self.logger.warning('Dropping invalid signature-request from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
             elif not contract.verify(message.candidate.get_member()):
                 self.logger.warning('Dropping signature-request with incorrect signature')
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             self.logger.debug('Got signature-request from %s', message.candidate.sock_addr)
+            self.lifecycle.record(contract, SIGNATURE_REQUEST)
 
             if self.finalize_contract(contract, sign=True):
                 self.send_signature_response(message.candidate, contract, message.payload.dictionary['identifier'])
-                self.incoming_contracts[contract.id] = contract
+                self.add_incoming_contract(contract)
                 self.multicast_message(u'contract', {'contract': contract.to_dict()})
 
     def send_signature_response(self, candidate, contract, identifier):
@@ -269,20 +502,24 @@ class BlockchainCommunity(Community):
             cache = self.request_cache.get(u'signature-request', message.payload.dictionary['identifier'])
             if not cache:
                 self.logger.warning("Dropping unexpected signature-response from %s", message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             contract = Contract.from_dict(message.payload.dictionary['contract'])
             if contract is None:
                 self.logger.warning('Dropping invalid signature-response from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
             elif not contract.verify(message.candidate.get_member()):
                 self.logger.warning('Dropping signature-response with incorrect signature')
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             self.logger.debug('Got signature-response from %s', message.candidate.sock_addr)
+            self.lifecycle.record(contract, SIGNATURE_RESPONSE)
 
             if self.finalize_contract(contract):
-                self.incoming_contracts[contract.id] = contract
+                self.add_incoming_contract(contract)
                 self.multicast_message(u'contract', {'contract': contract.to_dict()})
 
     def on_contract(self, messages):
@@ -290,21 +527,25 @@ class BlockchainCommunity(Community):
             contract = Contract.from_dict(message.payload.dictionary['contract'])
             if contract is None:
                 self.logger.warning('Dropping invalid contract from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
             elif self.incoming_contracts.get(contract.id) or self.data_manager.get_contract(contract.id):
                 self.logger.debug('Dropping contract %s (duplicate)', b64encode(contract.id))
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             # Preliminary check to see if contract is allowed. A final check will be performed in check_block.
             if not self.check_contract(contract, fail_without_parent=False):
                 self.logger.warning('Dropping contract %s (check failed)', b64encode(contract.id))
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             self.logger.debug('Got contract %s', b64encode(contract.id))
+            self.lifecycle.record(contract, GOSSIP)
 
             # Forward if needed
             if contract.id not in self.incoming_contracts:
-                self.incoming_contracts[contract.id] = contract
+                self.add_incoming_contract(contract)
                 self.multicast_message(u'contract', {'contract': contract.to_dict()}, exclude=message.candidate)
 
     def send_block_request(self, block_id):
@@ -318,15 +559,16 @@ class BlockchainCommunity(Community):
             block_id = message.payload.dictionary['block_id']
             self.logger.debug('Got block-request for id %s', b64encode(block_id))
 
-            block = self.data_manager.get_block(block_id)
-            if block is not None:
-                self.send_message(u'block', (message.candidate,), {'block': block.to_dict()})
+            block_dict = self.data_manager.get_block_dict(block_id)
+            if block_dict is not None:
+                self.send_message(u'block', (message.candidate,), {'block': block_dict})
 
     def on_block(self, messages):
         for message in messages:
             block = Block.from_dict(message.payload.dictionary['block'])
             if not block:
                 self.logger.warning('Dropping invalid block from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             # If we're trying to download this block, stop it. This needs to happen before any additional checks.
@@ -335,24 +577,67 @@ class BlockchainCommunity(Community):
                 if isinstance(cache, BlockRequestCache) and cache.block_id == block.id:
                     self.request_cache.pop(cache.prefix, cache.number)
 
-            if not self.check_block(block):
-                self.logger.warning('Dropping illegal block from %s', message.candidate.sock_addr)
+            if block.id in self.verifying_blocks:
+                self.logger.debug('Dropping block %s (duplicate)', b64encode(block.id))
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
-            self.logger.debug('Got block %s', b64encode(block.id))
+            # The block message has the same size as the message we would create for this block
+            if len(message.packet) > MAX_PACKET_SIZE:
+                self.logger.warning('Dropping illegal block from %s (block too large)', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+                continue
 
-            # Are we dealing with an orphan block?
-            if block.previous_hash != BLOCK_GENESIS_HASH and not self.data_manager.get_block(block.previous_hash):
-                # Postpone processing the current block and request missing blocks
-                self.incoming_blocks[block.id] = block
-                # TODO: address issues with memory filling up
-                self.send_block_request(block.previous_hash)
-                self.logger.debug('Postpone block %s', b64encode(block.id))
+            # The stateless checks may run in another process, the rest of the checks is done when they are finished
+            self.verifying_blocks[block.id] = block
+            if block.id in self.assumed_valid:
+                self.on_block_verified(verify_contents(block), block, message, assume_valid=True)
                 continue
+            deferred = self.validator.verify_block(block.to_dict())
+            deferred.addCallback(self.on_block_verified, block, message)
+            deferred.addErrback(self.on_block_verification_failed, block)
 
-            if self.process_block(block):
-                self.logger.debug('Added received block with %s contract(s)', len(block.contracts))
-                self.process_blocks_after(block)
+    def on_block_verified(self, reason, block, message, assume_valid=False):
+        del self.verifying_blocks[block.id]
+
+        start = time.time()
+        if assume_valid:
+            # Blocks on the chain of a checkpoint only need to link up, and their merkle root has already been checked
+            valid = reason is None and not self.data_manager.get_block_header(block.id)
+        else:
+            valid = reason is None and self.check_block_rules(block)
+        BLOCK_VALIDATION_SECONDS.observe(time.time() - start)
+        if not valid:
+            if reason is not None:
+                self.logger.debug('Block failed check (%s)', reason)
+            self.logger.warning('Dropping illegal block from %s', message.candidate.sock_addr)
+            MESSAGES_DROPPED.inc(message.meta.name)
+            return
+
+        self.logger.debug('Got block %s', b64encode(block.id))
+
+        if assume_valid:
+            self.assumed_valid.discard(block.id)
+            if block.previous_hash != BLOCK_GENESIS_HASH:
+                self.assumed_valid.add(block.previous_hash)
+
+        # Are we dealing with an orphan block?
+        if block.previous_hash != BLOCK_GENESIS_HASH and not self.data_manager.get_block_header(block.previous_hash):
+            # Postpone processing the current block and request missing blocks, unless they are being checked
+            self.incoming_blocks[block.id] = block
+            # TODO: address issues with memory filling up
+            if block.previous_hash not in self.verifying_blocks:
+                self.send_block_request(block.previous_hash)
+            self.logger.debug('Postpone block %s', b64encode(block.id))
+            return
+
+        if self.process_block(block):
+            self.logger.debug('Added received block with %s contract(s)', len(block.contracts))
+            self.process_blocks_after(block)
+
+    def on_block_verification_failed(self, failure, block):
+        self.verifying_blocks.pop(block.id, None)
+        self.logger.error('Could not check block %s: %s', b64encode(block.id), failure.getErrorMessage())
 
     def process_blocks_after(self, block):
         # Process any orphan blocks that depend on the current block
@@ -366,7 +651,7 @@ class BlockchainCommunity(Community):
     def process_block(self, block):
         # We have already checked the proof of this block, but not whether the target_difficulty itself is as expected.
         # Note that we can't to this in check_block, because at that time the previous block may not be known yet.
-        prev_block = self.data_manager.get_block(block.previous_hash)
+        prev_block = self.data_manager.get_block_header(block.previous_hash)
         if block.target_difficulty != self.get_next_difficulty(prev_block):
             self.logger.debug('Block processing failed (unexpected target difficulty)')
             return False
@@ -388,7 +673,7 @@ class BlockchainCommunity(Community):
                 # We can connect to the best chain
                 from_height = block_index.height
                 break
-            cur_block = self.data_manager.get_block(cur_block.previous_hash)
+            cur_block = self.data_manager.get_block_header(cur_block.previous_hash)
 
         # Make sure that we are not dealing with a chain of orphan blocks
         if cur_block is None and block_ids[-1] != BLOCK_GENESIS_HASH:
@@ -397,56 +682,135 @@ class BlockchainCommunity(Community):
 
         # For now, the longest chain wins
         if len(block_ids) + from_height > latest_index.height:
+            disconnected = [self.data_manager.get_block_index_at_height(height)
+                            for height in range(from_height + 1, latest_index.height + 1)]
             self.data_manager.remove_block_indexes(from_height + 1)
+
+            connected = []
             for index, block_id in enumerate(reversed(block_ids)):
-                self.data_manager.add_block_index(BlockIndex(block_id, from_height + 1 + index))
+                block_index = BlockIndex(block_id, from_height + 1 + index)
+                self.data_manager.add_block_index(block_index)
+                connected.append(block_index)
+
+            self.on_best_chain_changed(disconnected, connected)
 
         # Make sure we stop trying to create blocks with the contracts in this block
         for contract in block.contracts:
-            if contract.id in self.incoming_contracts:
-                del self.incoming_contracts[contract.id]
+            self.remove_incoming_contract(contract.id)
 
         return True
 
+    def add_incoming_contract(self, contract):
+        """
+        Add a contract to the contracts that are waiting to be included in a block.
+        """
+        self.incoming_contracts[contract.id] = contract
+        self.lifecycle.record(contract, MEMPOOL)
+
+    def remove_incoming_contract(self, contract_id):
+        """
+        Remove a contract from the contracts that are waiting to be included in a block.
+        :return: the removed contract, or None if the contract was not waiting
+        """
+        return self.incoming_contracts.pop(contract_id, None)
+
+    def on_best_chain_changed(self, disconnected, connected):
+        """
+        Called after blocks have been removed from and/or added to the best chain.
+        :param disconnected: the BlockIndexes that have been removed, in order of height
+        :param connected: the BlockIndexes that have been added, in order of height
+        """
+        self.notify_best_chain_changed(disconnected, connected)
+        self.track_best_chain_changed(disconnected, connected)
+
+    def notify_best_chain_changed(self, disconnected, connected):
+        if not self.notifier.observers:
+            return
+
+        for block_index in reversed(disconnected):
+            self.notifier.notify(BLOCK_DISCONNECTED, {'id': urlsafe_b64encode(block_index.block_id),
+                                                      'height': block_index.height})
+
+        blocks = self.data_manager.get_blocks_by_ids([block_index.block_id for block_index in connected], full=False)
+        for block_index in connected:
+            if block_index.block_id in blocks:
+                header, contract_ids = blocks[block_index.block_id]
+                block_dict = header.to_dict(api_response=True)
+                block_dict['contracts'] = [urlsafe_b64encode(contract_id) for contract_id in contract_ids]
+                block_dict['height'] = block_index.height
+                self.notifier.notify(BLOCK_CONNECTED, {'block': block_dict})
+
+    def track_best_chain_changed(self, disconnected, connected):
+        if not self.lifecycle.lifecycles:
+            return
+
+        blocks = self.data_manager.get_blocks_by_ids([block_index.block_id for block_index in disconnected + connected],
+                                                     full=False)
+        for block_index in disconnected:
+            for contract_id in blocks.get(block_index.block_id, (None, []))[1]:
+                self.lifecycle.remove_block(contract_id)
+        for block_index in connected:
+            for contract_id in blocks.get(block_index.block_id, (None, []))[1]:
+                self.lifecycle.record_block(contract_id, block_index.height)
+        if connected:
+            self.lifecycle.update_height(connected[-1].height)
+
+    @timed(BLOCK_VALIDATION_SECONDS)
     def check_block(self, block):
         if self.get_block_packet_size(block) > MAX_PACKET_SIZE:
             self.logger.debug('Block failed check (block too large)')
             return False
 
-        if not self.check_proof(block):
+        reason = verify_block(block)
+        if reason is not None:
             # Don't log message when we created the block
             if block.creator != self.my_member.public_key:
-                self.logger.debug('Block failed check (incorrect proof)')
+                self.logger.debug('Block failed check (%s)', reason)
             return False
 
-        if not block.verify():
-            self.logger.debug('Block failed check (invalid signature)')
-            return False
+        return self.check_block_rules(block)
 
-        if self.data_manager.get_block(block.id):
-            self.logger.debug('Block failed check (duplicate block)')
-            return False
-
-        if block.time > int(time.time()) + MAX_CLOCK_DRIFT:
-            self.logger.debug('Block failed check (max clock drift exceeded)')
+    def check_block_rules(self, block):
+        """
+        Check the parts of a block that depend on our blockchain and contracts, including the proof. The other checks
+        are done by verify_block, which can be done in another process.
+        """
+        if not self.check_header_rules(block):
             return False
 
         for contract in block.contracts:
-            if block.time < contract.time:
-                self.logger.debug('Block failed check (block created before contract)')
-                return False
-
-            if not self.check_contract(contract):
+            # The signatures have already been checked by verify_block
+            if not self.check_contract(contract, verify=False):
                 self.logger.warning('Block check failed (contract check failed)')
-                self.incoming_contracts.pop(contract.id, None)
+                self.remove_incoming_contract(contract.id)
                 return False
 
-        if len(block.contracts) != len(set([contract.id for contract in block.contracts])):
-            self.logger.debug('Block failed check (duplicate contracts)')
+        return True
+
+    def check_header(self, block):
+        reason = verify_header(block)
+        if reason is not None:
+            # Don't log message when we created the block
+            if block.creator != self.my_member.public_key:
+                self.logger.debug('Block failed check (%s)', reason)
             return False
 
-        if block.merkle_root_hash != block.merkle_tree.build():
-            self.logger.debug('Block failed check (incorrect merkle root hash)')
+        return self.check_header_rules(block)
+
+    def check_header_rules(self, block):
+        if self.data_manager.get_block_header(block.id):
+            self.logger.debug('Block failed check (duplicate block)')
+            return False
+
+        # The target of the proof depends on the stake of the creator, which the worker processes don't know about
+        if not self.check_proof(block):
+            # Don't log message when we created the block
+            if block.creator != self.my_member.public_key:
+                self.logger.debug('Block failed check (incorrect proof)')
+            return False
+
+        if block.time > int(time.time()) + MAX_CLOCK_DRIFT:
+            self.logger.debug('Block failed check (max clock drift exceeded)')
             return False
 
         past_blocks = self.get_past_blocks(block, 11)
@@ -456,11 +820,109 @@ class BlockchainCommunity(Community):
 
         return True
 
+    def get_block_locator(self):
+        # Return block ids from our best chain, starting at the tip and going back exponentially
+        locator = []
+        height = self.data_manager.get_block_indexes(limit=1)[0].height
+        step = 1
+        while height > 0:
+            locator.append(self.data_manager.get_block_index_at_height(height).block_id)
+            if len(locator) >= MAX_LOCATOR_STEPS:
+                step *= 2
+            height -= step
+        locator.append(BLOCK_GENESIS_HASH)
+        return locator
+
+    def send_header_request(self):
+        verifiers = self.get_verifiers()[:HEADER_REQUEST_VERIFIERS]
+        if not verifiers:
+            self.logger.debug('No verifiers to send header-request to')
+            return
+
+        cache = self.request_cache.add(HeaderRequestCache(self, len(verifiers)))
+        self.send_message(u'header-request', tuple(verifiers), {'identifier': cache.number,
+                                                                'locator': self.get_block_locator()})
+
+    def on_header_request(self, messages):
+        for message in messages:
+            self.logger.debug('Got header-request from %s', message.candidate.sock_addr)
+
+            # Find the first block from the locator that is on our best chain
+            start_index = None
+            for block_id in message.payload.dictionary['locator']:
+                start_index = self.data_manager.get_block_index(block_id)
+                if start_index is not None:
+                    break
+
+            headers = []
+            if start_index is not None:
+                for height in range(start_index.height + 1, start_index.height + 1 + MAX_HEADERS_PER_MESSAGE):
+                    block_index = self.data_manager.get_block_index_at_height(height)
+                    if block_index is None:
+                        break
+                    header_dict = self.data_manager.get_block(block_index.block_id).to_dict()
+                    header_dict['contracts'] = []
+                    headers.append(header_dict)
+
+            self.send_message(u'headers', (message.candidate,), {'identifier': message.payload.dictionary['identifier'],
+                                                                 'headers': headers})
+
+    def on_headers(self, messages):
+        for message in messages:
+            cache = self.request_cache.get(u'header-request', message.payload.dictionary['identifier'])
+            if not cache:
+                self.logger.warning("Dropping unexpected headers from %s", message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+                continue
+
+            headers = [Block.from_dict(header_dict) for header_dict in message.payload.dictionary['headers']]
+            if None in headers:
+                self.logger.warning('Dropping invalid headers from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+                headers = []
+
+            self.logger.debug('Got %d header(s) from %s', len(headers), message.candidate.sock_addr)
+
+            # The headers are processed once all verifiers have answered, or when the request times out
+            if cache.add_response(message.candidate.get_member().public_key, message.candidate, headers):
+                self.request_cache.pop(u'header-request', message.payload.dictionary['identifier'])
+                self.process_headers(cache)
+
+    def process_headers(self, cache):
+        votes = defaultdict(int)
+        for _, headers in cache.responses:
+            for header_id in set(header.id for header in headers):
+                votes[header_id] += 1
+        min_votes = min(MIN_HEADER_VOTES, cache.num_verifiers)
+        self.agreed_headers = set(header_id for header_id, count in votes.iteritems() if count >= min_votes)
+
+        more_headers = False
+        try:
+            # The verifiers may be on different chains, so start with the one that sent the most headers
+            for candidate, headers in sorted(cache.responses, key=lambda response: len(response[1]), reverse=True):
+                for header in headers:
+                    if self.data_manager.get_block_header(header.id):
+                        continue
+
+                    # Headers are sent in order, so we should always know the previous block
+                    if not self.check_header(header) or not self.process_block(header):
+                        self.logger.warning('Dropping headers from %s (illegal header)', candidate.sock_addr)
+                        MESSAGES_DROPPED.inc(u'headers')
+                        break
+                else:
+                    # There may be more headers available
+                    more_headers = more_headers or len(headers) == MAX_HEADERS_PER_MESSAGE
+        finally:
+            self.agreed_headers = set()
+
+        if more_headers:
+            self.send_header_request()
+
     def check_proof(self, block):
-        proof = hashlib.sha256(str(block)).digest()
-        return full_to_uint256(proof) < block.target_difficulty
+        return check_proof(block)
 
     def create_block(self):
+        BLOCK_CREATION_ATTEMPTS.inc()
         latest_index = self.data_manager.get_block_indexes(limit=1)[0]
         prev_block = self.data_manager.get_block(latest_index.block_id) if latest_index is not None else None
 
@@ -510,28 +972,19 @@ class BlockchainCommunity(Community):
             if self.process_block(block):
                 self.logger.debug('Added created block with %s contract(s)', len(block.contracts))
                 self.multicast_message(u'block', {'block': block.to_dict()})
+                BLOCKS_CREATED.inc()
                 return block
 
     def get_next_difficulty(self, block):
-        # Determine difficulty for the next block
-        if block is not None:
-            target_difficulty = block.target_difficulty
-
-            # Go back BLOCK_TARGET_BLOCKSPAN
-            past_blocks = self.get_past_blocks(block, BLOCK_TARGET_BLOCKSPAN)
-            if past_blocks:
-                target_difficulty *= float(block.time - past_blocks[-1].time) / BLOCK_TARGET_TIMESPAN
-        else:
-            target_difficulty = BLOCK_DIFFICULTY_INIT
-
-        target_difficulty = min(target_difficulty, BLOCK_DIFFICULTY_MIN)
-        return compact_to_uint256(uint256_to_compact(target_difficulty))
+        # Go back BLOCK_TARGET_BLOCKSPAN
+        past_blocks = self.get_past_blocks(block, BLOCK_TARGET_BLOCKSPAN) if block is not None else None
+        return calculate_next_difficulty(block, past_blocks)
 
     def get_past_blocks(self, block, num_past):
         result = []
         current = block
         for _ in range(num_past):
-            current = self.data_manager.get_block(current.previous_hash)
+            current = self.data_manager.get_block_header(current.previous_hash)
             if current is None:
                 return None
             result.append(current)
@@ -545,8 +998,8 @@ class BlockchainCommunity(Community):
                             payload=({'block': block.to_dict()},))
         return len(message.packet)
 
-    def check_contract(self, contract, fail_without_parent=True):
-        if not contract.verify():
+    def check_contract(self, contract, fail_without_parent=True, verify=True):
+        if verify and not contract.verify():
             self.logger.debug('Contract failed check (invalid signature)')
             return False
 
@@ -571,6 +1024,7 @@ class BlockchainCommunity(Community):
         contract.previous_hash = previous_hash
         contract.time = int(time.time())
         contract.sign(self.my_member)
+        self.lifecycle.record(contract, BEGIN)
 
         return self.send_signature_request(contract, candidate)
 
@@ -585,6 +1039,126 @@ class BlockchainCommunity(Community):
 
         return True
 
+    def send_proof_request(self, contract_id, contract_type=None):
+        # Since we check the proof ourselves, we only need to ask a single verifier
+        verifiers = self.get_verifiers()
+        if not verifiers:
+            self.logger.warning('No verifiers to send proof-request')
+            return
+
+        deferred = Deferred()
+        cache = self.request_cache.add(ProofRequestCache(self, contract_id, contract_type, deferred))
+
+        msg_dict = {'identifier': cache.number,
+                    'contract_id': contract_id}
+
+        if contract_type != None:
+            msg_dict['contract_type'] = contract_type
+
+        self.send_message(u'proof-request', (verifiers[0],), msg_dict)
+
+        return deferred
+
+    def on_proof_request(self, messages):
+        for message in messages:
+            msg_dict = {'identifier': message.payload.dictionary['identifier']}
+            contract = self.data_manager.get_contract(message.payload.dictionary['contract_id'])
+
+            block_id = self.data_manager.get_blockchain_block_id(contract.id) if contract is not None else None
+            if block_id is not None:
+                block = self.data_manager.get_block(block_id)
+                msg_dict['contract'] = contract.to_dict()
+                msg_dict['proof'] = block.get_merkle_proof(contract.id).to_dict()
+
+            self.send_message(u'proof-response', (message.candidate,), msg_dict)
+
+    def on_proof_response(self, messages):
+        for message in messages:
+            cache = self.request_cache.pop(u'proof-request', message.payload.dictionary['identifier'])
+            if not cache:
+                self.logger.warning("Dropping unexpected proof-response from %s", message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+                continue
+
+            self.logger.debug('Got proof-response from %s', message.candidate.sock_addr)
+
+            if 'contract' not in message.payload.dictionary:
+                cache.deferred.callback((None, None))
+                continue
+
+            contract = Contract.from_dict(message.payload.dictionary['contract'])
+            merkle_proof = MerkleProof.from_dict(contract.id, message.payload.dictionary['proof']) \
+                           if contract is not None and 'proof' in message.payload.dictionary else None
+
+            if merkle_proof is None or not self.check_merkle_proof(contract, merkle_proof, cache):
+                self.logger.warning('Dropping invalid proof-response from %s', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+                cache.deferred.callback(None)
+                continue
+
+            if self.data_manager.get_contract(contract.id) is None:
+                self.data_manager.add_contract(contract)
+            self.data_manager.add_merkle_proof(merkle_proof)
+            # Light nodes don't download blocks, so the proof tells them in which block the contract is
+            block_index = self.data_manager.get_block_index(merkle_proof.block_id)
+            if self.lifecycle.record_block(contract.id, block_index.height):
+                self.lifecycle.update_height(self.data_manager.get_block_indexes(limit=1)[0].height)
+
+            cache.deferred.callback((contract, self.find_confirmation_count(contract.id)))
+
+    def check_merkle_proof(self, contract, merkle_proof, cache):
+        if not contract.verify():
+            self.logger.debug('Proof failed check (invalid contract signature)')
+            return False
+
+        if contract.id != cache.contract_id:
+            self.logger.debug('Proof failed check (unexpected contract)')
+            return False
+
+        if cache.contract_type is not None and contract.type != cache.contract_type:
+            self.logger.debug('Proof failed check (unexpected contract type)')
+            return False
+
+        header = self.data_manager.get_block_header(merkle_proof.block_id)
+        if header is None or self.data_manager.get_block_index(header.id) is None:
+            # We may be lagging behind, so try to get more headers
+            self.logger.debug('Proof failed check (block not on best chain)')
+            self.send_header_request()
+            return False
+
+        if not merkle_proof.verify(header.merkle_root_hash):
+            self.logger.debug('Proof failed check (incorrect merkle branch)')
+            return False
+
+        return True
+
+    def update_proofs(self):
+        # Forget about proofs that no longer point to a block on the best chain
+        for merkle_proof in list(self.data_manager.get_merkle_proofs()):
+            if self.data_manager.get_block_index(merkle_proof.block_id) is None:
+                self.data_manager.remove_merkle_proof(merkle_proof)
+
+        # Make sure we have a proof for every contract we're involved in. The contracts for which we have waited the
+        # longest go first, so that contracts that never make it into a block don't keep the others from being proven.
+        contract_ids = list(self.data_manager.get_contracts_without_proof(self.my_member.public_key)
+                            .values(Contract._id))
+        self.proof_requested = {contract_id: self.proof_requested[contract_id]
+                                for contract_id in contract_ids if contract_id in self.proof_requested}
+        now = time.time()
+        for contract_id in sorted(contract_ids, key=lambda c: self.proof_requested.get(c, 0))[:MAX_PROOF_REQUESTS]:
+            self.proof_requested[contract_id] = now
+            self.send_proof_request(contract_id)
+
+    @inlineCallbacks
+    def find_contract_remote(self, contract_id, contract_type=None):
+        # A merkle proof doesn't prove that a contract descends from contract_id, or that it is the end of the chain.
+        # So we rely on the responses of multiple verifiers.
+        response = yield self.send_traversal_request(contract_id, contract_type)
+        if self.light and response is not None and response[0] is not None:
+            # Light nodes don't have the blocks, so they also check the proof of the contract themselves
+            response = yield self.send_proof_request(response[0].id, contract_type)
+        returnValue(response)
+
     def send_traversal_request(self, contract_id, contract_type=None, max_requests=5, min_responses=1):
         # Send a message to a limited number of verifiers
         verifiers = self.get_verifiers()[:max_requests]
@@ -633,6 +1207,7 @@ class BlockchainCommunity(Community):
             cache = self.request_cache.get(u'traversal-request', message.payload.dictionary['identifier'])
             if not cache:
                 self.logger.warning("Dropping unexpected traversal-response from %s", message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
                 continue
 
             self.logger.debug('Got traversal-response from %s', message.candidate.sock_addr)
@@ -647,32 +1222,39 @@ class BlockchainCommunity(Community):
 
     def traverse_contracts(self, contract_id, contract_type):
         contract_of_type = None
-        contract = self.data_manager.get_contract(contract_id) \
+        contract = self.data_manager.get_contract_header(contract_id) \
                    if self.data_manager.contract_on_blockchain(contract_id) else None
 
-        # Traverse contract chain
+        # Traverse contract chain. We only load the complete contract once we have found the one we are looking for.
         while contract:
             if contract.type == contract_type:
                 contract_of_type = contract
 
-            contracts = self.data_manager.find_contracts(Contract.previous_hash == contract.id)
-            contracts = [contract for contract in list(contracts) if self.data_manager.contract_on_blockchain(contract.id)]
+            contract_ids = self.data_manager.get_contract_ids_by_previous_hash(contract.id)
+            contract_ids = [contract_id for contract_id in contract_ids
+                            if self.data_manager.contract_on_blockchain(contract_id)]
 
-            if len(contracts) == 1:
+            if len(contract_ids) == 1:
                 # Keep traversing the contract chain
-                contract = contracts[0]
+                contract = self.data_manager.get_contract_header(contract_ids[0])
                 continue
 
-            elif len(contracts) == 0:
+            elif len(contract_ids) == 0:
                 # Found end of contract chain
-                return contract if contract_type is None else contract_of_type
+                result = contract if contract_type is None else contract_of_type
+                return self.data_manager.get_contract(result.id) if result is not None else None
 
             break
 
     def find_confirmation_count(self, contract_id):
         # Find the number of confirmations this contract has
-        block_id = self.data_manager.get_blockchain_block_id(contract_id)
-        block = self.data_manager.get_block(block_id)
+        if self.light:
+            # Light nodes only know about contracts in blocks through merkle proofs
+            merkle_proof = self.data_manager.get_merkle_proof(contract_id)
+            block_id = merkle_proof.block_id if merkle_proof is not None else None
+        else:
+            block_id = self.data_manager.get_blockchain_block_id(contract_id)
+        block = self.data_manager.get_block_header(block_id)
         if block:
             first_index = self.data_manager.get_block_index(block.id)
             last_index = self.data_manager.get_block_indexes(limit=1)[0]
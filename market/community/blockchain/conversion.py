@@ -13,7 +13,11 @@ class BlockchainConversion(BinaryConversion):
                      u'block-request': (chr(4), conversion_pb2.BlockRequestMessage),
                      u'block': (chr(5), conversion_pb2.BlockMessage),
                      u'traversal-request': (chr(6), conversion_pb2.TraversalRequestMessage),
-                     u'traversal-response': (chr(7), conversion_pb2.TraversalResponseMessage)}
+                     u'traversal-response': (chr(7), conversion_pb2.TraversalResponseMessage),
+                     u'header-request': (chr(8), conversion_pb2.HeaderRequestMessage),
+                     u'headers': (chr(9), conversion_pb2.HeadersMessage),
+                     u'proof-request': (chr(10), conversion_pb2.ProofRequestMessage),
+                     u'proof-response': (chr(11), conversion_pb2.ProofResponseMessage)}
 
         for name, (byte, proto) in msg_types.iteritems():
             self.define_meta_message(byte,
@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='conversion.proto',
   package='blockchain',
   syntax='proto2',
-  serialized_pb=_b('\n\x10\x63onversion.proto\x12\nblockchain\"U\n\x17SignatureRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x02(\x0b\x32\x14.blockchain.Contract\"V\n\x18SignatureResponseMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x02(\x0b\x32\x14.blockchain.Contract\"9\n\x0f\x43ontractMessage\x12&\n\x08\x63ontract\x18\x01 \x02(\x0b\x32\x14.blockchain.Contract\"\'\n\x13\x42lockRequestMessage\x12\x10\n\x08\x62lock_id\x18\x01 \x02(\x0c\"0\n\x0c\x42lockMessage\x12 \n\x05\x62lock\x18\x01 \x02(\x0b\x32\x11.blockchain.Block\"Y\n\x17TraversalRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x02 \x02(\x0c\x12\x15\n\rcontract_type\x18\x03 \x01(\r\"m\n\x18TraversalResponseMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x01(\x0b\x32\x14.blockchain.Contract\x12\x15\n\rconfirmations\x18\x03 \x01(\r\"\xad\x01\n\x08\x43ontract\x12\x15\n\rprevious_hash\x18\x01 \x02(\x0c\x12\x17\n\x0f\x66rom_public_key\x18\x02 \x02(\x0c\x12\x16\n\x0e\x66rom_signature\x18\x03 \x02(\x0c\x12\x15\n\rto_public_key\x18\x04 \x02(\x0c\x12\x14\n\x0cto_signature\x18\x05 \x02(\x0c\x12\x10\n\x08\x64ocument\x18\x06 \x02(\x0c\x12\x0c\n\x04type\x18\x07 \x02(\r\x12\x0c\n\x04time\x18\x08 \x02(\r\"\xb6\x01\n\x05\x42lock\x12\x15\n\rprevious_hash\x18\x01 \x02(\x0c\x12\x18\n\x10merkle_root_hash\x18\x02 \x02(\x0c\x12\x19\n\x11target_difficulty\x18\x03 \x02(\x0c\x12\x0f\n\x07\x63reator\x18\x04 \x02(\x0c\x12\x19\n\x11\x63reator_signature\x18\x05 \x02(\x0c\x12\x0c\n\x04time\x18\x06 \x02(\r\x12\'\n\tcontracts\x18\x07 \x03(\x0b\x32\x14.blockchain.Contract')
+  serialized_pb=_b('\n\x10\x63onversion.proto\x12\nblockchain\"U\n\x17SignatureRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x02(\x0b\x32\x14.blockchain.Contract\"V\n\x18SignatureResponseMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x02(\x0b\x32\x14.blockchain.Contract\"9\n\x0f\x43ontractMessage\x12&\n\x08\x63ontract\x18\x01 \x02(\x0b\x32\x14.blockchain.Contract\"\'\n\x13\x42lockRequestMessage\x12\x10\n\x08\x62lock_id\x18\x01 \x02(\x0c\"0\n\x0c\x42lockMessage\x12 \n\x05\x62lock\x18\x01 \x02(\x0b\x32\x11.blockchain.Block\"Y\n\x17TraversalRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x02 \x02(\x0c\x12\x15\n\rcontract_type\x18\x03 \x01(\r\"m\n\x18TraversalResponseMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x01(\x0b\x32\x14.blockchain.Contract\x12\x15\n\rconfirmations\x18\x03 \x01(\r\";\n\x14HeaderRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12\x0f\n\x07locator\x18\x02 \x03(\x0c\"H\n\x0eHeadersMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12\"\n\x07headers\x18\x02 \x03(\x0b\x32\x11.blockchain.Block\"g\n\x13ProofRequestMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x02 \x02(\x0c\x12\x15\n\rcontract_type\x18\x03 \x01(\r\x12\x10\n\x08traverse\x18\x04 \x01(\x08\"z\n\x14ProofResponseMessage\x12\x12\n\nidentifier\x18\x01 \x02(\r\x12&\n\x08\x63ontract\x18\x02 \x01(\x0b\x32\x14.blockchain.Contract\x12&\n\x05proof\x18\x03 \x01(\x0b\x32\x17.blockchain.MerkleProof\"\xad\x01\n\x08\x43ontract\x12\x15\n\rprevious_hash\x18\x01 \x02(\x0c\x12\x17\n\x0f\x66rom_public_key\x18\x02 \x02(\x0c\x12\x16\n\x0e\x66rom_signature\x18\x03 \x02(\x0c\x12\x15\n\rto_public_key\x18\x04 \x02(\x0c\x12\x14\n\x0cto_signature\x18\x05 \x02(\x0c\x12\x10\n\x08\x64ocument\x18\x06 \x02(\x0c\x12\x0c\n\x04type\x18\x07 \x02(\r\x12\x0c\n\x04time\x18\x08 \x02(\r\"\xb6\x01\n\x05\x42lock\x12\x15\n\rprevious_hash\x18\x01 \x02(\x0c\x12\x18\n\x10merkle_root_hash\x18\x02 \x02(\x0c\x12\x19\n\x11target_difficulty\x18\x03 \x02(\x0c\x12\x0f\n\x07\x63reator\x18\x04 \x02(\x0c\x12\x19\n\x11\x63reator_signature\x18\x05 \x02(\x0c\x12\x0c\n\x04time\x18\x06 \x02(\r\x12\'\n\tcontracts\x18\x07 \x03(\x0b\x32\x14.blockchain.Contract\"G\n\x0bMerkleProof\x12\x10\n\x08\x62lock_id\x18\x01 \x02(\x0c\x12&\n\x06\x62ranch\x18\x02 \x03(\x0b\x32\x16.blockchain.MerkleNode\"(\n\nMerkleNode\x12\x0c\n\x04hash\x18\x01 \x02(\x0c\x12\x0c\n\x04left\x18\x02 \x02(\x08')
 )
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -285,6 +285,179 @@ _TRAVERSALRESPONSEMESSAGE = _descriptor.Descriptor(
 )
 
 
+_HEADERREQUESTMESSAGE = _descriptor.Descriptor(
+  name='HeaderRequestMessage',
+  full_name='blockchain.HeaderRequestMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='identifier', full_name='blockchain.HeaderRequestMessage.identifier', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='locator', full_name='blockchain.HeaderRequestMessage.locator', index=1,
+      number=2, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=559,
+  serialized_end=618,
+)
+
+
+_HEADERSMESSAGE = _descriptor.Descriptor(
+  name='HeadersMessage',
+  full_name='blockchain.HeadersMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='identifier', full_name='blockchain.HeadersMessage.identifier', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='headers', full_name='blockchain.HeadersMessage.headers', index=1,
+      number=2, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=620,
+  serialized_end=692,
+)
+
+
+_PROOFREQUESTMESSAGE = _descriptor.Descriptor(
+  name='ProofRequestMessage',
+  full_name='blockchain.ProofRequestMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='identifier', full_name='blockchain.ProofRequestMessage.identifier', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='contract_id', full_name='blockchain.ProofRequestMessage.contract_id', index=1,
+      number=2, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='contract_type', full_name='blockchain.ProofRequestMessage.contract_type', index=2,
+      number=3, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='traverse', full_name='blockchain.ProofRequestMessage.traverse', index=3,
+      number=4, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=694,
+  serialized_end=797,
+)
+
+
+_PROOFRESPONSEMESSAGE = _descriptor.Descriptor(
+  name='ProofResponseMessage',
+  full_name='blockchain.ProofResponseMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='identifier', full_name='blockchain.ProofResponseMessage.identifier', index=0,
+      number=1, type=13, cpp_type=3, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='contract', full_name='blockchain.ProofResponseMessage.contract', index=1,
+      number=2, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='proof', full_name='blockchain.ProofResponseMessage.proof', index=2,
+      number=3, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=799,
+  serialized_end=921,
+)
+
+
 _CONTRACT = _descriptor.Descriptor(
   name='Contract',
   full_name='blockchain.Contract',
@@ -360,8 +533,8 @@ _CONTRACT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=560,
-  serialized_end=733,
+  serialized_start=924,
+  serialized_end=1097,
 )
 
 
@@ -433,8 +606,84 @@ _BLOCK = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=736,
-  serialized_end=918,
+  serialized_start=1100,
+  serialized_end=1282,
+)
+
+
+_MERKLEPROOF = _descriptor.Descriptor(
+  name='MerkleProof',
+  full_name='blockchain.MerkleProof',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='block_id', full_name='blockchain.MerkleProof.block_id', index=0,
+      number=1, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='branch', full_name='blockchain.MerkleProof.branch', index=1,
+      number=2, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1284,
+  serialized_end=1355,
+)
+
+
+_MERKLENODE = _descriptor.Descriptor(
+  name='MerkleNode',
+  full_name='blockchain.MerkleNode',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='hash', full_name='blockchain.MerkleNode.hash', index=0,
+      number=1, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='left', full_name='blockchain.MerkleNode.left', index=1,
+      number=2, type=8, cpp_type=7, label=2,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1357,
+  serialized_end=1397,
 )
 
 _SIGNATUREREQUESTMESSAGE.fields_by_name['contract'].message_type = _CONTRACT
@@ -442,7 +691,11 @@ _SIGNATURERESPONSEMESSAGE.fields_by_name['contract'].message_type = _CONTRACT
 _CONTRACTMESSAGE.fields_by_name['contract'].message_type = _CONTRACT
 _BLOCKMESSAGE.fields_by_name['block'].message_type = _BLOCK
 _TRAVERSALRESPONSEMESSAGE.fields_by_name['contract'].message_type = _CONTRACT
+_HEADERSMESSAGE.fields_by_name['headers'].message_type = _BLOCK
+_PROOFRESPONSEMESSAGE.fields_by_name['contract'].message_type = _CONTRACT
+_PROOFRESPONSEMESSAGE.fields_by_name['proof'].message_type = _MERKLEPROOF
 _BLOCK.fields_by_name['contracts'].message_type = _CONTRACT
+_MERKLEPROOF.fields_by_name['branch'].message_type = _MERKLENODE
 DESCRIPTOR.message_types_by_name['SignatureRequestMessage'] = _SIGNATUREREQUESTMESSAGE
 DESCRIPTOR.message_types_by_name['SignatureResponseMessage'] = _SIGNATURERESPONSEMESSAGE
 DESCRIPTOR.message_types_by_name['ContractMessage'] = _CONTRACTMESSAGE
@@ -450,8 +703,14 @@ DESCRIPTOR.message_types_by_name['BlockRequestMessage'] = _BLOCKREQUESTMESSAGE
 DESCRIPTOR.message_types_by_name['BlockMessage'] = _BLOCKMESSAGE
 DESCRIPTOR.message_types_by_name['TraversalRequestMessage'] = _TRAVERSALREQUESTMESSAGE
 DESCRIPTOR.message_types_by_name['TraversalResponseMessage'] = _TRAVERSALRESPONSEMESSAGE
+DESCRIPTOR.message_types_by_name['HeaderRequestMessage'] = _HEADERREQUESTMESSAGE
+DESCRIPTOR.message_types_by_name['HeadersMessage'] = _HEADERSMESSAGE
+DESCRIPTOR.message_types_by_name['ProofRequestMessage'] = _PROOFREQUESTMESSAGE
+DESCRIPTOR.message_types_by_name['ProofResponseMessage'] = _PROOFRESPONSEMESSAGE
 DESCRIPTOR.message_types_by_name['Contract'] = _CONTRACT
 DESCRIPTOR.message_types_by_name['Block'] = _BLOCK
+DESCRIPTOR.message_types_by_name['MerkleProof'] = _MERKLEPROOF
+DESCRIPTOR.message_types_by_name['MerkleNode'] = _MERKLENODE
 
 SignatureRequestMessage = _reflection.GeneratedProtocolMessageType('SignatureRequestMessage', (_message.Message,), dict(
   DESCRIPTOR = _SIGNATUREREQUESTMESSAGE,
@@ -502,6 +761,34 @@ TraversalResponseMessage = _reflection.GeneratedProtocolMessageType('TraversalRe
   ))
 _sym_db.RegisterMessage(TraversalResponseMessage)
 
+HeaderRequestMessage = _reflection.GeneratedProtocolMessageType('HeaderRequestMessage', (_message.Message,), dict(
+  DESCRIPTOR = _HEADERREQUESTMESSAGE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.HeaderRequestMessage)
+  ))
+_sym_db.RegisterMessage(HeaderRequestMessage)
+
+HeadersMessage = _reflection.GeneratedProtocolMessageType('HeadersMessage', (_message.Message,), dict(
+  DESCRIPTOR = _HEADERSMESSAGE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.HeadersMessage)
+  ))
+_sym_db.RegisterMessage(HeadersMessage)
+
+ProofRequestMessage = _reflection.GeneratedProtocolMessageType('ProofRequestMessage', (_message.Message,), dict(
+  DESCRIPTOR = _PROOFREQUESTMESSAGE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.ProofRequestMessage)
+  ))
+_sym_db.RegisterMessage(ProofRequestMessage)
+
+ProofResponseMessage = _reflection.GeneratedProtocolMessageType('ProofResponseMessage', (_message.Message,), dict(
+  DESCRIPTOR = _PROOFRESPONSEMESSAGE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.ProofResponseMessage)
+  ))
+_sym_db.RegisterMessage(ProofResponseMessage)
+
 Contract = _reflection.GeneratedProtocolMessageType('Contract', (_message.Message,), dict(
   DESCRIPTOR = _CONTRACT,
   __module__ = 'conversion_pb2'
@@ -516,5 +803,19 @@ Block = _reflection.GeneratedProtocolMessageType('Block', (_message.Message,), d
   ))
 _sym_db.RegisterMessage(Block)
 
+MerkleProof = _reflection.GeneratedProtocolMessageType('MerkleProof', (_message.Message,), dict(
+  DESCRIPTOR = _MERKLEPROOF,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.MerkleProof)
+  ))
+_sym_db.RegisterMessage(MerkleProof)
+
+MerkleNode = _reflection.GeneratedProtocolMessageType('MerkleNode', (_message.Message,), dict(
+  DESCRIPTOR = _MERKLENODE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:blockchain.MerkleNode)
+  ))
+_sym_db.RegisterMessage(MerkleNode)
+
 
 # @@protoc_insertion_point(module_scope)
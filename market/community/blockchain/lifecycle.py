@@ -0,0 +1,153 @@
+import math
+import time
+
+from collections import OrderedDict, defaultdict
+
+# The stages of a contract, in the order in which they normally occur. A node only sees some of them: the node that
+# begins a contract gets a signature-response, the other party gets a signature-request, and all other nodes get the
+# contract through gossip.
+ACTION = 'action'
+BEGIN = 'begin'
+SIGNATURE_REQUEST = 'signature_request'
+SIGNATURE_RESPONSE = 'signature_response'
+GOSSIP = 'gossip'
+MEMPOOL = 'mempool'
+BLOCK = 'block'
+CONFIRMED = 'confirmed'
+STAGES = [ACTION, BEGIN, SIGNATURE_REQUEST, SIGNATURE_RESPONSE, GOSSIP, MEMPOOL, BLOCK, CONFIRMED]
+
+MAX_TRACKED_CONTRACTS = 10000
+MAX_PENDING_ACTIONS = 1000
+# Number of blocks on top of the block with the contract before a contract is considered confirmed
+CONFIRMATIONS = 6
+
+PERCENTILES = (50, 90, 99)
+
+
+def get_percentiles(values):
+    values = sorted(values)
+    result = {'count': len(values), 'max': values[-1]}
+    for percentile in PERCENTILES:
+        # Nearest-rank method
+        rank = int(math.ceil(percentile / 100.0 * len(values)))
+        result['p%d' % percentile] = values[max(rank, 1) - 1]
+    return result
+
+
+class ContractLifecycle(object):
+    """
+    This class holds the times at which a contract reached each stage on this node.
+    """
+
+    def __init__(self, contract_id):
+        self.contract_id = contract_id
+        self.action = None
+        self.times = {}
+
+
+class LifecycleTracker(object):
+    """
+    This class keeps track of the stages that contracts go through on this node, so that we can find out where the
+    time between starting an action and having a confirmed contract is spent. Only the most recent contracts are
+    kept.
+
+    Actions (e.g., accepting a mortgage through the REST API) are tagged with the object they are about. Since the
+    contract for that object is usually created by another node, the action is linked to the first contract with that
+    object that is seen.
+    """
+
+    def __init__(self, max_contracts=MAX_TRACKED_CONTRACTS, max_actions=MAX_PENDING_ACTIONS,
+                 confirmations=CONFIRMATIONS, clock=time.time):
+        self.max_contracts = max_contracts
+        self.max_actions = max_actions
+        self.confirmations = confirmations
+        self.clock = clock
+        # Contract id -> ContractLifecycle, oldest first
+        self.lifecycles = OrderedDict()
+        # (object type, object id, object user id) -> (action, time), oldest first
+        self.actions = OrderedDict()
+        # Contract id -> height of the block with the contract, for contracts that are not yet confirmed
+        self.in_block = {}
+
+    def tag_action(self, action, object_type, object_id, object_user_id):
+        key = (object_type, object_id, object_user_id)
+        self.actions.pop(key, None)
+        self.actions[key] = (action, self.clock())
+        if len(self.actions) > self.max_actions:
+            self.actions.popitem(last=False)
+
+    def record(self, contract, stage):
+        """
+        Record that a contract reached a stage. Only the first time a stage is reached is kept.
+        """
+        lifecycle = self.lifecycles.get(contract.id)
+        if lifecycle is None:
+            lifecycle = self.lifecycles[contract.id] = ContractLifecycle(contract.id)
+            if len(self.lifecycles) > self.max_contracts:
+                contract_id, _ = self.lifecycles.popitem(last=False)
+                self.in_block.pop(contract_id, None)
+            if self.actions:
+                self.link_action(lifecycle, contract)
+
+        lifecycle.times.setdefault(stage, self.clock())
+
+    def link_action(self, lifecycle, contract):
+        obj = contract.get_object()
+        key = (contract.type, getattr(obj, 'id', None), getattr(obj, 'user_id', None))
+        if key in self.actions:
+            lifecycle.action, lifecycle.times[ACTION] = self.actions.pop(key)
+
+    def record_block(self, contract_id, height):
+        """
+        Record that a contract has been included in the block at the given height of the best chain.
+        :return: True if the contract is being tracked, False otherwise
+        """
+        lifecycle = self.lifecycles.get(contract_id)
+        if lifecycle is None:
+            return False
+
+        lifecycle.times.setdefault(BLOCK, self.clock())
+        if CONFIRMED not in lifecycle.times:
+            self.in_block[contract_id] = height
+        return True
+
+    def remove_block(self, contract_id):
+        """
+        Record that the block with a contract is no longer on the best chain.
+        """
+        self.in_block.pop(contract_id, None)
+
+    def update_height(self, height):
+        """
+        Record the contracts that are confirmed now that the best chain has the given height.
+        """
+        for contract_id, block_height in self.in_block.items():
+            if height - block_height >= self.confirmations:
+                del self.in_block[contract_id]
+                self.lifecycles[contract_id].times.setdefault(CONFIRMED, self.clock())
+
+    def get_statistics(self):
+        """
+        Get the percentiles of the time spent in every stage (i.e., the time between reaching the previous stage and
+        reaching this stage), and per action the percentiles of the time between the action and reaching each stage.
+        """
+        stages = defaultdict(list)
+        actions = defaultdict(lambda: defaultdict(list))
+        for lifecycle in self.lifecycles.itervalues():
+            previous = None
+            for stage in STAGES:
+                stage_time = lifecycle.times.get(stage)
+                if stage_time is None:
+                    continue
+                if previous is not None:
+                    stages[stage].append(stage_time - previous)
+                previous = stage_time
+
+                if lifecycle.action is not None and stage != ACTION:
+                    actions[lifecycle.action][stage].append(stage_time - lifecycle.times[ACTION])
+
+        return {'contracts': len(self.lifecycles),
+                'stages': {stage: get_percentiles(durations) for stage, durations in stages.iteritems()},
+                'actions': {action: {stage: get_percentiles(durations)
+                                     for stage, durations in action_stages.iteritems()}
+                            for action, action_stages in actions.iteritems()}}
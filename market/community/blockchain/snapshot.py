@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+import logging
+
+from binascii import hexlify, unhexlify
+
+SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger('BlockchainLogger')
+
+
+class ChainSnapshot(object):
+    """
+    This class holds the state that a node has derived from the best chain up to a given height, so that a restarted
+    node only needs to process the blocks above that height. Besides the best chain itself, communities can store their
+    own state (e.g., the amounts invested in mortgages) as a JSON-compatible dictionary.
+
+    Snapshots are written together with a checksum, and they replace the previous snapshot atomically. An incomplete
+    or corrupted snapshot is ignored.
+    """
+
+    def __init__(self, height, best_chain, state=None):
+        self.height = height
+        # Block ids of the best chain, indexed by height
+        self.best_chain = best_chain
+        self.state = state or {}
+
+    @property
+    def block_id(self):
+        return self.best_chain[self.height]
+
+    def to_dict(self):
+        return {'version': SNAPSHOT_VERSION,
+                'height': self.height,
+                'best_chain': [hexlify(block_id) for block_id in self.best_chain],
+                'state': self.state}
+
+    @staticmethod
+    def from_dict(snapshot_dict):
+        return ChainSnapshot(snapshot_dict['height'],
+                             [unhexlify(block_id) for block_id in snapshot_dict['best_chain']],
+                             snapshot_dict['state'])
+
+    def save(self, filename):
+        body = json.dumps(self.to_dict(), sort_keys=True)
+        with open(filename + '.tmp', 'wb') as fp:
+            fp.write(hashlib.sha256(body).hexdigest() + '\n' + body)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.rename(filename + '.tmp', filename)
+
+    @staticmethod
+    def load(filename):
+        """
+        Load a snapshot from a file.
+        :return: a ChainSnapshot, or None if the file does not exist or does not contain a valid snapshot
+        """
+        if not os.path.exists(filename):
+            return None
+
+        with open(filename, 'rb') as fp:
+            checksum, _, body = fp.read().partition('\n')
+
+        if hashlib.sha256(body).hexdigest() != checksum:
+            logger.warning('Ignoring snapshot %s (checksum mismatch)', filename)
+            return None
+
+        try:
+            snapshot_dict = json.loads(body)
+            if snapshot_dict.get('version') != SNAPSHOT_VERSION:
+                logger.warning('Ignoring snapshot %s (unsupported version)', filename)
+                return None
+            snapshot = ChainSnapshot.from_dict(snapshot_dict)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning('Ignoring snapshot %s (%s)', filename, e)
+            return None
+
+        if not 0 <= snapshot.height < len(snapshot.best_chain):
+            logger.warning('Ignoring snapshot %s (invalid height)', filename)
+            return None
+        return snapshot
@@ -0,0 +1,192 @@
+"""
+The stateless checks of blocks, i.e. the checks that don't depend on the blockchain or the contracts that this node
+knows about. Since these checks don't need the database, they can run in a pool of worker processes. The proof of a
+block depends on the stake of its creator, so it is checked by the community instead.
+"""
+
+import time
+import signal
+import hashlib
+import logging
+import multiprocessing
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, gatherResults, maybeDeferred
+from twisted.python.failure import Failure
+
+from market.defs import VERIFIED_BANKS
+from market.metrics import BLOCK_VERIFICATION_SECONDS
+from market.models.block import Block
+from market.models.contract import Contract
+from market.util.misc import verify_libnaclpk
+from market.util.uint256 import full_to_uint256
+
+# The signatures of the contracts of a block are checked in tasks of at most this many contracts
+CONTRACTS_PER_TASK = 16
+
+logger = logging.getLogger('BlockchainLogger')
+
+
+def check_proof(block, stake=1):
+    proof = hashlib.sha256(str(block)).digest()
+    return full_to_uint256(proof) < block.target_difficulty * stake
+
+
+def verify_header(block):
+    """
+    Check the signature of a block.
+    :return: the reason why the block is invalid, or None if the block is valid
+    """
+    if not block.verify():
+        return 'invalid signature'
+
+
+def verify_contents(block):
+    """
+    Check the contracts of a block, except for their signatures.
+    :return: the reason why the block is invalid, or None if the block is valid
+    """
+    if None in block.contracts:
+        return 'invalid contract'
+
+    for contract in block.contracts:
+        if block.time < contract.time:
+            return 'block created before contract'
+
+    if len(block.contracts) != len(set([contract.id for contract in block.contracts])):
+        return 'duplicate contracts'
+
+    if block.merkle_root_hash != block.merkle_tree.build():
+        return 'incorrect merkle root hash'
+
+
+def verify_contracts(contracts):
+    """
+    Check the signatures of contracts.
+    :return: the reason why a contract is invalid, or None if all contracts are valid
+    """
+    for contract in contracts:
+        if not contract.verify():
+            return 'invalid contract signature'
+
+
+def verify_block(block):
+    """
+    Run all stateless checks of a block.
+    :return: the reason why the block is invalid, or None if the block is valid
+    """
+    return verify_header(block) or verify_contents(block) or verify_contracts(block.contracts)
+
+
+def get_checkpoint_data(height, block_id):
+    # The data that is signed by the bank that vouches for a checkpoint
+    return 'checkpoint %d %s' % (height, block_id)
+
+
+def load_checkpoints(checkpoints, banks=VERIFIED_BANKS):
+    """
+    Get the checkpoints that have been signed by a verified bank.
+    :param checkpoints: a dictionary mapping heights to (block id, bank name, signature) tuples
+    :param banks: a dictionary mapping bank names to public keys
+    :return: a dictionary mapping heights to block ids
+    """
+    result = {}
+    for height, (block_id, bank, signature) in checkpoints.iteritems():
+        public_key = banks.get(bank)
+        if public_key is None or not verify_libnaclpk(public_key, get_checkpoint_data(height, block_id), signature):
+            logger.warning('Ignoring checkpoint at height %d (invalid signature)', height)
+            continue
+        result[height] = block_id
+    return result
+
+
+# Storm objects can't be pickled, so the worker processes get the dictionaries from the payload of the block message
+
+def verify_block_dict(block_dict):
+    block = Block.from_dict(block_dict)
+    return verify_header(block) or verify_contents(block)
+
+
+def verify_contract_dicts(contract_dicts):
+    contracts = [Contract.from_dict(contract_dict) for contract_dict in contract_dicts]
+    if None in contracts:
+        return 'invalid contract'
+    return verify_contracts(contracts)
+
+
+def run_task(func, args):
+    # Python 2 doesn't pass exceptions of tasks to callbacks, so we do it ourselves
+    try:
+        return True, func(*args)
+    except Exception as e:
+        return False, '%s: %s' % (e.__class__.__name__, e)
+
+
+def init_worker():
+    # Ctrl-C should only stop the main process, which will terminate the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class BlockValidator(object):
+    """
+    This class runs the stateless checks of received blocks in a pool of worker processes, so that large blocks or
+    bursts of blocks don't block the reactor. Blocks are checked in parallel, and the signatures of the contracts of a
+    block are checked in parallel with the rest of the block. Without worker processes, the checks are done on the
+    calling thread.
+    """
+
+    def __init__(self, processes=0, contracts_per_task=CONTRACTS_PER_TASK):
+        self.processes = processes
+        self.contracts_per_task = contracts_per_task
+        self.pool = None
+
+    def start(self):
+        """
+        Start the worker processes. Since forking a process that has threads or open database connections is unsafe,
+        this should be done before Dispersy and the databases are started.
+        """
+        if self.processes > 0:
+            self.pool = multiprocessing.Pool(self.processes, init_worker)
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def run(self, func, *args):
+        """
+        Call func in one of the worker processes.
+        :return: a Deferred that fires on the reactor thread with the result of func
+        """
+        if self.pool is None:
+            return maybeDeferred(func, *args)
+
+        deferred = Deferred()
+
+        def on_result(result):
+            success, value = result
+            if success:
+                reactor.callFromThread(deferred.callback, value)
+            else:
+                reactor.callFromThread(deferred.errback, Failure(RuntimeError(value)))
+
+        self.pool.apply_async(run_task, (func, args), callback=on_result)
+        return deferred
+
+    def verify_block(self, block_dict):
+        """
+        Run all stateless checks of a block.
+        :param block_dict: the block, as it is in the payload of a block message
+        :return: a Deferred that fires with the reason why the block is invalid, or None if the block is valid
+        """
+        start = time.time()
+        contract_dicts = block_dict.get('contracts', [])
+        deferreds = [self.run(verify_block_dict, block_dict)]
+        for index in range(0, len(contract_dicts), self.contracts_per_task):
+            deferreds.append(self.run(verify_contract_dicts, contract_dicts[index:index + self.contracts_per_task]))
+
+        def on_done(reasons):
+            BLOCK_VERIFICATION_SECONDS.observe(time.time() - start)
+            return next((reason for reason in reasons if reason is not None), None)
+        return gatherResults(deferreds, consumeErrors=True).addCallback(on_done)
@@ -1,9 +1,12 @@
 import hashlib
 
-from market.models.user import Role
+from market.metrics import MESSAGES_DROPPED
 
 
 def accept(local=None, remote=None):
+    # The models import their protobuf messages from this package, so they can only be imported once it is loaded
+    from market.models.user import Role
+
     def wrap(f):
         def invoke_func(*args, **kwargs):
             community = args[0]
@@ -12,6 +15,7 @@ def accept(local=None, remote=None):
             if local in Role and community.my_role != local:
                 for message in messages:
                     community.logger.warning('Dropping %s (receiver has incorrect role)', message.meta.name)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                 while messages:
                     messages.pop()
 
@@ -22,9 +26,11 @@ def accept(local=None, remote=None):
                     user = community.data_manager.get_user(user_id)
                     if user is not None and user.role != remote:
                         community.logger.warning('Dropping %s (sender has incorrect role)', message.meta.name)
+                        MESSAGES_DROPPED.inc(message.meta.name)
                         messages.remove(message)
                     elif remote == Role.FINANCIAL_INSTITUTION and community.get_stake(user_public_key) < 1:
                         community.logger.warning('Dropping %s (sender has <1 stake)', message.meta.name)
+                        MESSAGES_DROPPED.inc(message.meta.name)
                         messages.remove(message)
 
             return f(community, messages, *args[2:], **kwargs)
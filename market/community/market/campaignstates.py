@@ -0,0 +1,122 @@
+import time
+import hashlib
+
+from market.models.investment import InvestmentStatus
+
+# Upper bound on the number of states that we keep, to protect us against peers that send lots of bogus updates
+MAX_CAMPAIGN_STATES = 10000
+# Number of sequence numbers that fit in a single campaign-sync message
+STATES_PER_SYNC_MESSAGE = 30
+# Investments that are no longer for sale are synchronized for this long, so that peers learn that they have been sold
+SOLD_INVESTMENT_LIFETIME = 24 * 60 * 60
+# Campaign-updates with sequence numbers that are further ahead of our clock (in seconds) are rejected, since they
+# would prevent the updates that follow them from being accepted
+MAX_CLOCK_DRIFT = 5 * 60
+
+
+class CampaignStates(object):
+    """
+    This class holds the latest campaign-update message per campaign, and per investment that is offered for resale.
+    A message replaces the message that we have for the same campaign or investment if it has a higher sequence
+    number. Since only these messages are kept and synchronized, the amount of state is bounded by the number of live
+    campaigns and investments for sale, instead of the number of investments that have ever been made.
+
+    Sequence numbers are the time in milliseconds at which the update was created, or the previous sequence number
+    plus one if that is higher. This keeps them increasing when a node has lost its state (e.g., after a restart).
+    """
+
+    def __init__(self, max_states=MAX_CAMPAIGN_STATES, clock=time.time):
+        self.max_states = max_states
+        self.clock = clock
+        # Key -> (sequence number, message)
+        self.states = {}
+
+    @staticmethod
+    def get_key(dictionary):
+        """
+        Get the key of the campaign or investment that a campaign-update is about.
+        """
+        if 'investment' in dictionary:
+            obj, prefix = dictionary['investment'], 'investment'
+        else:
+            obj, prefix = dictionary['campaign'], 'campaign'
+        return hashlib.sha1('%s:%d:%s' % (prefix, obj['id'], obj['user_id'])).digest()
+
+    def get_sequence_number(self, key):
+        return self.states[key][0] if key in self.states else 0
+
+    def next_sequence_number(self, key):
+        return max(self.get_sequence_number(key) + 1, int(self.clock() * 1000))
+
+    @staticmethod
+    def is_signed_by_owner(dictionary, signer_id, owner_id=None):
+        """
+        Check if a campaign-update has been signed by the bank of the campaign, or by the owner of the investment that
+        it is about.
+        :param owner_id: the id of the current owner of the investment, if known. Defaults to the investor.
+        """
+        investment = dictionary.get('investment')
+        if investment is None:
+            return signer_id == dictionary['campaign']['user_id']
+        return signer_id == (owner_id or investment['user_id'])
+
+    def is_expired(self, dictionary, sequence_number):
+        investment = dictionary.get('investment')
+        if investment is None:
+            return dictionary['campaign']['end_time'] < self.clock()
+        return investment['status'] != InvestmentStatus.FORSALE.value and \
+            sequence_number / 1000.0 + SOLD_INVESTMENT_LIFETIME < self.clock()
+
+    def update(self, message):
+        """
+        Store a campaign-update message, unless we already have a message about the same campaign or investment with
+        an equal or higher sequence number, the sequence number lies too far in the future, or the message is about a
+        campaign that has ended.
+        :return: True if the message has been stored, False otherwise
+        """
+        dictionary = message.payload.dictionary
+        key = self.get_key(dictionary)
+        sequence_number = dictionary['sequence_number']
+        if sequence_number <= self.get_sequence_number(key) or self.is_expired(dictionary, sequence_number):
+            return False
+        if sequence_number > (self.clock() + MAX_CLOCK_DRIFT) * 1000:
+            return False
+        if key not in self.states and len(self.states) >= self.max_states:
+            return False
+
+        self.states[key] = (sequence_number, message)
+        return True
+
+    def remove_expired(self):
+        for key, (sequence_number, message) in self.states.items():
+            if self.is_expired(message.payload.dictionary, sequence_number):
+                del self.states[key]
+
+    def get_sync_ranges(self, states_per_message=STATES_PER_SYNC_MESSAGE):
+        """
+        Split the sequence numbers of all states into key ranges that each fit in a campaign-sync message. Together,
+        the ranges cover all possible keys.
+        :return: a list of (lower, upper, {key: sequence number}) tuples, in which lower is inclusive, upper is
+        exclusive, and an empty string means that there is no bound
+        """
+        keys = sorted(self.states)
+        ranges = []
+        for index in range(0, max(len(keys), 1), states_per_message):
+            chunk = keys[index:index + states_per_message]
+            lower = chunk[0] if index > 0 else ''
+            upper = keys[index + states_per_message] if index + states_per_message < len(keys) else ''
+            ranges.append((lower, upper, {key: self.get_sequence_number(key) for key in chunk}))
+        return ranges
+
+    def get_newer_messages(self, lower, upper, sequence_numbers, max_messages):
+        """
+        Get the messages within a key range that are newer than the ones that a peer has.
+        :param sequence_numbers: the sequence numbers of the peer within the key range, by key
+        """
+        messages = []
+        for key, (sequence_number, message) in self.states.iteritems():
+            if key >= lower and (not upper or key < upper) and sequence_number > sequence_numbers.get(key, 0):
+                messages.append(message)
+                if len(messages) >= max_messages:
+                    break
+        return messages
@@ -1,16 +1,18 @@
 import os
 import time
+import random
 import base64
 import logging
 import hashlib
 
+from binascii import hexlify, unhexlify
+from collections import defaultdict
 from twisted.internet.defer import inlineCallbacks, returnValue
-from twisted.internet.task import LoopingCall
 
 from dispersy.authentication import MemberAuthentication
 from dispersy.conversion import DefaultConversion
-from dispersy.destination import CommunityDestination, CandidateDestination
-from dispersy.distribution import DirectDistribution, FullSyncDistribution
+from dispersy.destination import CandidateDestination
+from dispersy.distribution import DirectDistribution
 from dispersy.message import Message
 from dispersy.resolution import PublicResolution
 
@@ -18,9 +20,14 @@ from internetofmoney.utils.iban import IBANUtil
 
 from market.community.market import accept
 from market.community.blockchain.community import BlockchainCommunity
+from market.community.blockchain.validation import check_proof
+from market.community.market.campaignstates import CampaignStates
 from market.community.market.conversion import MarketConversion
+from market.community.market.funding import FundingTotals
+from market.community.market.orderbook import OrderBooks, Side
 from market.community.payload import ProtobufPayload
 from market.database.datamanager import MarketDataManager
+from market.metrics import MESSAGES_DROPPED, PAYMENT_QUEUE, PAYMENT_SECONDS
 from market.models import ObjectType
 from market.models.loanrequest import LoanRequest, LoanRequestStatus
 from market.models.mortgage import Mortgage, MortgageStatus
@@ -32,17 +39,50 @@ from market.models.confirmation import Confirmation
 from market.models.profile import Profile
 from market.models.contract import Contract
 from market.restapi.rest_manager import RESTManager
-from market.util.uint256 import full_to_uint256
+from market.util.events import CAMPAIGN_UPDATED, INVESTMENT_STATUS_CHANGED, LOAN_REQUEST_RECEIVED, \
+    LOAN_REQUEST_STATUS_CHANGED, MORTGAGE_STATUS_CHANGED
 from market.defs import VERIFIED_BANKS
 
 COMMIT_INTERVAL = 60
 CLEANUP_INTERVAL = 60
 PAYUP_INTERVAL = 30
+CAMPAIGN_SYNC_INTERVAL = 30
+# Number of peers to which new campaign-updates are sent
+CAMPAIGN_UPDATE_FANOUT = 10
+MAX_CAMPAIGN_SYNC_RESPONSE = 50
 DEFAULT_CAMPAIGN_DURATION = 30 * 24 * 60 * 60
 TRANSFER_LOCK_TIME = 60 * 60
+# Transfers that were offered after a match are given up on when the seller hasn't answered within this many seconds,
+# after which the bid is placed again
+PENDING_TRADE_TIMEOUT = 5 * 60
 POS_STEP = 1000000
 POS_LIMIT = 10 * POS_STEP
 
+# The models of the objects that accept and reject messages can refer to
+OBJECT_MODELS = {ObjectType.LOANREQUEST: LoanRequest,
+                 ObjectType.MORTGAGE: Mortgage,
+                 ObjectType.INVESTMENT: Investment,
+                 ObjectType.TRANSFER: Transfer}
+
+
+def calculate_stake(public_key, value, banks=VERIFIED_BANKS):
+    """
+    Calculate the stake of a peer from the value of the investments and transfers that it owns.
+    """
+    #  Give stake a +1 for every POS_STEP invested. Consider amounts up to POS_LIMIT.
+    stake = min(value, POS_LIMIT) / POS_STEP
+
+    # To allow bootstrapping we give verified banks a minimum stake of 1
+    if public_key in banks.values():
+        stake = max(stake, 1)
+    return stake
+
+# The types of contracts that may point to a contract of a given type
+CONTRACT_SUCCESSORS = {ObjectType.MORTGAGE: [ObjectType.INVESTMENT],
+                       ObjectType.INVESTMENT: [ObjectType.TRANSFER],
+                       ObjectType.TRANSFER: [ObjectType.TRANSFER, ObjectType.CONFIRMATION],
+                       ObjectType.CONFIRMATION: [ObjectType.TRANSFER]}
+
 
 class MarketCommunity(BlockchainCommunity):
 
@@ -55,26 +95,68 @@ class MarketCommunity(BlockchainCommunity):
         self.payment_queue = []
         self.money_community = None
         self.stake_cache = {}
-
-    def initialize(self, rest_api_port=0, role=Role.UNKNOWN, database_fn='', money_community=None):
+        # Investment contract id -> public key of the current owner
+        self.owners = {}
+        self.funding = FundingTotals()
+        self.campaign_states = CampaignStates()
+        self.order_books = OrderBooks()
+        # (transfer id, transfer user_id) -> (mortgage key, Trade, time), for transfers that were offered after a match
+        self.pending_trades = {}
+
+    def initialize(self, rest_api_port=0, role=Role.UNKNOWN, database_fn='', money_community=None,
+                   validator=None, block_files=False, hot_blocks=0):
         super(MarketCommunity, self).initialize(verifier=role == Role.FINANCIAL_INSTITUTION,
-                                                role=role, database_fn=database_fn)
+                                                light=role in [Role.BORROWER, Role.INVESTOR],
+                                                validator=validator,
+                                                role=role, database_fn=database_fn, block_files=block_files,
+                                                hot_blocks=hot_blocks)
 
         self.money_community = money_community
         self.rest_manager = RESTManager(self, rest_api_port)
         self.market_api = self.rest_manager.start()
 
-        self.register_task('cleanup', LoopingCall(self.cleanup)).start(CLEANUP_INTERVAL)
-        self.register_task('payup', LoopingCall(self.payup)).start(PAYUP_INTERVAL)
+        self.register_looping_call('cleanup', self.cleanup, CLEANUP_INTERVAL)
+        self.register_looping_call('payup', self.payup, PAYUP_INTERVAL)
+        self.register_looping_call('sync_campaigns', self.sync_campaigns, CAMPAIGN_SYNC_INTERVAL)
+        self.add_gauge_function(PAYMENT_QUEUE, lambda: len(self.payment_queue))
 
         self.logger.info('MarketCommunity initialized')
         self.logger.info('Using ID %s', base64.urlsafe_b64encode(self.my_user_id))
 
-    def initialize_database(self, role, database_fn):
+    def initialize_database(self, role, database_fn, block_files=False, hot_blocks=0):
         if database_fn:
             database_fn = os.path.join(self.dispersy.working_directory, database_fn)
-        self.data_manager = MarketDataManager(database_fn)
-        self.data_manager.initialize(self.my_user_id, role)
+        self.data_manager = MarketDataManager(database_fn, block_files=block_files, hot_blocks=hot_blocks)
+        snapshot = self.load_snapshot(database_fn)
+        if self.data_manager.initialize(self.my_user_id, role, snapshot):
+            self.apply_snapshot(snapshot)
+        else:
+            for contract in self.data_manager.get_best_chain_contracts(ObjectType.INVESTMENT):
+                self.funding.add_committed(contract)
+
+    def get_snapshot_state(self):
+        # Make sure that we have the owners and stakes of all investments on the best chain
+        for amounts in self.funding.committed.itervalues():
+            for investment_contract_id in amounts:
+                owner = self.find_owner(investment_contract_id)
+                if owner is not None:
+                    self.get_stake(owner)
+
+        return {'funding': {hexlify(mortgage_contract_id): {hexlify(contract_id): amount
+                                                            for contract_id, amount in amounts.iteritems()}
+                            for mortgage_contract_id, amounts in self.funding.committed.iteritems()},
+                'owners': {hexlify(contract_id): hexlify(public_key)
+                           for contract_id, public_key in self.owners.iteritems()},
+                'stakes': {hexlify(public_key): stake for public_key, (_, stake) in self.stake_cache.iteritems()}}
+
+    def set_snapshot_state(self, state):
+        self.funding.set_committed({unhexlify(mortgage_contract_id): {unhexlify(contract_id): amount
+                                                                      for contract_id, amount in amounts.iteritems()}
+                                    for mortgage_contract_id, amounts in state['funding'].iteritems()})
+        self.owners = {unhexlify(contract_id): unhexlify(public_key)
+                       for contract_id, public_key in state['owners'].iteritems()}
+        self.stake_cache = {unhexlify(public_key): (time.time(), stake)
+                            for public_key, stake in state['stakes'].iteritems()}
 
     def initiate_meta_messages(self):
         meta_messages = super(MarketCommunity, self).initiate_meta_messages()
@@ -114,17 +196,24 @@ class MarketCommunity(BlockchainCommunity):
                     ProtobufPayload(),
                     self._generic_timeline_check,
                     self.on_reject),
-            # Notification message
+            # Notification messages. Only the latest campaign-update per campaign (or investment) is kept, and
+            # campaign-sync messages are used to synchronize these with our peers.
             Message(self, u"campaign-update",
                     MemberAuthentication(),
                     PublicResolution(),
-                    FullSyncDistribution(enable_sequence_number=False,
-                                         synchronization_direction=u"DESC",
-                                         priority=128),
-                    CommunityDestination(node_count=10),
+                    DirectDistribution(),
+                    CandidateDestination(),
+                    ProtobufPayload(),
+                    self._generic_timeline_check,
+                    self.on_campaign_update),
+            Message(self, u"campaign-sync",
+                    MemberAuthentication(),
+                    PublicResolution(),
+                    DirectDistribution(),
+                    CandidateDestination(),
                     ProtobufPayload(),
                     self._generic_timeline_check,
-                    self.on_campaign_update)
+                    self.on_campaign_sync)
         ]
 
     def initiate_conversions(self):
@@ -149,13 +238,24 @@ class MarketCommunity(BlockchainCommunity):
         for user_id, candidate in self.id_to_candidate.items():
             if candidate.last_walk_reply < time.time() - 300:
                 self.id_to_candidate.pop(user_id)
+        self.campaign_states.remove_expired()
+
+        for transfer_key, (mortgage_key, trade, offer_time) in self.pending_trades.items():
+            if offer_time < time.time() - PENDING_TRADE_TIMEOUT:
+                # The seller didn't answer, so an accept that still arrives is ignored and the bid is placed again
+                del self.pending_trades[transfer_key]
+                transfer = self.data_manager.get_transfer(*transfer_key)
+                if transfer is not None:
+                    transfer.status = TransferStatus.REJECTED
+                self.place_bid(mortgage_key, trade.bid.price, trade.amount)
 
     @inlineCallbacks
     def payup(self):
         self.logger.debug('Payment queue length: %d', len(self.payment_queue))
         for payment in self.payment_queue:
             transfer, investment = payment
-            response = yield self.send_traversal_request(investment.contract_id)
+            # A merkle proof for the transfer doesn't show that nothing follows it, so we always ask the verifiers
+            response = yield self.find_contract_remote(investment.contract_id)
             end_of_chain = response[0] if response else None
             if end_of_chain and end_of_chain.id == transfer.contract_id:
                 self.logger.debug('Found transfer on blockchain, attempting to pay..')
@@ -178,7 +278,9 @@ class MarketCommunity(BlockchainCommunity):
                 self.logger.debug('Moving money from %s to %s through %s', source_iban, destination_iban, switch_iban)
 
                 try:
+                    start_time = time.time()
                     yield self.money_community.send_money_using_router(candidate, manager, amount, switch_iban, destination_iban)
+                    PAYMENT_SECONDS.observe(time.time() - start_time)
 
                     self.logger.debug('Payment successful!')
                     self.payment_queue.remove(payment)
@@ -243,20 +345,26 @@ class MarketCommunity(BlockchainCommunity):
                                           'phone_number': profile.phone_number}})
         return user_dict
 
-    def add_or_update_user(self, candidate, role=Role.UNKNOWN):
+    def get_user(self, user_id, users=None):
+        # Message handlers pass the users that they have prefetched for a batch of messages
+        return users.get(user_id) if users is not None else self.data_manager.get_user(user_id)
+
+    def add_or_update_user(self, candidate, role=Role.UNKNOWN, users=None):
         user_id = self.member_to_id(candidate.get_member())
-        user = self.data_manager.get_user(user_id)
+        user = self.get_user(user_id, users)
         if user is not None:
             user.role = role
         else:
             user = User(user_id, role=role)
             self.data_manager.add_user(user)
+            if users is not None:
+                users[user_id] = user
         self.id_to_candidate[user_id] = candidate
         return user
 
-    def add_or_update_profile(self, candidate, profile):
+    def add_or_update_profile(self, candidate, profile, users=None):
         user_id = self.member_to_id(candidate.get_member())
-        user = self.data_manager.get_user(user_id)
+        user = self.get_user(user_id, users)
         if profile is not None:
             if user.profile is None:
                 user.profile = profile
@@ -368,8 +476,18 @@ class MarketCommunity(BlockchainCommunity):
                                                                          'object_id': transfer.id,
                                                                          'object_user_id': transfer.user_id})
 
-    def on_offer(self, message):
-        for message in message:
+    def on_offer(self, messages):
+        dictionaries = [message.payload.dictionary for message in messages]
+        objects = self.data_manager.prefetch({
+            User: [self.member_to_id(message.candidate.get_member()) for message in messages],
+            LoanRequest: [(d['mortgage']['loan_request_id'], d['mortgage']['loan_request_user_id'])
+                          for d in dictionaries if 'mortgage' in d],
+            Campaign: [(d['investment']['campaign_id'], d['investment']['campaign_user_id'])
+                       for d in dictionaries if 'investment' in d],
+            Investment: [(d['investment']['id'], d['investment']['user_id']) for d in dictionaries if 'investment' in d]
+        })
+
+        for message in messages:
             dictionary = message.payload.dictionary
             sock_addr = message.candidate.sock_addr
 
@@ -377,39 +495,46 @@ class MarketCommunity(BlockchainCommunity):
                 loan_request = LoanRequest.from_dict(dictionary['loan_request'])
                 if loan_request is None:
                     self.logger.warning('Dropping invalid loanrequest offer from %s', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got loanrequest offer from %s', sock_addr)
                 profile = Profile.from_dict(dictionary['profile'])
-                user = self.add_or_update_user(message.candidate, role=Role.BORROWER)
-                self.add_or_update_profile(message.candidate, profile)
+                user = self.add_or_update_user(message.candidate, role=Role.BORROWER, users=objects[User])
+                self.add_or_update_profile(message.candidate, profile, users=objects[User])
                 user.loan_requests.add(loan_request)
+                self.notify_changed(LOAN_REQUEST_RECEIVED, 'loan_request', loan_request)
 
             elif set(('mortgage',)) <= set(dictionary):
                 mortgage = Mortgage.from_dict(dictionary['mortgage'])
                 if mortgage is None:
                     self.logger.warning('Dropping invalid mortgage offer from %s', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
                 elif mortgage.bank_id != self.member_to_id(message.candidate.get_member()):
                     self.logger.warning('Dropping mortgage offer from %s (wrong sender)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                loan_request = self.data_manager.get_loan_request(mortgage.loan_request_id, mortgage.loan_request_user_id)
+                loan_request = objects[LoanRequest].get((mortgage.loan_request_id, mortgage.loan_request_user_id))
                 if not loan_request:
                     self.logger.warning('Dropping mortgage offer from %s (unknown loan request)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got mortgage offer from %s', sock_addr)
-                self.add_or_update_user(message.candidate, role=Role.FINANCIAL_INSTITUTION)
+                self.add_or_update_user(message.candidate, role=Role.FINANCIAL_INSTITUTION, users=objects[User])
                 loan_request.status = LoanRequestStatus.ACCEPTED
                 loan_request.mortgage = mortgage
                 self.data_manager.you.mortgages.add(mortgage)
+                self.notify_changed(MORTGAGE_STATUS_CHANGED, 'mortgage', mortgage)
 
             elif set(('investment', 'profile')) <= set(dictionary):
                 investment = Investment.from_dict(dictionary['investment'])
-                campaign = self.data_manager.get_campaign(investment.campaign_id, investment.campaign_user_id)
+                campaign = objects[Campaign].get((investment.campaign_id, investment.campaign_user_id))
                 if campaign is None:
                     self.logger.warning('Dropping investment offer from %s (unknown campaign)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
                 elif campaign.amount_invested + investment.amount > campaign.amount:
                     self.logger.warning('Auto-rejecting investment offer from %s (amount too large)', sock_addr)
@@ -418,42 +543,86 @@ class MarketCommunity(BlockchainCommunity):
 
                 self.logger.debug('Got investment offer from %s', sock_addr)
                 profile = Profile.from_dict(dictionary['profile'])
-                self.add_or_update_profile(message.candidate, profile)
+                self.add_or_update_profile(message.candidate, profile, users=objects[User])
                 campaign.investments.add(investment)
+                objects[Investment][(investment.id, investment.user_id)] = investment
+                self.notify_changed(INVESTMENT_STATUS_CHANGED, 'investment', investment)
 
             elif set(('transfer', 'investment')) <= set(dictionary):
                 transfer = Transfer.from_dict(dictionary['transfer'])
                 investment = Investment.from_dict(dictionary['investment'])
                 if transfer is None or investment is None:
                     self.logger.warning('Dropping invalid transfer offer from %s', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                investment = self.data_manager.get_investment(investment.id, investment.user_id)
+                investment = objects[Investment].get((investment.id, investment.user_id))
                 if investment is None:
                     self.logger.warning('Dropping transfer offer from %s (unknown investment)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got transfer offer from %s', sock_addr)
 
                 investment.transfers.add(transfer)
 
+                # Accept offers that match the asking price of an investment that we are selling
+                ask = self.order_books.get_ask((investment.id, investment.user_id))
+                if ask is not None and ask.user_id == self.my_user_id and transfer.amount >= ask.price * ask.amount:
+                    self.logger.debug('Auto-accepting transfer offer from %s (matches ask)', sock_addr)
+                    self.order_books.cancel(ask.id)
+                    transfer.status = TransferStatus.ACCEPTED
+                    self.lifecycle.tag_action('accept_transfer', ObjectType.TRANSFER, transfer.id, transfer.user_id)
+                    self.accept_transfer(transfer)
+
+                    campaign = objects[Campaign].get((investment.campaign_id, investment.campaign_user_id))
+                    investment.status = InvestmentStatus.ACCEPTED
+                    if campaign is not None:
+                        self.send_campaign_update(campaign, investment)
+
             else:
                 self.logger.warning('Dropping offer from %s (unexpected payload)', message.candidate.sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
+
+    def prefetch_objects(self, messages):
+        """
+        Get the objects that a batch of accept or reject messages refer to, together with the investments of the
+        transfers, and the campaigns and mortgages of the investments.
+        """
+        keys = defaultdict(list)
+        for message in messages:
+            dictionary = message.payload.dictionary
+            model = OBJECT_MODELS.get(dictionary['object_type'])
+            if model is not None:
+                keys[model].append((dictionary['object_id'], dictionary['object_user_id']))
+        objects = self.data_manager.prefetch(keys)
+
+        get_objects = self.data_manager.get_objects
+        objects[Investment].update(get_objects(Investment, [(transfer.investment_id, transfer.investment_user_id)
+                                                            for transfer in objects[Transfer].itervalues()]))
+        objects[Campaign].update(get_objects(Campaign, [(investment.campaign_id, investment.campaign_user_id)
+                                                        for investment in objects[Investment].itervalues()]))
+        objects[Mortgage].update(get_objects(Mortgage, [(campaign.mortgage_id, campaign.mortgage_user_id)
+                                                        for campaign in objects[Campaign].itervalues()]))
+        return objects
 
     @inlineCallbacks
     def on_accept(self, messages):
+        objects = self.prefetch_objects(messages)
         for message in messages:
             dictionary = message.payload.dictionary
             sock_addr = message.candidate.sock_addr
 
             if dictionary['object_type'] == ObjectType.MORTGAGE:
-                mortgage = self.data_manager.get_mortgage(dictionary['object_id'], dictionary['object_user_id'])
+                mortgage = objects[Mortgage].get((dictionary['object_id'], dictionary['object_user_id']))
                 if mortgage is None:
                     self.logger.warning('Dropping mortgage accept from %s (unknown mortgage)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got mortgage accept from %s', sock_addr)
                 mortgage.status = MortgageStatus.ACCEPTED
+                self.notify_changed(MORTGAGE_STATUS_CHANGED, 'mortgage', mortgage)
                 self.begin_contract(message.candidate, mortgage.to_bin(), ObjectType.MORTGAGE,
                                     self.my_member.public_key, message.candidate.get_member().public_key)
 
@@ -463,46 +632,60 @@ class MarketCommunity(BlockchainCommunity):
                 campaign = Campaign(self.data_manager.you.campaigns.count(), self.my_user_id,
                                     mortgage.id, mortgage.user_id, finance_goal, 0, end_time)
                 self.data_manager.you.campaigns.add(campaign)
+                self.notify_changed(CAMPAIGN_UPDATED, 'campaign', campaign)
 
             elif dictionary['object_type'] == ObjectType.INVESTMENT:
-                investment = self.data_manager.get_investment(dictionary['object_id'], dictionary['object_user_id'])
+                investment = objects[Investment].get((dictionary['object_id'], dictionary['object_user_id']))
                 if investment is None:
                     self.logger.warning('Dropping investment accept from %s (unknown investment)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                campaign = self.data_manager.get_campaign(investment.campaign_id, investment.campaign_user_id)
+                campaign = objects[Campaign].get((investment.campaign_id, investment.campaign_user_id))
                 if campaign is None:
                     self.logger.warning('Dropping investment accept from %s (unknown campaign)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                mortgage = self.data_manager.get_mortgage_for_investment(investment)
+                mortgage = objects[Mortgage].get((campaign.mortgage_id, campaign.mortgage_user_id))
                 if mortgage is None:
                     self.logger.warning('Dropping investment accept from %s (unknown mortgage)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got investment accept from %s', sock_addr)
                 investment.status = InvestmentStatus.ACCEPTED
                 campaign.amount_invested += investment.amount
+                self.notify_changed(INVESTMENT_STATUS_CHANGED, 'investment', investment)
+                self.notify_changed(CAMPAIGN_UPDATED, 'campaign', campaign)
                 self.begin_contract(message.candidate, investment.to_bin(), ObjectType.INVESTMENT,
                                     message.candidate.get_member().public_key, self.my_member.public_key,
                                     mortgage.contract_id)
 
             elif dictionary['object_type'] == ObjectType.TRANSFER:
-                transfer = self.data_manager.get_transfer(dictionary['object_id'], dictionary['object_user_id'])
+                transfer = objects[Transfer].get((dictionary['object_id'], dictionary['object_user_id']))
                 if transfer is None:
                     self.logger.warning('Dropping transfer accept from %s (unknown transfer)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                investment = self.data_manager.get_investment(transfer.investment_id, transfer.investment_user_id)
+                investment = objects[Investment].get((transfer.investment_id, transfer.investment_user_id))
                 if investment is None:
                     self.logger.warning('Dropping transfer accept from %s (unknown investment)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
+                    continue
+
+                if transfer.status == TransferStatus.REJECTED:
+                    self.logger.warning('Dropping transfer accept from %s (transfer has expired)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got transfer accept from %s', sock_addr)
                 transfer.status = TransferStatus.ACCEPTED
+                self.pending_trades.pop((transfer.id, transfer.user_id), None)
 
-                response = yield self.send_traversal_request(investment.contract_id)
-                if response is not None:
+                response = yield self.find_contract_remote(investment.contract_id)
+                if response is not None and response[0] is not None:
                     prev_contract, _ = response
                     self.begin_contract(message.candidate, transfer.to_bin(), ObjectType.TRANSFER,
                                         message.candidate.get_member().public_key, self.my_member.public_key,
@@ -512,101 +695,191 @@ class MarketCommunity(BlockchainCommunity):
 
             else:
                 self.logger.warning('Dropping accept from %s (unknown object_type)', sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
 
     def on_reject(self, messages):
+        objects = self.prefetch_objects(messages)
         for message in messages:
             dictionary = message.payload.dictionary
             sock_addr = message.candidate.sock_addr
 
             if dictionary['object_type'] == ObjectType.LOANREQUEST:
-                loanrequest = self.data_manager.get_loan_request(dictionary['object_id'], dictionary['object_user_id'])
+                loanrequest = objects[LoanRequest].get((dictionary['object_id'], dictionary['object_user_id']))
                 if loanrequest is None:
                     self.logger.warning('Dropping loanrequest reject from %s (unknown loanrequest)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got loanrequest reject from %s', sock_addr)
                 loanrequest.status = LoanRequestStatus.REJECTED
+                self.notify_changed(LOAN_REQUEST_STATUS_CHANGED, 'loan_request', loanrequest)
 
             elif dictionary['object_type'] == ObjectType.MORTGAGE:
-                mortgage = self.data_manager.get_mortgage(dictionary['object_id'], dictionary['object_user_id'])
+                mortgage = objects[Mortgage].get((dictionary['object_id'], dictionary['object_user_id']))
                 if mortgage is None:
                     self.logger.warning('Dropping mortgage reject from %s (unknown mortgage)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got mortgage reject from %s', sock_addr)
                 mortgage.status = MortgageStatus.REJECTED
+                self.notify_changed(MORTGAGE_STATUS_CHANGED, 'mortgage', mortgage)
 
             elif dictionary['object_type'] == ObjectType.INVESTMENT:
-                investment = self.data_manager.get_investment(dictionary['object_id'], dictionary['object_user_id'])
+                investment = objects[Investment].get((dictionary['object_id'], dictionary['object_user_id']))
                 if investment is None:
                     self.logger.warning('Dropping investment reject from %s (unknown investment)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got investment reject from %s', sock_addr)
                 investment.status = InvestmentStatus.REJECTED
+                self.notify_changed(INVESTMENT_STATUS_CHANGED, 'investment', investment)
 
             elif dictionary['object_type'] == ObjectType.TRANSFER:
-                transfer = self.data_manager.get_transfer(dictionary['object_id'], dictionary['object_user_id'])
+                transfer = objects[Transfer].get((dictionary['object_id'], dictionary['object_user_id']))
                 if transfer is None:
                     self.logger.warning('Dropping transfer accept from %s (unknown transfer)', sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
                 self.logger.debug('Got transfer reject from %s', sock_addr)
                 transfer.status = TransferStatus.REJECTED
 
+                pending = self.pending_trades.pop((transfer.id, transfer.user_id), None)
+                if pending is not None:
+                    # The ask is no longer in the book, so put the unfilled part of the bid back
+                    mortgage_key, trade, _ = pending
+                    self.place_bid(mortgage_key, trade.bid.price, trade.amount)
+
             else:
                 self.logger.warning('Dropping reject from %s (unknown object_type)', sock_addr)
+                MESSAGES_DROPPED.inc(message.meta.name)
 
-    def send_campaign_update(self, campaign, investment=None):
+    def send_campaign_update(self, campaign, investment=None, price=None):
         mortgage = self.data_manager.get_mortgage(campaign.mortgage_id, campaign.mortgage_user_id)
         msg_dict = {'campaign': campaign.to_dict(),
                     'mortgage': mortgage.to_dict()}
         if investment is not None:
             msg_dict['investment'] = investment.to_dict()
+        if price is not None:
+            msg_dict['price'] = price
+        msg_dict['sequence_number'] = self.campaign_states.next_sequence_number(CampaignStates.get_key(msg_dict))
 
         meta = self.get_meta_message(u'campaign-update')
         message = meta.impl(authentication=(self._my_member,),
                             distribution=(self.claim_global_time(),),
+                            destination=tuple(self.get_campaign_update_candidates()),
                             payload=(msg_dict,))
-        return self.dispersy.store_update_forward([message], True, True, True)
+        self.campaign_states.update(message)
+        return self.dispersy.store_update_forward([message], False, False, True)
+
+    def get_campaign_update_candidates(self, exclude=None):
+        candidates = [candidate for candidate in self.id_to_candidate.values() if candidate != exclude]
+        return random.sample(candidates, min(len(candidates), CAMPAIGN_UPDATE_FANOUT))
+
+    def forward_campaign_updates(self, messages):
+        # Forward the messages as they are, since they are signed by the sender of the update
+        for message in messages:
+            candidates = self.get_campaign_update_candidates(exclude=message.candidate)
+            if candidates:
+                self.send_packets(candidates, [message.packet], message.name)
+
+    def send_packets(self, candidates, packets, name):
+        """
+        Send the packets of messages that were created by other peers to the given candidates. Dispersy has no public
+        method for this: store_update_forward sends a message to the destination it was implemented with, and the
+        messages of other peers can't be implemented again since we can't sign them. So we use the private method
+        that store_update_forward uses itself, which, unlike the endpoint, keeps the message statistics up to date.
+        """
+        self.dispersy._send_packets(candidates, packets, self, name)
+
+    def sync_campaigns(self):
+        """
+        Send the sequence numbers of our campaign states to a random peer, which will reply with the campaign-updates
+        that are newer than ours.
+        """
+        if not self.id_to_candidate:
+            return
+
+        candidate = random.choice(self.id_to_candidate.values())
+        for lower, upper, sequence_numbers in self.campaign_states.get_sync_ranges():
+            states = [{'key': key, 'sequence_number': sequence_number}
+                      for key, sequence_number in sequence_numbers.iteritems()]
+            self.send_message(u'campaign-sync', (candidate,), {'lower': lower, 'upper': upper, 'states': states})
+
+    def on_campaign_sync(self, messages):
+        for message in messages:
+            dictionary = message.payload.dictionary
+            sequence_numbers = {state['key']: state['sequence_number'] for state in dictionary.get('states', [])}
+            updates = self.campaign_states.get_newer_messages(dictionary['lower'], dictionary['upper'],
+                                                              sequence_numbers, MAX_CAMPAIGN_SYNC_RESPONSE)
+            if updates:
+                self.logger.debug('Sending %d campaign-update(s) to %s', len(updates), message.candidate.sock_addr)
+                self.send_packets([message.candidate], [update.packet for update in updates], u'campaign-update')
 
     def on_campaign_update(self, messages):
+        dictionaries = [message.payload.dictionary for message in messages]
+        objects = self.data_manager.prefetch({
+            User: [d[name]['user_id'] for d in dictionaries for name in ('campaign', 'mortgage')],
+            Mortgage: [(d['mortgage']['id'], d['mortgage']['user_id']) for d in dictionaries],
+            Campaign: [(d['campaign']['id'], d['campaign']['user_id']) for d in dictionaries],
+            Investment: [(d['investment']['id'], d['investment']['user_id']) for d in dictionaries if 'investment' in d]
+        })
+
+        updated = []
         for message in messages:
             dictionary = message.payload.dictionary
+            keys = set(dictionary) - set(['sequence_number', 'price'])
 
-            if set(('campaign', 'mortgage')) == set(dictionary):
+            if set(('campaign', 'mortgage')) == keys:
                 # Campaign update. Informs us about how much money the bank still needs.
                 campaign = Campaign.from_dict(dictionary['campaign'])
                 mortgage = Mortgage.from_dict(dictionary['mortgage'])
 
                 if campaign is None or mortgage is None:
                     self.logger.warning('Dropping invalid campaign-update from %s', message.candidate.sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                bank = self.data_manager.get_user(campaign.user_id)
+                bank = objects[User].get(campaign.user_id)
                 if bank is None:
                     self.logger.warning('Dropping campaign-update (unknown user_id)')
+                    MESSAGES_DROPPED.inc(message.meta.name)
+                    continue
+
+                if not CampaignStates.is_signed_by_owner(dictionary, self.member_to_id(message.authentication.member)):
+                    self.logger.warning('Dropping campaign-update (not signed by the bank)')
+                    MESSAGES_DROPPED.inc(message.meta.name)
+                    continue
+
+                if not self.campaign_states.update(message):
+                    self.logger.debug('Ignoring outdated campaign-update')
                     continue
 
                 self.logger.debug('Got campaign-update')
 
-                user = self.data_manager.get_user(mortgage.user_id)
+                user = objects[User].get(mortgage.user_id)
                 if user is None:
-                    user = User(mortgage.user_id, role=Role.BORROWER)
+                    user = objects[User][mortgage.user_id] = User(mortgage.user_id, role=Role.BORROWER)
                     self.data_manager.add_user(user)
 
                 # TODO: check if this message is signed by the mortgage owner
 
-                if self.data_manager.get_mortgage(mortgage.id, mortgage.user_id) is None:
+                if (mortgage.id, mortgage.user_id) not in objects[Mortgage]:
+                    objects[Mortgage][(mortgage.id, mortgage.user_id)] = mortgage
                     user.mortgages.add(mortgage)
 
-                existing_campaign = self.data_manager.get_campaign(campaign.id, campaign.user_id)
+                existing_campaign = objects[Campaign].get((campaign.id, campaign.user_id))
                 if existing_campaign is None:
+                    objects[Campaign][(campaign.id, campaign.user_id)] = campaign
                     bank.campaigns.add(campaign)
                 else:
                     existing_campaign.amount_invested = max(existing_campaign.amount_invested, campaign.amount_invested)
+                    campaign = existing_campaign
+                self.notify_changed(CAMPAIGN_UPDATED, 'campaign', campaign)
 
-            elif set(('campaign', 'mortgage', 'investment')) == set(dictionary):
+            elif set(('campaign', 'mortgage', 'investment')) == keys:
                 # Someone is offering an investment that they own for resale
                 campaign = Campaign.from_dict(dictionary['campaign'])
                 mortgage = Mortgage.from_dict(dictionary['mortgage'])
@@ -614,37 +887,153 @@ class MarketCommunity(BlockchainCommunity):
 
                 if campaign is None or mortgage is None or investment is None:
                     self.logger.warning('Dropping invalid campaign-update from %s', message.candidate.sock_addr)
+                    MESSAGES_DROPPED.inc(message.meta.name)
                     continue
 
-                bank = self.data_manager.get_user(campaign.user_id)
+                bank = objects[User].get(campaign.user_id)
                 if bank is None:
                     self.logger.warning('Dropping campaign-update (unknown user_id)')
+                    MESSAGES_DROPPED.inc(message.meta.name)
+                    continue
+
+                # After a resale, the blockchain knows who owns the investment
+                owner_public_key = self.find_owner(investment.contract_id) if investment.contract_id else None
+                owner_id = self.public_key_to_id(owner_public_key) if owner_public_key else None
+                if not CampaignStates.is_signed_by_owner(dictionary, self.member_to_id(message.authentication.member),
+                                                         owner_id):
+                    self.logger.warning('Dropping campaign-update (not signed by the investment owner)')
+                    MESSAGES_DROPPED.inc(message.meta.name)
+                    continue
+
+                if not self.campaign_states.update(message):
+                    self.logger.debug('Ignoring outdated campaign-update (for investment)')
                     continue
 
                 self.logger.debug('Got campaign-update (for investment)')
 
-                user = self.data_manager.get_user(mortgage.user_id)
+                user = objects[User].get(mortgage.user_id)
                 if user is None:
-                    user = User(mortgage.user_id, role=Role.BORROWER)
+                    user = objects[User][mortgage.user_id] = User(mortgage.user_id, role=Role.BORROWER)
                     self.data_manager.add_user(user)
 
-                # TODO: check if this message is signed by the investment owner
-
-                if self.data_manager.get_mortgage(mortgage.id, mortgage.user_id) is None:
+                if (mortgage.id, mortgage.user_id) not in objects[Mortgage]:
+                    objects[Mortgage][(mortgage.id, mortgage.user_id)] = mortgage
                     user.mortgages.add(mortgage)
 
-                existing_campaign = self.data_manager.get_campaign(campaign.id, campaign.user_id)
+                existing_campaign = objects[Campaign].get((campaign.id, campaign.user_id))
                 if existing_campaign is None:
+                    objects[Campaign][(campaign.id, campaign.user_id)] = campaign
                     bank.campaigns.add(campaign)
                 else:
                     campaign = existing_campaign
 
-                existing_investment = self.data_manager.get_investment(investment.id, investment.user_id)
+                existing_investment = objects[Investment].get((investment.id, investment.user_id))
                 if existing_investment is None:
+                    objects[Investment][(investment.id, investment.user_id)] = investment
                     campaign.investments.add(investment)
                 else:
                     # Update the existing investment with the new status. Should be either ACCEPTED or FORSALE
                     existing_investment.status = investment.status
+                    investment = existing_investment
+                self.notify_changed(INVESTMENT_STATUS_CHANGED, 'investment', investment)
+                self.update_ask((mortgage.id, mortgage.user_id), investment, dictionary.get('price', 1.0),
+                                self.member_to_id(message.authentication.member))
+
+            else:
+                continue
+
+            updated.append(message)
+
+        self.forward_campaign_updates(updated)
+
+    def place_bid(self, mortgage_key, price, amount):
+        """
+        Bid on the investments in a mortgage that are for sale, and offer transfers for the asks that match the bid.
+        :return: the Order
+        """
+        order, trades = self.order_books.place(mortgage_key, Side.BID, self.my_user_id, price, amount)
+        for trade in trades:
+            self.execute_trade(mortgage_key, trade)
+        return order
+
+    def sell_investment(self, investment, campaign, price=1.0):
+        """
+        Put an investment up for sale and let other users know about its asking price.
+        :return: the Order
+        """
+        mortgage_key = (campaign.mortgage_id, campaign.mortgage_user_id)
+        # Our own bids are the only bids in our books, so this ask will not result in any trades
+        order, _ = self.order_books.place(mortgage_key, Side.ASK, self.my_user_id, price, investment.amount,
+                                          (investment.id, investment.user_id))
+        if not order.active:
+            raise ValueError('ask matches one of your bids')
+        investment.status = InvestmentStatus.FORSALE
+        self.send_campaign_update(campaign, investment, price)
+        return order
+
+    def cancel_order(self, order_id):
+        """
+        Cancel one of our orders. Investments for which the ask is cancelled are no longer for sale.
+        :return: the cancelled Order, or None if we don't have an order with this id
+        """
+        order = self.order_books.get_order(order_id)
+        if order is None or order.user_id != self.my_user_id:
+            return None
+
+        self.order_books.cancel(order_id)
+        if order.side == Side.ASK:
+            investment = self.data_manager.get_investment(*order.investment_key)
+            campaign = self.data_manager.get_campaign(investment.campaign_id, investment.campaign_user_id) \
+                if investment is not None else None
+            if campaign is not None:
+                investment.status = InvestmentStatus.ACCEPTED
+                self.send_campaign_update(campaign, investment)
+        return order
+
+    def update_ask(self, mortgage_key, investment, price, user_id):
+        """
+        Replace the ask for an investment that another user is selling, after a campaign-update about the investment.
+        """
+        investment_key = (investment.id, investment.user_id)
+        ask = self.order_books.get_ask(investment_key)
+        if ask is not None:
+            self.order_books.cancel(ask.id)
+
+        if investment.status == InvestmentStatus.FORSALE and user_id != self.my_user_id:
+            try:
+                _, trades = self.order_books.place(mortgage_key, Side.ASK, user_id, price, investment.amount,
+                                                   investment_key)
+            except ValueError as e:
+                self.logger.warning('Ignoring ask for investment %s: %s', investment.id, e)
+                return
+
+            for trade in trades:
+                self.execute_trade(mortgage_key, trade)
+
+    def execute_trade(self, mortgage_key, trade):
+        """
+        Offer a transfer for the investment of a matched ask. The seller accepts transfers that match its asking
+        price, after which the transfer contract is created.
+        """
+        investment = self.data_manager.get_investment(*trade.ask.investment_key)
+        if investment is None:
+            self.logger.error('Cannot execute trade (unknown investment)')
+            return
+
+        you = self.data_manager.you
+        transfer = Transfer(you.transfers.count(), you.id, u'', trade.price * trade.amount,
+                            investment.id, investment.user_id, TransferStatus.PENDING)
+        you.transfers.add(transfer)
+        investment.transfers.add(transfer)
+        self.pending_trades[(transfer.id, transfer.user_id)] = (mortgage_key, trade, time.time())
+
+        self.lifecycle.tag_action('offer_transfer', ObjectType.TRANSFER, transfer.id, transfer.user_id)
+        self.offer_transfer(transfer)
+
+    def notify_changed(self, event, name, obj):
+        # Building the API dictionary is not free, so only do it when someone is listening
+        if self.notifier.observers:
+            self.notifier.notify(event, {name: obj.to_dict(api_response=True)})
 
     def get_stake(self, public_key):
         for key, (ts, _) in self.stake_cache.items():
@@ -655,8 +1044,10 @@ class MarketCommunity(BlockchainCommunity):
         if public_key not in self.stake_cache:
             value = 0
 
-            contracts = self.data_manager.find_contracts(Contract.to_public_key == public_key,
-                                                         Contract.type in [ObjectType.INVESTMENT, ObjectType.TRANSFER])
+            contracts = list(self.data_manager.find_contracts(Contract.to_public_key == public_key,
+                                                              Contract.type in [ObjectType.INVESTMENT,
+                                                                                ObjectType.TRANSFER]))
+            contracts += self.data_manager.get_archived_contracts_to(public_key)
 
             for contract in contracts:
                 if not self.data_manager.contract_on_blockchain(contract.id):
@@ -673,25 +1064,23 @@ class MarketCommunity(BlockchainCommunity):
                     if self.find_owner(contract.id) == public_key:
                         value += contract.get_object().amount
 
-
-            #  Give stake a +1 for every POS_STEP invested. Consider amounts up to POS_LIMIT.
-            stake = min(value, POS_LIMIT) / POS_STEP
-
-            # To allow bootstrapping we give verified banks a minimum stake of 1
-            if public_key in VERIFIED_BANKS.values():
-                stake = max(stake, 1)
-
-            self.stake_cache[public_key] = (time.time(), stake)
+            self.stake_cache[public_key] = (time.time(), calculate_stake(public_key, value))
 
         return self.stake_cache[public_key][1]
 
     def check_proof(self, block):
-        proof = hashlib.sha256(str(block)).digest()
-        stake = self.get_stake(block.creator)
-        return full_to_uint256(proof) < (block.target_difficulty * stake)
+        if self.light:
+            # Light nodes don't have the contracts needed to calculate the stake. They only know that verified banks
+            # have a stake of at least 1, so a proof that needs more stake than that is only accepted if enough
+            # verifiers sent us the header.
+            stake = POS_LIMIT / POS_STEP if block.id in self.agreed_headers else calculate_stake(block.creator, 0)
+        else:
+            stake = self.get_stake(block.creator)
+        return check_proof(block, stake)
 
-    def check_contract(self, contract, fail_without_parent=True):
-        if not super(MarketCommunity, self).check_contract(contract, fail_without_parent=fail_without_parent):
+    def check_contract(self, contract, fail_without_parent=True, verify=True):
+        if not super(MarketCommunity, self).check_contract(contract, fail_without_parent=fail_without_parent,
+                                                           verify=verify):
             return False
 
         if contract.previous_hash:
@@ -702,10 +1091,7 @@ class MarketCommunity(BlockchainCommunity):
                 # Should never happen since BlockchainCommunity.check_contract also checks for this
                 return True
 
-            elif (prev_contract.type == ObjectType.MORTGAGE and contract.type != ObjectType.INVESTMENT) or \
-                 (prev_contract.type == ObjectType.INVESTMENT and contract.type != ObjectType.TRANSFER) or \
-                 (prev_contract.type == ObjectType.TRANSFER and contract.type not in [ObjectType.TRANSFER, ObjectType.CONFIRMATION]) or \
-                 (prev_contract.type == ObjectType.CONFIRMATION and contract.type != ObjectType.TRANSFER):
+            elif contract.type not in CONTRACT_SUCCESSORS.get(prev_contract.type, [contract.type]):
                 self.logger.debug('Contract failed check (unexpected contract type)')
                 return False
 
@@ -716,7 +1102,7 @@ class MarketCommunity(BlockchainCommunity):
             elif contract.type == ObjectType.TRANSFER:
                 if prev_contract == ObjectType.TRANSFER:
                     block_id = self.data_manager.get_blockchain_block_id(prev_contract.id)
-                    block = self.data_manager.get_block(block_id)
+                    block = self.data_manager.get_block_header(block_id)
                     if block is None:
                         self.logger.debug('Contract failed check (previous transfer not on blockchain)')
                         return False
@@ -733,24 +1119,11 @@ class MarketCommunity(BlockchainCommunity):
                     return False
 
             elif contract.type == ObjectType.INVESTMENT:
-                # Find all contracts that depend on this mortgage
-                contracts = self.data_manager.find_contracts(Contract.previous_hash == prev_contract.id)
-                contracts = list(contracts) if contracts.count() > 0 else []
-                contracts += [c for c in self.incoming_contracts.values()
-                              if c.previous_hash == prev_contract.id]
-                contracts.append(contract)
-
-                # Filter out duplicates
-                contracts_dict = {}
-                for contract in contracts:
-                    contracts_dict[contract.id] = contract
-                contracts = contracts_dict.values()
-
-                # Make sure the sum of all investments does not surpass the maximum allowed amount
+                # Make sure the sum of all investments (on the blockchain, waiting to be included in a block, and
+                # this one) does not surpass the maximum allowed amount
                 mortgage = prev_contract.get_object()
                 maximum_value = mortgage.amount - mortgage.bank_amount
-                current_value = sum([c.get_object().amount for c in contracts
-                                     if c.type == ObjectType.INVESTMENT])
+                current_value = self.funding.get_total(prev_contract.id, contract)
 
                 if current_value > maximum_value:
                     self.logger.debug('Contract failed check (attempt to overspend)')
@@ -762,16 +1135,50 @@ class MarketCommunity(BlockchainCommunity):
 
         return True
 
+    def add_incoming_contract(self, contract):
+        super(MarketCommunity, self).add_incoming_contract(contract)
+        self.funding.add_pending(contract)
+
+    def remove_incoming_contract(self, contract_id):
+        contract = super(MarketCommunity, self).remove_incoming_contract(contract_id)
+        if contract is not None:
+            self.funding.remove_pending(contract)
+        return contract
+
+    def on_best_chain_changed(self, disconnected, connected):
+        super(MarketCommunity, self).on_best_chain_changed(disconnected, connected)
+
+        # Update the amounts that have been invested in mortgages on the blockchain
+        blocks = self.data_manager.get_blocks_by_ids([block_index.block_id for block_index in disconnected + connected])
+        for block_index in disconnected:
+            for contract in blocks.get(block_index.block_id, (None, []))[1]:
+                self.funding.remove_committed(contract)
+        for block_index in connected:
+            for contract in blocks.get(block_index.block_id, (None, []))[1]:
+                self.funding.add_committed(contract)
+
+        # Forget the owners and stakes that these blocks may have changed
+        for block_index in disconnected + connected:
+            for contract in blocks.get(block_index.block_id, (None, []))[1]:
+                self.forget_ownership(contract)
+
+    def forget_ownership(self, contract):
+        public_keys = [contract.from_public_key, contract.to_public_key]
+        investment_contract = None
+        if contract.type in [ObjectType.INVESTMENT, ObjectType.TRANSFER, ObjectType.CONFIRMATION]:
+            investment_contract = self.find_investment_contract(contract)
+        if investment_contract is not None:
+            public_keys.append(self.owners.pop(investment_contract.id, None))
+        for public_key in public_keys:
+            self.stake_cache.pop(public_key, None)
+
     def has_sibling(self, contract):
         for c in self.incoming_contracts.itervalues():
             if c.id != contract.id and c.previous_hash == contract.previous_hash:
                 return True
 
-        # For some reason if we add Contract.id != contract.id to the find_contract arguments,
-        # it may still produce results where Contract.id == contract.id. So we check this manually.
-        contracts = self.data_manager.find_contracts(Contract.previous_hash == contract.previous_hash)
-        for c in list(contracts):
-            if c.id != contract.id:
+        for contract_id in self.data_manager.get_contract_ids_by_previous_hash(contract.previous_hash):
+            if contract_id != contract.id:
                 return True
 
         return False
@@ -848,10 +1255,10 @@ class MarketCommunity(BlockchainCommunity):
 
     @inlineCallbacks
     def find_owner_remote(self, contract_id):
-        response = yield self.send_traversal_request(contract_id, ObjectType.CONFIRMATION)
+        response = yield self.find_contract_remote(contract_id, ObjectType.CONFIRMATION)
         if response is None or response[0] is None:
-            response = yield self.send_traversal_request(contract_id, ObjectType.INVESTMENT)
-            owner = response[0].to_public_key if response else None
+            response = yield self.find_contract_remote(contract_id, ObjectType.INVESTMENT)
+            owner = response[0].to_public_key if response and response[0] else None
         else:
             contract, _ = response
             owner = contract.from_public_key
@@ -859,13 +1266,23 @@ class MarketCommunity(BlockchainCommunity):
         returnValue(owner)
 
     def find_owner(self, contract_id):
+        owner = self.owners.get(contract_id)
+        if owner is not None:
+            return owner
+
         contract = self.traverse_contracts(contract_id, ObjectType.CONFIRMATION)
 
         if not contract:
             contract = self.traverse_contracts(contract_id, ObjectType.INVESTMENT)
-            return contract.to_public_key if contract else None
+            owner = contract.to_public_key if contract else None
         else:
-            return contract.from_public_key
+            owner = contract.from_public_key
+
+        # Only the owners of investments are kept, since forget_ownership only knows how to find those
+        header = self.data_manager.get_contract_header(contract_id)
+        if owner is not None and header is not None and header.type == ObjectType.INVESTMENT:
+            self.owners[contract_id] = owner
+        return owner
 
     def find_investment_contract(self, contract):
         # Go up in the chain until we find the investment
@@ -894,3 +1311,19 @@ class MarketCommunity(BlockchainCommunity):
     @accept(remote=Role.FINANCIAL_INSTITUTION)
     def on_traversal_response(self, messages):
         super(MarketCommunity, self).on_traversal_response(messages)
+
+    @accept(local=Role.FINANCIAL_INSTITUTION)
+    def on_header_request(self, messages):
+        super(MarketCommunity, self).on_header_request(messages)
+
+    @accept(remote=Role.FINANCIAL_INSTITUTION)
+    def on_headers(self, messages):
+        super(MarketCommunity, self).on_headers(messages)
+
+    @accept(local=Role.FINANCIAL_INSTITUTION)
+    def on_proof_request(self, messages):
+        super(MarketCommunity, self).on_proof_request(messages)
+
+    @accept(remote=Role.FINANCIAL_INSTITUTION)
+    def on_proof_response(self, messages):
+        super(MarketCommunity, self).on_proof_response(messages)
@@ -11,7 +11,8 @@ class MarketConversion(BlockchainConversion):
                      u'offer': (chr(101), conversion_pb2.OfferMessage),
                      u'accept': (chr(102), conversion_pb2.AcceptMessage),
                      u'reject': (chr(103), conversion_pb2.RejectMessage),
-                     u'campaign-update': (chr(104), conversion_pb2.CampaignUpdateMessage)}
+                     u'campaign-update': (chr(104), conversion_pb2.CampaignUpdateMessage),
+                     u'campaign-sync': (chr(105), conversion_pb2.CampaignSyncMessage)}
 
         for name, (byte, proto) in msg_types.iteritems():
             self.define_meta_message(byte,
@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='conversion.proto',
   package='market',
   syntax='proto2',
-  serialized_pb=_b('\n\x10\x63onversion.proto\x12\x06market\")\n\x0bUserMessage\x12\x1a\n\x04user\x18\x01 \x02(\x0b\x32\x0c.market.User\"\xcb\x01\n\x0cOfferMessage\x12)\n\x0cloan_request\x18\x01 \x01(\x0b\x32\x13.market.LoanRequest\x12\"\n\x08mortgage\x18\x02 \x01(\x0b\x32\x10.market.Mortgage\x12&\n\ninvestment\x18\x03 \x01(\x0b\x32\x12.market.Investment\x12 \n\x07profile\x18\x04 \x01(\x0b\x32\x0f.market.Profile\x12\"\n\x08transfer\x18\x05 \x01(\x0b\x32\x10.market.Transfer\"O\n\rAcceptMessage\x12\x13\n\x0bobject_type\x18\x01 \x02(\r\x12\x11\n\tobject_id\x18\x02 \x02(\r\x12\x16\n\x0eobject_user_id\x18\x03 \x02(\x0c\"O\n\rRejectMessage\x12\x13\n\x0bobject_type\x18\x01 \x02(\r\x12\x11\n\tobject_id\x18\x02 \x02(\r\x12\x16\n\x0eobject_user_id\x18\x03 \x02(\x0c\"\x87\x01\n\x15\x43\x61mpaignUpdateMessage\x12\"\n\x08\x63\x61mpaign\x18\x01 \x02(\x0b\x32\x10.market.Campaign\x12\"\n\x08mortgage\x18\x02 \x02(\x0b\x32\x10.market.Mortgage\x12&\n\ninvestment\x18\x03 \x01(\x0b\x32\x12.market.Investment\"B\n\x04User\x12\n\n\x02id\x18\x01 \x02(\x0c\x12\x0c\n\x04role\x18\x02 \x02(\r\x12 \n\x07profile\x18\x03 \x01(\x0b\x32\x0f.market.Profile\"\xce\x01\n\x07Profile\x12\x12\n\nfirst_name\x18\x01 \x02(\t\x12\x11\n\tlast_name\x18\x02 \x02(\t\x12\r\n\x05\x65mail\x18\x03 \x02(\t\x12\x0c\n\x04iban\x18\x04 \x02(\t\x12\x14\n\x0cphone_number\x18\x05 \x02(\t\x12\x1b\n\x13\x63urrent_postal_code\x18\x06 \x01(\t\x12\x1c\n\x14\x63urrent_house_number\x18\x07 \x01(\t\x12\x17\n\x0f\x63urrent_address\x18\x08 \x01(\t\x12\x15\n\rdocument_list\x18\t \x01(\t\"\xac\x01\n\x0bLoanRequest\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x1c\n\x05house\x18\x03 \x02(\x0b\x32\r.market.House\x12\x15\n\rmortgage_type\x18\x04 \x02(\r\x12\x0f\n\x07\x62\x61nk_id\x18\x05 \x02(\x0c\x12\x13\n\x0b\x64\x65scription\x18\x06 \x02(\t\x12\x15\n\ramount_wanted\x18\x07 \x02(\x01\x12\x0e\n\x06status\x18\x08 \x02(\r\"\x92\x01\n\x05House\x12\x13\n\x0bpostal_code\x18\x01 \x02(\t\x12\x14\n\x0chouse_number\x18\x02 \x02(\t\x12\x0f\n\x07\x61\x64\x64ress\x18\x03 \x02(\t\x12\r\n\x05price\x18\x04 \x02(\x01\x12\x0b\n\x03url\x18\x05 \x02(\t\x12\x1b\n\x13seller_phone_number\x18\x06 \x02(\t\x12\x14\n\x0cseller_email\x18\x07 \x02(\t\"\xf8\x02\n\x08Mortgage\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0f\n\x07\x62\x61nk_id\x18\x03 \x02(\x0c\x12\x1c\n\x05house\x18\x04 \x02(\x0b\x32\r.market.House\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\x12\x13\n\x0b\x62\x61nk_amount\x18\x06 \x02(\x01\x12\x15\n\rmortgage_type\x18\x07 \x02(\r\x12\x15\n\rinterest_rate\x18\x08 \x02(\x01\x12\x17\n\x0fmax_invest_rate\x18\t \x02(\x01\x12\x14\n\x0c\x64\x65\x66\x61ult_rate\x18\n \x02(\x01\x12\x10\n\x08\x64uration\x18\x0b \x02(\r\x12\x0c\n\x04risk\x18\x0c \x02(\t\x12\x0e\n\x06status\x18\r \x02(\r\x12\"\n\x08\x63\x61mpaign\x18\x0e \x01(\x0b\x32\x10.market.Campaign\x12\x17\n\x0floan_request_id\x18\x0f \x02(\r\x12\x1c\n\x14loan_request_user_id\x18\x10 \x02(\x0c\x12\x13\n\x0b\x63ontract_id\x18\x11 \x01(\x0c\"\xa4\x01\n\nInvestment\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0e\n\x06\x61mount\x18\x03 \x02(\x01\x12\x15\n\rinterest_rate\x18\x04 \x02(\x01\x12\x13\n\x0b\x63\x61mpaign_id\x18\x05 \x02(\r\x12\x18\n\x10\x63\x61mpaign_user_id\x18\x06 \x02(\x0c\x12\x0e\n\x06status\x18\x07 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x08 \x01(\x0c\"\xbf\x01\n\x08Transfer\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0c\n\x04iban\x18\x03 \x02(\t\x12\x0e\n\x06\x61mount\x18\x04 \x02(\x01\x12\x15\n\rinvestment_id\x18\x05 \x02(\r\x12\x1a\n\x12investment_user_id\x18\x06 \x02(\x0c\x12\x0e\n\x06status\x18\x07 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x08 \x01(\x0c\x12 \n\x18\x63onfirmation_contract_id\x18\t \x01(\x0c\"q\n\x0c\x43onfirmation\x12\x13\n\x0btransfer_id\x18\x01 \x02(\r\x12\x18\n\x10transfer_user_id\x18\x02 \x02(\x0c\x12\x0f\n\x07to_iban\x18\x03 \x02(\t\x12\x11\n\tfrom_iban\x18\x04 \x02(\t\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\"\x91\x01\n\x08\x43\x61mpaign\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x13\n\x0bmortgage_id\x18\x03 \x02(\r\x12\x18\n\x10mortgage_user_id\x18\x04 \x02(\x0c\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\x12\x17\n\x0f\x61mount_invested\x18\x06 \x02(\x01\x12\x10\n\x08\x65nd_time\x18\x07 \x02(\r')
+  serialized_pb=_b('\n\x10\x63onversion.proto\x12\x06market\")\n\x0bUserMessage\x12\x1a\n\x04user\x18\x01 \x02(\x0b\x32\x0c.market.User\"\xcb\x01\n\x0cOfferMessage\x12)\n\x0cloan_request\x18\x01 \x01(\x0b\x32\x13.market.LoanRequest\x12\"\n\x08mortgage\x18\x02 \x01(\x0b\x32\x10.market.Mortgage\x12&\n\ninvestment\x18\x03 \x01(\x0b\x32\x12.market.Investment\x12 \n\x07profile\x18\x04 \x01(\x0b\x32\x0f.market.Profile\x12\"\n\x08transfer\x18\x05 \x01(\x0b\x32\x10.market.Transfer\"O\n\rAcceptMessage\x12\x13\n\x0bobject_type\x18\x01 \x02(\r\x12\x11\n\tobject_id\x18\x02 \x02(\r\x12\x16\n\x0eobject_user_id\x18\x03 \x02(\x0c\"O\n\rRejectMessage\x12\x13\n\x0bobject_type\x18\x01 \x02(\r\x12\x11\n\tobject_id\x18\x02 \x02(\r\x12\x16\n\x0eobject_user_id\x18\x03 \x02(\x0c\"\xaf\x01\n\x15\x43\x61mpaignUpdateMessage\x12\"\n\x08\x63\x61mpaign\x18\x01 \x02(\x0b\x32\x10.market.Campaign\x12\"\n\x08mortgage\x18\x02 \x02(\x0b\x32\x10.market.Mortgage\x12&\n\ninvestment\x18\x03 \x01(\x0b\x32\x12.market.Investment\x12\x17\n\x0fsequence_number\x18\x04 \x02(\x04\x12\r\n\x05price\x18\x05 \x01(\x01\"Z\n\x13\x43\x61mpaignSyncMessage\x12\r\n\x05lower\x18\x01 \x02(\x0c\x12\r\n\x05upper\x18\x02 \x02(\x0c\x12%\n\x06states\x18\x03 \x03(\x0b\x32\x15.market.CampaignState\"B\n\x04User\x12\n\n\x02id\x18\x01 \x02(\x0c\x12\x0c\n\x04role\x18\x02 \x02(\r\x12 \n\x07profile\x18\x03 \x01(\x0b\x32\x0f.market.Profile\"\xce\x01\n\x07Profile\x12\x12\n\nfirst_name\x18\x01 \x02(\t\x12\x11\n\tlast_name\x18\x02 \x02(\t\x12\r\n\x05\x65mail\x18\x03 \x02(\t\x12\x0c\n\x04iban\x18\x04 \x02(\t\x12\x14\n\x0cphone_number\x18\x05 \x02(\t\x12\x1b\n\x13\x63urrent_postal_code\x18\x06 \x01(\t\x12\x1c\n\x14\x63urrent_house_number\x18\x07 \x01(\t\x12\x17\n\x0f\x63urrent_address\x18\x08 \x01(\t\x12\x15\n\rdocument_list\x18\t \x01(\t\"\xac\x01\n\x0bLoanRequest\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x1c\n\x05house\x18\x03 \x02(\x0b\x32\r.market.House\x12\x15\n\rmortgage_type\x18\x04 \x02(\r\x12\x0f\n\x07\x62\x61nk_id\x18\x05 \x02(\x0c\x12\x13\n\x0b\x64\x65scription\x18\x06 \x02(\t\x12\x15\n\ramount_wanted\x18\x07 \x02(\x01\x12\x0e\n\x06status\x18\x08 \x02(\r\"\x92\x01\n\x05House\x12\x13\n\x0bpostal_code\x18\x01 \x02(\t\x12\x14\n\x0chouse_number\x18\x02 \x02(\t\x12\x0f\n\x07\x61\x64\x64ress\x18\x03 \x02(\t\x12\r\n\x05price\x18\x04 \x02(\x01\x12\x0b\n\x03url\x18\x05 \x02(\t\x12\x1b\n\x13seller_phone_number\x18\x06 \x02(\t\x12\x14\n\x0cseller_email\x18\x07 \x02(\t\"\xf8\x02\n\x08Mortgage\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0f\n\x07\x62\x61nk_id\x18\x03 \x02(\x0c\x12\x1c\n\x05house\x18\x04 \x02(\x0b\x32\r.market.House\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\x12\x13\n\x0b\x62\x61nk_amount\x18\x06 \x02(\x01\x12\x15\n\rmortgage_type\x18\x07 \x02(\r\x12\x15\n\rinterest_rate\x18\x08 \x02(\x01\x12\x17\n\x0fmax_invest_rate\x18\t \x02(\x01\x12\x14\n\x0c\x64\x65\x66\x61ult_rate\x18\n \x02(\x01\x12\x10\n\x08\x64uration\x18\x0b \x02(\r\x12\x0c\n\x04risk\x18\x0c \x02(\t\x12\x0e\n\x06status\x18\r \x02(\r\x12\"\n\x08\x63\x61mpaign\x18\x0e \x01(\x0b\x32\x10.market.Campaign\x12\x17\n\x0floan_request_id\x18\x0f \x02(\r\x12\x1c\n\x14loan_request_user_id\x18\x10 \x02(\x0c\x12\x13\n\x0b\x63ontract_id\x18\x11 \x01(\x0c\"\xa4\x01\n\nInvestment\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0e\n\x06\x61mount\x18\x03 \x02(\x01\x12\x15\n\rinterest_rate\x18\x04 \x02(\x01\x12\x13\n\x0b\x63\x61mpaign_id\x18\x05 \x02(\r\x12\x18\n\x10\x63\x61mpaign_user_id\x18\x06 \x02(\x0c\x12\x0e\n\x06status\x18\x07 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x08 \x01(\x0c\"\xbf\x01\n\x08Transfer\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x0c\n\x04iban\x18\x03 \x02(\t\x12\x0e\n\x06\x61mount\x18\x04 \x02(\x01\x12\x15\n\rinvestment_id\x18\x05 \x02(\r\x12\x1a\n\x12investment_user_id\x18\x06 \x02(\x0c\x12\x0e\n\x06status\x18\x07 \x02(\r\x12\x13\n\x0b\x63ontract_id\x18\x08 \x01(\x0c\x12 \n\x18\x63onfirmation_contract_id\x18\t \x01(\x0c\"q\n\x0c\x43onfirmation\x12\x13\n\x0btransfer_id\x18\x01 \x02(\r\x12\x18\n\x10transfer_user_id\x18\x02 \x02(\x0c\x12\x0f\n\x07to_iban\x18\x03 \x02(\t\x12\x11\n\tfrom_iban\x18\x04 \x02(\t\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\"\x91\x01\n\x08\x43\x61mpaign\x12\n\n\x02id\x18\x01 \x02(\r\x12\x0f\n\x07user_id\x18\x02 \x02(\x0c\x12\x13\n\x0bmortgage_id\x18\x03 \x02(\r\x12\x18\n\x10mortgage_user_id\x18\x04 \x02(\x0c\x12\x0e\n\x06\x61mount\x18\x05 \x02(\x01\x12\x17\n\x0f\x61mount_invested\x18\x06 \x02(\x01\x12\x10\n\x08\x65nd_time\x18\x07 \x02(\r\"5\n\rCampaignState\x12\x0b\n\x03key\x18\x01 \x02(\x0c\x12\x17\n\x0fsequence_number\x18\x02 \x02(\x04')
 )
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -234,6 +234,20 @@ _CAMPAIGNUPDATEMESSAGE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='sequence_number', full_name='market.CampaignUpdateMessage.sequence_number', index=3,
+      number=4, type=4, cpp_type=4, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='price', full_name='market.CampaignUpdateMessage.price', index=4,
+      number=5, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -247,7 +261,52 @@ _CAMPAIGNUPDATEMESSAGE = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=440,
-  serialized_end=575,
+  serialized_end=615,
+)
+
+
+_CAMPAIGNSYNCMESSAGE = _descriptor.Descriptor(
+  name='CampaignSyncMessage',
+  full_name='market.CampaignSyncMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='lower', full_name='market.CampaignSyncMessage.lower', index=0,
+      number=1, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='upper', full_name='market.CampaignSyncMessage.upper', index=1,
+      number=2, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='states', full_name='market.CampaignSyncMessage.states', index=2,
+      number=3, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=617,
+  serialized_end=707,
 )
 
 
@@ -291,8 +350,8 @@ _USER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=577,
-  serialized_end=643,
+  serialized_start=709,
+  serialized_end=775,
 )
 
 
@@ -378,8 +437,8 @@ _PROFILE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=646,
-  serialized_end=852,
+  serialized_start=778,
+  serialized_end=984,
 )
 
 
@@ -458,8 +517,8 @@ _LOANREQUEST = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=855,
-  serialized_end=1027,
+  serialized_start=987,
+  serialized_end=1159,
 )
 
 
@@ -531,8 +590,8 @@ _HOUSE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1030,
-  serialized_end=1176,
+  serialized_start=1162,
+  serialized_end=1308,
 )
 
 
@@ -674,8 +733,8 @@ _MORTGAGE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1179,
-  serialized_end=1555,
+  serialized_start=1311,
+  serialized_end=1687,
 )
 
 
@@ -754,8 +813,8 @@ _INVESTMENT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1558,
-  serialized_end=1722,
+  serialized_start=1690,
+  serialized_end=1854,
 )
 
 
@@ -841,8 +900,8 @@ _TRANSFER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1725,
-  serialized_end=1916,
+  serialized_start=1857,
+  serialized_end=2048,
 )
 
 
@@ -900,8 +959,8 @@ _CONFIRMATION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1918,
-  serialized_end=2031,
+  serialized_start=2050,
+  serialized_end=2163,
 )
 
 
@@ -973,8 +1032,46 @@ _CAMPAIGN = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=2034,
-  serialized_end=2179,
+  serialized_start=2166,
+  serialized_end=2311,
+)
+
+
+_CAMPAIGNSTATE = _descriptor.Descriptor(
+  name='CampaignState',
+  full_name='market.CampaignState',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='key', full_name='market.CampaignState.key', index=0,
+      number=1, type=12, cpp_type=9, label=2,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='sequence_number', full_name='market.CampaignState.sequence_number', index=1,
+      number=2, type=4, cpp_type=4, label=2,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto2',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=2313,
+  serialized_end=2366,
 )
 
 _USERMESSAGE.fields_by_name['user'].message_type = _USER
@@ -986,6 +1083,7 @@ _OFFERMESSAGE.fields_by_name['transfer'].message_type = _TRANSFER
 _CAMPAIGNUPDATEMESSAGE.fields_by_name['campaign'].message_type = _CAMPAIGN
 _CAMPAIGNUPDATEMESSAGE.fields_by_name['mortgage'].message_type = _MORTGAGE
 _CAMPAIGNUPDATEMESSAGE.fields_by_name['investment'].message_type = _INVESTMENT
+_CAMPAIGNSYNCMESSAGE.fields_by_name['states'].message_type = _CAMPAIGNSTATE
 _USER.fields_by_name['profile'].message_type = _PROFILE
 _LOANREQUEST.fields_by_name['house'].message_type = _HOUSE
 _MORTGAGE.fields_by_name['house'].message_type = _HOUSE
@@ -995,6 +1093,7 @@ DESCRIPTOR.message_types_by_name['OfferMessage'] = _OFFERMESSAGE
 DESCRIPTOR.message_types_by_name['AcceptMessage'] = _ACCEPTMESSAGE
 DESCRIPTOR.message_types_by_name['RejectMessage'] = _REJECTMESSAGE
 DESCRIPTOR.message_types_by_name['CampaignUpdateMessage'] = _CAMPAIGNUPDATEMESSAGE
+DESCRIPTOR.message_types_by_name['CampaignSyncMessage'] = _CAMPAIGNSYNCMESSAGE
 DESCRIPTOR.message_types_by_name['User'] = _USER
 DESCRIPTOR.message_types_by_name['Profile'] = _PROFILE
 DESCRIPTOR.message_types_by_name['LoanRequest'] = _LOANREQUEST
@@ -1004,6 +1103,7 @@ DESCRIPTOR.message_types_by_name['Investment'] = _INVESTMENT
 DESCRIPTOR.message_types_by_name['Transfer'] = _TRANSFER
 DESCRIPTOR.message_types_by_name['Confirmation'] = _CONFIRMATION
 DESCRIPTOR.message_types_by_name['Campaign'] = _CAMPAIGN
+DESCRIPTOR.message_types_by_name['CampaignState'] = _CAMPAIGNSTATE
 
 UserMessage = _reflection.GeneratedProtocolMessageType('UserMessage', (_message.Message,), dict(
   DESCRIPTOR = _USERMESSAGE,
@@ -1040,6 +1140,13 @@ CampaignUpdateMessage = _reflection.GeneratedProtocolMessageType('CampaignUpdate
   ))
 _sym_db.RegisterMessage(CampaignUpdateMessage)
 
+CampaignSyncMessage = _reflection.GeneratedProtocolMessageType('CampaignSyncMessage', (_message.Message,), dict(
+  DESCRIPTOR = _CAMPAIGNSYNCMESSAGE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:market.CampaignSyncMessage)
+  ))
+_sym_db.RegisterMessage(CampaignSyncMessage)
+
 User = _reflection.GeneratedProtocolMessageType('User', (_message.Message,), dict(
   DESCRIPTOR = _USER,
   __module__ = 'conversion_pb2'
@@ -1103,5 +1210,12 @@ Campaign = _reflection.GeneratedProtocolMessageType('Campaign', (_message.Messag
   ))
 _sym_db.RegisterMessage(Campaign)
 
+CampaignState = _reflection.GeneratedProtocolMessageType('CampaignState', (_message.Message,), dict(
+  DESCRIPTOR = _CAMPAIGNSTATE,
+  __module__ = 'conversion_pb2'
+  # @@protoc_insertion_point(class_scope:market.CampaignState)
+  ))
+_sym_db.RegisterMessage(CampaignState)
+
 
 # @@protoc_insertion_point(module_scope)
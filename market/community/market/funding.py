@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from market.models import ObjectType
+
+
+class FundingTotals(object):
+    """
+    This class keeps track of the amounts that have been invested in mortgages, so that checking whether an
+    investment contract would overspend a mortgage does not require loading all other investment contracts.
+
+    Amounts are committed when the investment contract is in a block on the best chain, and pending while the
+    contract is waiting to be included in a block. Mortgages are identified by the id of their contract, which
+    is the previous_hash of the investment contracts.
+    """
+
+    def __init__(self):
+        # Mortgage contract id -> {investment contract id: amount}
+        self.committed = defaultdict(dict)
+        self.pending = defaultdict(dict)
+        # Mortgage contract id -> sum of the amounts
+        self.committed_totals = defaultdict(float)
+        self.pending_totals = defaultdict(float)
+
+    @staticmethod
+    def _add(amounts, totals, contract):
+        if contract.type == ObjectType.INVESTMENT and contract.id not in amounts[contract.previous_hash]:
+            amount = contract.get_object().amount
+            amounts[contract.previous_hash][contract.id] = amount
+            totals[contract.previous_hash] += amount
+
+    @staticmethod
+    def _remove(amounts, totals, contract):
+        if contract.type == ObjectType.INVESTMENT and contract.previous_hash in amounts:
+            amount = amounts[contract.previous_hash].pop(contract.id, None)
+            if amount is not None:
+                totals[contract.previous_hash] -= amount
+            if not amounts[contract.previous_hash]:
+                # Avoid rounding errors piling up and forget about mortgages without investments
+                del amounts[contract.previous_hash]
+                del totals[contract.previous_hash]
+
+    def add_committed(self, contract):
+        # A contract that is on the best chain is no longer pending, even if it is still in memory
+        self._remove(self.pending, self.pending_totals, contract)
+        self._add(self.committed, self.committed_totals, contract)
+
+    def remove_committed(self, contract):
+        self._remove(self.committed, self.committed_totals, contract)
+
+    def set_committed(self, committed):
+        """
+        Replace the committed amounts (e.g., with the amounts from a snapshot).
+        :param committed: a dictionary mapping mortgage contract ids to {investment contract id: amount} dictionaries
+        """
+        self.committed = defaultdict(dict, committed)
+        self.committed_totals = defaultdict(float, [(mortgage_contract_id, sum(amounts.values()))
+                                                    for mortgage_contract_id, amounts in committed.iteritems()])
+
+    def add_pending(self, contract):
+        if contract.id not in self.committed.get(contract.previous_hash, ()):
+            self._add(self.pending, self.pending_totals, contract)
+
+    def remove_pending(self, contract):
+        self._remove(self.pending, self.pending_totals, contract)
+
+    def get_total(self, mortgage_contract_id, contract=None):
+        """
+        Get the total amount that has been invested in a mortgage.
+        :param mortgage_contract_id: the id of the mortgage contract
+        :param contract: an investment contract that should be included in the total, if it has not been counted yet
+        :return: the sum of the committed and pending amounts
+        """
+        total = self.committed_totals.get(mortgage_contract_id, 0) + self.pending_totals.get(mortgage_contract_id, 0)
+        if contract is not None and contract.type == ObjectType.INVESTMENT and \
+           contract.id not in self.committed.get(mortgage_contract_id, ()) and \
+           contract.id not in self.pending.get(mortgage_contract_id, ()):
+            total += contract.get_object().amount
+        return total
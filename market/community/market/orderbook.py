@@ -0,0 +1,243 @@
+import heapq
+import itertools
+
+from collections import defaultdict, namedtuple
+
+from enum import Enum
+
+# The heaps are rebuilt once they hold this many more entries than there are orders, which bounds the number of
+# cancelled orders that are kept in memory
+MIN_COMPACT_SIZE = 64
+# Orders above this price per unit are refused. Prices come from other peers as well, so this also keeps absurd
+# prices out of the books.
+MAX_PRICE = 10.0
+
+Trade = namedtuple('Trade', ['bid', 'ask', 'price', 'amount'])
+
+
+class Side(Enum):
+    BID = 0
+    ASK = 1
+
+
+class Order(object):
+    """
+    This class represents an order in an order book. The price is per unit of the amount (e.g., 0.98 for an
+    investment that is sold for 98% of its amount). An ask is always for a single investment, since an investment
+    can only be transferred as a whole, and is therefore filled completely or not at all. A bid is for an amount
+    that can be filled by multiple asks.
+    """
+
+    __slots__ = ('id', 'side', 'user_id', 'price', 'amount', 'remaining', 'investment_key', 'active')
+
+    def __init__(self, order_id, side, user_id, price, amount, investment_key=None):
+        self.id = order_id
+        self.side = side
+        self.user_id = user_id
+        self.price = price
+        self.amount = amount
+        self.remaining = amount
+        self.investment_key = investment_key
+        self.active = True
+
+    def to_dict(self, api_response=False):
+        return {
+            'id': self.id,
+            'side': self.side.name if api_response else self.side.value,
+            'price': self.price,
+            'amount': self.amount,
+            'remaining': self.remaining,
+            'active': self.active
+        }
+
+
+class OrderBook(object):
+    """
+    This class holds the bids and asks for the investments in a single mortgage, and matches them with price-time
+    priority. The orders of each side are kept in a heap, so adding an order takes O(log n) time. Cancelling an order
+    only marks it as inactive; inactive orders are skipped when they reach the top of the heap, and the heaps are
+    rebuilt when they contain too many of them.
+
+    Since asks can't be partially filled, matching stops when the best bid is too small for the best ask.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        # Heaps of (price, sequence number, order) tuples, with negated prices for the bids
+        self.heaps = {Side.BID: [], Side.ASK: []}
+        # Side -> price -> the remaining amount and the number of the orders at that price
+        self.levels = {Side.BID: defaultdict(float), Side.ASK: defaultdict(float)}
+        self.counts = {Side.BID: defaultdict(int), Side.ASK: defaultdict(int)}
+        self.sequence = itertools.count()
+
+    def add(self, order):
+        """
+        Add an order to the book, after matching it with the orders on the other side. Orders that would match an
+        order of the same user are not added.
+        :return: a list with Trades
+        """
+        trades = self.match(order)
+        if order.remaining > 0 and order.active:
+            self.orders[order.id] = order
+            heapq.heappush(self.heaps[order.side], (-order.price if order.side == Side.BID else order.price,
+                                                    next(self.sequence), order))
+            self.levels[order.side][order.price] += order.remaining
+            self.counts[order.side][order.price] += 1
+        else:
+            order.active = False
+        return trades
+
+    def cancel(self, order_id):
+        """
+        Remove an order from the book.
+        :return: the order, or None if the order is not in the book
+        """
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            self.remove_amount(order, order.remaining, True)
+
+            heap = self.heaps[order.side]
+            if len(heap) > MIN_COMPACT_SIZE and len(heap) > 2 * len(self.orders):
+                self.heaps[order.side] = heap = [entry for entry in heap if entry[2].active]
+                heapq.heapify(heap)
+        return order
+
+    def best(self, side):
+        heap = self.heaps[side]
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def remove_amount(self, order, amount, removed):
+        levels, counts = self.levels[order.side], self.counts[order.side]
+        levels[order.price] -= amount
+        if removed:
+            order.active = False
+            counts[order.price] -= 1
+            if not counts[order.price]:
+                # Avoid rounding errors piling up and forget about empty price levels
+                del levels[order.price]
+                del counts[order.price]
+
+    def fill(self, order, amount):
+        order.remaining -= amount
+        if order.id in self.orders:
+            removed = order.remaining <= 0
+            if removed:
+                del self.orders[order.id]
+            self.remove_amount(order, amount, removed)
+
+    def match(self, order):
+        trades = []
+        other_side = Side.ASK if order.side == Side.BID else Side.BID
+        while order.remaining > 0:
+            other = self.best(other_side)
+            bid, ask = (order, other) if order.side == Side.BID else (other, order)
+            if other is None or bid.price < ask.price:
+                break
+
+            if other.user_id == order.user_id:
+                # Users can't trade with themselves, so the rest of the new order is cancelled
+                order.active = False
+                break
+
+            if bid.remaining < ask.remaining:
+                break
+
+            # The trade takes place at the price of the order that was in the book first
+            amount = ask.remaining
+            trades.append(Trade(bid, ask, other.price, amount))
+            self.fill(other, amount)
+            self.fill(order, amount)
+        return trades
+
+    def get_depth(self, side, levels=None):
+        """
+        Get the remaining amount per price, best price first.
+        :return: a list with (price, amount) tuples
+        """
+        prices = sorted(self.levels[side], reverse=side == Side.BID)
+        return [(price, self.levels[side][price]) for price in prices[:levels]]
+
+
+class OrderBooks(object):
+    """
+    This class holds an OrderBook per mortgage, and keeps track of the ask for every investment that is for sale.
+    Mortgages and investments are identified by their (id, user_id) keys.
+    """
+
+    def __init__(self):
+        self.books = {}
+        # Order id -> mortgage key
+        self.order_mortgages = {}
+        # Investment key -> ask
+        self.asks = {}
+        self.order_ids = itertools.count(1)
+
+    def place(self, mortgage_key, side, user_id, price, amount, investment_key=None):
+        """
+        Place an order and match it.
+        :param investment_key: the investment that is sold, for asks
+        :return: an (Order, list of Trades) tuple
+        :raises ValueError: if the price or amount is out of range, or if the investment is already for sale
+        """
+        # Written so that NaN fails the checks as well, since it would break the ordering of the heaps
+        if not 0 < price <= MAX_PRICE:
+            raise ValueError('price should be positive and at most %s' % MAX_PRICE)
+        if not 0 < amount < float('inf'):
+            raise ValueError('amount should be positive and finite')
+        if side == Side.ASK and investment_key in self.asks:
+            raise ValueError('investment is already for sale')
+
+        order = Order(next(self.order_ids), side, user_id, price, amount, investment_key)
+        book = self.books.get(mortgage_key)
+        if book is None:
+            book = self.books[mortgage_key] = OrderBook()
+        trades = book.add(order)
+
+        for trade in trades:
+            for filled in (trade.bid, trade.ask):
+                if not filled.active:
+                    self.forget(filled)
+        if order.active:
+            self.order_mortgages[order.id] = mortgage_key
+            if side == Side.ASK:
+                self.asks[investment_key] = order
+        return order, trades
+
+    def forget(self, order):
+        self.order_mortgages.pop(order.id, None)
+        if order.side == Side.ASK and self.asks.get(order.investment_key) is order:
+            del self.asks[order.investment_key]
+
+    def cancel(self, order_id):
+        """
+        :return: the cancelled order, or None if the order is not in any book
+        """
+        mortgage_key = self.order_mortgages.get(order_id)
+        if mortgage_key is None:
+            return None
+
+        book = self.books[mortgage_key]
+        order = book.cancel(order_id)
+        if order is not None:
+            self.forget(order)
+            if not book.orders:
+                del self.books[mortgage_key]
+        return order
+
+    def get_order(self, order_id):
+        mortgage_key = self.order_mortgages.get(order_id)
+        return self.books[mortgage_key].orders.get(order_id) if mortgage_key is not None else None
+
+    def get_ask(self, investment_key):
+        return self.asks.get(investment_key)
+
+    def get_depth(self, mortgage_key, levels=None):
+        """
+        :return: a dictionary with the bids and asks as lists of (price, amount) tuples, best price first
+        """
+        book = self.books.get(mortgage_key)
+        if book is None:
+            return {'bids': [], 'asks': []}
+        return {'bids': book.get_depth(Side.BID, levels), 'asks': book.get_depth(Side.ASK, levels)}
@@ -0,0 +1,26 @@
+import zlib
+
+from market.database.blockfile import BlockFileStore
+
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+
+class BlockArchive(BlockFileStore):
+    """
+    This class stores old blocks (i.e., blocks that are far below the top of the best chain) after they have been
+    moved out of the database. Blocks are stored in the same way as in a BlockFileStore, except that every record
+    is compressed separately, so that a single block can still be read without reading the blocks around it. The
+    archive has its own segment files and index.
+    """
+
+    segment_format = 'arc%05d.dat'
+    index_filename = 'archive.idx'
+
+    def encode(self, data):
+        return zlib.compress(data, ARCHIVE_COMPRESSION_LEVEL)
+
+    def decode(self, data):
+        return zlib.decompress(data)
+
+    def contains(self, key):
+        return self.index.get(key) is not None
@@ -0,0 +1,49 @@
+CREATE TABLE IF NOT EXISTS contract(
+  id              TEXT PRIMARY KEY,
+  previous_hash   TEXT,
+  from_public_key TEXT NOT NULL,
+  from_signature  TEXT,
+  to_public_key   TEXT NOT NULL,
+  to_signature    TEXT,
+  document        TEXT NOT NULL,
+  type            INTEGER NOT NULL,
+  time            TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS block(
+  id                TEXT PRIMARY KEY,
+  previous_hash     TEXT NOT NULL,
+  merkle_root_hash  TEXT NOT NULL,
+  creator           TEXT NOT NULL,
+  creator_signature TEXT NOT NULL,
+  target_difficulty TEXT NOT NULL,
+  time              TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS block_contract(
+  block_id    TEXT NOT NULL,
+  contract_id TEXT NOT NULL,
+  position    INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (block_id, contract_id)
+);
+
+-- Contracts that have been moved to the archive, without their documents and signatures
+CREATE TABLE IF NOT EXISTS archived_contract(
+  id              TEXT PRIMARY KEY,
+  previous_hash   TEXT,
+  from_public_key TEXT NOT NULL,
+  to_public_key   TEXT NOT NULL,
+  type            INTEGER NOT NULL,
+  time            TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS block_index(
+  block_id TEXT PRIMARY KEY,
+  height   INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS contract_previous_hash_idx ON contract(previous_hash);
+
+CREATE INDEX IF NOT EXISTS archived_contract_previous_hash_idx ON archived_contract(previous_hash);
+
+CREATE INDEX IF NOT EXISTS block_contract_contract_id_idx ON block_contract(contract_id);
@@ -0,0 +1,259 @@
+import os
+import mmap
+import struct
+
+from protobuf_to_dict import dict_to_protobuf, protobuf_to_dict
+
+from market.community.blockchain import conversion_pb2
+from market.models.block import Block
+from market.models.contract import Contract
+
+# Segment files are closed once they reach this size, after which a new segment is started
+SEGMENT_SIZE = 64 * 1024 * 1024
+RECORD_HEADER = struct.Struct('>I')
+
+# Index slots: key, segment, offset and length of the block record, and the position of the contract within the block
+INDEX_HEADER = struct.Struct('>4sII')
+INDEX_SLOT = struct.Struct('>32sHIIH')
+INDEX_MAGIC = 'BIDX'
+INDEX_INITIAL_SLOTS = 4096
+# The index is doubled in size when it is more than half full
+INDEX_MAX_LOAD = 0.5
+BLOCK_POSITION = 0xffff
+
+
+class MmapIndex(object):
+    """
+    This class is a hash table with open addressing that lives in a memory-mapped file. It maps 32-byte keys (which
+    are SHA-256 hashes, so their first bytes are used as hash) to (segment, offset, length, position) tuples. Entries
+    are never removed or replaced, and the table is rebuilt with twice as many slots when it gets too full.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.fp = None
+        self.map = None
+        self.slots = 0
+        self.entries = 0
+
+        if not os.path.exists(filename):
+            self.create(filename, INDEX_INITIAL_SLOTS)
+        self.open()
+
+    @staticmethod
+    def create(filename, slots):
+        with open(filename, 'wb') as fp:
+            fp.write(INDEX_HEADER.pack(INDEX_MAGIC, slots, 0))
+            fp.truncate(INDEX_HEADER.size + slots * INDEX_SLOT.size)
+
+    def open(self):
+        self.fp = open(self.filename, 'r+b')
+        self.map = mmap.mmap(self.fp.fileno(), 0)
+        magic, self.slots, self.entries = INDEX_HEADER.unpack_from(self.map, 0)
+        assert magic == INDEX_MAGIC, 'Not a block index file'
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.fp.close()
+            self.map = self.fp = None
+
+    def flush(self):
+        self.map.flush()
+
+    def find_slot(self, key):
+        """
+        Find the slot that holds a key, or the empty slot where it should go.
+        :return: a (slot offset, value) tuple, where value is None for an empty slot
+        """
+        slot = struct.unpack_from('>Q', key)[0] % self.slots
+        while True:
+            offset = INDEX_HEADER.size + slot * INDEX_SLOT.size
+            slot_key, segment, record_offset, length, position = INDEX_SLOT.unpack_from(self.map, offset)
+            # Records are never empty, so slots with a length of 0 are unused
+            if length == 0:
+                return offset, None
+            if slot_key == key:
+                return offset, (segment, record_offset, length, position)
+            slot = (slot + 1) % self.slots
+
+    def get(self, key):
+        return self.find_slot(key)[1]
+
+    def add(self, key, segment, offset, length, position=BLOCK_POSITION):
+        """
+        Add a key to the index, unless it already exists.
+        :return: True if the key has been added, False otherwise
+        """
+        if self.entries + 1 > self.slots * INDEX_MAX_LOAD:
+            self.grow()
+
+        slot_offset, value = self.find_slot(key)
+        if value is not None:
+            return False
+
+        INDEX_SLOT.pack_into(self.map, slot_offset, key, segment, offset, length, position)
+        self.entries += 1
+        INDEX_HEADER.pack_into(self.map, 0, INDEX_MAGIC, self.slots, self.entries)
+        return True
+
+    def iteritems(self):
+        for slot in xrange(self.slots):
+            key, segment, offset, length, position = INDEX_SLOT.unpack_from(self.map,
+                                                                            INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if length:
+                yield key, (segment, offset, length, position)
+
+    def grow(self):
+        # Fill the new table next to the old one, and only replace the old one once the new one is complete and on
+        # disk, so that a crash leaves us with either of them
+        filename = self.filename + '.tmp'
+        self.create(filename, self.slots * 2)
+        table = MmapIndex(filename)
+        for key, value in self.iteritems():
+            table.add(key, *value)
+        table.close()
+
+        self.close()
+        os.rename(filename, self.filename)
+        self.open()
+
+
+class BlockFileStore(object):
+    """
+    This class stores blocks in append-only segment files, as serialized Block messages (i.e., in the same format
+    that is used to send them to other nodes). An MmapIndex maps the ids of blocks and contracts to the records in
+    the segment files, which are read through memory maps. Reading a block therefore does not involve any queries or
+    Storm objects.
+
+    Every record starts with its length, so that records that have been indexed but not written completely (e.g.,
+    after a crash) can be recognized. Blocks that are added more than once are only stored once.
+    """
+
+    segment_format = 'blk%05d.dat'
+    index_filename = 'index.dat'
+
+    def __init__(self, directory, segment_size=SEGMENT_SIZE):
+        self.directory = directory
+        self.segment_size = segment_size
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.index = MmapIndex(os.path.join(directory, self.index_filename))
+        self.segment = 0
+        while os.path.exists(self.get_segment_filename(self.segment + 1)):
+            self.segment += 1
+        self.fp = open(self.get_segment_filename(self.segment), 'ab')
+        # Segment number -> mmap, created when a segment is first read
+        self.maps = {}
+
+    def get_segment_filename(self, segment):
+        return os.path.join(self.directory, self.segment_format % segment)
+
+    def encode(self, data):
+        return data
+
+    def decode(self, data):
+        return str(data)
+
+    def close(self):
+        self.flush()
+        self.fp.close()
+        for segment_map in self.maps.itervalues():
+            segment_map.close()
+        self.maps = {}
+        self.index.close()
+
+    def flush(self):
+        # Make sure the records are on disk before the index entries that point to them
+        self.fp.flush()
+        os.fsync(self.fp.fileno())
+        self.index.flush()
+
+    def add_block(self, block):
+        """
+        Append a block to the current segment file, and add the block and its contracts to the index.
+        :return: True if the block has been added, False if we already had it
+        """
+        if self.index.get(block.id) is not None:
+            return False
+
+        data = self.encode(dict_to_protobuf(conversion_pb2.Block, block.to_dict()).SerializeToString())
+        if self.fp.tell() > 0 and self.fp.tell() + RECORD_HEADER.size + len(data) > self.segment_size:
+            self.fp.close()
+            self.segment += 1
+            self.fp = open(self.get_segment_filename(self.segment), 'ab')
+
+        offset = self.fp.tell()
+        self.fp.write(RECORD_HEADER.pack(len(data)))
+        self.fp.write(data)
+        # Make the record visible to the memory maps
+        self.fp.flush()
+
+        self.index.add(block.id, self.segment, offset, len(data))
+        for position, contract in enumerate(block.contracts):
+            self.index.add(contract.id, self.segment, offset, len(data), position)
+        return True
+
+    def get_map(self, segment, size):
+        segment_map = self.maps.get(segment)
+        if segment_map is None or len(segment_map) < size:
+            # The segment has grown since we mapped it
+            if segment_map is not None:
+                segment_map.close()
+            with open(self.get_segment_filename(segment), 'rb') as fp:
+                segment_map = self.maps[segment] = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return segment_map
+
+    def get_record(self, key):
+        """
+        Get the record of the block with a given id, or of the block that contains the contract with a given id.
+        :return: a (buffer, position) tuple, where the buffer refers to the serialized block in the memory map, or
+        None if there is no such record
+        """
+        value = self.index.get(key)
+        if value is None:
+            return None
+
+        segment, offset, length, position = value
+        try:
+            segment_map = self.get_map(segment, offset + RECORD_HEADER.size + length)
+        except (IOError, ValueError):
+            return None
+        if len(segment_map) < offset + RECORD_HEADER.size + length or \
+           RECORD_HEADER.unpack_from(segment_map, offset)[0] != length:
+            return None
+        return buffer(segment_map, offset + RECORD_HEADER.size, length), position
+
+    def get_block_data(self, block_id):
+        """
+        Get the record of a block, which needs to be decoded to get the Block message.
+        :return: a buffer, or None if the block could not be found
+        """
+        record = self.get_record(block_id)
+        return record[0] if record is not None and record[1] == BLOCK_POSITION else None
+
+    def get_block_dict(self, block_id):
+        """
+        Get a block in the format of Block.to_dict.
+        :return: a dictionary, or None if the block could not be found
+        """
+        data = self.get_block_data(block_id)
+        if data is None:
+            return None
+        message = conversion_pb2.Block()
+        message.ParseFromString(self.decode(data))
+        return protobuf_to_dict(message)
+
+    def get_block(self, block_id):
+        block_dict = self.get_block_dict(block_id)
+        return Block.from_dict(block_dict) if block_dict is not None else None
+
+    def get_contract(self, contract_id):
+        record = self.get_record(contract_id)
+        if record is None or record[1] == BLOCK_POSITION:
+            return None
+        message = conversion_pb2.Block()
+        message.ParseFromString(self.decode(record[0]))
+        return Contract.from_dict(protobuf_to_dict(message.contracts[record[1]]))
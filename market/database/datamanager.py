@@ -1,8 +1,11 @@
 import os
 
+from collections import defaultdict
 from storm.database import create_database
-from storm.expr import Desc
+from storm.expr import And, Or, Not, Select, LeftJoin
+from twisted.internet.defer import succeed
 
+from market.models import ObjectType
 from market.models.user import User
 from market.models.loanrequest import LoanRequest
 from market.models.mortgage import Mortgage
@@ -12,50 +15,276 @@ from market.models.campaign import Campaign
 from market.models.contract import Contract
 from market.models.block import Block
 from market.models.block_index import BlockIndex
-from market.models.block_contract import BlockContract
+from market.models.merkle_proof import MerkleProof
+from market.models.profile import Profile
+from market.database.archive import BlockArchive
+from market.database.blockfile import BlockFileStore
+from market.database.executor import DatabaseExecutor
+from market.database.reader import BlockHeader, ContractHeader, DatabaseReader, Position
 from market.database.store import MarketStore
 from market.defs import BASE_DIR
+from market.metrics import DATABASE_CALL_SECONDS
+from market.util.metrics import timed_methods
 
+# SQLite allows at most 999 parameters per query, and a composite key takes two
+MAX_KEYS_PER_QUERY = 400
+# The maximum number of blocks that are moved to the archive at once
+MAX_ARCHIVE_BLOCKS = 100
+# The tables that are stored in the blockchain database file when using a DatabaseExecutor
+BLOCKCHAIN_TABLES = ['contract', 'block', 'block_contract', 'archived_contract', 'block_index']
 
+
+@timed_methods(DATABASE_CALL_SECONDS)
 class BlockchainDataManager(object):
     """
     This class stores and manages all the blocks in the blockchain.
+
+    When using a database file, the blockchain tables are stored in a separate file that is written by a
+    DatabaseExecutor, so that writing blocks and contracts does not block the reactor thread. Storm can still
+    read these tables, since the file is attached to its connection. Objects that are being written are kept in
+    memory until Storm is able to see them (i.e., after the next commit). The best chain is kept in memory as well.
+
+    Hot paths that only need a few columns (e.g., walking the chain) use the DatabaseReader instead of Storm.
+
+    Optionally, complete blocks are also appended to a BlockFileStore next to the database file, from which blocks and
+    contracts can be read without any queries. The database is still needed for everything that is looked up by
+    something other than an id (e.g., the contracts that point to a given contract).
+
+    When hot_blocks is set, blocks on the best chain that are more than hot_blocks below the top are moved to a
+    compressed BlockArchive, together with their contracts. Only the headers of these contracts remain in the database
+    (in the archived_contract table), so that walking the contract chains does not require the archive. Reading an
+    archived block or contract falls back to the archive, and is therefore slower than reading a recent one.
+
+    The duration of every call to a public method is kept in the market_database_call_seconds metric.
     """
 
-    def __init__(self, market_db):
-        self.database = create_database('sqlite:' + market_db)
+    def __init__(self, market_db, threaded=True, block_files=False, hot_blocks=0):
+        self.executor = None
+        self.block_files = None
+        self.archive = None
+        self.hot_blocks = hot_blocks
+        # Blocks on the best chain up to (and including) this height have been moved to the archive
+        self.archived_height = 0
+        self.pending_contracts = {}
+        self.pending_blocks = {}
+        self.written = []
+        self.best_chain = []
+        self.heights = {}
+
+        schema = self.read_schema('schema.sql')
+        blockchain_schema = self.read_schema('blockchain.sql')
+
+        if market_db:
+            self.database = create_database('sqlite:%s?journal_mode=WAL&synchronous=NORMAL' % market_db)
+        else:
+            self.database = create_database('sqlite:')
         self.store = MarketStore(self.database)
+        self.reader = DatabaseReader(self.store)
+
+        if market_db and threaded:
+            blockchain_db = '%s-blockchain%s' % os.path.splitext(market_db)
+            self.executor = DatabaseExecutor(blockchain_db, blockchain_schema)
+            self.store.attach_database(blockchain_db, 'blockchain')
+            self.migrate_blockchain_tables()
+            self.executor.start()
+        else:
+            schema += blockchain_schema
 
-        with open(os.path.join(BASE_DIR, 'database', 'schema.sql')) as fp:
-            schema = fp.read()
-        for cmd in schema.split(';'):
+        if market_db and block_files:
+            self.block_files = BlockFileStore('%s-blocks' % os.path.splitext(market_db)[0])
+        # Blocks that have been archived before should remain available, even if we no longer archive blocks
+        archive_dir = '%s-archive' % os.path.splitext(market_db)[0] if market_db else None
+        if archive_dir and (hot_blocks or os.path.exists(archive_dir)):
+            self.archive = BlockArchive(archive_dir)
+
+        for cmd in schema:
             self.store.execute(cmd)
 
-    def initialize(self):
+    def migrate_blockchain_tables(self):
+        """
+        Move the blockchain tables of a database that was created without a DatabaseExecutor to the blockchain
+        database. SQLite looks up unqualified table names in the main database first, so these tables would otherwise
+        hide the tables that the executor writes to. Rows that already exist are skipped, so an interrupted migration
+        can safely be repeated.
+        """
+        for table in BLOCKCHAIN_TABLES:
+            if not self.store.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                                      (unicode(table),)).get_one():
+                continue
+
+            new_columns = set(row[1] for row in self.store.execute('PRAGMA blockchain.table_info(%s)' % table))
+            columns = ', '.join(row[1] for row in self.store.execute('PRAGMA main.table_info(%s)' % table)
+                                if row[1] in new_columns)
+            self.store.execute('INSERT OR IGNORE INTO blockchain.%s (%s) SELECT %s FROM main.%s' %
+                               (table, columns, columns, table))
+            self.store.execute('DROP TABLE main.%s' % table)
+        self.store.commit()
+
+    @staticmethod
+    def read_schema(filename):
+        with open(os.path.join(BASE_DIR, 'database', filename)) as fp:
+            schema = fp.read()
+        return [cmd.strip() for cmd in schema.split(';') if cmd.strip()]
+
+    def initialize(self, snapshot=None):
+        """
+        Load the best chain into memory.
+        :param snapshot: a ChainSnapshot, or None. If the snapshot matches the block indexes in the database, only the
+        block indexes above the height of the snapshot are read from the database.
+        :return: True if the snapshot has been used, False otherwise
+        """
+        use_snapshot = snapshot is not None and self.matches_snapshot(snapshot)
+        if use_snapshot:
+            self.best_chain = snapshot.best_chain[:snapshot.height + 1]
+            self.heights = dict((block_id, height) for height, block_id in enumerate(self.best_chain))
+
+        from_height = len(self.best_chain)
+        for block_id, height in self.store.execute('SELECT block_id, height FROM block_index WHERE height >= ? '
+                                                   'ORDER BY height', (from_height,)):
+            self.best_chain.append(block_id)
+            self.heights[block_id] = height
+
         # Ensure we have a BlockIndex with height 0
-        if self.get_block_indexes(limit=1).count() == 0:
+        if not self.best_chain:
             from market.community.blockchain.community import BLOCK_GENESIS_HASH
             self.add_block_index(BlockIndex(BLOCK_GENESIS_HASH, 0))
 
+        if self.archive is not None:
+            self.archived_height = self.find_archived_height()
+        return use_snapshot
+
+    def find_archived_height(self):
+        # The archived blocks are at the bottom of the best chain, so we can use a binary search
+        lower, upper = 0, len(self.best_chain) - 1
+        while lower < upper:
+            height = (lower + upper + 1) / 2
+            if self.archive.contains(self.best_chain[height]):
+                lower = height
+            else:
+                upper = height - 1
+        return lower
+
+    def matches_snapshot(self, snapshot):
+        # A snapshot is of no use if the best chain has changed below its height (e.g., after a reorg that happened
+        # after the snapshot was written), or if the database has lost the blocks at the top of the snapshot.
+        row = self.store.execute('SELECT block_id FROM block_index WHERE height = ?', (snapshot.height,)).get_one()
+        return row is not None and str(row[0]) == snapshot.block_id
+
+    def write(self, statements, pending=()):
+        """
+        Write to the blockchain tables.
+        :param statements: a list of (statement, params) tuples
+        :param pending: a list of (dict, key) tuples of objects that can be forgotten after the next commit
+        :return: a Deferred that fires when the statements have been committed to the database
+        """
+        if self.executor is None:
+            for statement, params in statements:
+                self.store.execute(statement, params)
+            return succeed(None)
+
+        def on_written(_):
+            self.written.extend(pending)
+        return self.executor.execute_all(statements).addCallback(on_written)
+
     def add_contract(self, contract):
-        self.store.add(contract)
+        if self.executor is None:
+            self.store.add(contract)
+            return succeed(None)
+
+        self.pending_contracts[contract.id] = contract
+        return self.write([self.insert_contract_statement(contract)], [(self.pending_contracts, contract.id)])
+
+    @staticmethod
+    def insert_contract_statement(contract):
+        return ('INSERT OR IGNORE INTO contract (id, previous_hash, from_public_key, from_signature, to_public_key, '
+                'to_signature, document, type, time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (contract.id, contract.previous_hash, contract.from_public_key, contract.from_signature,
+                 contract.to_public_key, contract.to_signature, contract.document, contract.type.value, contract.time))
 
     def get_contract(self, contract_id):
-        return self.store.get(Contract, contract_id)
+        contract = self.pending_contracts.get(contract_id)
+        if contract is None and self.block_files is not None:
+            contract = self.block_files.get_contract(contract_id)
+        contract = contract or self.store.get(Contract, contract_id)
+        if contract is None and self.archive is not None:
+            contract = self.archive.get_contract(contract_id)
+        return contract
 
     def find_contracts(self, *args):
+        """
+        Find contracts using a Storm expression. Note that contracts that are still being written or that have been
+        archived are not included.
+        """
         return self.store.find(Contract, *args)
 
+    def get_archived_contracts_to(self, public_key):
+        """
+        Get all archived contracts of which a given user is the receiving party.
+        :param public_key: the public key of the user
+        :return: a list with Contract objects
+        """
+        if self.archive is None:
+            return []
+        contracts = [self.archive.get_contract(contract_id)
+                     for contract_id in self.reader.get_archived_contract_ids_to(public_key)]
+        return [contract for contract in contracts if contract is not None]
+
+    def find_contracts_by_previous_hash(self, previous_hash):
+        """
+        Get all contracts that point to a given contract.
+        :param previous_hash: the id of the previous contract
+        :return: a list with Contract objects
+        """
+        contracts = dict([(contract.id, contract) for contract in
+                          self.store.find(Contract, Contract.previous_hash == previous_hash)])
+        for contract in self.pending_contracts.itervalues():
+            if contract.previous_hash == previous_hash:
+                contracts[contract.id] = contract
+        return contracts.values()
+
+    def get_contract_header(self, contract_id):
+        contract = self.pending_contracts.get(contract_id)
+        if contract is not None:
+            return ContractHeader(contract.id, contract.previous_hash, contract.from_public_key,
+                                  contract.to_public_key, contract.type, contract.time)
+        return self.reader.get_contract_header(contract_id)
+
+    def get_contract_ids_by_previous_hash(self, previous_hash):
+        """
+        Get the ids of all contracts that point to a given contract, without loading the contracts themselves.
+        :param previous_hash: the id of the previous contract
+        :return: a list with contract ids
+        """
+        contract_ids = set(self.reader.get_contract_ids_by_previous_hash(previous_hash))
+        for contract in self.pending_contracts.itervalues():
+            if contract.previous_hash == previous_hash:
+                contract_ids.add(contract.id)
+        return list(contract_ids)
+
+    def get_best_chain_contracts(self, contract_type):
+        """
+        Get all contracts of a given type that are in a block on the best chain. Blocks and block indexes that are
+        still being written by the executor are not included, so this is meant to be used during startup.
+        :param contract_type: the ObjectType of the contracts
+        :return: a list with Contract objects
+        """
+        contracts = self.reader.get_best_chain_contracts(contract_type)
+        if self.archive is not None:
+            for contract_id in self.reader.get_best_chain_archived_contract_ids(contract_type):
+                contract = self.archive.get_contract(contract_id)
+                if contract is not None:
+                    contracts.append(contract)
+        return contracts
+
     def contract_on_blockchain(self, contract_id):
         return self.get_blockchain_block_id(contract_id) is not None
 
     def get_blockchain_block_id(self, contract_id):
         # Find blocks that contain this contract
-        block_ids = []
-        block_contracts = self.store.find(BlockContract, BlockContract.contract_id == contract_id)
-        if block_contracts:
-            for block_contract in block_contracts:
-                block_ids.append(block_contract.block_id)
+        block_ids = self.reader.get_block_ids_for_contract(contract_id)
+        for block in self.pending_blocks.itervalues():
+            if contract_id in [contract.id for contract in block.contracts]:
+                block_ids.append(block.id)
 
         # Find out if any of the blocks are on the best chain
         for block_id in block_ids:
@@ -63,43 +292,242 @@ class BlockchainDataManager(object):
                 return block_id
 
     def add_block(self, block):
-        self.store.add(block)
+        if self.block_files is not None:
+            self.block_files.add_block(block)
+
+        if self.executor is None:
+            self.store.add(block)
+            return succeed(None)
+
+        self.pending_blocks[block.id] = block
+        statements = [('INSERT OR IGNORE INTO block (id, previous_hash, merkle_root_hash, creator, '
+                       'creator_signature, target_difficulty, time) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (block.id, block.previous_hash, block.merkle_root_hash, block.creator,
+                        block.creator_signature, block._target_difficulty, block.time))]
+        pending = [(self.pending_blocks, block.id)]
+
+        for position, contract in enumerate(block.contracts):
+            if self.get_contract(contract.id) is None:
+                self.pending_contracts[contract.id] = contract
+                pending.append((self.pending_contracts, contract.id))
+            statements.append(self.insert_contract_statement(contract))
+            statements.append(('INSERT OR IGNORE INTO block_contract (block_id, contract_id, position) '
+                               'VALUES (?, ?, ?)', (block.id, contract.id, position)))
+
+        return self.write(statements, pending)
 
     def get_block(self, block_id):
-        return self.store.get(Block, block_id)
+        block = self.pending_blocks.get(block_id)
+        if block is None and self.block_files is not None:
+            block = self.block_files.get_block(block_id)
+        block = block or self.store.get(Block, block_id)
+        if block is None and self.archive is not None:
+            block = self.archive.get_block(block_id)
+        return block
+
+    def get_block_dict(self, block_id):
+        """
+        Get a block in the format of Block.to_dict (e.g., to send it to another node). When using block files, the block
+        is read from the files without creating any Storm objects.
+        :param block_id: the id of the block
+        :return: a dictionary or None if the block could not be found
+        """
+        block = self.pending_blocks.get(block_id)
+        if block is None and self.block_files is not None:
+            block_dict = self.block_files.get_block_dict(block_id)
+            if block_dict is not None:
+                return block_dict
+        block = block or self.store.get(Block, block_id)
+        if block is None and self.archive is not None:
+            return self.archive.get_block_dict(block_id)
+        return block.to_dict() if block is not None else None
+
+    def get_block_header(self, block_id):
+        """
+        Get a block without its contracts. Use this instead of get_block when walking the chain.
+        :param block_id: the id of the block
+        :return: a BlockHeader object or None if the block could not be found
+        """
+        block = self.pending_blocks.get(block_id)
+        if block is not None:
+            return BlockHeader.from_block(block)
+        header = self.reader.get_block_header(block_id)
+        if header is None and self.archive is not None:
+            block = self.archive.get_block(block_id)
+            header = BlockHeader.from_block(block) if block is not None else None
+        return header
 
     def get_blocks(self):
         return self.store.find(Block)
 
+    def get_blocks_by_ids(self, block_ids, full=True):
+        """
+        Get multiple blocks including their contracts, without loading them through Storm.
+        :param block_ids: the ids of the blocks
+        :param full: whether to return Contract objects or only contract ids
+        :return: a dictionary mapping block ids to (BlockHeader, list of contracts) tuples
+        """
+        result = {}
+        if full and self.block_files is not None:
+            for block_id in block_ids:
+                block = self.block_files.get_block(block_id)
+                if block is not None:
+                    result[block_id] = (BlockHeader.from_block(block), block.contracts)
+
+        result.update(self.reader.get_blocks([block_id for block_id in block_ids
+                                              if block_id not in self.pending_blocks and block_id not in result], full))
+        for block_id in block_ids:
+            block = self.pending_blocks.get(block_id)
+            if block is None and block_id not in result and self.archive is not None:
+                block = self.archive.get_block(block_id)
+            if block is not None:
+                contracts = block.contracts if full else [contract.id for contract in block.contracts]
+                result[block_id] = (BlockHeader.from_block(block), contracts)
+        return result
+
     def add_block_index(self, block_index):
-        self.store.add(block_index)
+        assert block_index.height == len(self.best_chain), 'Block indexes should be added in order'
+        self.best_chain.append(block_index.block_id)
+        self.heights[block_index.block_id] = block_index.height
+        return self.write([('INSERT OR REPLACE INTO block_index (block_id, height) VALUES (?, ?)',
+                            (block_index.block_id, block_index.height))])
 
     def get_block_index(self, block_id):
-        return self.store.get(BlockIndex, block_id)
+        height = self.heights.get(block_id)
+        return BlockIndex(block_id, height) if height is not None else None
+
+    def get_block_index_at_height(self, height):
+        if 0 <= height < len(self.best_chain):
+            return BlockIndex(self.best_chain[height], height)
 
     def get_block_indexes(self, limit=250):
-        return self.store.find(BlockIndex).order_by(Desc(BlockIndex.height)).config(limit=limit)
+        top = len(self.best_chain) - 1
+        return [BlockIndex(self.best_chain[height], height) for height in range(top, max(top - limit, -1), -1)]
 
     def remove_block_indexes(self, from_height):
-        self.store.find(BlockIndex, BlockIndex.height >= from_height).remove()
+        for block_id in self.best_chain[from_height:]:
+            del self.heights[block_id]
+        del self.best_chain[from_height:]
+        # Archived blocks that are no longer on the best chain remain in the archive
+        self.archived_height = min(self.archived_height, from_height - 1)
+        return self.write([('DELETE FROM block_index WHERE height >= ?', (from_height,))])
+
+    def add_merkle_proof(self, merkle_proof):
+        existing = self.get_merkle_proof(merkle_proof.contract_id)
+        if existing is None:
+            self.store.add(merkle_proof)
+        else:
+            # The contract ended up in a different block (e.g., after a reorg)
+            existing.block_id = merkle_proof.block_id
+            existing.branch = merkle_proof.branch
+
+    def get_merkle_proof(self, contract_id):
+        return self.store.get(MerkleProof, contract_id)
+
+    def get_merkle_proofs(self):
+        return self.store.find(MerkleProof)
+
+    def remove_merkle_proof(self, merkle_proof):
+        self.store.remove(merkle_proof)
+
+    def get_contracts_without_proof(self, public_key):
+        """
+        Get the contracts of a user for which we do not yet have a merkle proof.
+        :param public_key: the public key of the user
+        :return: a list with Contract objects
+        """
+        return self.store.find(Contract,
+                               Or(Contract.from_public_key == public_key, Contract.to_public_key == public_key),
+                               Not(Contract._id.is_in(Select(MerkleProof.contract_id))))
+
+    def archive_blocks(self, max_blocks=MAX_ARCHIVE_BLOCKS):
+        """
+        Move the blocks on the best chain that are more than hot_blocks below the top, together with their contracts,
+        from the database to the archive.
+        :param max_blocks: the maximum number of blocks to move
+        :return: the number of blocks that have been moved
+        """
+        if self.archive is None or not self.hot_blocks:
+            return 0
+
+        blocks = []
+        to_height = min(len(self.best_chain) - 1 - self.hot_blocks, self.archived_height + max_blocks)
+        for height in range(self.archived_height + 1, to_height + 1):
+            block_id = self.best_chain[height]
+            # Blocks that are still being written are archived next time
+            block = self.get_block(block_id) if block_id not in self.pending_blocks else None
+            if block is None:
+                break
+            blocks.append(block)
+
+        if not blocks:
+            return 0
+
+        for block in blocks:
+            self.archive.add_block(block)
+        # The blocks should be in the archive before they are removed from the database
+        self.archive.flush()
+
+        statements = []
+        for block in blocks:
+            for contract in block.contracts:
+                statements.append(('INSERT OR IGNORE INTO archived_contract (id, previous_hash, from_public_key, '
+                                   'to_public_key, type, time) SELECT id, previous_hash, from_public_key, '
+                                   'to_public_key, type, time FROM contract WHERE id = ?', (contract.id,)))
+                statements.append(('DELETE FROM contract WHERE id = ?', (contract.id,)))
+            statements.append(('DELETE FROM block WHERE id = ?', (block.id,)))
+        self.write(statements)
+
+        self.archived_height += len(blocks)
+        return len(blocks)
 
     def flush(self):
         self.store.flush()
 
+    def get_table_versions(self, *tables):
+        """
+        Get the versions of the given tables. A version changes whenever the table is modified through Storm.
+        :param tables: the names of the tables
+        :return: a tuple with the versions
+        """
+        # Make sure pending changes are included
+        self.store.flush()
+        return tuple([self.store.table_versions[table] for table in tables])
+
     def commit(self):
         self.store.commit()
-
-
+        if self.block_files is not None:
+            self.block_files.flush()
+        if self.archive is not None:
+            self.archive.flush()
+
+        # Storm is now able to see everything that has been written by the executor
+        for pending, key in self.written:
+            pending.pop(key, None)
+        self.written = []
+
+    def close(self):
+        self.commit()
+        if self.block_files is not None:
+            self.block_files.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.executor is not None:
+            return self.executor.stop()
+        return succeed(None)
+
+
+@timed_methods(DATABASE_CALL_SECONDS)
 class MarketDataManager(BlockchainDataManager):
     """
     This class stores and manages all the data for the decentralized mortgage market.
     """
 
-    def __init__(self, market_db):
-        super(MarketDataManager, self).__init__(market_db)
+    def __init__(self, market_db, threaded=True, block_files=False, hot_blocks=0):
+        super(MarketDataManager, self).__init__(market_db, threaded, block_files, hot_blocks)
         self.you = None
 
-    def initialize(self, user_id, role):
+    def initialize(self, user_id, role, snapshot=None):
         # Load or create local user
         user = self.get_user(user_id)
         if user is None:
@@ -110,7 +538,55 @@ class MarketDataManager(BlockchainDataManager):
             user.role = role
         self.you = user
 
-        super(MarketDataManager, self).initialize()
+        return super(MarketDataManager, self).initialize(snapshot)
+
+    def get_objects_page(self, cls, after=None, limit=MAX_KEYS_PER_QUERY):
+        """
+        Get objects in the order of their (id, user_id) key, for walking through a table without loading all of it.
+        :param cls: the class of the objects (e.g., Mortgage)
+        :param after: the key after which the page starts, or None to start at the beginning
+        :param limit: the maximum number of objects
+        :return: a list with objects
+        """
+        conditions = []
+        if after is not None:
+            conditions.append(Or(cls.id > after[0], And(cls.id == after[0], cls.user_id > after[1])))
+        return list(self.store.find(cls, *conditions).order_by(cls.id, cls.user_id)[:limit])
+
+    def get_objects(self, cls, keys):
+        """
+        Get multiple objects of the same class with a few IN-queries, instead of a query per object.
+        :param cls: a model with an id primary key (i.e., User), or an (id, user_id) primary key (e.g., Campaign)
+        :param keys: the primary keys of the objects
+        :return: a dictionary mapping primary keys to objects, for the objects that exist
+        """
+        keys = list(set(keys))
+        objects = {}
+        for index in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            chunk = keys[index:index + MAX_KEYS_PER_QUERY]
+            if cls is User:
+                objects.update((user.id, user) for user in self.store.find(User, User.id.is_in(chunk)))
+                continue
+
+            # Narrow down on both columns, and drop the combinations that we didn't ask for
+            chunk = set(chunk)
+            for obj in self.store.find(cls, cls.id.is_in(list(set([key[0] for key in chunk]))),
+                                       cls.user_id.is_in(list(set([key[1] for key in chunk])))):
+                if (obj.id, obj.user_id) in chunk:
+                    objects[(obj.id, obj.user_id)] = obj
+        return objects
+
+    def prefetch(self, keys):
+        """
+        Get the objects that are needed to process a batch of messages.
+        :param keys: a dictionary mapping model classes to the primary keys of the objects
+        :return: a dictionary mapping model classes to dictionaries as returned by get_objects. Classes without
+        objects map to empty dictionaries, to which the caller can add the objects that it creates.
+        """
+        objects = defaultdict(dict)
+        for cls, cls_keys in keys.iteritems():
+            objects[cls] = self.get_objects(cls, cls_keys)
+        return objects
 
     def add_user(self, user):
         self.store.add(user)
@@ -124,6 +600,14 @@ class MarketDataManager(BlockchainDataManager):
     def get_users(self):
         return self.store.find(User)
 
+    def get_users_with_profiles(self):
+        """
+        Get all users, while loading their profiles within the same query. Keeping a reference to the profiles ensures
+        that User.profile can be resolved without additional queries.
+        :return: a list with (User, Profile) tuples, where Profile may be None
+        """
+        return list(self.store.using(LeftJoin(User, Profile, User.profile_id == Profile.id)).find((User, Profile)))
+
     def get_loan_requests(self):
         """
         Get all loan requests in the market.
@@ -131,6 +615,16 @@ class MarketDataManager(BlockchainDataManager):
         """
         return self.store.find(LoanRequest)
 
+    def get_loan_request_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the loan requests in the market, without creating LoanRequest objects.
+        :param filters: a sequence of (Filter, params) tuples using LOAN_REQUEST_FILTERS
+        :param sort: a (sort key, descending) tuple using LOAN_REQUEST_SORT_COLUMNS, or None
+        :param limit: the maximum number of loan requests, or None
+        :return: a list with dictionaries as returned by LoanRequest.to_dict(api_response=True)
+        """
+        return self.reader.get_loan_request_dicts(filters, sort, limit)
+
     def get_loan_request(self, loan_request_id, user_id):
         """
         Get a loan requests in the market.
@@ -162,6 +656,16 @@ class MarketDataManager(BlockchainDataManager):
         """
         return self.store.find(Mortgage)
 
+    def get_mortgage_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the mortgages in the market, without creating Mortgage objects.
+        :param filters: a sequence of (Filter, params) tuples using MORTGAGE_FILTERS
+        :param sort: a (sort key, descending) tuple using MORTGAGE_SORT_COLUMNS, or None
+        :param limit: the maximum number of mortgages, or None
+        :return: a list with dictionaries as returned by Mortgage.to_dict(api_response=True)
+        """
+        return self.reader.get_mortgage_dicts(filters, sort, limit)
+
     def get_investment(self, investment_id, user_id):
         """
         Get a specific investment with a specified id
@@ -178,6 +682,17 @@ class MarketDataManager(BlockchainDataManager):
         """
         return self.store.find(Investment)
 
+    def get_investments_with_transfers(self):
+        """
+        Get all investments in the market together with their transfers, using a single query for all transfers.
+        :return: a list with (Investment, list of Transfer objects) tuples
+        """
+        transfers = defaultdict(list)
+        for transfer in self.store.find(Transfer):
+            transfers[(transfer.investment_id, transfer.investment_user_id)].append(transfer)
+        return [(investment, transfers[(investment.id, investment.user_id)])
+                for investment in self.store.find(Investment)]
+
     def add_transfer(self, transfer):
         self.store.add(transfer)
 
@@ -203,3 +718,34 @@ class MarketDataManager(BlockchainDataManager):
         :return: a list with Campaign objects
         """
         return self.store.find(Campaign)
+
+    def get_portfolio_positions(self, user_id):
+        """
+        Get the positions of a user, i.e. the mortgages that the user has given as a bank and the investments that
+        the user owns.
+        :return: a list with Positions
+        """
+        return self.reader.get_mortgage_positions(user_id) + self.reader.get_investment_positions(owner_id=user_id)
+
+    def get_campaign_positions(self, campaign):
+        """
+        Get the positions in the mortgage of a campaign, i.e. the part of the bank and the accepted investments.
+        :return: a list with Positions
+        """
+        mortgage = self.get_mortgage(campaign.mortgage_id, campaign.mortgage_user_id)
+        positions = []
+        if mortgage is not None:
+            positions.append(Position(ObjectType.MORTGAGE, mortgage.id, mortgage.user_id, mortgage.bank_id,
+                                      mortgage.bank_amount, mortgage.interest_rate, mortgage.mortgage_type,
+                                      mortgage.duration, mortgage.default_rate))
+        return positions + self.reader.get_investment_positions(campaign_key=(campaign.id, campaign.user_id))
+
+    def get_campaign_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the campaigns in the market, without creating Campaign objects.
+        :param filters: a sequence of (Filter, params) tuples using CAMPAIGN_FILTERS
+        :param sort: a (sort key, descending) tuple using CAMPAIGN_SORT_COLUMNS, or None
+        :param limit: the maximum number of campaigns, or None
+        :return: a list with dictionaries as returned by Campaign.to_dict(api_response=True)
+        """
+        return self.reader.get_campaign_dicts(filters, sort, limit)
@@ -0,0 +1,130 @@
+import logging
+import sqlite3
+
+from Queue import Queue, Empty
+from threading import Thread
+from time import time
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
+
+COMMIT_INTERVAL = 0.05
+COMMIT_THRESHOLD = 250
+
+
+class DatabaseExecutor(object):
+    """
+    This class runs database writes on a dedicated thread with its own connection. Writes are grouped
+    into a single transaction, which is committed after COMMIT_INTERVAL seconds or COMMIT_THRESHOLD writes.
+    Every write returns a Deferred that fires on the reactor thread once the write has been committed.
+    Each write runs within a savepoint, so a write that fails is rolled back without affecting the others.
+    """
+
+    def __init__(self, database_fn, statements=(), commit_interval=COMMIT_INTERVAL, commit_threshold=COMMIT_THRESHOLD):
+        self.logger = logging.getLogger('DatabaseLogger')
+        self.commit_interval = commit_interval
+        self.commit_threshold = commit_threshold
+        self.queue = Queue()
+        self.thread = None
+
+        # The connection is only used by the worker thread once it has been started
+        self.connection = sqlite3.connect(database_fn, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        for statement in statements:
+            self.connection.execute(statement)
+
+    def start(self):
+        self.thread = Thread(target=self._run, name='DatabaseExecutor')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Commit all pending writes and stop the worker thread.
+        :return: a Deferred that fires when the worker thread has stopped
+        """
+        deferred = Deferred()
+        self.queue.put((None, (), deferred))
+        return deferred
+
+    def run(self, func, *args):
+        """
+        Run a function on the worker thread.
+        :param func: the function to call, with a sqlite3 cursor as first argument
+        :return: a Deferred that fires with the result of the function after the transaction has been committed
+        """
+        deferred = Deferred()
+        self.queue.put((func, args, deferred))
+        return deferred
+
+    def execute(self, statement, params=()):
+        return self.execute_all([(statement, params)])
+
+    def execute_all(self, statements):
+        """
+        Execute a list of statements within the same transaction.
+        :param statements: a list of (statement, params) tuples
+        :return: a Deferred that fires after the statements have been committed
+        """
+        # Like Storm, we store str values as blobs
+        statements = [(statement, tuple([buffer(p) if isinstance(p, str) else p for p in params]))
+                      for statement, params in statements]
+
+        def execute_all(cursor):
+            for statement, params in statements:
+                cursor.execute(statement, params)
+        return self.run(execute_all)
+
+    def flush(self):
+        """
+        :return: a Deferred that fires when all writes that are currently queued have been committed
+        """
+        return self.run(lambda _: None)
+
+    def _run(self):
+        cursor = self.connection.cursor()
+        running = True
+
+        while running:
+            # Wait for the first write, and then collect writes until the interval or threshold has been reached
+            tasks = [self.queue.get()]
+            deadline = time() + self.commit_interval
+            while len(tasks) < self.commit_threshold and tasks[-1][0] is not None:
+                try:
+                    tasks.append(self.queue.get(timeout=max(0, deadline - time())))
+                except Empty:
+                    break
+
+            results = []
+            cursor.execute('BEGIN')
+            for func, args, deferred in tasks:
+                if func is None:
+                    running = False
+                    results.append((deferred, None))
+                    continue
+
+                cursor.execute('SAVEPOINT write')
+                try:
+                    results.append((deferred, func(cursor, *args)))
+                except Exception:
+                    self.logger.exception('Error while executing database write')
+                    reactor.callFromThread(deferred.errback, Failure())
+                    cursor.execute('ROLLBACK TO write')
+                cursor.execute('RELEASE write')
+
+            try:
+                cursor.execute('COMMIT')
+            except sqlite3.Error:
+                self.logger.exception('Error while committing database writes')
+                failure = Failure()
+                cursor.execute('ROLLBACK')
+                for deferred, _ in results:
+                    reactor.callFromThread(deferred.errback, failure)
+                continue
+
+            for deferred, result in results:
+                reactor.callFromThread(deferred.callback, result)
+
+        self.connection.close()
@@ -0,0 +1,126 @@
+import json
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from market.models.campaign import Campaign
+from market.models.investment import Investment
+from market.models.mortgage import Mortgage
+
+# The number of blocks or objects that are loaded at a time
+EXPORT_BATCH_SIZE = 100
+
+# The sections of an export, in the order in which they are exported
+EXPORT_SECTIONS = ['blocks', 'mortgages', 'campaigns', 'investments']
+SECTION_MODELS = {'mortgages': Mortgage, 'campaigns': Campaign, 'investments': Investment}
+RECORD_TYPES = {'blocks': 'block', 'mortgages': 'mortgage', 'campaigns': 'campaign', 'investments': 'investment'}
+
+
+def parse_sections(sections):
+    """
+    Parse a comma separated list of sections.
+    :return: the sections, in the order in which they are exported
+    :raises ValueError: if one of the sections is unknown
+    """
+    names = sections.split(',')
+    for name in names:
+        if name not in EXPORT_SECTIONS:
+            raise ValueError('unknown section %s' % name)
+    return [name for name in EXPORT_SECTIONS if name in names]
+
+
+def parse_cursor(cursor):
+    """
+    Parse the cursor of an exported record.
+    :return: a (section, position) tuple, where the position is a height for blocks and an (id, user_id) key for
+    the other sections
+    :raises ValueError: if the cursor is invalid
+    """
+    section, _, position = cursor.partition(':')
+    try:
+        if section == 'blocks':
+            return section, int(position)
+        if section in SECTION_MODELS:
+            object_id, _, user_id = position.partition(':')
+            return section, (int(object_id), urlsafe_b64decode(str(user_id)))
+    except (TypeError, ValueError):
+        pass
+    raise ValueError('invalid cursor')
+
+
+class MarketExporter(object):
+    """
+    This class exports the best chain (in order of height, with the contracts and their decoded documents inline)
+    and the mortgages, campaigns and investments as newline-delimited JSON. Everything is loaded in batches, so the
+    memory usage does not depend on the size of the chain or the market.
+
+    Every record has a cursor. An export that is started from a cursor continues after the record with that cursor,
+    so that an interrupted export can be resumed. Blocks are read from the committed block_index, which means that
+    a reorg during an export may cause blocks below the cursor to be replaced; clients can detect this by comparing
+    the previous_hash of the first block after the cursor.
+    """
+
+    def __init__(self, data_manager, sections=EXPORT_SECTIONS, batch_size=EXPORT_BATCH_SIZE):
+        self.data_manager = data_manager
+        self.sections = sections
+        self.batch_size = batch_size
+
+    def get_records(self, cursor=None):
+        """
+        :param cursor: the cursor of the record after which the export continues, or None to start at the beginning
+        :return: a generator of (cursor, record type, dictionary) tuples
+        :raises ValueError: if the cursor is invalid
+        """
+        start_section, position = parse_cursor(cursor) if cursor else (None, None)
+        start_index = EXPORT_SECTIONS.index(start_section) if start_section else 0
+
+        for section in EXPORT_SECTIONS[start_index:]:
+            if section in self.sections:
+                after = position if section == start_section else None
+                if section == 'blocks':
+                    records = self.get_block_records(after)
+                else:
+                    records = self.get_object_records(section, after)
+                for record in records:
+                    yield record
+
+    def get_block_records(self, after_height=None):
+        # The genesis block isn't stored, so the export starts at height 1
+        height = after_height + 1 if after_height is not None else 1
+        while True:
+            indexes = self.data_manager.reader.get_block_indexes_from(height, self.batch_size)
+            if not indexes:
+                return
+
+            blocks = self.data_manager.get_blocks_by_ids([block_id for block_id, _ in indexes], full=True)
+            for block_id, block_height in indexes:
+                if block_id not in blocks:
+                    continue
+                header, contracts = blocks[block_id]
+                block_dict = header.to_dict(api_response=True)
+                block_dict['height'] = block_height
+                block_dict['contracts'] = [contract.to_dict(api_response=True) for contract in contracts]
+                yield 'blocks:%d' % block_height, 'block', block_dict
+            height = indexes[-1][1] + 1
+
+    def get_object_records(self, section, after=None):
+        cls = SECTION_MODELS[section]
+        record_type = RECORD_TYPES[section]
+        while True:
+            objects = self.data_manager.get_objects_page(cls, after, self.batch_size)
+            for obj in objects:
+                after = (obj.id, obj.user_id)
+                yield '%s:%d:%s' % (section, obj.id, urlsafe_b64encode(obj.user_id)), record_type, \
+                    obj.to_dict(api_response=True)
+            if len(objects) < self.batch_size:
+                return
+
+    def get_lines(self, cursor=None):
+        """
+        :return: a generator of JSON lines, e.g. {"type": "block", "cursor": "blocks:1", "block": {...}}
+        :raises ValueError: if the cursor is invalid
+        """
+        # The cursor is parsed here, so that an invalid cursor is reported before anything has been written
+        if cursor:
+            parse_cursor(cursor)
+        return (json.dumps({'type': record_type, 'cursor': record_cursor, record_type: record_dict}) + '\n'
+                for record_cursor, record_type, record_dict in self.get_records(cursor))
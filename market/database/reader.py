@@ -0,0 +1,418 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from collections import namedtuple
+
+from market.models import ObjectType
+from market.models.contract import Contract
+from market.models.investment import InvestmentStatus
+from market.models.loanrequest import LoanRequestStatus
+from market.models.mortgage import MortgageType, MortgageStatus
+from market.util.profiling import query_counter
+from market.util.uint256 import compact_to_uint256, uint256_to_full
+
+ContractHeader = namedtuple('ContractHeader', ['id', 'previous_hash', 'from_public_key', 'to_public_key', 'type', 'time'])
+
+# A mortgage (for the bank) or an investment (for the investor) in a portfolio, with the terms of its mortgage
+Position = namedtuple('Position', ['type', 'id', 'user_id', 'bank_id', 'principal', 'interest_rate', 'mortgage_type',
+                                   'duration', 'default_rate'])
+
+HOUSE_COLUMNS = ('postal_code', 'house_number', 'address', 'price', 'url', 'seller_phone_number', 'seller_email')
+
+# A filter consists of a condition and a function that converts the value of a query parameter into the parameters
+# of that condition. The conversion raises a ValueError, TypeError or KeyError for invalid values.
+Filter = namedtuple('Filter', ['condition', 'parse'])
+
+
+def parse_float(value):
+    return (float(value),)
+
+
+def parse_int(value):
+    return (int(value),)
+
+
+def parse_enum(enum):
+    return lambda value: (enum[value].value,)
+
+
+def parse_public_key(value):
+    return (buffer(urlsafe_b64decode(str(value))),)
+
+
+def parse_prefix(value):
+    # Using a range instead of LIKE allows sqlite to use the index on the column
+    return (value, value + u'\uffff')
+
+
+def parse_bool(value):
+    return ({'true': 1, 'false': 0}[value.lower()],)
+
+
+def mortgage_filters(amount_column):
+    return {
+        'min_interest_rate': Filter('m.interest_rate >= ?', parse_float),
+        'max_interest_rate': Filter('m.interest_rate <= ?', parse_float),
+        'min_amount': Filter(amount_column + ' >= ?', parse_float),
+        'max_amount': Filter(amount_column + ' <= ?', parse_float),
+        'min_duration': Filter('m.duration >= ?', parse_int),
+        'max_duration': Filter('m.duration <= ?', parse_int),
+        'mortgage_type': Filter('m.mortgage_type = ?', parse_enum(MortgageType)),
+        'bank': Filter('m.bank_id = ?', parse_public_key),
+        'postal_code': Filter('h.postal_code >= ? AND h.postal_code < ?', parse_prefix)
+    }
+
+MORTGAGE_FILTERS = dict(mortgage_filters('m.amount'),
+                        status=Filter('m.status = ?', parse_enum(MortgageStatus)))
+
+MORTGAGE_SORT_COLUMNS = {
+    'id': 'm.id',
+    'amount': 'm.amount',
+    'interest_rate': 'm.interest_rate',
+    'duration': 'm.duration',
+    'postal_code': 'h.postal_code'
+}
+
+CAMPAIGN_FILTERS = dict(mortgage_filters('c.amount'),
+                        completed=Filter('(c.amount_invested >= c.amount) = ?', parse_bool))
+
+CAMPAIGN_SORT_COLUMNS = {
+    'id': 'c.id',
+    'amount': 'c.amount',
+    'amount_invested': 'c.amount_invested',
+    'end_time': 'c.end_time',
+    'interest_rate': 'm.interest_rate',
+    'duration': 'm.duration',
+    'postal_code': 'h.postal_code'
+}
+
+LOAN_REQUEST_FILTERS = {
+    'min_amount': Filter('l.amount_wanted >= ?', parse_float),
+    'max_amount': Filter('l.amount_wanted <= ?', parse_float),
+    'mortgage_type': Filter('l.mortgage_type = ?', parse_enum(MortgageType)),
+    'bank': Filter('l.bank_id = ?', parse_public_key),
+    'postal_code': Filter('h.postal_code >= ? AND h.postal_code < ?', parse_prefix),
+    'status': Filter('l.status = ?', parse_enum(LoanRequestStatus))
+}
+
+LOAN_REQUEST_SORT_COLUMNS = {
+    'id': 'l.id',
+    'amount': 'l.amount_wanted',
+    'postal_code': 'h.postal_code'
+}
+
+
+class BlockHeader(object):
+    """
+    This class is a read-only version of a Block without its contracts. It has the same attributes as a Block,
+    which allows it to be used when walking the chain.
+    """
+
+    __slots__ = ('id', 'previous_hash', 'merkle_root_hash', 'creator', 'creator_signature', '_target_difficulty', 'time')
+
+    def __init__(self, block_id, previous_hash, merkle_root_hash, creator, creator_signature, target_difficulty, time):
+        self.id = block_id
+        self.previous_hash = previous_hash
+        self.merkle_root_hash = merkle_root_hash
+        self.creator = creator
+        self.creator_signature = creator_signature
+        self._target_difficulty = target_difficulty
+        self.time = time
+
+    @property
+    def target_difficulty(self):
+        return compact_to_uint256(self._target_difficulty)
+
+    def to_dict(self, api_response=False):
+        block_dict = {
+            'previous_hash': urlsafe_b64encode(self.previous_hash) if api_response else self.previous_hash,
+            'merkle_root_hash': urlsafe_b64encode(self.merkle_root_hash) if api_response else self.merkle_root_hash,
+            'creator': urlsafe_b64encode(self.creator) if api_response else self.creator,
+            'creator_signature': urlsafe_b64encode(self.creator_signature) if api_response else self.creator_signature,
+            'target_difficulty': uint256_to_full(self.target_difficulty).encode('hex') if api_response else self._target_difficulty,
+            'time': self.time
+        }
+
+        if api_response:
+            block_dict['id'] = urlsafe_b64encode(self.id)
+
+        return block_dict
+
+    @staticmethod
+    def from_block(block):
+        return BlockHeader(block.id, block.previous_hash, block.merkle_root_hash, block.creator,
+                           block.creator_signature, block._target_difficulty, block.time)
+
+
+class DatabaseReader(object):
+    """
+    This class executes read-only queries directly on the sqlite3 connection that is used by Storm, without creating
+    model objects. The statements are constant strings, so sqlite3 only prepares them once and reuses them from its
+    statement cache. It should only be used for hot paths; everything else should use the Storm models.
+
+    Note that Storm stores str values as blobs, so parameters need to be passed as buffers and blobs are returned
+    as buffers. Before every query the store is flushed, so that objects that have been added to the store are visible.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def query(self, statement, params=()):
+        self.store.flush()
+        # Bypass Storm's connection wrapper, which wraps every call
+        raw_connection = self.store._connection._raw_connection
+        raw_connection = getattr(raw_connection, '_connection', raw_connection)
+        # These queries bypass the Storm tracers as well, so they are counted here
+        query_counter.count += 1
+        return raw_connection.execute(statement, params)
+
+    def query_list(self, statement, filters, sort_columns, sort=None, limit=None):
+        """
+        Execute a list query with optional conditions, ordering and limit.
+        :param statement: the SELECT statement without WHERE clause
+        :param filters: a sequence of (Filter, params) tuples, which are combined using AND
+        :param sort_columns: a dictionary mapping sort keys to columns
+        :param sort: a (sort key, descending) tuple or None
+        :param limit: the maximum number of rows or None
+        :return: the sqlite3 cursor
+        """
+        params = []
+        if filters:
+            statement += ' WHERE ' + ' AND '.join('(%s)' % f.condition for f, _ in filters)
+            for _, filter_params in filters:
+                params.extend(filter_params)
+        if sort is not None:
+            statement += ' ORDER BY %s %s' % (sort_columns[sort[0]], 'DESC' if sort[1] else 'ASC')
+        if limit is not None:
+            statement += ' LIMIT ?'
+            params.append(limit)
+        return self.query(statement, params)
+
+    def get_block_header(self, block_id):
+        row = self.query('SELECT id, previous_hash, merkle_root_hash, creator, creator_signature, target_difficulty, '
+                         'time FROM block WHERE id = ?', (buffer(block_id),)).fetchone()
+        if row is not None:
+            return BlockHeader(str(row[0]), str(row[1]), str(row[2]), str(row[3]), str(row[4]), str(row[5]), row[6])
+
+    def get_blocks(self, block_ids, full=True):
+        """
+        Get multiple blocks including their contracts using a single query.
+        :param block_ids: the ids of the blocks
+        :param full: whether to return Contract objects (not attached to the store) or only contract ids
+        :return: a dictionary mapping block ids to (BlockHeader, list of contracts) tuples
+        """
+        if not block_ids:
+            return {}
+
+        statement = 'SELECT b.id, b.previous_hash, b.merkle_root_hash, b.creator, b.creator_signature, ' \
+                    'b.target_difficulty, b.time, bc.contract_id'
+        if full:
+            statement += ', c.previous_hash, c.from_public_key, c.from_signature, c.to_public_key, c.to_signature, ' \
+                         'c.document, c.type, c.time'
+        statement += ' FROM block b LEFT JOIN block_contract bc ON bc.block_id = b.id'
+        if full:
+            statement += ' LEFT JOIN contract c ON c.id = bc.contract_id'
+        statement += ' WHERE b.id IN (%s) ORDER BY b.id, bc.position' % ', '.join(['?'] * len(block_ids))
+
+        result = {}
+        for row in self.query(statement, [buffer(block_id) for block_id in block_ids]):
+            block_id = str(row[0])
+            if block_id not in result:
+                result[block_id] = (BlockHeader(block_id, str(row[1]), str(row[2]), str(row[3]), str(row[4]),
+                                                str(row[5]), row[6]), [])
+            if row[7] is None:
+                # Block without contracts
+                continue
+            elif not full:
+                result[block_id][1].append(str(row[7]))
+            elif row[8] is not None:
+                result[block_id][1].append(self.contract_from_row(row[8:]))
+        return result
+
+    @staticmethod
+    def contract_from_row(row):
+        """
+        Create a Contract (not attached to the store) from the previous_hash, from_public_key, from_signature,
+        to_public_key, to_signature, document, type and time columns.
+        """
+        contract = Contract()
+        contract.previous_hash = str(row[0])
+        contract.from_public_key = str(row[1])
+        contract.from_signature = str(row[2])
+        contract.to_public_key = str(row[3])
+        contract.to_signature = str(row[4])
+        contract.document = str(row[5])
+        contract.type = ObjectType(row[6])
+        contract.time = row[7]
+        return contract
+
+    def get_block_indexes_from(self, height, limit):
+        """
+        Get the block indexes of the best chain from a given height, according to the block_index table.
+        :return: a list with (block id, height) tuples, in order of height
+        """
+        return [(str(block_id), block_height) for block_id, block_height in
+                self.query('SELECT block_id, height FROM block_index WHERE height >= ? ORDER BY height LIMIT ?',
+                           (height, limit))]
+
+    def get_block_contract_ids(self, block_id):
+        return [str(contract_id) for contract_id, in
+                self.query('SELECT contract_id FROM block_contract WHERE block_id = ? ORDER BY position',
+                           (buffer(block_id),))]
+
+    def get_block_ids_for_contract(self, contract_id):
+        return [str(block_id) for block_id, in
+                self.query('SELECT block_id FROM block_contract WHERE contract_id = ?', (buffer(contract_id),))]
+
+    def get_contract_header(self, contract_id):
+        # The headers of archived contracts are still in the database
+        row = self.query('SELECT id, previous_hash, from_public_key, to_public_key, type, time '
+                         'FROM contract WHERE id = ? UNION ALL '
+                         'SELECT id, previous_hash, from_public_key, to_public_key, type, time '
+                         'FROM archived_contract WHERE id = ?', (buffer(contract_id), buffer(contract_id))).fetchone()
+        if row is not None:
+            return ContractHeader(str(row[0]), str(row[1]), str(row[2]), str(row[3]), ObjectType(row[4]), row[5])
+
+    def get_best_chain_contracts(self, contract_type):
+        """
+        Get all contracts of a given type that are in a block on the best chain, according to the block_index table.
+        """
+        return [self.contract_from_row(row) for row in
+                self.query('SELECT DISTINCT c.previous_hash, c.from_public_key, c.from_signature, c.to_public_key, '
+                           'c.to_signature, c.document, c.type, c.time FROM contract c '
+                           'JOIN block_contract bc ON bc.contract_id = c.id '
+                           'JOIN block_index bi ON bi.block_id = bc.block_id WHERE c.type = ?',
+                           (contract_type.value,))]
+
+    def get_contract_ids_by_previous_hash(self, previous_hash):
+        return [str(contract_id) for contract_id, in
+                self.query('SELECT id FROM contract WHERE previous_hash = ? UNION ALL '
+                           'SELECT id FROM archived_contract WHERE previous_hash = ?',
+                           (buffer(previous_hash), buffer(previous_hash)))]
+
+    def get_best_chain_archived_contract_ids(self, contract_type):
+        """
+        Get the ids of all archived contracts of a given type that are in a block on the best chain.
+        """
+        return [str(contract_id) for contract_id, in
+                self.query('SELECT DISTINCT ac.id FROM archived_contract ac '
+                           'JOIN block_contract bc ON bc.contract_id = ac.id '
+                           'JOIN block_index bi ON bi.block_id = bc.block_id WHERE ac.type = ?',
+                           (contract_type.value,))]
+
+    def get_archived_contract_ids_to(self, public_key):
+        return [str(contract_id) for contract_id, in
+                self.query('SELECT id FROM archived_contract WHERE to_public_key = ?', (buffer(public_key),))]
+
+    @staticmethod
+    def position_from_row(position_type, row):
+        return Position(position_type, row[0], str(row[1]), str(row[2]), row[3], row[4], MortgageType(row[5]), row[6],
+                        row[7])
+
+    def get_mortgage_positions(self, bank_id):
+        """
+        Get the accepted mortgages that have been given by a bank, for which the bank provides the bank_amount.
+        :return: a list with Positions
+        """
+        return [self.position_from_row(ObjectType.MORTGAGE, row) for row in
+                self.query('SELECT m.id, m.user_id, m.bank_id, m.bank_amount, m.interest_rate, m.mortgage_type, '
+                           'm.duration, m.default_rate FROM mortgage m WHERE m.bank_id = ? AND m.status = ?',
+                           (buffer(bank_id), MortgageStatus.ACCEPTED.value))]
+
+    def get_investment_positions(self, owner_id=None, campaign_key=None):
+        """
+        Get the accepted investments (including the ones that are for sale) of an owner or in a campaign.
+        :param owner_id: the id of the owner
+        :param campaign_key: the (id, user_id) key of the campaign
+        :return: a list with Positions
+        """
+        statement = 'SELECT i.id, i.user_id, m.bank_id, i.amount, i.interest_rate, m.mortgage_type, m.duration, ' \
+                    'm.default_rate FROM investment i ' \
+                    'JOIN campaign c ON c.id = i.campaign_id AND c.user_id = i.campaign_user_id ' \
+                    'JOIN mortgage m ON m.id = c.mortgage_id AND m.user_id = c.mortgage_user_id ' \
+                    'WHERE i.status IN (?, ?) AND '
+        params = [InvestmentStatus.ACCEPTED.value, InvestmentStatus.FORSALE.value]
+        if owner_id is not None:
+            statement += 'i.owner_id = ?'
+            params.append(buffer(owner_id))
+        else:
+            statement += 'i.campaign_id = ? AND i.campaign_user_id = ?'
+            params.extend([campaign_key[0], buffer(campaign_key[1])])
+        return [self.position_from_row(ObjectType.INVESTMENT, row) for row in self.query(statement, params)]
+
+    def get_loan_request_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the loan requests in the market, in the format of LoanRequest.to_dict(api_response=True).
+        The arguments are passed to query_list and should use LOAN_REQUEST_FILTERS and LOAN_REQUEST_SORT_COLUMNS.
+        """
+        result = []
+        for row in self.query_list('SELECT l.id, l.user_id, l.mortgage_type, l.bank_id, l.description, '
+                                   'l.amount_wanted, l.status, h.postal_code, h.house_number, h.address, h.price, '
+                                   'h.url, h.seller_phone_number, h.seller_email '
+                                   'FROM loan_request l JOIN house h ON l.house_id = h.id',
+                                   filters, LOAN_REQUEST_SORT_COLUMNS, sort, limit):
+            result.append({
+                'id': row[0],
+                'user_id': urlsafe_b64encode(str(row[1])),
+                'house': dict(zip(HOUSE_COLUMNS, row[7:14])),
+                'mortgage_type': MortgageType(row[2]).name,
+                'bank_id': urlsafe_b64encode(str(row[3])),
+                'description': row[4],
+                'amount_wanted': row[5],
+                'status': LoanRequestStatus(row[6]).name
+            })
+        return result
+
+    def get_mortgage_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the mortgages in the market, in the format of Mortgage.to_dict(api_response=True).
+        The arguments are passed to query_list and should use MORTGAGE_FILTERS and MORTGAGE_SORT_COLUMNS.
+        """
+        result = []
+        for row in self.query_list('SELECT m.id, m.user_id, m.bank_id, m.amount, m.bank_amount, m.mortgage_type, '
+                                   'm.interest_rate, m.max_invest_rate, m.default_rate, m.duration, m.risk, '
+                                   'm.status, m.loan_request_id, m.loan_request_user_id, m.contract_id, '
+                                   'h.postal_code, h.house_number, h.address, h.price, h.url, '
+                                   'h.seller_phone_number, h.seller_email '
+                                   'FROM mortgage m JOIN house h ON m.house_id = h.id',
+                                   filters, MORTGAGE_SORT_COLUMNS, sort, limit):
+            result.append({
+                'id': row[0],
+                'user_id': urlsafe_b64encode(str(row[1])),
+                'bank_id': urlsafe_b64encode(str(row[2])),
+                'house': dict(zip(HOUSE_COLUMNS, row[15:22])),
+                'amount': row[3],
+                'bank_amount': row[4],
+                'mortgage_type': MortgageType(row[5]).name,
+                'interest_rate': row[6],
+                'max_invest_rate': row[7],
+                'default_rate': row[8],
+                'duration': row[9],
+                'risk': row[10],
+                'status': MortgageStatus(row[11]).name,
+                'loan_request_id': row[12],
+                'loan_request_user_id': urlsafe_b64encode(str(row[13])),
+                'contract_id': urlsafe_b64encode(str(row[14]))
+            })
+        return result
+
+    def get_campaign_dicts(self, filters=(), sort=None, limit=None):
+        """
+        Get the campaigns in the market, in the format of Campaign.to_dict(api_response=True). Campaigns can be
+        filtered on the properties of their mortgage. The arguments are passed to query_list and should use
+        CAMPAIGN_FILTERS and CAMPAIGN_SORT_COLUMNS.
+        """
+        result = []
+        for row in self.query_list('SELECT c.id, c.user_id, c.mortgage_id, c.mortgage_user_id, c.amount, '
+                                   'c.amount_invested, c.end_time FROM campaign c '
+                                   'LEFT JOIN mortgage m ON m.id = c.mortgage_id AND m.user_id = c.mortgage_user_id '
+                                   'LEFT JOIN house h ON m.house_id = h.id',
+                                   filters, CAMPAIGN_SORT_COLUMNS, sort, limit):
+            result.append({
+                'id': row[0],
+                'user_id': urlsafe_b64encode(str(row[1])),
+                'mortgage_id': row[2],
+                'mortgage_user_id': urlsafe_b64encode(str(row[3])),
+                'amount': row[4],
+                'amount_invested': row[5],
+                'end_time': row[6]
+            })
+        return result
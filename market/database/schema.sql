@@ -101,36 +101,18 @@ CREATE TABLE IF NOT EXISTS transfer(
   PRIMARY KEY (id, user_id)
 );
 
-CREATE TABLE IF NOT EXISTS contract(
-  id              TEXT PRIMARY KEY,
-  previous_hash   TEXT,
-  from_public_key TEXT NOT NULL,
-  from_signature  TEXT,
-  to_public_key   TEXT NOT NULL,
-  to_signature    TEXT,
-  document        TEXT NOT NULL,
-  type            INTEGER NOT NULL,
-  time            TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+CREATE TABLE IF NOT EXISTS merkle_proof(
+  contract_id TEXT PRIMARY KEY,
+  block_id    TEXT NOT NULL,
+  branch      TEXT NOT NULL
 );
 
-CREATE TABLE IF NOT EXISTS block(
-  id                TEXT PRIMARY KEY,
-  previous_hash     TEXT NOT NULL,
-  merkle_root_hash  TEXT NOT NULL,
-  creator           TEXT NOT NULL,
-  creator_signature TEXT NOT NULL,
-  target_difficulty TEXT NOT NULL,
-  time              TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
-);
+CREATE INDEX IF NOT EXISTS house_postal_code_idx ON house(postal_code);
 
-CREATE TABLE IF NOT EXISTS block_contract(
-  block_id    TEXT NOT NULL,
-  contract_id TEXT NOT NULL,
-  position    INTEGER NOT NULL DEFAULT 0,
-  PRIMARY KEY (block_id, contract_id)
-);
+CREATE INDEX IF NOT EXISTS loan_request_bank_id_status_idx ON loan_request(bank_id, status);
 
-CREATE TABLE IF NOT EXISTS block_index(
-  block_id TEXT PRIMARY KEY,
-  height   INTEGER NOT NULL
-);
+CREATE INDEX IF NOT EXISTS mortgage_bank_id_status_idx ON mortgage(bank_id, status);
+
+CREATE INDEX IF NOT EXISTS mortgage_interest_rate_idx ON mortgage(interest_rate);
+
+CREATE INDEX IF NOT EXISTS campaign_mortgage_idx ON campaign(mortgage_id, mortgage_user_id);
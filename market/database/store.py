@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from storm.store import Store
 
 
@@ -5,6 +7,11 @@ from storm.store import Store
 # See also: https://bugs.launchpad.net/storm/+bug/1334020
 class MarketStore(Store):
 
+    def __init__(self, database, cache=None):
+        super(MarketStore, self).__init__(database, cache)
+        # Every table has a version that is increased whenever an object in that table is flushed
+        self.table_versions = defaultdict(int)
+
     def flush(self):
         for key in self._order.keys():
             for obj in key:
@@ -13,3 +20,12 @@ class MarketStore(Store):
                         v.pop('flush_order')
 
         super(MarketStore, self).flush()
+
+    def _flush_one(self, obj_info):
+        self.table_versions[obj_info.cls_info.table.name] += 1
+        super(MarketStore, self)._flush_one(obj_info)
+
+    def attach_database(self, database_fn, name):
+        # Storm starts a transaction before executing any statement, and ATTACH can't be used within a transaction
+        self.commit()
+        self._connection._raw_connection.execute("ATTACH DATABASE ? AS %s" % name, (database_fn,))
@@ -14,3 +14,10 @@ VERIFIED_BANKS = {'ABN-Amro': 'TGliTmFDTFBLOoc8OkIAtq9_8j5NmUG6tUWR473jLdUeyzqoH
 
 VERIFIED_BANKS = {k : urlsafe_b64decode(v) for k, v in VERIFIED_BANKS.iteritems()}
 VERIFIED_BANK_IDS = {k : hashlib.sha256(v).digest() for k, v in VERIFIED_BANKS.iteritems()}
+VERIFIED_BANK_NAMES = {v : k for k, v in VERIFIED_BANK_IDS.iteritems()}
+
+# Assume-valid checkpoints: height -> (block id, name of a verified bank, signature of the bank on the checkpoint).
+# The blocks of the checkpointed chain up to these heights are not fully checked by verifiers that are catching up.
+CHECKPOINTS = {}
+
+CHECKPOINTS = {h : (urlsafe_b64decode(b), n, urlsafe_b64decode(s)) for h, (b, n, s) in CHECKPOINTS.iteritems()}
@@ -0,0 +1,54 @@
+"""
+Export the best chain and the market state of a market database as newline-delimited JSON, e.g. for analytics. The
+blocks are exported in order of height with their contracts and decoded documents, followed by the mortgages, the
+campaigns and the investments. Every record has a cursor, which can be passed with --cursor to resume an export.
+
+Usage: python -m market.export [--state DIR] [--database FILENAME] [--output FILENAME] [--cursor CURSOR]
+                               [--sections blocks,mortgages,campaigns,investments]
+"""
+
+import os
+import sys
+import argparse
+
+from market.database.datamanager import MarketDataManager
+from market.database.export import EXPORT_SECTIONS, MarketExporter, parse_sections
+from market.defs import BASE_DIR
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Export the blockchain and the market state of a market database')
+    parser.add_argument('--state', help='State directory', default=os.path.join(BASE_DIR, 'State'))
+    parser.add_argument('--database', help='Database filename, relative to the state directory', default='market.db')
+    parser.add_argument('--output', help='Output filename (default: standard output)')
+    parser.add_argument('--cursor', help='Cursor of the record after which the export continues')
+    parser.add_argument('--sections', help='Comma separated list of sections to export',
+                        default=','.join(EXPORT_SECTIONS))
+    args = parser.parse_args(argv)
+
+    database_fn = os.path.join(args.state, args.database)
+    if not os.path.exists(database_fn):
+        parser.error('%s does not exist' % database_fn)
+
+    # Without a DatabaseExecutor the blockchain tables are in the database file itself
+    threaded = os.path.exists('%s-blockchain%s' % os.path.splitext(database_fn))
+    data_manager = MarketDataManager(database_fn, threaded=threaded)
+    try:
+        exporter = MarketExporter(data_manager, parse_sections(args.sections))
+        lines = exporter.get_lines(args.cursor)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output = open(args.output, 'wb') if args.output else sys.stdout
+    try:
+        for line in lines:
+            output.write(line)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        data_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
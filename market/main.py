@@ -20,6 +20,7 @@ from internetofmoney.database import InternetOfMoneyDB
 from internetofmoney.managers.dummy.DummyManager import DummyManager
 from internetofmoney.utils.iban import IBANUtil
 
+from market.community.blockchain.validation import BlockValidator
 from market.community.market.community import MarketCommunity
 from market.defs import DEFAULT_REST_API_PORT, DEFAULT_DISPERSY_PORT, BASE_DIR
 from market.models.user import Role
@@ -104,6 +105,11 @@ def main(argv):
     parser.add_argument('--api', help='API port', type=int, default=DEFAULT_REST_API_PORT)
     parser.add_argument('--state', help='State directory', type=type_unicode, default=os.path.join(BASE_DIR, 'State'))
     parser.add_argument('--keypair', help='Keypair filename', type=type_unicode)
+    parser.add_argument('--validation-processes', help='Number of processes that check received blocks (banks only, '
+                        '0 to check them on the reactor thread)', type=int, default=0)
+    parser.add_argument('--block-files', help='Also store blocks in append-only files', action='store_true')
+    parser.add_argument('--hot-blocks', help='Number of recent blocks to keep in the database, older blocks are '
+                        'moved to an archive (0 to keep all blocks in the database)', type=int, default=0)
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--bank', action='store_const', const=Role.FINANCIAL_INSTITUTION, help='Run as bank')
@@ -111,16 +117,22 @@ def main(argv):
     group.add_argument('--borrower', action='store_const', const=Role.BORROWER, help='Run as borrower')
 
     args = parser.parse_args(sys.argv[1:])
-    manager = DispersyManager(args.dispersy, args.state, args.keypair)
     role = args.bank or args.investor or args.borrower
 
+    # The worker processes are forked before any threads or database connections exist
+    validator = BlockValidator(args.validation_processes if role == Role.FINANCIAL_INSTITUTION else 0)
+    validator.start()
+
+    manager = DispersyManager(args.dispersy, args.state, args.keypair)
+
     def start():
         # Redirect twisted log to standard python logging
         observer = log.PythonLoggingObserver()
         observer.start()
 
         manager.start_dispersy()
-        manager.start_market(role=role, rest_api_port=args.api, database_fn='market.db')
+        manager.start_market(role=role, rest_api_port=args.api, database_fn='market.db',
+                             validator=validator, block_files=args.block_files, hot_blocks=args.hot_blocks)
 
         signal.signal(signal.SIGINT, lambda signum, stack: stop())
 
@@ -129,6 +141,7 @@ def main(argv):
 
     reactor.callWhenRunning(start)
     reactor.run()
+    validator.stop()
 
 if __name__ == "__main__":
     main(sys.argv[1:])
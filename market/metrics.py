@@ -0,0 +1,44 @@
+"""
+The metrics of the market. They are exposed in the Prometheus text format by the /metrics endpoint.
+"""
+
+from market.util.metrics import registry
+
+MESSAGES_RECEIVED = registry.counter('market_messages_received_total',
+                                     'Number of messages that have been received', 'message')
+MESSAGES_DROPPED = registry.counter('market_messages_dropped_total',
+                                    'Number of received messages that have been dropped', 'message')
+
+INCOMING_CONTRACTS = registry.gauge('market_incoming_contracts',
+                                    'Number of contracts that are waiting to be included in a block')
+INCOMING_BLOCKS = registry.gauge('market_incoming_blocks',
+                                 'Number of blocks that are waiting for their previous block')
+
+BLOCK_CREATION_ATTEMPTS = registry.counter('market_block_creation_attempts_total',
+                                           'Number of attempts to create a block')
+BLOCKS_CREATED = registry.counter('market_blocks_created_total',
+                                  'Number of blocks that have been created and added to the blockchain')
+BLOCK_VALIDATION_SECONDS = registry.histogram('market_block_validation_seconds',
+                                              'Time spent on checking a block on the reactor thread')
+BLOCK_VERIFICATION_SECONDS = registry.histogram('market_block_verification_seconds',
+                                                'Time until the stateless checks of a received block are done')
+
+DATABASE_CALL_SECONDS = registry.histogram('market_database_call_seconds',
+                                           'Duration of the calls to the data manager', 'method')
+
+TRAVERSAL_REQUEST_SECONDS = registry.histogram('market_traversal_request_seconds',
+                                               'Time between sending a traversal-request and getting the result')
+
+HANDLER_SECONDS = registry.histogram('market_handler_seconds',
+                                     'Wall time per invocation of a message handler or periodic task', 'handler')
+HANDLER_QUERIES = registry.histogram('market_handler_queries',
+                                     'Number of database queries per invocation of a message handler or periodic task',
+                                     'handler', buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+HANDLER_BATCH_SIZE = registry.histogram('market_handler_batch_size',
+                                        'Number of messages per invocation of a message handler', 'handler',
+                                        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+PAYMENT_QUEUE = registry.gauge('market_payment_queue',
+                               'Number of transfers that are waiting to be paid')
+PAYMENT_SECONDS = registry.histogram('market_payment_seconds',
+                                     'Duration of payments through a money switch')
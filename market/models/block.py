@@ -10,6 +10,7 @@ from dispersy.crypto import LibNaCLPK
 
 from market.models.contract import Contract
 from market.models.block_contract import BlockContract
+from market.models.merkle_proof import MerkleProof
 from market.util.misc import verify_libnaclpk
 from market.util.uint256 import compact_to_uint256, uint256_to_compact, uint256_to_full
 
@@ -80,6 +81,17 @@ class Block(object):
             leaves.append(leaves[-1])
         return MerkleTree(leaves)
 
+    def get_merkle_proof(self, contract_id):
+        leaves = [contract.id for contract in self.contracts]
+        if contract_id not in leaves:
+            return None
+
+        merkle_tree = self.merkle_tree
+        merkle_tree.build()
+        # The first and last items of the chain are the leaf and the root
+        branch = merkle_tree.get_chain(leaves.index(contract_id))[1:-1]
+        return MerkleProof(contract_id, self.id, branch)
+
     def to_dict(self, api_response=False):
         block_dict = {
             'previous_hash': urlsafe_b64encode(self.previous_hash) if api_response else self.previous_hash,
@@ -1,3 +1,4 @@
+import copy
 import hashlib
 
 from base64 import urlsafe_b64encode
@@ -11,8 +12,48 @@ from market.models.mortgage import Mortgage
 from market.models.investment import Investment
 from market.models.transfer import Transfer
 from market.models.confirmation import Confirmation
+from market.util.cache import LRUCache
 from market.util.misc import verify_libnaclpk
 
+# The maximum number of decoded documents that are kept in memory
+MAX_DECODED_DOCUMENTS = 10000
+
+
+class DecodedDocument(object):
+    """
+    This class holds the object that is stored in the document of a contract, and its API representation.
+    """
+
+    __slots__ = ('obj', '_api_dict')
+
+    def __init__(self, obj):
+        self.obj = obj
+        self._api_dict = None
+
+    @property
+    def api_dict(self):
+        if self._api_dict is None:
+            self._api_dict = self.obj.to_dict(api_response=True)
+            self._api_dict.pop('contract_id', None)
+        # The decoded document is shared, so callers get a copy that they are free to change
+        return copy.deepcopy(self._api_dict)
+
+
+def decode_document(contract_type, document):
+    if contract_type == ObjectType.MORTGAGE:
+        return DecodedDocument(Mortgage.from_bin(document))
+    elif contract_type == ObjectType.INVESTMENT:
+        return DecodedDocument(Investment.from_bin(document))
+    elif contract_type == ObjectType.TRANSFER:
+        return DecodedDocument(Transfer.from_bin(document))
+    elif contract_type == ObjectType.CONFIRMATION:
+        return DecodedDocument(Confirmation.from_bin(document))
+    return DecodedDocument(None)
+
+# Documents are immutable once a contract has been signed, so the decoded documents are shared between all contracts
+# with the same content (e.g., the copies that are used for validation and the ones that are loaded by the REST API).
+decoded_documents = LRUCache(MAX_DECODED_DOCUMENTS)
+
 
 class Contract(object):
     """
@@ -76,15 +117,17 @@ class Contract(object):
         elif member.public_key == self.to_public_key:
             return member.verify(data, self.to_signature)
 
+    def get_decoded_document(self):
+        # The document and type together are the content that is decoded, so they can be used as key directly
+        contract_type, document = self.type, self.document
+        return decoded_documents.get((contract_type, document), lambda: decode_document(contract_type, document))
+
     def get_object(self):
-        if self.type == ObjectType.MORTGAGE:
-            return Mortgage.from_bin(self.document)
-        elif self.type == ObjectType.INVESTMENT:
-            return Investment.from_bin(self.document)
-        elif self.type == ObjectType.TRANSFER:
-            return Transfer.from_bin(self.document)
-        elif self.type == ObjectType.CONFIRMATION:
-            return Confirmation.from_bin(self.document)
+        """
+        Get the object that is stored in the document of this contract. The object is shared with other contracts
+        that have the same document, and should not be modified or added to the store.
+        """
+        return self.get_decoded_document().obj
 
     def to_dict(self, api_response=False):
         contract_dict = {
@@ -100,8 +143,7 @@ class Contract(object):
 
         if api_response:
             contract_dict['id'] = urlsafe_b64encode(self.id)
-            contract_dict['decoded'] = self.get_object().to_dict(api_response=True)
-            contract_dict['decoded'].pop('contract_id', None)
+            contract_dict['decoded'] = self.get_decoded_document().api_dict
 
         return contract_dict
 
@@ -0,0 +1,51 @@
+import hashlib
+
+from merkle import MerkleError, check_chain
+from storm.properties import RawStr
+
+
+class MerkleProof(object):
+    """
+    This class represents a proof that a contract is included in a block. It is used by light nodes,
+    which only store block headers and therefore cannot check the contracts of a block themselves.
+    """
+
+    __storm_table__ = 'merkle_proof'
+    contract_id = RawStr(primary=True)
+    block_id = RawStr()
+    _branch = RawStr(name='branch')
+
+    def __init__(self, contract_id, block_id, branch):
+        self.contract_id = contract_id
+        self.block_id = block_id
+        self.branch = branch
+
+    @property
+    def branch(self):
+        # Every node is stored as a 1 byte side ('L' or 'R') followed by a 32 byte hash
+        return [(self._branch[i + 1:i + 33], self._branch[i]) for i in range(0, len(self._branch), 33)]
+
+    @branch.setter
+    def branch(self, value):
+        self._branch = ''.join([side + node_hash for node_hash, side in value])
+
+    def verify(self, merkle_root_hash):
+        chain = [(hashlib.sha256(self.contract_id).digest(), 'SELF')] + self.branch + [(merkle_root_hash, 'ROOT')]
+        try:
+            check_chain(chain)
+        except MerkleError:
+            return False
+        return True
+
+    def to_dict(self):
+        return {
+            'block_id': self.block_id,
+            'branch': [{'hash': node_hash, 'left': side == 'L'} for node_hash, side in self.branch]
+        }
+
+    @staticmethod
+    def from_dict(contract_id, proof_dict):
+        branch = [(node_dict['hash'], 'L' if node_dict['left'] else 'R') for node_dict in proof_dict['branch']]
+        if any([len(node_hash) != 32 for node_hash, _ in branch]):
+            return None
+        return MerkleProof(contract_id, proof_dict['block_id'], branch)
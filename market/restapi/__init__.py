@@ -17,3 +17,36 @@ def split_composite_key(composite_key):
         return (int(keys[0]), urlsafe_b64decode(keys[1])) if len(keys) == 2 else None
     except (TypeError, ValueError):
         return None
+
+def get_list_parameters(params, filters, sort_columns):
+    """
+    Parse the filter, sort and limit parameters of a GET request to a list endpoint.
+    :param params: the arguments of the request
+    :param filters: a dictionary mapping parameter names to the Filters of the endpoint
+    :param sort_columns: the keys that the list can be sorted on
+    :return: a (filters, sort, limit) tuple, which can be passed to the data manager and used as cache key
+    :raises ValueError: if one of the parameters has an invalid value
+    """
+    conditions = []
+    for name in sorted(filters):
+        value = get_param(params, name)
+        if value is None:
+            continue
+        try:
+            conditions.append((filters[name], filters[name].parse(value.decode('utf-8'))))
+        except (TypeError, ValueError, KeyError):
+            raise ValueError('invalid %s parameter' % name)
+
+    sort = get_param(params, 'sort')
+    if sort is not None:
+        sort = (sort[1:], True) if sort.startswith('-') else (sort, False)
+        if sort[0] not in sort_columns:
+            raise ValueError('invalid sort parameter')
+
+    limit = get_param(params, 'limit')
+    if limit is not None:
+        if not limit.isdigit() or int(limit) == 0:
+            raise ValueError('invalid limit parameter')
+        limit = int(limit)
+
+    return tuple(conditions), sort, limit
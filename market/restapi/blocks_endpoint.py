@@ -1,7 +1,11 @@
 import json
 
 from twisted.web import resource, http
-from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from market.restapi import get_param
+
+MAX_BLOCKS_PER_PAGE = 250
 
 
 class BlocksEndpoint(resource.Resource):
@@ -17,13 +21,18 @@ class BlocksEndpoint(resource.Resource):
         """
         .. http:get:: /blocks
 
-        A GET request to this endpoint returns a list of block in the blockchain.
+        A GET request to this endpoint returns a list of blocks in the best chain, starting at the highest block.
+        The results are paginated by height: use the returned next value as the before parameter to get the next page.
+        By passing contracts=ids, only the ids of the contracts are returned instead of the complete contracts.
+
+        The response has an ETag that only changes when the best chain changes. A request with a matching
+        If-None-Match header results in a 304 response.
 
             **Example request**:
 
             .. sourcecode:: none
 
-                curl -X GET http://localhost:8085/blocks
+                curl -X GET http://localhost:8085/blocks?limit=10&before=100&contracts=ids
 
             **Example response**:
 
@@ -38,21 +47,59 @@ class BlocksEndpoint(resource.Resource):
                         "time": 1493046869,
                         "id": "ADxyGf6VmgZduESTrQCHDxEJjLX0WPmg9gXjq18j8nc=",
                         "previous_hash": "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA=",
-                        "target_difficulty": "00ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff"
-                    }, ...]
+                        "target_difficulty": "00ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+                        "height": 99
+                    }, ...],
+                    "next": 90
                 }
         """
-
-        limit = min(250, int(request.args['limit'][0])) if 'limit' in request.args else 250
+        try:
+            limit = min(MAX_BLOCKS_PER_PAGE, int(get_param(request.args, 'limit') or MAX_BLOCKS_PER_PAGE))
+            before = get_param(request.args, 'before')
+            before = int(before) if before is not None else None
+        except ValueError:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "limit and before should be integers"})
+
+        # An empty page would tell the client that it has reached the end of the chain
+        if limit < 1:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "limit should be positive"})
+
+        projection = get_param(request.args, 'contracts') or 'full'
+        if projection not in ['full', 'ids']:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "contracts should be either full or ids"})
+
+        # The response only depends on the best chain and the parameters, so we can compare the tip of the chain
+        # with the ETag before doing any work
+        tip = self.community.data_manager.get_block_indexes(limit=1)[0]
+        etag = '"%s-%d-%s-%d-%s"' % (tip.block_id.encode('hex'), tip.height, before, limit, projection)
+        request.setHeader('Cache-Control', 'no-cache')
+        if request.setETag(etag) == http.CACHED:
+            return ''
+
+        top = tip.height if before is None else min(before - 1, tip.height)
+        indexes = [self.community.data_manager.get_block_index_at_height(height)
+                   for height in range(top, max(top - limit, -1), -1)]
+        blocks_by_id = self.community.data_manager.get_blocks_by_ids([index.block_id for index in indexes],
+                                                                     full=projection == 'full')
         blocks = []
-        for index in self.community.data_manager.get_block_indexes(limit):
-            block = self.community.data_manager.get_block(index.block_id)
-            if block:
-                block_dict = block.to_dict(api_response=True)
-                block_dict["height"] = index.height
-                blocks.append(block_dict)
-
-        return json.dumps({"blocks": blocks})
+        for index in indexes:
+            if index.block_id not in blocks_by_id:
+                continue
+
+            header, contracts = blocks_by_id[index.block_id]
+            block_dict = header.to_dict(api_response=True)
+            if projection == 'full':
+                block_dict['contracts'] = [contract.to_dict(api_response=True) for contract in contracts]
+            else:
+                block_dict['contracts'] = [urlsafe_b64encode(contract_id) for contract_id in contracts]
+            block_dict["height"] = index.height
+            blocks.append(block_dict)
+
+        next_height = indexes[-1].height if indexes and indexes[-1].height > 0 else None
+        return json.dumps({"blocks": blocks, "next": next_height})
 
     def getChild(self, path, request):
         return SpecificBlockEndpoint(self.community, path)
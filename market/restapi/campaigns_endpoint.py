@@ -3,8 +3,14 @@ import json
 from twisted.web import http
 from twisted.web import resource
 
+from market.database.reader import CAMPAIGN_FILTERS, CAMPAIGN_SORT_COLUMNS
 from market.models.investment import InvestmentStatus
-from market.restapi import split_composite_key
+from market.restapi import get_list_parameters, split_composite_key
+from market.util.cache import VersionedCache
+from market.util.portfolio import analyse_portfolio, get_schedule
+
+# The number of different queries for which the response is cached
+MAX_CACHED_QUERIES = 32
 
 
 class CampaignsEndpoint(resource.Resource):
@@ -15,6 +21,8 @@ class CampaignsEndpoint(resource.Resource):
     def __init__(self, community):
         resource.Resource.__init__(self)
         self.community = community
+        self.cache = VersionedCache(MAX_CACHED_QUERIES)
+        self.analytics_cache = VersionedCache(MAX_CACHED_QUERIES)
 
     def render_GET(self, request):
         """
@@ -22,11 +30,18 @@ class CampaignsEndpoint(resource.Resource):
 
         A GET request to this endpoint returns information about the ongoing campaigns.
 
+        The campaigns can be filtered on their mortgage using the min_interest_rate, max_interest_rate, min_duration,
+        max_duration, mortgage_type, bank (id) and postal_code (prefix) parameters, on the amount of the campaign using
+        min_amount and max_amount, and on whether the campaign has been completed using completed (true or false).
+        They can be sorted on id, amount, amount_invested, end_time, interest_rate, duration or postal_code using the
+        sort parameter (prefixed with - for descending order), and the number of campaigns can be limited with the
+        limit parameter.
+
             **Example request**:
 
             .. sourcecode:: none
 
-                curl -X GET http://localhost:8085/campaigns
+                curl -X GET "http://localhost:8085/campaigns?completed=false&postal_code=85&sort=end_time"
 
             **Example response**:
 
@@ -63,11 +78,18 @@ class CampaignsEndpoint(resource.Resource):
                     }, ...]
                 }
         """
-        return json.dumps({"campaigns": [campaign.to_dict(api_response=True)
-                                         for campaign in self.community.data_manager.get_campaigns()]})
+        try:
+            parameters = get_list_parameters(request.args, CAMPAIGN_FILTERS, CAMPAIGN_SORT_COLUMNS)
+        except ValueError as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
+
+        data_manager = self.community.data_manager
+        return self.cache.get(parameters, data_manager.get_table_versions('campaign', 'mortgage', 'house'),
+                              lambda: json.dumps({"campaigns": data_manager.get_campaign_dicts(*parameters)}))
 
     def getChild(self, path, request):
-        return SpecificCampaignEndpoint(self.community, path)
+        return SpecificCampaignEndpoint(self.community, path, self.analytics_cache)
 
 
 class SpecificCampaignEndpoint(resource.Resource):
@@ -75,12 +97,13 @@ class SpecificCampaignEndpoint(resource.Resource):
     This class handles requests for a specific campaign.
     """
 
-    def __init__(self, community, campaign_composite_key):
+    def __init__(self, community, campaign_composite_key, analytics_cache):
         resource.Resource.__init__(self)
         self.community = community
         self.campaign_composite_key = campaign_composite_key
 
         self.putChild("investments", CampaignInvestmentsEndpoint(community, campaign_composite_key))
+        self.putChild("analytics", CampaignAnalyticsEndpoint(community, campaign_composite_key, analytics_cache))
 
     def render_GET(self, request):
         """
@@ -187,6 +210,75 @@ class CampaignInvestmentsEndpoint(resource.Resource):
         return json.dumps({"investments": [investment.to_dict(api_response=True) for investment in campaign.investments]})
 
 
+class CampaignAnalyticsEndpoint(resource.Resource):
+    """
+    This class handles requests for the cash flow analytics of a campaign.
+    """
+    def __init__(self, community, campaign_composite_key, cache):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.campaign_composite_key = campaign_composite_key
+        self.cache = cache
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /campaigns/(string: campaign_id)/analytics
+
+        A GET request to this endpoint returns the amortisation schedule of the mortgage of a campaign, and the
+        expected cash flows of the positions in it (the part of the bank and the accepted investments). See
+        market.util.portfolio for the model that is used.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/campaigns/8593AB_89/analytics
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "analytics": {
+                        "schedule": [{
+                            "month": 1,
+                            "payment": 1843.21,
+                            "interest": 1745.83,
+                            "repayment": 97.38,
+                            "balance": 394902.62
+                        }, ...],
+                        "positions": [{
+                            "type": "INVESTMENT",
+                            "id": 0,
+                            "principal": 9000,
+                            "interest_rate": 4.9,
+                            "expected_interest": 4612.3,
+                            "expected_loss": 601.2,
+                            "default_adjusted_yield": 4.21,
+                            ...
+                        }, ...],
+                        "totals": {"principal": 209000, "expected_return": 63519.8, ...},
+                        "exposure": [{"bank_id": "TGliTmFDTFBLOgmEL13Spu...", "principal": 209000}]
+                    }
+                }
+        """
+        keys = split_composite_key(self.campaign_composite_key)
+        data_manager = self.community.data_manager
+        campaign = data_manager.get_campaign(*keys) if keys is not None else None
+        if not campaign:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "campaign not found"})
+
+        def create():
+            analytics = analyse_portfolio(data_manager.get_campaign_positions(campaign))
+            mortgage = data_manager.get_mortgage(campaign.mortgage_id, campaign.mortgage_user_id)
+            analytics['schedule'] = get_schedule(mortgage.amount, mortgage.interest_rate, mortgage.mortgage_type,
+                                                 mortgage.duration) if mortgage else []
+            return json.dumps({"analytics": analytics})
+
+        return self.cache.get(keys, data_manager.get_table_versions('campaign', 'mortgage', 'investment'), create)
+
+
 class SpecificCampaignInvestmentEndpoint(resource.Resource):
     """
     This class handles requests for a specific investment in a campaign
@@ -17,6 +17,8 @@ class ContractsEndpoint(resource.Resource):
         resource.Resource.__init__(self)
         self.community = community
 
+        self.putChild("lifecycle", ContractLifecycleEndpoint(community))
+
     def render_POST(self, request):
         you = self.community.data_manager.you
 
@@ -31,7 +33,7 @@ class ContractsEndpoint(resource.Resource):
 
             contracts_dict[contract_id] = contract.to_dict(api_response=True)
 
-            if you.role == Role.FINANCIAL_INSTITUTION:
+            if you.role == Role.FINANCIAL_INSTITUTION or self.community.data_manager.get_merkle_proof(contract.id):
                 # Determine confirmations locally
                 contracts_dict[contract_id]["confirmations"] = self.community.find_confirmation_count(contract.id)
             else:
@@ -73,7 +75,7 @@ class SpecificContractEndpoint(resource.Resource):
             return json.dumps({"error": "contract not found"})
 
         contract_dict = contract.to_dict(api_response=True)
-        if you.role == Role.FINANCIAL_INSTITUTION:
+        if you.role == Role.FINANCIAL_INSTITUTION or self.community.data_manager.get_merkle_proof(contract.id):
             # Determine confirmations locally
             contract_dict["confirmations"] = self.community.find_confirmation_count(contract.id)
             return json.dumps({"contract": contract_dict})
@@ -86,3 +88,51 @@ class SpecificContractEndpoint(resource.Resource):
 
             self.community.send_traversal_request(contract.id).addCallback(on_traversal_response)
             return NOT_DONE_YET
+
+
+class ContractLifecycleEndpoint(resource.Resource):
+    """
+    This class handles requests regarding the time contracts spend in each stage of their lifecycle.
+    """
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /contracts/lifecycle
+
+        A GET request to this endpoint returns the 50th, 90th and 99th percentile and the maximum of the time (in
+        seconds) that the recent contracts seen by this node spent in each stage, i.e. the time between reaching the
+        previous stage and reaching the stage. The stages are action, begin, signature_request, signature_response,
+        gossip, mempool, block and confirmed. For contracts that were the result of an action through the REST API
+        (accept_mortgage, invest, offer_transfer or accept_transfer), the time between the action and each stage is
+        also returned.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/contracts/lifecycle
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "contracts": 12,
+                    "stages": {
+                        "mempool": {"count": 12, "p50": 0.004, "p90": 0.01, "p99": 0.02, "max": 0.02},
+                        "block": {"count": 10, "p50": 14.2, "p90": 28.1, "p99": 29.8, "max": 29.8},
+                        ...
+                    },
+                    "actions": {
+                        "accept_mortgage": {
+                            "signature_request": {"count": 1, "p50": 0.31, "p90": 0.31, "p99": 0.31, "max": 0.31},
+                            ...
+                        }
+                    }
+                }
+        """
+        return json.dumps(self.community.lifecycle.get_statistics())
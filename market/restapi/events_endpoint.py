@@ -0,0 +1,79 @@
+import json
+
+from twisted.internet.task import LoopingCall
+from twisted.web import resource, server
+
+KEEP_ALIVE_INTERVAL = 15
+
+
+class EventsEndpoint(resource.Resource):
+    """
+    This class pushes changes in the mortgage market community to clients using Server-Sent Events.
+    """
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.requests = []
+        self.keep_alive = LoopingCall(self.write_to_all, ': keep-alive\n\n')
+
+    def on_event(self, event_type, data):
+        # The event is serialized once, regardless of the number of clients
+        self.write_to_all('event: %s\ndata: %s\n\n' % (event_type, json.dumps(data)))
+
+    def write_to_all(self, chunk):
+        for request in self.requests:
+            request.write(chunk)
+
+    def add_request(self, request):
+        if not self.requests:
+            self.community.notifier.add_observer(self.on_event)
+            self.keep_alive.start(KEEP_ALIVE_INTERVAL, now=False)
+        self.requests.append(request)
+
+    def remove_request(self, request):
+        self.requests.remove(request)
+        if not self.requests:
+            self.community.notifier.remove_observer(self.on_event)
+            self.keep_alive.stop()
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /events
+
+        A GET request to this endpoint opens a stream of Server-Sent Events, which describe changes in the market.
+        Clients are expected to fetch the current state once, and then apply the changes as they come in. When
+        the connection is lost, clients should fetch the state again since events are not buffered.
+
+        The following events are sent, with the data in the same format as the other endpoints:
+
+        - block_connected: {"block": {...}}, a block has been added to the best chain (with contracts=ids)
+        - block_disconnected: {"id": ..., "height": ...}, a block has been removed from the best chain
+        - campaign_updated: {"campaign": {...}}, a campaign has been created or changed
+        - investment_status_changed: {"investment": {...}}, an investment has been offered or changed status
+        - loan_request_received: {"loan_request": {...}}, a loan request has been offered to us
+        - loan_request_status_changed: {"loan_request": {...}}, our loan request has been rejected
+        - mortgage_status_changed: {"mortgage": {...}}, a mortgage has been offered, accepted or rejected
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/events
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                event: campaign_updated
+                data: {"campaign": {"id": 0, "user_id": "...", "amount": 195000, "amount_invested": 5000, ...}}
+
+        """
+        request.setHeader('Content-Type', 'text/event-stream')
+        request.setHeader('Cache-Control', 'no-cache')
+        # Makes sure the headers are sent immediately
+        request.write(': connected\n\n')
+
+        self.add_request(request)
+        request.notifyFinish().addBoth(lambda _: self.remove_request(request))
+        return server.NOT_DONE_YET
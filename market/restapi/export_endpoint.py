@@ -0,0 +1,92 @@
+import json
+
+from itertools import islice
+
+from twisted.internet.interfaces import IPullProducer
+from twisted.web import http, resource, server
+from zope.interface import implementer
+
+from market.database.export import EXPORT_SECTIONS, MarketExporter, parse_sections
+from market.restapi import get_param
+
+# The number of lines that are written to the client at a time
+LINES_PER_WRITE = 100
+
+
+@implementer(IPullProducer)
+class ExportProducer(object):
+    """
+    This class writes the lines of an export to a request whenever the transport asks for more data, so that the
+    export is never loaded completely and a slow client doesn't cause the lines to be buffered.
+    """
+
+    def __init__(self, request, lines):
+        self.request = request
+        self.lines = lines
+
+    def resumeProducing(self):
+        if self.lines is None:
+            return
+
+        lines = list(islice(self.lines, LINES_PER_WRITE))
+        if lines:
+            self.request.write(''.join(lines))
+        if len(lines) < LINES_PER_WRITE:
+            self.lines = None
+            self.request.unregisterProducer()
+            self.request.finish()
+
+    def stopProducing(self):
+        # The connection has been lost
+        self.lines = None
+
+
+class ExportEndpoint(resource.Resource):
+    """
+    This class streams a bulk export of the blockchain and the market.
+    """
+
+    isLeaf = True
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /export
+
+        A GET request to this endpoint returns the best chain (in order of height, with the contracts and their
+        decoded documents inline), the mortgages, the campaigns and the investments as newline-delimited JSON. The
+        response is streamed, so it can be used to export the entire chain.
+
+        The sections can be selected with the sections parameter (a comma separated list of blocks, mortgages,
+        campaigns and investments). Every record has a cursor; an interrupted export can be resumed by passing the
+        cursor of the last record that was received with the cursor parameter.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET "http://localhost:8085/export?sections=blocks,campaigns&cursor=blocks:1000"
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                {"type": "block", "cursor": "blocks:1001", "block": {"id": "...", "height": 1001, "contracts": [...]}}
+                {"type": "block", "cursor": "blocks:1002", "block": {"id": "...", "height": 1002, "contracts": [...]}}
+                {"type": "campaign", "cursor": "campaigns:0:...", "campaign": {"id": 0, "user_id": "...", ...}}
+        """
+        try:
+            sections = get_param(request.args, 'sections')
+            exporter = MarketExporter(self.community.data_manager,
+                                      parse_sections(sections) if sections else EXPORT_SECTIONS)
+            lines = exporter.get_lines(get_param(request.args, 'cursor'))
+        except ValueError as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
+
+        request.setHeader('Content-Type', 'application/x-ndjson')
+        request.registerProducer(ExportProducer(request, lines), False)
+        return server.NOT_DONE_YET
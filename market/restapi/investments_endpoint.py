@@ -4,6 +4,8 @@ from twisted.web import http
 from twisted.web import resource
 
 from market.restapi import split_composite_key
+from market.util.cache import VersionedCache
+from market.models import ObjectType
 from market.models.user import Role
 from market.models.transfer import Transfer, TransferStatus
 
@@ -16,6 +18,7 @@ class InvestmentsEndpoint(resource.Resource):
     def __init__(self, community):
         resource.Resource.__init__(self)
         self.community = community
+        self.cache = VersionedCache()
 
     def getChild(self, path, request):
         return SpecificInvestmentEndpoint(self.community, path)
@@ -49,10 +52,15 @@ class InvestmentsEndpoint(resource.Resource):
                 }
         """
 
+        data_manager = self.community.data_manager
+        return self.cache.get('investments', data_manager.get_table_versions('investment', 'transfer'),
+                              self.render_investments)
+
+    def render_investments(self):
         investment_dicts = []
-        for investment in self.community.data_manager.get_investments():
+        for investment, transfers in self.community.data_manager.get_investments_with_transfers():
             investment_dict = investment.to_dict(api_response=True)
-            investment_dict["transfers"] = [transfer.to_dict(api_response=True) for transfer in investment.transfers]
+            investment_dict["transfers"] = [transfer.to_dict(api_response=True) for transfer in transfers]
             investment_dicts.append(investment_dict)
 
         return json.dumps({"investments": investment_dicts})
@@ -175,6 +183,7 @@ class InvestmentTransfersEndpoint(resource.Resource):
         you.transfers.add(transfer)
         investment.transfers.add(transfer)
 
+        self.community.lifecycle.tag_action('offer_transfer', ObjectType.TRANSFER, transfer.id, transfer.user_id)
         self.community.offer_transfer(transfer)
 
         return json.dumps({"success": True})
@@ -225,6 +234,7 @@ class SpecificInvestmentTransferEndpoint(resource.Resource):
 
         if status == 'ACCEPT':
             transfer.status = TransferStatus.ACCEPTED
+            self.community.lifecycle.tag_action('accept_transfer', ObjectType.TRANSFER, transfer.id, transfer.user_id)
             self.community.accept_transfer(transfer)
         else:
             transfer.status = TransferStatus.REJECTED
@@ -2,9 +2,14 @@ import json
 
 from twisted.web import http, resource
 
+from market.database.reader import LOAN_REQUEST_FILTERS, LOAN_REQUEST_SORT_COLUMNS
 from market.models.loanrequest import LoanRequestStatus
 from market.models.mortgage import Mortgage, MortgageStatus
-from market.restapi import split_composite_key
+from market.restapi import get_list_parameters, split_composite_key
+from market.util.cache import VersionedCache
+
+# The number of different queries for which the response is cached
+MAX_CACHED_QUERIES = 32
 
 
 class LoanRequestsEndpoint(resource.Resource):
@@ -16,6 +21,7 @@ class LoanRequestsEndpoint(resource.Resource):
     def __init__(self, community):
         resource.Resource.__init__(self)
         self.community = community
+        self.cache = VersionedCache(MAX_CACHED_QUERIES)
 
     def render_GET(self, request):
         """
@@ -23,11 +29,15 @@ class LoanRequestsEndpoint(resource.Resource):
 
         A GET request to this endpoint returns a list of loan requests. Only accessible by financial institutions.
 
+        The loan requests can be filtered using the min_amount, max_amount, mortgage_type, bank (id), postal_code
+        (prefix) and status parameters. They can be sorted on id, amount or postal_code using the sort parameter
+        (prefixed with - for descending order), and the number of loan requests can be limited with the limit parameter.
+
             **Example request**:
 
             .. sourcecode:: none
 
-                curl -X GET http://localhost:8085/loanrequests
+                curl -X GET "http://localhost:8085/loanrequests?status=PENDING&sort=-amount"
 
             **Example response**:
 
@@ -45,8 +55,15 @@ class LoanRequestsEndpoint(resource.Resource):
                     }, ...]
                 }
         """
-        return json.dumps({"loan_requests": [loan_request.to_dict(api_response=True) for
-                                             loan_request in self.community.data_manager.get_loan_requests()]})
+        try:
+            parameters = get_list_parameters(request.args, LOAN_REQUEST_FILTERS, LOAN_REQUEST_SORT_COLUMNS)
+        except ValueError as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
+
+        data_manager = self.community.data_manager
+        return self.cache.get(parameters, data_manager.get_table_versions('loan_request', 'house'),
+                              lambda: json.dumps({"loan_requests": data_manager.get_loan_request_dicts(*parameters)}))
 
     def getChild(self, path, request):
         return SpecificLoanRequestEndpoint(self.community, path)
@@ -0,0 +1,41 @@
+from twisted.web import resource
+
+from market.util.metrics import registry
+
+
+class MetricsEndpoint(resource.Resource):
+    """
+    This class exposes the metrics of the market in the Prometheus text format.
+    """
+
+    isLeaf = True
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /metrics
+
+        A GET request to this endpoint returns the metrics of this process (i.e., message counts, mempool size,
+        block creation and validation, database calls, traversal-requests and payments), in the format that is
+        scraped by Prometheus.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/metrics
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                # HELP market_messages_received_total Number of messages that have been received
+                # TYPE market_messages_received_total counter
+                market_messages_received_total{message="block"} 12.0
+                ...
+        """
+        request.setHeader('Content-Type', 'text/plain; version=0.0.4')
+        return registry.render()
@@ -1,6 +1,13 @@
 import json
 
-from twisted.web import resource
+from twisted.web import http, resource
+
+from market.database.reader import MORTGAGE_FILTERS, MORTGAGE_SORT_COLUMNS
+from market.restapi import get_list_parameters
+from market.util.cache import VersionedCache
+
+# The number of different queries for which the response is cached
+MAX_CACHED_QUERIES = 32
 
 
 class MortgagesEndpoint(resource.Resource):
@@ -12,6 +19,7 @@ class MortgagesEndpoint(resource.Resource):
     def __init__(self, community):
         resource.Resource.__init__(self)
         self.community = community
+        self.cache = VersionedCache(MAX_CACHED_QUERIES)
 
     def render_GET(self, request):
         """
@@ -19,11 +27,16 @@ class MortgagesEndpoint(resource.Resource):
 
         A GET request to this endpoint returns a list of mortgages. Only accessible by financial institutions.
 
+        The mortgages can be filtered using the min_interest_rate, max_interest_rate, min_amount, max_amount,
+        min_duration, max_duration, mortgage_type, bank (id), postal_code (prefix) and status parameters.
+        They can be sorted on id, amount, interest_rate, duration or postal_code using the sort parameter (prefixed
+        with - for descending order), and the number of mortgages can be limited with the limit parameter.
+
             **Example request**:
 
             .. sourcecode:: none
 
-                curl -X GET http://localhost:8085/mortgages
+                curl -X GET "http://localhost:8085/mortgages?min_interest_rate=2.5&sort=-interest_rate&limit=10"
 
             **Example response**:
 
@@ -56,5 +69,12 @@ class MortgagesEndpoint(resource.Resource):
                 }
         """
 
-        return json.dumps({"mortgages": [mortgage.to_dict(api_response=True) for
-                                         mortgage in self.community.data_manager.get_mortgages()]})
+        try:
+            parameters = get_list_parameters(request.args, MORTGAGE_FILTERS, MORTGAGE_SORT_COLUMNS)
+        except ValueError as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
+
+        data_manager = self.community.data_manager
+        return self.cache.get(parameters, data_manager.get_table_versions('mortgage', 'house'),
+                              lambda: json.dumps({"mortgages": data_manager.get_mortgage_dicts(*parameters)}))
@@ -0,0 +1,234 @@
+import json
+
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from twisted.web import http
+from twisted.web import resource
+
+from market.community.market.orderbook import Side
+from market.models.investment import InvestmentStatus
+from market.models.user import Role
+from market.restapi import get_param, split_composite_key
+
+
+class OrderBookEndpoint(resource.Resource):
+    """
+    This class handles requests regarding the order books of the investment resale market.
+    """
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /orderbook
+
+        A GET request to this endpoint returns the mortgages that have bids or asks for their investments, with the
+        best bid and ask prices.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/orderbook
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "books": [{
+                        "mortgage_id": 3,
+                        "mortgage_user_id": "TGliTmFDTFBLOgmEL13Spu...",
+                        "best_bid": 0.97,
+                        "best_ask": 0.99
+                    }, ...]
+                }
+        """
+        books = []
+        for (mortgage_id, mortgage_user_id), book in sorted(self.community.order_books.books.iteritems()):
+            best_bid, best_ask = book.best(Side.BID), book.best(Side.ASK)
+            books.append({'mortgage_id': mortgage_id,
+                          'mortgage_user_id': urlsafe_b64encode(mortgage_user_id),
+                          'best_bid': best_bid.price if best_bid else None,
+                          'best_ask': best_ask.price if best_ask else None})
+        return json.dumps({"books": books})
+
+    def getChild(self, path, request):
+        return SpecificOrderBookEndpoint(self.community, path)
+
+
+class SpecificOrderBookEndpoint(resource.Resource):
+    """
+    This class handles requests for the order book of a specific mortgage.
+    """
+
+    def __init__(self, community, mortgage_composite_key):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.mortgage_composite_key = mortgage_composite_key
+
+        self.putChild("orders", OrderBookOrdersEndpoint(community))
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /orderbook/(string: mortgage_id)
+
+        A GET request to this endpoint returns the depth of the order book of a mortgage: the remaining amount per
+        price, best price first. The number of prices per side can be limited with the levels parameter.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET "http://localhost:8085/orderbook/3%20TGliTmFDTFBLOgmEL13Spu...?levels=10"
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "depth": {
+                        "bids": [[0.97, 20000], [0.95, 5000]],
+                        "asks": [[0.99, 10000], ...]
+                    }
+                }
+        """
+        keys = split_composite_key(self.mortgage_composite_key)
+        if keys is None:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "mortgage not found"})
+
+        levels = get_param(request.args, 'levels')
+        if levels is not None and (not levels.isdigit() or int(levels) < 1):
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "invalid levels parameter"})
+        levels = int(levels) if levels is not None else None
+
+        return json.dumps({"depth": self.community.order_books.get_depth(keys, levels)})
+
+    def render_PUT(self, request):
+        """
+        .. http:put:: /orderbook/(string: mortgage_id)
+
+        A PUT request to this endpoint places an order. A BID for an amount at a price per unit is matched with the
+        investments for sale, for which transfers are offered to their owners. An ASK puts one of your investments
+        up for sale at a price per unit of its amount.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X PUT http://localhost:8085/orderbook/3%20TGliTmFDTFBLOgmEL13Spu...
+                --data '{"side": "BID", "price": 0.97, "amount": 20000}'
+
+                curl -X PUT http://localhost:8085/orderbook/3%20TGliTmFDTFBLOgmEL13Spu...
+                --data '{"side": "ASK", "price": 0.99, "investment_id": 2,
+                         "investment_user_id": "YTk0YThmZTVjY2IxOWJhNjFjNGMwODcz..."}'
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {"order": {"id": 5, "side": "BID", "price": 0.97, "amount": 20000, "remaining": 10000}}
+        """
+        you = self.community.data_manager.you
+        if you.role != Role.INVESTOR:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "only investors can place orders"})
+
+        if you.profile is None:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "please create a profile prior to placing an order"})
+
+        keys = split_composite_key(self.mortgage_composite_key)
+        mortgage = self.community.data_manager.get_mortgage(*keys) if keys is not None else None
+        if not mortgage:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "mortgage not found"})
+
+        parameters = json.loads(request.content.read())
+        side = parameters.get('side')
+        required_fields = {'BID': ['price', 'amount'],
+                           'ASK': ['price', 'investment_id', 'investment_user_id']}.get(side)
+        if required_fields is None:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "invalid side parameter"})
+
+        for field in required_fields:
+            if field not in parameters:
+                request.setResponseCode(http.BAD_REQUEST)
+                return json.dumps({"error": "missing %s parameter" % field})
+
+        try:
+            if side == 'BID':
+                order = self.community.place_bid(keys, float(parameters['price']), float(parameters['amount']))
+            else:
+                investment = self.community.data_manager.get_investment(
+                    parameters['investment_id'], urlsafe_b64decode(str(parameters['investment_user_id'])))
+                campaign = self.community.data_manager.get_campaign(investment.campaign_id,
+                                                                    investment.campaign_user_id) \
+                    if investment is not None else None
+                if campaign is None or (campaign.mortgage_id, campaign.mortgage_user_id) != keys:
+                    request.setResponseCode(http.NOT_FOUND)
+                    return json.dumps({"error": "investment not found"})
+                elif investment.status != InvestmentStatus.ACCEPTED:
+                    request.setResponseCode(http.BAD_REQUEST)
+                    return json.dumps({"error": "only accepted investments can be sold"})
+
+                order = self.community.sell_investment(investment, campaign, float(parameters['price']))
+        except (TypeError, ValueError) as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
+
+        return json.dumps({"order": order.to_dict(api_response=True)})
+
+
+class OrderBookOrdersEndpoint(resource.Resource):
+    """
+    This class handles requests regarding the orders in an order book.
+    """
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+
+    def getChild(self, path, request):
+        return SpecificOrderEndpoint(self.community, path)
+
+
+class SpecificOrderEndpoint(resource.Resource):
+    """
+    This class handles requests for a specific order.
+    """
+
+    def __init__(self, community, order_id):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.order_id = order_id
+
+    def render_DELETE(self, request):
+        """
+        .. http:delete:: /orderbook/(string: mortgage_id)/orders/(int: order_id)
+
+        A DELETE request to this endpoint cancels one of your orders. An investment for which the ask is cancelled is
+        no longer for sale.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X DELETE http://localhost:8085/orderbook/3%20TGliTmFDTFBLOgmEL13Spu.../orders/5
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {"success": True}
+        """
+        order = self.community.cancel_order(int(self.order_id)) if self.order_id.isdigit() else None
+        if order is None:
+            request.setResponseCode(http.NOT_FOUND)
+            return json.dumps({"error": "order not found"})
+
+        return json.dumps({"success": True})
@@ -0,0 +1,92 @@
+import json
+import logging
+import threading
+
+from twisted.web import resource, http
+from twisted.web.server import NOT_DONE_YET
+
+from market.restapi import get_param
+from market.util.profiling import DEFAULT_SAMPLE_INTERVAL, SamplingProfiler
+
+DEFAULT_PROFILE_DURATION = 10
+MAX_PROFILE_DURATION = 300
+MIN_SAMPLE_INTERVAL = 0.001
+
+
+class ProfilerEndpoint(resource.Resource):
+    """
+    This class runs a sampling profiler on the reactor thread on request, so that stalls can be attributed without
+    restarting the node.
+    """
+
+    isLeaf = True
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.profiler = None
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /profiler
+
+        A GET request to this endpoint samples the stack of the reactor thread for the given number of seconds
+        (default 10, at most 300), every interval seconds (default 0.005). The response is sent when the profiler
+        is done, and contains the samples in the collapsed stack format, which can be turned into a flame graph with
+        flamegraph.pl or speedscope. Only one profiler can run at a time.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/profiler?seconds=30 > market.folded
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                <module> (main.py:1);...;mainLoop (.../twisted/internet/base.py:1270);...;on_block (...) 42
+                ...
+        """
+        try:
+            duration = float(get_param(request.args, 'seconds') or DEFAULT_PROFILE_DURATION)
+            interval = float(get_param(request.args, 'interval') or DEFAULT_SAMPLE_INTERVAL)
+        except ValueError:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "seconds and interval should be numbers"})
+
+        if not 0 < duration <= MAX_PROFILE_DURATION or interval < MIN_SAMPLE_INTERVAL:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": "seconds should be between 0 and %d, and interval at least %s" %
+                                        (MAX_PROFILE_DURATION, MIN_SAMPLE_INTERVAL)})
+
+        if self.profiler is not None:
+            request.setResponseCode(http.CONFLICT)
+            return json.dumps({"error": "the profiler is already running"})
+
+        # Requests are handled on the reactor thread, which is the thread we want to profile
+        self.profiler = SamplingProfiler(threading.current_thread().ident, interval)
+
+        disconnected = []
+        request.notifyFinish().addErrback(lambda _: disconnected.append(True))
+
+        def on_profiled(collapsed_stacks):
+            if not disconnected:
+                request.setHeader('Content-Type', 'text/plain')
+                request.write(collapsed_stacks)
+                request.finish()
+
+        def on_failure(failure):
+            self._logger.error('Profiler failed: %s', failure.getErrorMessage())
+            if not disconnected:
+                request.setResponseCode(http.INTERNAL_SERVER_ERROR)
+                request.write(json.dumps({"error": "the profiler failed"}))
+                request.finish()
+
+        def on_done(result):
+            self.profiler = None
+            return result
+
+        self.profiler.start(duration).addBoth(on_done).addCallbacks(on_profiled, on_failure)
+        return NOT_DONE_YET
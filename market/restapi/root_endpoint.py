@@ -13,6 +13,11 @@ from market.restapi.mortgages_endpoint import MortgagesEndpoint
 from market.restapi.contracts_endpoint import ContractsEndpoint
 from market.restapi.investments_endpoint import InvestmentsEndpoint
 from market.restapi.blocks_endpoint import BlocksEndpoint
+from market.restapi.events_endpoint import EventsEndpoint
+from market.restapi.export_endpoint import ExportEndpoint
+from market.restapi.metrics_endpoint import MetricsEndpoint
+from market.restapi.orderbook_endpoint import OrderBookEndpoint
+from market.restapi.profiler_endpoint import ProfilerEndpoint
 from market.models.user import Role
 
 
@@ -26,6 +31,9 @@ class APIEndpoint(resource.Resource):
                               "investments": InvestmentsEndpoint,
                               "contracts": ContractsEndpoint,
                               "blocks": BlocksEndpoint,
+                              "events": EventsEndpoint,
+                              "export": ExportEndpoint,
+                              "orderbook": OrderBookEndpoint,
                               "you": YouEndpoint}
         for path, child_cls in child_handler_dict.iteritems():
             self.putChild(path, child_cls(community))
@@ -46,4 +54,6 @@ class RootEndpoint(resource.Resource):
 
         self.putChild('', Redirect('/gui'))
         self.putChild('api', APIEndpoint(community))
+        self.putChild('metrics', MetricsEndpoint(community))
+        self.putChild('profiler', ProfilerEndpoint(community))
         self.putChild('gui', File(os.path.join(BASE_DIR, 'webapp', 'dist')))
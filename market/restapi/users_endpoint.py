@@ -2,6 +2,8 @@ import json
 
 from twisted.web import http, resource
 
+from market.util.cache import VersionedCache
+
 
 def user_to_dict(user, community):
     result = user.to_dict(api_response=True)
@@ -17,6 +19,7 @@ class UsersEndpoint(resource.Resource):
     def __init__(self, community):
         resource.Resource.__init__(self)
         self.community = community
+        self.cache = VersionedCache()
 
     def render_GET(self, request):
         """
@@ -42,8 +45,15 @@ class UsersEndpoint(resource.Resource):
                     }, ...]
                 }
         """
-        return json.dumps({"users": [user_to_dict(user, self.community)
-                                     for user in self.community.data_manager.get_users()]})
+        data_manager = self.community.data_manager
+        user_dicts = self.cache.get('users', data_manager.get_table_versions('user', 'profile'),
+                                    lambda: [(user.id, user.to_dict(api_response=True))
+                                             for user, _ in data_manager.get_users_with_profiles()])
+
+        # Whether a user is online does not depend on the database, so it's not cached
+        users = [dict(user_dict, online=user_id in self.community.id_to_candidate or
+                                        user_id == self.community.my_user_id) for user_id, user_dict in user_dicts]
+        return json.dumps({"users": users})
 
     def getChild(self, path, request):
         return SpecificUserEndpoint(self.community, path)
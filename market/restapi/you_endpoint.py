@@ -4,6 +4,7 @@ import json
 from base64 import urlsafe_b64decode
 from twisted.web import http, resource
 
+from market.models import ObjectType
 from market.models.house import House
 from market.models.investment import Investment, InvestmentStatus
 from market.models.loanrequest import LoanRequest, LoanRequestStatus
@@ -11,6 +12,8 @@ from market.models.mortgage import MortgageStatus, MortgageType
 from market.models.user import Role
 from market.models.profile import Profile
 from market.restapi import split_composite_key
+from market.util.cache import VersionedCache
+from market.util.portfolio import analyse_portfolio
 
 
 class YouEndpoint(resource.Resource):
@@ -27,6 +30,7 @@ class YouEndpoint(resource.Resource):
         self.putChild("mortgages", YouMortgagesEndpoint(community))
         self.putChild("loanrequests", YouLoanRequestsEndpoint(community))
         self.putChild("campaigns", YouCampaignsEndpoint(community))
+        self.putChild("portfolio", YouPortfolioEndpoint(community))
 
     def render_GET(self, request):
         return json.dumps({"you": self.community.data_manager.you.to_dict(api_response=True)})
@@ -235,6 +239,7 @@ class YouInvestmentsEndpoint(resource.Resource):
         you.investments.add(investment)
         campaign.investments.add(investment)
 
+        self.community.lifecycle.tag_action('invest', ObjectType.INVESTMENT, investment.id, investment.user_id)
         self.community.offer_investment(investment)
 
         return json.dumps({"success": True})
@@ -252,7 +257,7 @@ class YouSpecificInvestmentEndpoint(resource.Resource):
 
     def render_PATCH(self, request):
         """
-        Sell an investment
+        Sell an investment, at the given price per unit of its amount (1.0 by default)
         """
         keys = split_composite_key(self.investment_composite_key)
         investment = self.community.data_manager.get_investment(*keys) if keys is not None else None
@@ -275,8 +280,11 @@ class YouSpecificInvestmentEndpoint(resource.Resource):
             request.setResponseCode(http.BAD_REQUEST)
             return json.dumps({"error": "invalid status value"})
 
-        investment.status = InvestmentStatus.FORSALE
-        self.community.send_campaign_update(campaign, investment)
+        try:
+            self.community.sell_investment(investment, campaign, float(parameters.get('price', 1.0)))
+        except (TypeError, ValueError) as e:
+            request.setResponseCode(http.BAD_REQUEST)
+            return json.dumps({"error": str(e)})
 
         return json.dumps({"success": True})
 
@@ -400,6 +408,7 @@ class YouSpecificMortageEndpoint(resource.Resource):
 
         if status == "ACCEPT":
             mortgage.status = MortgageStatus.ACCEPTED
+            self.community.lifecycle.tag_action('accept_mortgage', ObjectType.MORTGAGE, mortgage.id, mortgage.user_id)
             self.community.accept_mortgage(mortgage)
         else:
             mortgage.status = MortgageStatus.REJECTED
@@ -425,3 +434,73 @@ class YouCampaignsEndpoint(resource.Resource):
             campaign_dict['investments'] = [investment.to_dict(api_response=True) for investment in campaign.investments]
             campaigns.append(campaign_dict)
         return json.dumps({"campaigns": campaigns})
+
+
+class YouPortfolioEndpoint(resource.Resource):
+    """
+    This class handles requests regarding the analytics of your portfolio.
+    """
+
+    def __init__(self, community):
+        resource.Resource.__init__(self)
+        self.community = community
+        self.cache = VersionedCache(1)
+
+    def render_GET(self, request):
+        """
+        .. http:get:: /you/portfolio
+
+        A GET request to this endpoint returns the expected cash flows of your positions: the mortgages that you have
+        given as a bank (for the bank amount) and the investments that you own. Next to the analytics per position,
+        the response contains the totals of the portfolio and the principal per bank. See market.util.portfolio for
+        the model that is used.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/you/portfolio
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "portfolio": {
+                        "positions": [{
+                            "type": "INVESTMENT",
+                            "id": 0,
+                            "user_id": "TGliTmFDTFBLOgj_xZe05ZR4e1rx...",
+                            "bank_id": "TGliTmFDTFBLOgmEL13SpuuOSsgM...",
+                            "principal": 9000,
+                            "interest_rate": 4.9,
+                            "mortgage_type": "FIXEDRATE",
+                            "duration": 120,
+                            "default_rate": 1.5,
+                            "monthly_payment": 95.02,
+                            "scheduled_interest": 2402.4,
+                            "expected_interest": 2261.7,
+                            "expected_loss": 635.9,
+                            "default_adjusted_yield": 3.33,
+                            "balance_months": 586420.1
+                        }, ...],
+                        "totals": {
+                            "positions": 12,
+                            "principal": 108000,
+                            "monthly_payment": 1140.24,
+                            "scheduled_interest": 28828.8,
+                            "expected_interest": 27140.4,
+                            "expected_loss": 7630.8,
+                            "expected_return": 19509.6,
+                            "default_adjusted_yield": 3.33,
+                            "balance_months": 7037041.2
+                        },
+                        "exposure": [{"bank_id": "TGliTmFDTFBLOgmEL13SpuuOSsgM...", "principal": 108000}, ...]
+                    }
+                }
+        """
+        data_manager = self.community.data_manager
+        you = data_manager.you
+        return self.cache.get(you.id, data_manager.get_table_versions('mortgage', 'investment', 'campaign'),
+                              lambda: json.dumps({"portfolio": analyse_portfolio(
+                                  data_manager.get_portfolio_positions(you.id))}))
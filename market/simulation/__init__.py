@@ -0,0 +1,4 @@
+"""
+This package contains a simulator that runs many MarketCommunities in a single process, for finding the limits of
+the market before they are reached in production.
+"""
@@ -0,0 +1,31 @@
+import time
+
+from twisted.internet import reactor
+
+
+class VirtualTime(object):
+    """
+    This context manager lets the reactor schedule its timed calls on a twisted.internet.task.Clock, and lets
+    time.time return the time of that clock. Dispersy, the LoopingCalls of the communities and deferLater all use
+    the reactor, so within this context their timers only fire when the clock is advanced. This allows a simulation
+    to run as fast as the nodes can process their work, independent of the speed of the machine.
+
+    Threads are not supported, since calls from other threads still arrive in real time.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.time = None
+
+    def __enter__(self):
+        self.time = time.time
+        reactor.callLater = self.clock.callLater
+        reactor.seconds = self.clock.seconds
+        reactor.getDelayedCalls = self.clock.getDelayedCalls
+        time.time = self.clock.seconds
+        return self.clock
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The attributes only shadow the methods of the reactor, so removing them restores the reactor
+        del reactor.callLater, reactor.seconds, reactor.getDelayedCalls
+        time.time = self.time
@@ -0,0 +1,60 @@
+import time
+
+from market.community.market.community import MarketCommunity
+from market.community.blockchain.community import BLOCK_GENESIS_HASH
+
+
+class NodeStats(object):
+    """
+    This class holds the statistics that are collected by a SimulatedMarketCommunity.
+    """
+
+    def __init__(self):
+        # (block id, time) tuples of the blocks that were created by this node
+        self.blocks_created = []
+        # Block id -> time the block was added to the database of this node
+        self.blocks_processed = {}
+        # Number of blocks that arrived before their previous block
+        self.orphans_received = 0
+        # Number of contracts that have been signed by both parties (counted by the party that started the contract)
+        self.contracts_signed = 0
+        # CPU time spent on creating blocks (the CPU time spent on incoming packets is kept by the endpoint)
+        self.cpu_time = 0
+
+
+class SimulatedMarketCommunity(MarketCommunity):
+    """
+    This class is a MarketCommunity that collects statistics for the simulator.
+    """
+
+    def __init__(self, dispersy, master, my_member):
+        super(SimulatedMarketCommunity, self).__init__(dispersy, master, my_member)
+        self.stats = NodeStats()
+
+    def create_block(self):
+        start = time.clock()
+        block = super(SimulatedMarketCommunity, self).create_block()
+        self.stats.cpu_time += time.clock() - start
+
+        if block is not None:
+            self.stats.blocks_created.append((block.id, time.time()))
+        return block
+
+    def process_block(self, block):
+        result = super(SimulatedMarketCommunity, self).process_block(block)
+        if result and block.id not in self.stats.blocks_processed:
+            self.stats.blocks_processed[block.id] = time.time()
+        return result
+
+    def on_block(self, messages):
+        for message in messages:
+            previous_hash = message.payload.dictionary['block'].get('previous_hash')
+            if previous_hash != BLOCK_GENESIS_HASH and self.data_manager.get_block_header(previous_hash) is None:
+                self.stats.orphans_received += 1
+        super(SimulatedMarketCommunity, self).on_block(messages)
+
+    def finalize_contract(self, contract, sign=False):
+        result = super(SimulatedMarketCommunity, self).finalize_contract(contract, sign)
+        if result and not sign:
+            self.stats.contracts_signed += 1
+        return result
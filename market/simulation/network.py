@@ -0,0 +1,117 @@
+import time
+import random
+
+from twisted.internet import reactor
+
+from dispersy.candidate import Candidate
+from dispersy.endpoint import Endpoint
+
+
+class SimulatedNetwork(object):
+    """
+    This class connects SimulatedEndpoints in memory. Packets are delayed by the uplink of the sender (which is
+    limited by the bandwidth) and the latency (plus some random jitter), and are dropped with a given probability.
+
+    All delays are scheduled on the given clock, which defaults to the reactor. Passing a twisted.internet.task.Clock
+    allows the network to be advanced manually (e.g., in tests).
+    """
+
+    def __init__(self, latency=0.05, jitter=0.01, loss=0.0, bandwidth=None, clock=None, seed=None):
+        """
+        :param latency: one-way delay in seconds
+        :param jitter: maximum random delay in seconds that is added to the latency
+        :param loss: probability that a packet is dropped
+        :param bandwidth: uplink bandwidth of every endpoint in bytes per second, or None for unlimited
+        :param clock: the IReactorTime provider that is used for scheduling deliveries
+        :param seed: seed for the random number generator, which makes runs reproducible
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.bandwidth = bandwidth
+        self.clock = clock or reactor
+        self.random = random.Random(seed)
+
+        self.endpoints = {}
+        self.next_port = 10000
+        self.packets_sent = 0
+        self.packets_lost = 0
+        self.bytes_sent = 0
+
+    def create_endpoint(self):
+        address = ('127.0.0.1', self.next_port)
+        self.next_port += 1
+        endpoint = self.endpoints[address] = SimulatedEndpoint(self, address)
+        return endpoint
+
+    def send(self, source, destination, packet):
+        self.packets_sent += 1
+        self.bytes_sent += len(packet)
+
+        if destination not in self.endpoints or self.random.random() < self.loss:
+            self.packets_lost += 1
+            return
+
+        now = self.clock.seconds()
+        sender = self.endpoints[source]
+        delay = 0
+        if self.bandwidth:
+            # Packets leave the sender one after the other
+            sender.uplink_free_at = max(now, sender.uplink_free_at) + float(len(packet)) / self.bandwidth
+            delay = sender.uplink_free_at - now
+        delay += self.latency + self.random.uniform(0, self.jitter)
+
+        self.clock.callLater(delay, self.deliver, source, destination, packet)
+
+    def deliver(self, source, destination, packet):
+        endpoint = self.endpoints.get(destination)
+        if endpoint is not None and endpoint.is_open:
+            endpoint.receive(source, packet)
+
+
+class SimulatedEndpoint(Endpoint):
+    """
+    This class is a Dispersy endpoint that sends packets over a SimulatedNetwork instead of a socket. It keeps track
+    of the CPU time that Dispersy spends on processing the packets it receives.
+    """
+
+    def __init__(self, network, address):
+        super(SimulatedEndpoint, self).__init__()
+        self.network = network
+        self.address = address
+        self.is_open = False
+        self.uplink_free_at = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.packets_received = 0
+        self.bytes_received = 0
+        self.cpu_time = 0
+
+    def open(self, dispersy):
+        super(SimulatedEndpoint, self).open(dispersy)
+        self.is_open = True
+        return True
+
+    def close(self, timeout=0.0):
+        self.is_open = False
+        return super(SimulatedEndpoint, self).close(timeout)
+
+    def get_address(self):
+        return self.address
+
+    def send(self, candidates, packets, prefix=None):
+        for candidate in candidates:
+            for packet in packets:
+                data = prefix + packet if prefix else packet
+                self.packets_sent += 1
+                self.bytes_sent += len(data)
+                self.network.send(self.address, candidate.sock_addr, data)
+        return True
+
+    def receive(self, source, packet):
+        self.packets_received += 1
+        self.bytes_received += len(packet)
+
+        start = time.clock()
+        self._dispersy.on_incoming_packets([(Candidate(source, False), packet)], True, time.time())
+        self.cpu_time += time.clock() - start
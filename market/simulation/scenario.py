@@ -0,0 +1,169 @@
+import random
+
+from base64 import urlsafe_b64decode
+
+from twisted.internet.task import LoopingCall
+
+from market.models.house import House
+from market.models.investment import Investment, InvestmentStatus
+from market.models.loanrequest import LoanRequest, LoanRequestStatus
+from market.models.mortgage import Mortgage, MortgageType, MortgageStatus
+from market.models.user import Role
+from market.util.events import CAMPAIGN_UPDATED, INVESTMENT_STATUS_CHANGED, LOAN_REQUEST_RECEIVED, \
+    MORTGAGE_STATUS_CHANGED
+
+# Number of banks, investors and borrowers for the predefined scenarios
+SCENARIOS = {
+    'small': (3, 10, 5),
+    'medium': (5, 50, 25),
+    'large': (10, 300, 100)
+}
+
+
+class MarketScenario(object):
+    """
+    This class lets the nodes of a simulation use the market in the same way as users of the webapp would:
+
+    - borrowers periodically send a loan request to a random bank
+    - banks offer a mortgage for every loan request they receive
+    - borrowers accept every mortgage offer
+    - investors offer an investment in every campaign they hear about, until the campaign is funded
+    - banks accept every investment offer that fits in the campaign
+
+    Users respond to events after a random delay of at most response_delay seconds.
+    """
+
+    def __init__(self, simulator, loan_request_interval=60, response_delay=5, investment_amount=25000, seed=None):
+        self.simulator = simulator
+        self.loan_request_interval = loan_request_interval
+        self.response_delay = response_delay
+        self.investment_amount = investment_amount
+        self.random = random.Random(seed)
+        self.running = False
+        self.looping_calls = []
+        self.delayed_calls = []
+        self.observers = []
+        self.loan_requests_sent = 0
+        self.investments_offered = 0
+
+    def start(self):
+        handlers = {Role.FINANCIAL_INSTITUTION: self.on_bank_event,
+                    Role.INVESTOR: self.on_investor_event,
+                    Role.BORROWER: self.on_borrower_event}
+
+        def respond(handler, node, event_type, data):
+            if self.running:
+                handler(node, event_type, data)
+
+        clock = self.simulator.clock
+        self.running = True
+        for node in self.simulator.nodes:
+            observer = lambda event_type, data, node=node, handler=handlers[node.role]: \
+                clock.callLater(self.random.uniform(0, self.response_delay), respond, handler, node, event_type, data)
+            node.community.notifier.add_observer(observer)
+            self.observers.append((node, observer))
+
+            if node.role == Role.BORROWER:
+                looping_call = LoopingCall(self.send_loan_request, node)
+                looping_call.clock = clock
+                # Spread the loan requests of the borrowers over the interval
+                self.delayed_calls.append(clock.callLater(self.random.uniform(0, self.loan_request_interval),
+                                                          looping_call.start, self.loan_request_interval))
+                self.looping_calls.append(looping_call)
+
+    def stop(self):
+        self.running = False
+        for delayed_call in self.delayed_calls:
+            if delayed_call.active():
+                delayed_call.cancel()
+        for looping_call in self.looping_calls:
+            if looping_call.running:
+                looping_call.stop()
+        for node, observer in self.observers:
+            node.community.notifier.remove_observer(observer)
+
+    def send_loan_request(self, node):
+        community = node.community
+        banks = [bank for bank in self.simulator.get_nodes(Role.FINANCIAL_INSTITUTION)
+                 if bank.community.my_user_id in community.id_to_candidate]
+        if not banks:
+            return
+
+        you = community.data_manager.you
+        amount = self.random.randint(10, 50) * 10000
+        house = House(u'%04d%s' % (self.random.randint(1000, 9999), self.random.choice([u'AB', u'CD', u'EF'])),
+                      unicode(self.random.randint(1, 200)), u'Simulated street', amount, u'', u'0123456789',
+                      u'seller@example.org')
+        loan_request = LoanRequest(you.loan_requests.count(), you.id, house, MortgageType.FIXEDRATE,
+                                   self.random.choice(banks).community.my_user_id, u'Simulated loan request', amount,
+                                   LoanRequestStatus.PENDING)
+        you.loan_requests.add(loan_request)
+        community.offer_loan_request(loan_request)
+        self.loan_requests_sent += 1
+
+    def on_bank_event(self, node, event_type, data):
+        community = node.community
+        data_manager = community.data_manager
+
+        if event_type == LOAN_REQUEST_RECEIVED:
+            loan_request = data_manager.get_loan_request(data['loan_request']['id'],
+                                                         urlsafe_b64decode(str(data['loan_request']['user_id'])))
+            if loan_request is None or loan_request.status != LoanRequestStatus.PENDING:
+                return
+
+            loan_request.status = LoanRequestStatus.ACCEPTED
+            user = data_manager.get_user(loan_request.user_id)
+            mortgage = Mortgage(user.mortgages.count(), loan_request.user_id, community.my_user_id,
+                                loan_request.house, loan_request.amount_wanted, loan_request.amount_wanted * 0.5,
+                                loan_request.mortgage_type, 3.5, 4.0, 5.0, 360, u'A', MortgageStatus.PENDING,
+                                loan_request.id, loan_request.user_id)
+            user.mortgages.add(mortgage)
+            community.offer_mortgage(loan_request, mortgage)
+
+        elif event_type == INVESTMENT_STATUS_CHANGED and data['investment']['status'] == 'PENDING':
+            investment = data_manager.get_investment(data['investment']['id'],
+                                                     urlsafe_b64decode(str(data['investment']['user_id'])))
+            if investment is None or investment.status != InvestmentStatus.PENDING:
+                return
+
+            campaign = data_manager.get_campaign(investment.campaign_id, investment.campaign_user_id)
+            if campaign is None:
+                return
+            elif campaign.amount_invested + investment.amount > campaign.amount:
+                investment.status = InvestmentStatus.REJECTED
+                community.reject_investment(investment)
+            else:
+                investment.status = InvestmentStatus.ACCEPTED
+                campaign.amount_invested += investment.amount
+                community.accept_investment(investment)
+
+    def on_borrower_event(self, node, event_type, data):
+        if event_type == MORTGAGE_STATUS_CHANGED and data['mortgage']['status'] == 'PENDING':
+            mortgage = node.community.data_manager.get_mortgage(data['mortgage']['id'],
+                                                                urlsafe_b64decode(str(data['mortgage']['user_id'])))
+            if mortgage is not None and mortgage.status == MortgageStatus.PENDING:
+                mortgage.status = MortgageStatus.ACCEPTED
+                node.community.accept_mortgage(mortgage)
+
+    def on_investor_event(self, node, event_type, data):
+        if event_type != CAMPAIGN_UPDATED:
+            return
+
+        community = node.community
+        data_manager = community.data_manager
+        campaign = data_manager.get_campaign(data['campaign']['id'],
+                                             urlsafe_b64decode(str(data['campaign']['user_id'])))
+        if campaign is None or campaign.completed or campaign.user_id not in community.id_to_candidate:
+            return
+
+        you = data_manager.you
+        if any(investment.user_id == you.id for investment in campaign.investments):
+            return
+
+        amount = min(self.investment_amount, campaign.amount - campaign.amount_invested)
+        investment = Investment(you.investments.count(), you.id, amount, 4.0, campaign.id, campaign.user_id,
+                                InvestmentStatus.PENDING)
+        you.investments.add(investment)
+        campaign.investments.add(investment)
+        community.offer_investment(investment)
+        self.investments_offered += 1
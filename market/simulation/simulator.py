@@ -0,0 +1,382 @@
+"""
+Run a network of MarketCommunities in a single process.
+
+Usage: python -m market.simulation.simulator [--scenario NAME] [--banks N] [--investors N] [--borrowers N]
+                                             [--duration SECONDS] [--latency SECONDS] [--jitter SECONDS]
+                                             [--loss PROBABILITY] [--bandwidth BYTES] [--seed N] [--json FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import resource
+
+from contextlib import contextmanager
+from tempfile import mkdtemp
+
+from twisted.internet import reactor
+from twisted.internet.defer import maybeDeferred
+from twisted.internet.task import Clock
+from twisted.python import log
+from twisted.python.failure import Failure
+
+from dispersy.candidate import Candidate
+from dispersy.crypto import LibNaCLSK
+from dispersy.dispersy import Dispersy
+
+from market import defs
+from market.models.profile import Profile
+from market.models.user import Role
+from market.simulation.clock import VirtualTime
+from market.simulation.community import SimulatedMarketCommunity
+from market.simulation.network import SimulatedNetwork
+from market.simulation.scenario import MarketScenario, SCENARIOS
+
+# Interval in seconds between the walker steps that are taken until every node knows all banks
+BOOTSTRAP_STEP_INTERVAL = 1
+BOOTSTRAP_TIMEOUT = 120
+# Seconds that the nodes get for stopping
+STOP_TIMEOUT = 60
+
+
+def register_verified_bank(name, public_key):
+    """
+    Make the market accept a bank as verifier. Only the banks from market.defs are verified by default, so this
+    is needed for simulating more banks. The tables in market.defs are shared by the whole process, so this should
+    be done within verified_banks().
+    """
+    defs.VERIFIED_BANKS[name] = public_key
+    defs.VERIFIED_BANK_IDS[name] = hashlib.sha256(public_key).digest()
+    defs.VERIFIED_BANK_NAMES[defs.VERIFIED_BANK_IDS[name]] = name
+
+
+def save_verified_banks():
+    return [(table, dict(table)) for table in [defs.VERIFIED_BANKS, defs.VERIFIED_BANK_IDS, defs.VERIFIED_BANK_NAMES]]
+
+
+def restore_verified_banks(saved):
+    # The tables are changed in place, since other modules have imported them
+    for table, contents in saved:
+        table.clear()
+        table.update(contents)
+
+
+@contextmanager
+def verified_banks():
+    """
+    Undo the banks that were registered with register_verified_bank when leaving the context.
+    """
+    saved = save_verified_banks()
+    try:
+        yield
+    finally:
+        restore_verified_banks(saved)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Node(object):
+    """
+    This class represents a single user of the simulated market, with its own Dispersy instance.
+    """
+
+    def __init__(self, role, dispersy, endpoint, community):
+        self.role = role
+        self.dispersy = dispersy
+        self.endpoint = endpoint
+        self.community = community
+
+    @property
+    def cpu_time(self):
+        return self.endpoint.cpu_time + self.community.stats.cpu_time
+
+    @property
+    def database_size(self):
+        data_manager = self.community.data_manager
+        page_count, = data_manager.store.execute('PRAGMA page_count').get_one()
+        page_size, = data_manager.store.execute('PRAGMA page_size').get_one()
+        return page_count * page_size
+
+
+class Simulator(object):
+    """
+    This class creates MarketCommunities that communicate over a SimulatedNetwork, and reports how the network
+    performed (i.e., throughput, block propagation, orphans, and resource usage per node).
+
+    All nodes run in this process, in virtual time. The network should use a twisted.internet.task.Clock, and the
+    simulation should run within a VirtualTime context for that clock, so that the timers of Dispersy and the
+    communities use it as well. The simulator advances the clock from one timed call to the next, so a run takes as
+    long as the nodes need for processing their work, regardless of the simulated duration.
+    """
+
+    def __init__(self, network, working_directory=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.network = network
+        self.clock = network.clock
+        self.working_directory = working_directory or mkdtemp(suffix='_market_simulation')
+        self.nodes = []
+        self.start_time = None
+        self.end_time = None
+
+    def get_nodes(self, role):
+        return [node for node in self.nodes if node.role == role]
+
+    def create_node(self, role):
+        endpoint = self.network.create_endpoint()
+        working_directory = os.path.join(self.working_directory, str(len(self.nodes)))
+        os.makedirs(working_directory)
+
+        dispersy = Dispersy(endpoint, unicode(working_directory), database_filename=u':memory:')
+        dispersy.start(autoload_discovery=False)
+
+        keypair = LibNaCLSK()
+        member = dispersy.get_member(private_key=keypair.key_to_bin())
+        if role == Role.FINANCIAL_INSTITUTION:
+            register_verified_bank('Simulated bank %d' % len(self.get_nodes(role)), member.public_key)
+
+        if self.nodes:
+            head_community = self.nodes[0].community
+            master_member = dispersy.get_member(mid=head_community._master_member.mid)
+            community = SimulatedMarketCommunity.init_community(dispersy, master_member, member, role=role)
+        else:
+            community = SimulatedMarketCommunity.create_community(dispersy, member, role=role)
+        community.candidates.clear()
+        community.my_user.profile = Profile(u'Simulated', u'User %d' % len(self.nodes), u'user@example.org',
+                                            u'NL28RABO0123456789', u'0123456789')
+
+        node = Node(role, dispersy, endpoint, community)
+        self.nodes.append(node)
+        return node
+
+    def create_nodes(self, num_banks, num_investors, num_borrowers):
+        for role, count in [(Role.FINANCIAL_INSTITUTION, num_banks),
+                            (Role.INVESTOR, num_investors),
+                            (Role.BORROWER, num_borrowers)]:
+            for _ in range(count):
+                self.create_node(role)
+
+    def advance(self, seconds, until=None):
+        """
+        Advance the clock by a number of seconds. The timed calls are run one after the other, each at its own time.
+        :param until: a function that stops the clock as soon as it returns True
+        :return: whether the clock was stopped by until
+        """
+        end = self.clock.seconds() + seconds
+        # The clock keeps its calls ordered by time
+        calls = self.clock.getDelayedCalls()
+        while calls and calls[0].getTime() <= end:
+            if until is not None and until():
+                return True
+            self.clock.advance(max(0, calls[0].getTime() - self.clock.seconds()))
+            calls = self.clock.getDelayedCalls()
+
+        if until is not None and until():
+            return True
+        self.clock.advance(end - self.clock.seconds())
+        return False
+
+    def wait(self, deferred, timeout):
+        """
+        Advance the clock until a deferred has fired.
+        :return: the result of the deferred
+        :raises RuntimeError: if the deferred did not fire within timeout seconds
+        """
+        results = []
+        deferred.addBoth(results.append)
+        if not self.advance(timeout, until=lambda: results):
+            raise RuntimeError('Deferred did not fire within %d seconds' % timeout)
+        if isinstance(results[0], Failure):
+            results[0].raiseException()
+        return results[0]
+
+    def bootstrap(self):
+        """
+        Introduce every node to all banks, and wait until every node has exchanged user information with them.
+        """
+        banks = self.get_nodes(Role.FINANCIAL_INSTITUTION)
+        for node in self.nodes:
+            for bank in banks:
+                if bank is not node:
+                    node.community.add_discovered_candidate(Candidate(bank.dispersy.lan_address, False))
+
+        def missing_banks(node):
+            return [bank for bank in banks
+                    if bank is not node and bank.community.my_user_id not in node.community.id_to_candidate]
+
+        for _ in range(BOOTSTRAP_TIMEOUT / BOOTSTRAP_STEP_INTERVAL):
+            waiting = [node for node in self.nodes if missing_banks(node)]
+            if not waiting:
+                break
+            for node in waiting:
+                node.community.take_step()
+            self.advance(BOOTSTRAP_STEP_INTERVAL)
+        else:
+            self.logger.warning('Not all nodes know all banks after %d seconds', BOOTSTRAP_TIMEOUT)
+
+    def run(self, scenario, duration):
+        self.bootstrap()
+
+        self.logger.info('Running scenario for %d seconds', duration)
+        self.start_time = self.clock.seconds()
+        scenario.start()
+        self.advance(duration)
+        scenario.stop()
+        self.end_time = self.clock.seconds()
+
+    def stop(self):
+        for node in self.nodes:
+            self.wait(maybeDeferred(node.dispersy.stop), STOP_TIMEOUT)
+
+    def get_report(self):
+        duration = self.end_time - self.start_time
+        banks = self.get_nodes(Role.FINANCIAL_INSTITUTION)
+
+        # Use the bank with the longest chain as reference for what ended up on the blockchain
+        reference = max(banks, key=lambda node: len(node.community.data_manager.best_chain)) if banks else None
+        best_chain = set(reference.community.data_manager.best_chain) if reference else set()
+
+        blocks_created = {}
+        for node in banks:
+            for block_id, created_at in node.community.stats.blocks_created:
+                if created_at >= self.start_time:
+                    blocks_created[block_id] = created_at
+
+        # Only full nodes (i.e., banks) receive blocks
+        latencies = []
+        for node in banks:
+            for block_id, processed_at in node.community.stats.blocks_processed.iteritems():
+                if block_id in blocks_created and processed_at > blocks_created[block_id]:
+                    latencies.append(processed_at - blocks_created[block_id])
+
+        contracts_on_chain = 0
+        if reference:
+            block_ids = [block_id for block_id in blocks_created if block_id in best_chain]
+            blocks = reference.community.data_manager.get_blocks_by_ids(block_ids, full=False)
+            contracts_on_chain = sum(len(contract_ids) for _, contract_ids in blocks.itervalues())
+
+        stale_blocks = len([block_id for block_id in blocks_created if block_id not in best_chain])
+
+        return {
+            'duration': duration,
+            'nodes': {'banks': len(banks),
+                      'investors': len(self.get_nodes(Role.INVESTOR)),
+                      'borrowers': len(self.get_nodes(Role.BORROWER))},
+            'network': {'packets_sent': self.network.packets_sent,
+                        'packets_lost': self.network.packets_lost,
+                        'bytes_sent': self.network.bytes_sent},
+            'contracts': {'signed': sum(node.community.stats.contracts_signed for node in self.nodes),
+                          'on_chain': contracts_on_chain,
+                          'per_second': contracts_on_chain / duration if duration else 0},
+            'blocks': {'created': len(blocks_created),
+                       'stale': stale_blocks,
+                       'orphan_rate': float(stale_blocks) / len(blocks_created) if blocks_created else 0,
+                       'orphans_received': sum(node.community.stats.orphans_received for node in banks),
+                       'propagation_latency': {'mean': sum(latencies) / len(latencies) if latencies else None,
+                                               'p50': percentile(latencies, 0.5),
+                                               'p95': percentile(latencies, 0.95),
+                                               'max': max(latencies) if latencies else None}},
+            'per_node': [{'role': node.role.name,
+                          'cpu_time': node.cpu_time,
+                          'packets_sent': node.endpoint.packets_sent,
+                          'packets_received': node.endpoint.packets_received,
+                          'incoming_contracts': len(node.community.incoming_contracts),
+                          'incoming_blocks': len(node.community.incoming_blocks),
+                          'database_size': node.database_size} for node in self.nodes],
+            # The nodes share a process, so memory can only be measured as a whole
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        }
+
+
+def print_report(report):
+    print 'Simulated %(banks)d bank(s), %(investors)d investor(s) and %(borrowers)d borrower(s)' % report['nodes'],
+    print 'for %.0f seconds' % report['duration']
+    print 'Network: %(packets_sent)d packets sent, %(packets_lost)d lost, %(bytes_sent)d bytes' % report['network']
+    print 'Contracts: %(signed)d signed, %(on_chain)d on the blockchain (%(per_second).2f/s)' % report['contracts']
+
+    blocks = report['blocks']
+    print 'Blocks: %d created, %d stale (orphan rate %.1f%%), %d received before their previous block' % \
+          (blocks['created'], blocks['stale'], blocks['orphan_rate'] * 100, blocks['orphans_received'])
+    latency = blocks['propagation_latency']
+    if latency['mean'] is not None:
+        print 'Block propagation latency: mean %.3fs, p50 %.3fs, p95 %.3fs, max %.3fs' % \
+              (latency['mean'], latency['p50'], latency['p95'], latency['max'])
+
+    print 'Peak memory usage: %d kB' % report['max_rss_kb']
+    print
+    print '%-4s %-22s %10s %10s %10s %10s %10s %12s' % ('node', 'role', 'cpu (s)', 'sent', 'received',
+                                                       'mempool', 'orphans', 'db (bytes)')
+    for index, node in enumerate(report['per_node']):
+        print '%-4d %-22s %10.2f %10d %10d %10d %10d %12d' % (index, node['role'], node['cpu_time'],
+                                                             node['packets_sent'], node['packets_received'],
+                                                             node['incoming_contracts'], node['incoming_blocks'],
+                                                             node['database_size'])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Simulate a network of MarketCommunities in a single process')
+    parser.add_argument('--scenario', help='Predefined number of nodes', choices=sorted(SCENARIOS), default='small')
+    parser.add_argument('--banks', help='Number of banks (overrides the scenario)', type=int)
+    parser.add_argument('--investors', help='Number of investors (overrides the scenario)', type=int)
+    parser.add_argument('--borrowers', help='Number of borrowers (overrides the scenario)', type=int)
+    parser.add_argument('--duration', help='Duration of the scenario in seconds', type=int, default=300)
+    parser.add_argument('--loan-interval', help='Seconds between loan requests of a borrower', type=int, default=60)
+    parser.add_argument('--latency', help='One-way network latency in seconds', type=float, default=0.05)
+    parser.add_argument('--jitter', help='Maximum additional random latency in seconds', type=float, default=0.01)
+    parser.add_argument('--loss', help='Probability that a packet is lost', type=float, default=0.0)
+    parser.add_argument('--bandwidth', help='Uplink bandwidth per node in bytes/s', type=int)
+    parser.add_argument('--seed', help='Seed for the random number generators', type=int)
+    parser.add_argument('--json', help='Write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    num_banks, num_investors, num_borrowers = SCENARIOS[args.scenario]
+    num_banks = args.banks if args.banks is not None else num_banks
+    num_investors = args.investors if args.investors is not None else num_investors
+    num_borrowers = args.borrowers if args.borrowers is not None else num_borrowers
+
+    logging.basicConfig(level=logging.WARNING)
+    observer = log.PythonLoggingObserver()
+    observer.start()
+
+    if args.seed is not None:
+        # Dispersy and the communities use the global random number generator
+        random.seed(args.seed)
+
+    clock = Clock()
+    # Start at the current time, since the nodes compare the times in messages with the time of the clock
+    clock.advance(time.time())
+    network = SimulatedNetwork(latency=args.latency, jitter=args.jitter, loss=args.loss, bandwidth=args.bandwidth,
+                               clock=clock, seed=args.seed)
+    simulator = Simulator(network)
+    scenario = MarketScenario(simulator, loan_request_interval=args.loan_interval, seed=args.seed)
+
+    def run():
+        try:
+            with verified_banks(), VirtualTime(clock):
+                simulator.create_nodes(num_banks, num_investors, num_borrowers)
+                simulator.run(scenario, args.duration)
+                report = simulator.get_report()
+                simulator.stop()
+
+            print_report(report)
+            if args.json:
+                with open(args.json, 'w') as fp:
+                    json.dump(report, fp, indent=2)
+        finally:
+            reactor.stop()
+
+    reactor.callWhenRunning(run)
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,2 @@
+# This will ensure nose starts the reactor. Do not remove
+from nose.twistedtools import reactor
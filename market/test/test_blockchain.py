@@ -6,7 +6,9 @@ from dispersy.candidate import Candidate
 from dispersy.util import blocking_call_on_reactor_thread
 
 from market.community.market.community import BlockchainCommunity
-from market.community.blockchain.community import BLOCK_GENESIS_HASH
+from market.community.blockchain.community import BLOCK_GENESIS_HASH, MAX_HEADERS_PER_MESSAGE, MAX_PROOF_REQUESTS, \
+    HeaderRequestCache
+from market.community.blockchain.validation import verify_block
 from market.models import ObjectType
 from market.models.contract import Contract
 from market.test.testcommunity import TestCommunity
@@ -160,6 +162,125 @@ class TestBlockchainCommunity(TestCommunity):
             self.assertTrue(db_block)
             self.assertEqual(index + 1, db_block.height)
 
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_header_sync(self):
+        yield self.destroy_community(self.node2)
+
+        # Create more blocks than fit in a single headers message
+        self.set_fixed_difficulty()
+        blocks = [self.node1.create_block() for _ in range(MAX_HEADERS_PER_MESSAGE + 1)]
+
+        # Start a light node
+        node3 = self.create_community(light=True)
+        node3.take_step()
+        yield self.get_next_message(node3, u'dispersy-introduction-request')
+        self.set_fixed_difficulty()
+
+        # Node3 should request the headers in 2 batches
+        node3.send_header_request()
+        yield self.get_next_message(node3, u'headers')
+        yield self.get_next_message(node3, u'headers')
+
+        # Check if all headers are on node3's blockchain
+        for index, block in enumerate(blocks):
+            db_block_index = node3.data_manager.get_block_index(block.id)
+            self.assertTrue(db_block_index)
+            self.assertEqual(index + 1, db_block_index.height)
+            self.assertEqual(node3.data_manager.get_block(block.id).contracts, [])
+
+    @blocking_call_on_reactor_thread
+    def test_header_votes(self):
+        self.set_fixed_difficulty()
+        block1 = self.node1.create_block()
+        block2 = self.node1.create_block()
+
+        node3 = self.create_community(light=True)
+        self.set_fixed_difficulty()
+        agreed = {}
+
+        def check_proof(block):
+            agreed[block.id] = block.id in node3.agreed_headers
+            return True
+        node3.check_proof = check_proof
+
+        # Only the header that was sent by both verifiers is agreed on. A second response from a verifier is ignored.
+        candidate = Candidate(self.node1._dispersy.lan_address, False)
+        cache = HeaderRequestCache(node3, 3)
+        self.assertFalse(cache.add_response('verifier1', candidate, [block1, block2]))
+        self.assertFalse(cache.add_response('verifier1', candidate, [block1]))
+        self.assertFalse(cache.add_response('verifier2', candidate, [block1]))
+        node3.process_headers(cache)
+
+        self.assertEqual(agreed, {block1.id: True, block2.id: False})
+        self.assertEqual(node3.data_manager.get_block_index(block2.id).height, 2)
+        self.assertEqual(node3.agreed_headers, set())
+
+    @blocking_call_on_reactor_thread
+    def test_check_proof(self):
+        self.set_fixed_difficulty()
+        block = self.node1.create_block()
+        self.assertTrue(block)
+
+        # A block without a valid proof passes the stateless checks, but not the checks of the community
+        block.target_difficulty = 1
+        block.sign(self.node1.my_member)
+        self.assertIsNone(verify_block(block))
+        self.assertFalse(self.node2.check_header(block))
+        self.assertFalse(self.node2.check_block(block))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_proof_request(self):
+        yield self.destroy_community(self.node2)
+
+        node3 = self.create_community(light=True)
+        node3.take_step()
+        yield self.get_next_message(node3, u'dispersy-introduction-request')
+
+        # Mine 2 blocks, the first one containing a contract
+        self.set_fixed_difficulty()
+        c1 = self.create_contract(self.node1, node3)
+        self.node1.incoming_contracts[c1.id] = c1
+        self.node1.create_block()
+        self.node1.create_block()
+
+        node3.send_header_request()
+        yield self.get_next_message(node3, u'headers')
+
+        # Node3 should be able to verify the contract using only the block headers
+        contract, confirmations = yield node3.send_proof_request(c1.id)
+        self.assertEqual(contract.id, c1.id)
+        self.assertEqual(confirmations, 1)
+
+        # The proof is stored, so the confirmations can now be determined locally
+        self.assertTrue(node3.data_manager.get_merkle_proof(c1.id))
+        self.assertEqual(node3.find_confirmation_count(c1.id), 1)
+
+        # Finding the end of the chain goes through the verifiers, after which the proof is checked again
+        contract, confirmations = yield node3.find_contract_remote(c1.id)
+        self.assertEqual(contract.id, c1.id)
+        self.assertEqual(confirmations, 1)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_update_proofs(self):
+        contract_ids = []
+        for i in range(MAX_PROOF_REQUESTS + 3):
+            self.document = 'CONTRACT%d' % i
+            contract = self.create_contract(self.node1, self.node2)
+            contract_ids.append(contract.id)
+            yield self.node1.data_manager.add_contract(contract)
+
+        requested = []
+        self.node1.send_proof_request = requested.append
+
+        # Contracts that have not been requested before should go first, so that every contract gets its turn
+        self.node1.update_proofs()
+        self.node1.update_proofs()
+        self.assertEqual(len(requested), 2 * MAX_PROOF_REQUESTS)
+        self.assertEqual(set(requested), set(contract_ids))
+
     def set_fixed_difficulty(self):
         for community in self.communities:
             def get_next_difficulty(c, b):
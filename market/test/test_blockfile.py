@@ -0,0 +1,198 @@
+import os
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.archive import BlockArchive
+from market.database.blockfile import BlockFileStore, MmapIndex, INDEX_INITIAL_SLOTS
+from market.database.datamanager import BlockchainDataManager
+from market.models import ObjectType
+from market.models.block_index import BlockIndex
+from market.test.util import create_block, create_contract
+
+
+def create_chain_block(previous_hash='', contracts=2):
+    # The contracts of blocks with different parents have different documents, and therefore different ids
+    return create_block([create_contract('CONTRACT %s %d' % (previous_hash.encode('hex'), i))
+                         for i in range(contracts)], previous_hash)
+
+
+class TestMmapIndex(unittest.TestCase):
+
+    def test_add_get(self):
+        filename = os.path.join(mkdtemp(), 'index.dat')
+        index = MmapIndex(filename)
+        keys = [chr(i % 256) * 31 + chr(i / 256) for i in range(INDEX_INITIAL_SLOTS)]
+        for i, key in enumerate(keys):
+            self.assertTrue(index.add(key, 0, i, 1))
+        self.assertFalse(index.add(keys[0], 1, 1, 1))
+
+        # The index should have grown, and survive being reopened
+        self.assertGreater(index.slots, INDEX_INITIAL_SLOTS)
+        index.close()
+        index = MmapIndex(filename)
+        self.assertEqual(index.entries, len(keys))
+        self.assertEqual(index.get(keys[10]), (0, 10, 1, 0xffff))
+        self.assertIsNone(index.get('\xff' * 32))
+        index.close()
+
+    def test_grow(self):
+        filename = os.path.join(mkdtemp(), 'index.dat')
+        index = MmapIndex(filename)
+        keys = [chr(i) * 32 for i in range(10)]
+        for i, key in enumerate(keys):
+            index.add(key, 0, i, 1, i)
+
+        # A table that was left behind by an interrupted grow should be replaced
+        with open(filename + '.tmp', 'wb') as fp:
+            fp.write('garbage')
+
+        index.grow()
+        self.assertEqual(index.slots, INDEX_INITIAL_SLOTS * 2)
+        self.assertFalse(os.path.exists(filename + '.tmp'))
+        index.close()
+        index = MmapIndex(filename)
+        self.assertEqual(index.entries, len(keys))
+        self.assertEqual(sorted(index.iteritems()), [(key, (0, i, 1, i)) for i, key in enumerate(keys)])
+        index.close()
+
+
+class TestBlockFileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(mkdtemp(), 'blocks')
+
+    def test_add_get(self):
+        store = BlockFileStore(self.directory, segment_size=1024)
+        blocks = [create_chain_block(chr(i) * 32) for i in range(10)]
+        for block in blocks:
+            self.assertTrue(store.add_block(block))
+        self.assertFalse(store.add_block(blocks[0]))
+
+        # Small segments should have caused the blocks to be spread over multiple files
+        self.assertGreater(store.segment, 0)
+        store.close()
+
+        store = BlockFileStore(self.directory, segment_size=1024)
+        for block in blocks:
+            self.assertEqual(store.get_block(block.id).id, block.id)
+            self.assertEqual(store.get_block_dict(block.id), block.to_dict())
+            self.assertEqual(store.get_contract(block.contracts[1].id).to_dict(), block.contracts[1].to_dict())
+        self.assertIsNone(store.get_block(blocks[0].contracts[0].id))
+        self.assertIsNone(store.get_contract(blocks[0].id))
+        self.assertIsNone(store.get_block('unknown'.ljust(32)))
+        store.close()
+
+    def test_truncated(self):
+        store = BlockFileStore(self.directory)
+        block = create_chain_block()
+        store.add_block(block)
+        store.close()
+
+        # A block that has been indexed but not completely written should not be returned
+        filename = os.path.join(self.directory, 'blk00000.dat')
+        with open(filename, 'r+b') as fp:
+            fp.truncate(os.path.getsize(filename) - 1)
+        store = BlockFileStore(self.directory)
+        self.assertIsNone(store.get_block(block.id))
+        store.close()
+
+
+class TestBlockFileDataManager(trial_unittest.TestCase):
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_block_files(self):
+        database_fn = os.path.join(mkdtemp(), 'market.db')
+        data_manager = BlockchainDataManager(database_fn, block_files=True)
+        data_manager.initialize()
+        block = create_chain_block()
+        data_manager.add_block(block)
+        yield data_manager.close()
+
+        self.assertTrue(os.path.exists(os.path.join(os.path.dirname(database_fn), 'market-blocks', 'index.dat')))
+        data_manager = BlockchainDataManager(database_fn, block_files=True)
+        data_manager.initialize()
+        self.assertEqual(data_manager.get_block(block.id).id, block.id)
+        self.assertEqual(data_manager.get_block_dict(block.id), block.to_dict())
+        self.assertEqual(data_manager.get_contract(block.contracts[0].id).id, block.contracts[0].id)
+        header, contracts = data_manager.get_blocks_by_ids([block.id])[block.id]
+        self.assertEqual(header.id, block.id)
+        self.assertEqual([c.id for c in contracts], [c.id for c in block.contracts])
+        yield data_manager.close()
+
+
+class TestBlockArchive(trial_unittest.TestCase):
+
+    def test_compressed(self):
+        directory = mkdtemp()
+        archive = BlockArchive(os.path.join(directory, 'archive'))
+        store = BlockFileStore(os.path.join(directory, 'blocks'))
+        block = create_chain_block(contracts=10)
+        archive.add_block(block)
+        store.add_block(block)
+        self.assertTrue(archive.contains(block.id))
+        self.assertLess(len(archive.get_block_data(block.id)), len(store.get_block_data(block.id)))
+        self.assertEqual(archive.get_block_dict(block.id), block.to_dict())
+        archive.close()
+        store.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_archive_blocks(self):
+        database_fn = os.path.join(mkdtemp(), 'market.db')
+        data_manager = BlockchainDataManager(database_fn, hot_blocks=1)
+        data_manager.initialize()
+        blocks = []
+        for height in range(1, 4):
+            blocks.append(create_chain_block(blocks[-1].id if blocks else ''))
+            yield data_manager.add_block(blocks[-1])
+            yield data_manager.add_block_index(BlockIndex(blocks[-1].id, height))
+        data_manager.commit()
+
+        # Only the blocks that are more than 1 block below the top should be moved
+        self.assertEqual(data_manager.archive_blocks(), 2)
+        self.assertEqual(data_manager.archive_blocks(), 0)
+        yield data_manager.close()
+
+        data_manager = BlockchainDataManager(database_fn, hot_blocks=1)
+        data_manager.initialize()
+        self.assertEqual(data_manager.archived_height, 2)
+        self.assertEqual(data_manager.store.execute('SELECT COUNT(*) FROM block').get_one()[0], 1)
+        self.assertEqual(data_manager.store.execute('SELECT COUNT(*) FROM contract').get_one()[0], 2)
+
+        # Archived blocks and contracts should still be available
+        archived = blocks[0]
+        contract = archived.contracts[0]
+        self.assertEqual(data_manager.get_block(archived.id).id, archived.id)
+        self.assertEqual(data_manager.get_block_dict(archived.id), archived.to_dict())
+        self.assertEqual(data_manager.get_block_header(archived.id).previous_hash, archived.previous_hash)
+        self.assertEqual(data_manager.get_blocks_by_ids([archived.id])[archived.id][0].id, archived.id)
+        self.assertEqual(data_manager.get_contract(contract.id).document, contract.document)
+        self.assertEqual(data_manager.get_contract_header(contract.id).type, ObjectType.MORTGAGE)
+        self.assertEqual(data_manager.get_blockchain_block_id(contract.id), archived.id)
+        self.assertIn(contract.id, data_manager.get_contract_ids_by_previous_hash(''))
+        self.assertEqual(len(data_manager.get_best_chain_contracts(ObjectType.MORTGAGE)), 6)
+        self.assertEqual(len(data_manager.get_archived_contracts_to('to')), 4)
+
+        # After a reorg, the blocks on the new best chain can be archived again
+        data_manager.remove_block_indexes(2)
+        self.assertEqual(data_manager.archived_height, 1)
+        yield data_manager.close()
+
+        # Without hot_blocks no blocks are archived, but the blocks that have been archived should remain readable
+        data_manager = BlockchainDataManager(database_fn)
+        data_manager.initialize()
+        self.assertEqual(data_manager.archive_blocks(), 0)
+        self.assertEqual(data_manager.get_block_dict(archived.id), archived.to_dict())
+        self.assertEqual(data_manager.get_contract(contract.id).document, contract.document)
+        yield data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
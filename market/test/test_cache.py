@@ -0,0 +1,119 @@
+import os
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import BlockchainDataManager
+from market.models import ObjectType
+from market.models.contract import Contract, decoded_documents
+from market.models.house import House
+from market.models.merkle_proof import MerkleProof
+from market.models.mortgage import Mortgage, MortgageStatus, MortgageType
+from market.util.cache import LRUCache, VersionedCache
+
+
+class TestVersionedCache(unittest.TestCase):
+
+    def test_get(self):
+        cache = VersionedCache()
+        self.assertEqual(cache.get('key', 1, lambda: 'value'), 'value')
+        self.assertEqual(cache.get('key', 1, lambda: 'other'), 'value')
+
+        # A new version should replace the cached value
+        self.assertEqual(cache.get('key', 2, lambda: 'other'), 'other')
+
+    def test_max_entries(self):
+        cache = VersionedCache(max_entries=2)
+        cache.get('key1', 1, lambda: 'value1')
+        cache.get('key2', 1, lambda: 'value2')
+        cache.get('key1', 1, lambda: 'other')
+        cache.get('key3', 1, lambda: 'value3')
+
+        # The least recently used entry should have been removed
+        self.assertEqual(cache.entries.keys(), ['key1', 'key3'])
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get(self):
+        cache = LRUCache(2)
+        self.assertEqual(cache.get('key1', lambda: 'value1'), 'value1')
+        self.assertEqual(cache.get('key1', lambda: 'other'), 'value1')
+
+    def test_eviction(self):
+        created = []
+
+        def create(value):
+            created.append(value)
+            return value
+
+        cache = LRUCache(2)
+        cache.get('key1', lambda: create('value1'))
+        cache.get('key2', lambda: create('value2'))
+        cache.get('key1', lambda: create('other'))
+        cache.get('key3', lambda: create('value3'))
+
+        # The least recently used value should have been removed, and is created again when needed
+        self.assertEqual(cache.entries.keys(), ['key1', 'key3'])
+        self.assertEqual(cache.get('key2', lambda: create('value2')), 'value2')
+        self.assertEqual(created, ['value1', 'value2', 'value3', 'value2'])
+
+
+class TestDecodedDocuments(unittest.TestCase):
+
+    def create_contract(self):
+        house = House(u'1234AB', u'1', u'Address', 200000, u'url', u'phone', u'email')
+        mortgage = Mortgage(0, 'user', 'bank', house, 200000, 100000, MortgageType.FIXEDRATE, 2.5, 3.5, 4.5, 30,
+                            u'A', MortgageStatus.ACCEPTED, 0, 'user')
+        contract = Contract()
+        contract.document = mortgage.to_bin()
+        contract.type = ObjectType.MORTGAGE
+        return contract
+
+    def test_shared(self):
+        decoded_documents.clear()
+        contract1, contract2 = self.create_contract(), self.create_contract()
+        self.assertIs(contract1.get_decoded_document(), contract2.get_decoded_document())
+        self.assertEqual(len(decoded_documents.entries), 1)
+
+    def test_api_dict_copy(self):
+        contract = self.create_contract()
+        api_dict = contract.get_decoded_document().api_dict
+        api_dict['house']['postal_code'] = u'9999ZZ'
+        api_dict['id'] = 1
+
+        # Changing the dictionary should not affect the cached document
+        self.assertEqual(self.create_contract().get_decoded_document().api_dict['house']['postal_code'], u'1234AB')
+        self.assertEqual(self.create_contract().get_decoded_document().api_dict['id'], 0)
+
+
+class TestTableVersions(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = BlockchainDataManager(os.path.join(mkdtemp(), 'market.db'))
+        self.data_manager.initialize()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_table_versions(self):
+        version = self.data_manager.get_table_versions('merkle_proof')
+        self.data_manager.add_merkle_proof(MerkleProof('contract', 'block', []))
+        self.assertNotEqual(self.data_manager.get_table_versions('merkle_proof'), version)
+
+        # Without changes the version should remain the same
+        version = self.data_manager.get_table_versions('merkle_proof')
+        self.data_manager.commit()
+        self.assertEqual(self.data_manager.get_table_versions('merkle_proof'), version)
+
+        self.data_manager.get_merkle_proof('contract').block_id = 'other'
+        self.assertNotEqual(self.data_manager.get_table_versions('merkle_proof'), version)
+        yield self.data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
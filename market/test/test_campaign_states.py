@@ -0,0 +1,110 @@
+import unittest
+
+from collections import namedtuple
+
+from market.community.market.campaignstates import CampaignStates, MAX_CLOCK_DRIFT, SOLD_INVESTMENT_LIFETIME
+from market.models.investment import InvestmentStatus
+
+Payload = namedtuple('Payload', ['dictionary'])
+
+
+class FakeMessage(object):
+
+    def __init__(self, dictionary):
+        self.payload = Payload(dictionary)
+
+
+def create_update(campaign_id, sequence_number, end_time=1000, investment=None):
+    dictionary = {'campaign': {'id': campaign_id, 'user_id': 'bank', 'end_time': end_time},
+                  'mortgage': {},
+                  'sequence_number': sequence_number}
+    if investment is not None:
+        dictionary['investment'] = investment
+    return FakeMessage(dictionary)
+
+
+class TestCampaignStates(unittest.TestCase):
+
+    def setUp(self):
+        self.time = 100
+        self.states = CampaignStates(max_states=5, clock=lambda: self.time)
+
+    def test_update(self):
+        self.assertTrue(self.states.update(create_update(1, 5)))
+        self.assertFalse(self.states.update(create_update(1, 5)))
+        self.assertFalse(self.states.update(create_update(1, 4)))
+        newer = create_update(1, 6)
+        self.assertTrue(self.states.update(newer))
+        self.assertEqual(self.states.states.values(), [(6, newer)])
+
+        # Investments for sale are kept separately from their campaign
+        self.assertTrue(self.states.update(create_update(1, 1, investment={'id': 1, 'user_id': 'investor',
+                                                                           'status': InvestmentStatus.FORSALE.value})))
+        self.assertEqual(len(self.states.states), 2)
+
+    def test_next_sequence_number(self):
+        key = CampaignStates.get_key(create_update(1, 0).payload.dictionary)
+        self.assertEqual(self.states.next_sequence_number(key), 100000)
+        self.states.update(create_update(1, 200000))
+        self.assertEqual(self.states.next_sequence_number(key), 200001)
+
+    def test_future_sequence_number(self):
+        self.assertFalse(self.states.update(create_update(1, (100 + MAX_CLOCK_DRIFT) * 1000 + 1)))
+        self.assertEqual(self.states.states, {})
+
+        # Once the clock has caught up, the update is accepted
+        self.time = 101
+        self.assertTrue(self.states.update(create_update(1, (100 + MAX_CLOCK_DRIFT) * 1000 + 1)))
+
+    def test_signed_by_owner(self):
+        dictionary = create_update(1, 5).payload.dictionary
+        self.assertTrue(CampaignStates.is_signed_by_owner(dictionary, 'bank'))
+        self.assertFalse(CampaignStates.is_signed_by_owner(dictionary, 'investor'))
+
+        # Investments can be offered by the investor, or by the user that bought the investment from them
+        dictionary = create_update(1, 5, investment={'id': 1, 'user_id': 'investor',
+                                                     'status': InvestmentStatus.FORSALE.value}).payload.dictionary
+        self.assertTrue(CampaignStates.is_signed_by_owner(dictionary, 'investor'))
+        self.assertFalse(CampaignStates.is_signed_by_owner(dictionary, 'bank'))
+        self.assertTrue(CampaignStates.is_signed_by_owner(dictionary, 'buyer', owner_id='buyer'))
+        self.assertFalse(CampaignStates.is_signed_by_owner(dictionary, 'investor', owner_id='buyer'))
+
+    def test_expired(self):
+        self.assertFalse(self.states.update(create_update(1, 5, end_time=99)))
+
+        sold = {'id': 1, 'user_id': 'investor', 'status': InvestmentStatus.ACCEPTED.value}
+        self.assertTrue(self.states.update(create_update(1, 100000, investment=sold)))
+        self.assertTrue(self.states.update(create_update(2, 5, end_time=200)))
+        self.time = 201
+        self.states.remove_expired()
+        self.assertEqual(len(self.states.states), 1)
+        self.time = 100 + SOLD_INVESTMENT_LIFETIME + 1
+        self.states.remove_expired()
+        self.assertEqual(self.states.states, {})
+
+    def test_bounded(self):
+        for campaign_id in range(10):
+            self.states.update(create_update(campaign_id, 1))
+        self.assertEqual(len(self.states.states), 5)
+
+    def test_sync(self):
+        for campaign_id in range(5):
+            self.states.update(create_update(campaign_id, 1))
+        ranges = self.states.get_sync_ranges(states_per_message=2)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], '')
+        self.assertEqual(ranges[-1][1], '')
+        for (_, upper, _), (lower, _, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(upper, lower)
+
+        # A peer without any state gets everything, a peer with the same state gets nothing
+        peer = CampaignStates()
+        lower, upper, sequence_numbers = peer.get_sync_ranges()[0]
+        self.assertEqual(len(self.states.get_newer_messages(lower, upper, sequence_numbers, 10)), 5)
+        self.assertEqual(len(self.states.get_newer_messages(lower, upper, sequence_numbers, 2)), 2)
+        for lower, upper, sequence_numbers in ranges:
+            self.assertEqual(self.states.get_newer_messages(lower, upper, sequence_numbers, 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
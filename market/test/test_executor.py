@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import BlockchainDataManager
+from market.database.executor import DatabaseExecutor
+from market.models.block_index import BlockIndex
+from market.test.util import create_block
+
+
+class TestDatabaseExecutor(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.database_fn = os.path.join(mkdtemp(), 'test.db')
+        self.executor = DatabaseExecutor(self.database_fn, ['CREATE TABLE test(key TEXT, value INTEGER)'])
+        self.executor.start()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_group_commit(self):
+        deferreds = [self.executor.execute('INSERT INTO test VALUES (?, ?)', ('key%d' % i, i)) for i in range(10)]
+        yield self.executor.flush()
+
+        # All writes should have been committed
+        for deferred in deferreds:
+            self.assertTrue(deferred.called)
+        connection = sqlite3.connect(self.database_fn)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM test').fetchone()[0], 10)
+
+        yield self.executor.stop()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_failing_write(self):
+        deferred = self.executor.execute('INSERT INTO unknown VALUES (?)', (1,))
+        yield self.assertFailure(deferred, sqlite3.Error)
+
+        # Other writes should not be affected
+        yield self.executor.execute('INSERT INTO test VALUES (?, ?)', ('key', 1))
+        yield self.executor.stop()
+
+        connection = sqlite3.connect(self.database_fn)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM test').fetchone()[0], 1)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_partial_write(self):
+        def insert_and_fail(cursor, error):
+            cursor.execute('INSERT INTO test VALUES (?, ?)', ('partial', 2))
+            raise error
+
+        # The statements of a failing write should be rolled back, whatever the exception
+        deferred1 = self.executor.run(insert_and_fail, sqlite3.IntegrityError())
+        deferred2 = self.executor.run(insert_and_fail, ValueError())
+        deferred3 = self.executor.execute('INSERT INTO test VALUES (?, ?)', ('key', 1))
+        yield self.assertFailure(deferred1, sqlite3.IntegrityError)
+        yield self.assertFailure(deferred2, ValueError)
+        yield deferred3
+        yield self.executor.stop()
+
+        connection = sqlite3.connect(self.database_fn)
+        self.assertEqual(connection.execute('SELECT value FROM test').fetchall(), [(1,)])
+
+
+class TestBlockchainDataManager(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.database_fn = os.path.join(mkdtemp(), 'market.db')
+        self.data_manager = BlockchainDataManager(self.database_fn)
+        self.data_manager.initialize()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_pending_writes(self):
+        block = create_block()
+        contract = block.contracts[0]
+        deferred = self.data_manager.add_block(block)
+        self.data_manager.add_block_index(BlockIndex(block.id, 1))
+
+        # The block should be available before the executor has written it
+        self.assertEqual(self.data_manager.get_block(block.id), block)
+        self.assertEqual(self.data_manager.get_contract(contract.id), contract)
+        self.assertTrue(self.data_manager.contract_on_blockchain(contract.id))
+
+        yield deferred
+        self.data_manager.commit()
+
+        # After committing, the block should be read from the database
+        self.assertFalse(self.data_manager.pending_blocks)
+        self.assertEqual(self.data_manager.get_block(block.id).id, block.id)
+        self.assertEqual(self.data_manager.get_contract(contract.id).id, contract.id)
+        self.assertTrue(self.data_manager.contract_on_blockchain(contract.id))
+
+        yield self.data_manager.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_best_chain_persisted(self):
+        block = create_block()
+        self.data_manager.add_block(block)
+        self.data_manager.add_block_index(BlockIndex(block.id, 1))
+        yield self.data_manager.close()
+
+        data_manager = BlockchainDataManager(self.database_fn)
+        data_manager.initialize()
+        self.assertEqual(data_manager.get_block_indexes(limit=1)[0].block_id, block.id)
+        self.assertEqual(data_manager.get_block_index(block.id).height, 1)
+        yield data_manager.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_migrate_tables(self):
+        yield self.data_manager.close()
+
+        # Without an executor, the blockchain tables are stored in the main database, as they used to be
+        database_fn = os.path.join(mkdtemp(), 'market.db')
+        data_manager = BlockchainDataManager(database_fn, threaded=False)
+        data_manager.initialize()
+        block = create_block()
+        block_id = block.id
+        yield data_manager.add_block(block)
+        yield data_manager.add_block_index(BlockIndex(block_id, 1))
+        yield data_manager.close()
+
+        self.data_manager = BlockchainDataManager(database_fn)
+        self.data_manager.initialize()
+        self.assertEqual(self.data_manager.get_block_index(block_id).height, 1)
+        self.assertEqual(self.data_manager.get_block(block_id).id, block_id)
+        self.assertEqual(self.data_manager.store.execute("SELECT COUNT(*) FROM main.sqlite_master "
+                                                         "WHERE name = 'block'").get_one()[0], 0)
+
+        # Blocks that are written by the executor should be visible after the migration
+        new_block = create_block()
+        new_block.previous_hash = block_id
+        yield self.data_manager.add_block(new_block)
+        self.data_manager.commit()
+        self.assertEqual(self.data_manager.get_block_header(new_block.id).previous_hash, block_id)
+        yield self.data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
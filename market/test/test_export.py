@@ -0,0 +1,74 @@
+import os
+import json
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import MarketDataManager
+from market.database.export import MarketExporter, parse_cursor, parse_sections
+from market.models.block_index import BlockIndex
+from market.models.campaign import Campaign
+from market.models.house import House
+from market.models.mortgage import Mortgage, MortgageStatus, MortgageType
+from market.models.user import Role
+from market.test.util import create_block, create_contract
+
+
+class TestMarketExporter(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = MarketDataManager(os.path.join(mkdtemp(), 'market.db'))
+        self.data_manager.initialize('user', Role.BORROWER)
+        self.blocks = []
+
+        for mortgage_id in range(3):
+            house = House(u'1234AB', unicode(mortgage_id), u'Address', 200000, u'url', u'phone', u'email')
+            mortgage = Mortgage(mortgage_id, 'user', 'bank', house, 200000, 100000, MortgageType.FIXEDRATE, 2.5, 3.5,
+                                4.5, 30, u'A', MortgageStatus.ACCEPTED, mortgage_id, 'user')
+            self.data_manager.store.add(mortgage)
+            self.data_manager.store.add(Campaign(mortgage_id, 'bank', mortgage_id, 'user', 100000, 0, 0))
+            self.blocks.append(create_block([create_contract(mortgage.to_bin())],
+                                            self.blocks[-1].id if self.blocks else ''))
+
+    @inlineCallbacks
+    def add_blocks(self):
+        for height, block in enumerate(self.blocks, 1):
+            yield self.data_manager.add_block(block)
+            yield self.data_manager.add_block_index(BlockIndex(block.id, height))
+        self.data_manager.commit()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_export(self):
+        yield self.add_blocks()
+        exporter = MarketExporter(self.data_manager, batch_size=2)
+        records = [json.loads(line) for line in exporter.get_lines()]
+        self.assertEqual([record['type'] for record in records], ['block'] * 3 + ['mortgage'] * 3 + ['campaign'] * 3)
+        self.assertEqual([record['block']['height'] for record in records[:3]], [1, 2, 3])
+        self.assertEqual(records[0]['block']['contracts'][0]['decoded']['id'], 0)
+        self.assertEqual([record['campaign']['id'] for record in records[6:]], [0, 1, 2])
+
+        # Resuming from a cursor should continue after the record with that cursor
+        for i, record in enumerate(records):
+            self.assertEqual([json.loads(line) for line in exporter.get_lines(record['cursor'])], records[i + 1:])
+
+        exporter = MarketExporter(self.data_manager, parse_sections('campaigns,blocks'))
+        self.assertEqual([json.loads(line)['type'] for line in exporter.get_lines(records[4]['cursor'])],
+                         ['campaign'] * 3)
+        yield self.data_manager.close()
+
+    def test_parse(self):
+        self.assertEqual(parse_cursor('blocks:10'), ('blocks', 10))
+        self.assertEqual(parse_cursor('campaigns:1:YmFuaw=='), ('campaigns', (1, 'bank')))
+        self.assertRaises(ValueError, parse_cursor, 'blocks:')
+        self.assertRaises(ValueError, parse_cursor, 'users:1:YmFuaw==')
+        self.assertRaises(ValueError, parse_sections, 'blocks,users')
+
+
+if __name__ == "__main__":
+    unittest.main()
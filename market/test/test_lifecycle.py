@@ -0,0 +1,82 @@
+import unittest
+
+from collections import namedtuple
+
+from market.community.blockchain.lifecycle import LifecycleTracker, BEGIN, BLOCK, CONFIRMED, MEMPOOL, \
+    SIGNATURE_REQUEST, get_percentiles
+from market.models import ObjectType
+
+Document = namedtuple('Document', ['id', 'user_id'])
+
+
+class FakeContract(object):
+
+    def __init__(self, contract_id, contract_type=ObjectType.MORTGAGE, obj=None):
+        self.id = contract_id
+        self.type = contract_type
+        self.obj = obj
+
+    def get_object(self):
+        return self.obj
+
+
+class TestLifecycleTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.time = 100
+        self.tracker = LifecycleTracker(max_contracts=2, confirmations=2, clock=lambda: self.time)
+
+    def test_stages(self):
+        contract = FakeContract('c1')
+        self.tracker.record(contract, BEGIN)
+        self.time = 101
+        self.tracker.record(contract, MEMPOOL)
+        self.time = 102
+        # Only the first time a stage is reached counts
+        self.tracker.record(contract, MEMPOOL)
+        self.tracker.record_block('c1', 10)
+        self.tracker.update_height(11)
+        self.assertNotIn(CONFIRMED, self.tracker.lifecycles['c1'].times)
+        self.time = 110
+        self.tracker.update_height(12)
+
+        statistics = self.tracker.get_statistics()
+        self.assertEqual(statistics['contracts'], 1)
+        self.assertEqual(statistics['stages'][MEMPOOL]['p50'], 1)
+        self.assertEqual(statistics['stages'][BLOCK]['p50'], 1)
+        self.assertEqual(statistics['stages'][CONFIRMED]['p50'], 8)
+        self.assertNotIn(BEGIN, statistics['stages'])
+        self.assertEqual(self.tracker.in_block, {})
+
+    def test_remove_block(self):
+        self.tracker.record(FakeContract('c1'), MEMPOOL)
+        self.tracker.record_block('c1', 10)
+        self.tracker.remove_block('c1')
+        self.tracker.update_height(20)
+        self.assertNotIn(CONFIRMED, self.tracker.lifecycles['c1'].times)
+        self.assertFalse(self.tracker.record_block('unknown', 10))
+
+    def test_action(self):
+        self.tracker.tag_action('accept_mortgage', ObjectType.MORTGAGE, 1, 'user')
+        self.time = 103
+        self.tracker.record(FakeContract('c1', obj=Document(1, 'user')), SIGNATURE_REQUEST)
+
+        statistics = self.tracker.get_statistics()
+        self.assertEqual(statistics['actions']['accept_mortgage'][SIGNATURE_REQUEST]['max'], 3)
+        self.assertEqual(self.tracker.actions, {})
+
+    def test_bounded(self):
+        for contract_id in ['c1', 'c2', 'c3']:
+            self.tracker.record(FakeContract(contract_id), MEMPOOL)
+            self.tracker.record_block(contract_id, 10)
+        self.assertEqual(self.tracker.lifecycles.keys(), ['c2', 'c3'])
+        self.assertEqual(sorted(self.tracker.in_block), ['c2', 'c3'])
+
+    def test_get_percentiles(self):
+        percentiles = get_percentiles(range(1, 101))
+        self.assertEqual(percentiles, {'count': 100, 'p50': 50, 'p90': 90, 'p99': 99, 'max': 100})
+        self.assertEqual(get_percentiles([5])['p50'], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
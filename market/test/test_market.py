@@ -1,10 +1,15 @@
+import time
 import unittest
 
 from twisted.internet.defer import inlineCallbacks
 
 from dispersy.util import blocking_call_on_reactor_thread
 
-from market.community.market.community import MarketCommunity
+from market.community.market.community import MarketCommunity, PENDING_TRADE_TIMEOUT
+from market.community.market.funding import FundingTotals
+from market.community.market.orderbook import Side
+from market.models import ObjectType
+from market.models.contract import Contract
 from market.models.user import Role
 from market.models.profile import Profile
 from market.models.loanrequest import LoanRequest, LoanRequestStatus
@@ -14,6 +19,7 @@ from market.models.investment import Investment, InvestmentStatus
 from market.models.campaign import Campaign
 from market.models.transfer import TransferStatus, Transfer
 from market.test.testcommunity import TestCommunity
+from market.util.events import LOAN_REQUEST_RECEIVED, LOAN_REQUEST_STATUS_CHANGED
 
 
 class TestMarketCommunity(TestCommunity):
@@ -103,6 +109,24 @@ class TestMarketCommunity(TestCommunity):
         yield self.get_next_message(self.node1, u'reject')
         self.assertEqual(loan_request.status, LoanRequestStatus.REJECTED)
 
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_loan_request_events(self):
+        events1 = []
+        events2 = []
+        self.node1.notifier.add_observer(lambda event_type, data: events1.append((event_type, data)))
+        self.node2.notifier.add_observer(lambda event_type, data: events2.append((event_type, data)))
+
+        loan_request = self.create_loan_request(self.node1, self.node1.my_user_id, self.node2.my_user_id)
+        self.node1.offer_loan_request(loan_request)
+        yield self.get_next_message(self.node2, u'offer')
+        self.assertEqual(events2, [(LOAN_REQUEST_RECEIVED, {'loan_request': loan_request.to_dict(api_response=True)})])
+
+        self.node2.reject_loan_request(loan_request)
+        yield self.get_next_message(self.node1, u'reject')
+        self.assertEqual(events1[0][0], LOAN_REQUEST_STATUS_CHANGED)
+        self.assertEqual(events1[0][1]['loan_request']['status'], 'REJECTED')
+
     @blocking_call_on_reactor_thread
     @inlineCallbacks
     def test_mortgage_agreement_reject_mortgage(self):
@@ -305,6 +329,28 @@ class TestMarketCommunity(TestCommunity):
         yield self.get_next_message(self.node1, u'reject')
         self.assertEqual(transfer1.status, TransferStatus.REJECTED)
 
+    @blocking_call_on_reactor_thread
+    def test_pending_trade_timeout(self):
+        loan_request = self.create_loan_request(self.node1, self.node1.my_user_id, self.node2.my_user_id, status=LoanRequestStatus.ACCEPTED)
+        mortgage = self.create_mortgage(self.node1, loan_request, status=MortgageStatus.ACCEPTED)
+        campaign = self.create_campaign(self.node1, mortgage)
+        investment = self.create_investment(self.node1, self.node2.my_user_id, campaign, status=InvestmentStatus.FORSALE)
+        transfer = self.create_transfer(self.node1, self.node1.my_user_id, investment, status=TransferStatus.PENDING)
+
+        # Match a bid with the ask of the investment, and let the seller never answer the transfer offer
+        mortgage_key = (mortgage.id, mortgage.user_id)
+        self.node1.order_books.place(mortgage_key, Side.ASK, self.node2.my_user_id, 0.98, investment.amount,
+                                     (investment.id, investment.user_id))
+        _, trades = self.node1.order_books.place(mortgage_key, Side.BID, self.node1.my_user_id, 0.99, investment.amount)
+        self.node1.pending_trades[(transfer.id, transfer.user_id)] = (mortgage_key, trades[0],
+                                                                      time.time() - PENDING_TRADE_TIMEOUT - 1)
+
+        # The trade should be given up on, and the bid should be back in the book
+        self.node1.cleanup()
+        self.assertEqual(self.node1.pending_trades, {})
+        self.assertEqual(transfer.status, TransferStatus.REJECTED)
+        self.assertEqual(self.node1.order_books.get_depth(mortgage_key)['bids'], [(0.99, investment.amount)])
+
     def create_loan_request(self, community, user_id, bank_id, status=LoanRequestStatus.PENDING):
         user = community.data_manager.get_user(user_id)
 
@@ -388,5 +434,37 @@ class TestMarketCommunity(TestCommunity):
         return community
 
 
+class TestFundingTotals(unittest.TestCase):
+
+    def create_contract(self, identifier, amount):
+        contract = Contract()
+        contract.previous_hash = 'mortgage'
+        contract.document = Investment(identifier, 'user', amount, 0.02, 0, 'user', InvestmentStatus.ACCEPTED).to_bin()
+        contract.type = ObjectType.INVESTMENT
+        return contract
+
+    def test_totals(self):
+        funding = FundingTotals()
+        c1 = self.create_contract(0, 1000)
+        c2 = self.create_contract(1, 2000)
+
+        funding.add_pending(c1)
+        self.assertEqual(funding.get_total('mortgage'), 1000)
+        self.assertEqual(funding.get_total('mortgage', c1), 1000)
+        self.assertEqual(funding.get_total('mortgage', c2), 3000)
+
+        # Contracts should not be counted twice once they are included in a block
+        funding.add_committed(c1)
+        funding.add_pending(c2)
+        funding.add_pending(c1)
+        funding.remove_pending(c1)
+        self.assertEqual(funding.get_total('mortgage'), 3000)
+
+        funding.remove_committed(c1)
+        funding.remove_pending(c2)
+        self.assertEqual(funding.get_total('mortgage'), 0)
+        self.assertFalse(funding.committed or funding.pending)
+
+
 if __name__ == "__main__":
     unittest.main()
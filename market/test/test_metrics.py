@@ -0,0 +1,77 @@
+import unittest
+
+from market.util.metrics import MetricsRegistry, timed, timed_methods
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        counter = self.registry.counter('messages_total', 'Number of messages', 'message')
+        counter.inc('block')
+        counter.inc('block', 2)
+        counter.inc('contract')
+        self.assertEqual(counter.get('block'), 3)
+        self.assertEqual(self.registry.render(), '# HELP messages_total Number of messages\n'
+                                                 '# TYPE messages_total counter\n'
+                                                 'messages_total{message="block"} 3.0\n'
+                                                 'messages_total{message="contract"} 1.0\n')
+
+    def test_gauge(self):
+        gauge = self.registry.gauge('queue', 'Queue size')
+        queue1, queue2 = [1, 2], [3]
+        function = lambda: len(queue1)
+        gauge.add_function(function)
+        gauge.add_function(lambda: len(queue2))
+        self.assertEqual(gauge.get(), 3)
+        gauge.remove_function(function)
+        self.assertEqual(gauge.get(), 1)
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('duration_seconds', 'Duration', buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        self.assertEqual(histogram.get_count(), 3)
+        self.assertIn('duration_seconds_bucket{le="0.1"} 1.0', self.registry.render())
+        self.assertIn('duration_seconds_bucket{le="1.0"} 2.0', self.registry.render())
+        self.assertIn('duration_seconds_bucket{le="+Inf"} 3.0', self.registry.render())
+        self.assertIn('duration_seconds_sum 5.55', self.registry.render())
+
+    def test_timed_methods(self):
+        histogram = self.registry.histogram('call_seconds', 'Duration of calls', 'method')
+
+        @timed_methods(histogram)
+        class DataManager(object):
+            def get(self):
+                return 1
+
+            @staticmethod
+            def helper():
+                return 2
+
+        self.assertEqual(DataManager().get(), 1)
+        self.assertEqual(DataManager.helper(), 2)
+        self.assertEqual(histogram.get_count('get'), 1)
+        self.assertEqual(histogram.get_count('helper'), 0)
+
+    def test_timed_exception(self):
+        histogram = self.registry.histogram('call_seconds', 'Duration of calls')
+
+        @timed(histogram)
+        def fail():
+            raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(histogram.get_count(), 1)
+
+    def test_escape_label_value(self):
+        counter = self.registry.counter('messages_total', 'Number of messages', 'message')
+        counter.inc('a"b\\c')
+        self.assertIn('messages_total{message="a\\"b\\\\c"} 1.0', self.registry.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from market.community.market.orderbook import MAX_PRICE, MIN_COMPACT_SIZE, OrderBooks, Side
+
+MORTGAGE = (0, 'bank')
+
+
+class TestOrderBooks(unittest.TestCase):
+
+    def setUp(self):
+        self.books = OrderBooks()
+
+    def ask(self, investment_id, price, amount, user_id='seller'):
+        return self.books.place(MORTGAGE, Side.ASK, user_id, price, amount, (investment_id, 'investor'))
+
+    def bid(self, price, amount, user_id='buyer'):
+        return self.books.place(MORTGAGE, Side.BID, user_id, price, amount)
+
+    def test_price_time_priority(self):
+        first = self.ask(0, 0.99, 100)[0]
+        cheapest = self.ask(1, 0.98, 100)[0]
+        second = self.ask(2, 0.99, 100)[0]
+
+        order, trades = self.bid(1.0, 250)
+        # The cheapest ask is filled first, then the oldest ask at the same price. The last ask is too large.
+        self.assertEqual([(trade.ask, trade.price, trade.amount) for trade in trades],
+                         [(cheapest, 0.98, 100), (first, 0.99, 100)])
+        self.assertEqual(order.remaining, 50)
+        self.assertIs(self.books.get_ask((2, 'investor')), second)
+        self.assertIsNone(self.books.get_ask((0, 'investor')))
+        self.assertEqual(self.books.get_depth(MORTGAGE), {'bids': [(1.0, 50)], 'asks': [(0.99, 100)]})
+
+    def test_resting_bids(self):
+        self.bid(0.97, 100)
+        self.bid(0.96, 300)
+        high = self.bid(0.98, 50)[0]
+
+        # Asks can't be partially filled, so the best bid blocks the book until it is cancelled
+        _, trades = self.ask(0, 0.95, 100)
+        self.assertEqual(trades, [])
+        self.books.cancel(high.id)
+        _, trades = self.ask(1, 0.95, 100)
+        self.assertEqual([(trade.price, trade.amount) for trade in trades], [(0.97, 100)])
+        self.assertEqual(self.books.get_depth(MORTGAGE, 1), {'bids': [(0.96, 300)], 'asks': [(0.95, 100)]})
+
+    def test_self_trade(self):
+        ask = self.ask(0, 0.99, 100, user_id='buyer')[0]
+        order, trades = self.bid(1.0, 100)
+        self.assertEqual(trades, [])
+        self.assertFalse(order.active)
+        self.assertIsNone(self.books.get_order(order.id))
+        self.assertIs(self.books.get_ask((0, 'investor')), ask)
+        self.assertEqual(self.books.get_depth(MORTGAGE), {'bids': [], 'asks': [(0.99, 100)]})
+
+    def test_cancel(self):
+        self.assertRaises(ValueError, self.bid, 0, 100)
+        self.assertRaises(ValueError, self.bid, 1.0, -1)
+        self.assertRaises(ValueError, self.bid, float('nan'), 100)
+        self.assertRaises(ValueError, self.bid, MAX_PRICE + 1, 100)
+        self.assertRaises(ValueError, self.bid, 1.0, float('nan'))
+        self.assertRaises(ValueError, self.bid, 1.0, float('inf'))
+        self.assertRaises(ValueError, self.ask, 1, float('inf'), 100)
+        ask = self.ask(0, 0.99, 100)[0]
+        self.assertRaises(ValueError, self.ask, 0, 0.98, 100)
+
+        self.assertIs(self.books.cancel(ask.id), ask)
+        self.assertIsNone(self.books.cancel(ask.id))
+        self.assertIsNone(self.books.get_order(ask.id))
+        self.assertEqual(self.books.books, {})
+
+        # Cancelled orders are removed from the heaps once they outnumber the orders in the book
+        orders = [self.bid(0.9, 1)[0] for _ in range(MIN_COMPACT_SIZE * 2)]
+        for order in orders[1:]:
+            self.books.cancel(order.id)
+        book = self.books.books[MORTGAGE]
+        self.assertLessEqual(len(book.heaps[Side.BID]), MIN_COMPACT_SIZE + 1)
+        self.assertIs(book.best(Side.BID), orders[0])
+        self.assertEqual(book.get_depth(Side.BID), [(0.9, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
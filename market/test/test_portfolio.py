@@ -0,0 +1,102 @@
+import os
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import MarketDataManager
+from market.database.reader import Position
+from market.models import ObjectType
+from market.models.campaign import Campaign
+from market.models.house import House
+from market.models.investment import Investment, InvestmentStatus
+from market.models.mortgage import Mortgage, MortgageStatus, MortgageType
+from market.models.user import Role
+from market.util.portfolio import analyse_portfolio, analyse_position, get_schedule
+
+
+def create_position(mortgage_type, default_rate=0.0, principal=100000.0, interest_rate=4.0, duration=120):
+    return Position(ObjectType.INVESTMENT, 0, 'investor', 'bank', principal, interest_rate, mortgage_type, duration,
+                    default_rate)
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_schedule(self):
+        for mortgage_type in MortgageType:
+            schedule = get_schedule(100000.0, 4.0, mortgage_type, 120)
+            self.assertEqual(len(schedule), 120)
+            self.assertAlmostEqual(sum(month['repayment'] for month in schedule), 100000.0)
+            self.assertAlmostEqual(schedule[-1]['balance'], 0.0)
+
+            analytics = analyse_position(create_position(mortgage_type))
+            self.assertAlmostEqual(analytics['monthly_payment'], schedule[0]['payment'])
+            self.assertAlmostEqual(analytics['scheduled_interest'], sum(month['interest'] for month in schedule))
+
+        payments = [month['payment'] for month in get_schedule(100000.0, 4.0, MortgageType.FIXEDRATE, 120)]
+        self.assertAlmostEqual(min(payments), max(payments))
+
+    def test_expected_cash_flows(self):
+        for mortgage_type in MortgageType:
+            # Without defaults, the expected interest is the scheduled interest and the yield is the interest rate
+            analytics = analyse_position(create_position(mortgage_type))
+            self.assertAlmostEqual(analytics['expected_interest'], analytics['scheduled_interest'])
+            self.assertAlmostEqual(analytics['expected_loss'], 0.0)
+            self.assertAlmostEqual(analytics['default_adjusted_yield'], 4.0)
+
+            # The closed-form sums should match the sums over the schedule
+            survival = 0.95 ** (1 / 12.0)
+            schedule = get_schedule(100000.0, 4.0, mortgage_type, 120)
+            balances = [100000.0] + [month['balance'] for month in schedule[:-1]]
+            analytics = analyse_position(create_position(mortgage_type, default_rate=5.0))
+            self.assertAlmostEqual(analytics['expected_interest'],
+                                   sum(survival ** month['month'] * month['interest'] for month in schedule), places=6)
+            self.assertAlmostEqual(analytics['expected_loss'],
+                                   sum(survival ** i * (1 - survival) * b for i, b in enumerate(balances)), places=6)
+            self.assertLess(analytics['default_adjusted_yield'], 0.0)
+
+    def test_portfolio(self):
+        portfolio = analyse_portfolio([create_position(MortgageType.LINEAR),
+                                       create_position(MortgageType.FIXEDRATE, default_rate=1.0, principal=50000.0),
+                                       create_position(MortgageType.LINEAR, duration=0)])
+        totals = portfolio['totals']
+        self.assertEqual(totals['positions'], 3)
+        self.assertEqual(totals['principal'], 250000.0)
+        self.assertAlmostEqual(totals['expected_return'], totals['expected_interest'] - totals['expected_loss'])
+        self.assertTrue(3.0 < totals['default_adjusted_yield'] < 4.0)
+        self.assertEqual(portfolio['exposure'], [{'bank_id': 'YmFuaw==', 'principal': 250000.0}])
+        self.assertEqual(analyse_portfolio([])['totals']['default_adjusted_yield'], 0.0)
+
+
+class TestPortfolioPositions(trial_unittest.TestCase):
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_positions(self):
+        data_manager = MarketDataManager(os.path.join(mkdtemp(), 'market.db'))
+        data_manager.initialize('investor', Role.INVESTOR)
+        house = House(u'1234AB', u'1', u'Address', 200000, u'url', u'phone', u'email')
+        data_manager.store.add(Mortgage(0, 'user', 'bank', house, 200000, 150000, MortgageType.LINEAR, 2.5, 3.5, 4.5,
+                                        120, u'A', MortgageStatus.ACCEPTED, 0, 'user'))
+        campaign = Campaign(0, 'user', 0, 'user', 50000, 0, 0)
+        data_manager.store.add(campaign)
+        for investment_id, status in enumerate([InvestmentStatus.ACCEPTED, InvestmentStatus.PENDING]):
+            investment = Investment(investment_id, 'investor', 10000, 3.0, 0, 'user', status)
+            data_manager.you.investments.add(investment)
+
+        positions = data_manager.get_portfolio_positions('investor')
+        self.assertEqual([(p.type, p.id, p.bank_id, p.principal, p.duration) for p in positions],
+                         [(ObjectType.INVESTMENT, 0, 'bank', 10000, 120)])
+        self.assertEqual([(p.type, p.principal) for p in data_manager.get_portfolio_positions('bank')],
+                         [(ObjectType.MORTGAGE, 150000)])
+        self.assertEqual([(p.type, p.principal) for p in data_manager.get_campaign_positions(campaign)],
+                         [(ObjectType.MORTGAGE, 150000), (ObjectType.INVESTMENT, 10000)])
+        yield data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
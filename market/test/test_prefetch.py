@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import MarketDataManager
+from market.models.campaign import Campaign
+from market.models.house import House
+from market.models.mortgage import Mortgage, MortgageType, MortgageStatus
+from market.models.user import Role, User
+
+
+class TestPrefetch(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = MarketDataManager(os.path.join(mkdtemp(), 'market.db'))
+        self.data_manager.initialize('user', Role.BORROWER)
+
+        for mortgage_id in range(3):
+            house = House(u'1234AB', unicode(mortgage_id), u'Address', 200000, u'url', u'phone', u'email')
+            self.data_manager.store.add(Mortgage(mortgage_id, 'user', 'bank', house, 200000, 100000,
+                                                 MortgageType.FIXEDRATE, 2.5, 3.5, 4.5, 30, u'A',
+                                                 MortgageStatus.ACCEPTED, mortgage_id, 'user'))
+            self.data_manager.store.add(Campaign(mortgage_id, 'user', mortgage_id, 'user', 100000, 0, 0))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_prefetch(self):
+        self.data_manager.store.add(Campaign(0, 'bank', 0, 'user', 100000, 0, 0))
+        objects = self.data_manager.prefetch({User: ['user', 'unknown'],
+                                              Campaign: [(0, 'user'), (2, 'user'), (0, 'bank'), (1, 'bank')]})
+        self.assertEqual(objects[User].keys(), ['user'])
+        self.assertEqual(sorted(objects[Campaign].keys()), [(0, 'bank'), (0, 'user'), (2, 'user')])
+        self.assertEqual(objects[Mortgage], {})
+
+        campaigns = self.data_manager.get_objects(Campaign, [(1, 'user'), (2, 'user'), (1, 'user')])
+        self.assertEqual(sorted(campaigns.keys()), [(1, 'user'), (2, 'user')])
+        self.assertIs(campaigns[(1, 'user')], self.data_manager.get_campaign(1, 'user'))
+        yield self.data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
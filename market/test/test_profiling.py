@@ -0,0 +1,82 @@
+import time
+import threading
+import unittest
+
+from storm.database import create_database
+from storm.store import Store
+
+from market.database.reader import DatabaseReader
+from market.metrics import HANDLER_BATCH_SIZE, HANDLER_QUERIES, HANDLER_SECONDS
+from market.util.profiling import SamplingProfiler, profile_handler, profile_task, query_counter
+
+
+def busy_loop(duration):
+    end = time.time() + duration
+    while time.time() < end:
+        pass
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_query_counter(self):
+        store = Store(create_database('sqlite:'))
+        count = query_counter.count
+        store.execute('SELECT 1')
+        store.execute('SELECT 2')
+        self.assertEqual(query_counter.count, count + 2)
+        store.close()
+
+    def test_profile_handler(self):
+        def on_test_handler(messages):
+            query_counter.count += 3
+            return len(messages)
+
+        handler = profile_handler('on_test_handler', on_test_handler)
+        count = HANDLER_SECONDS.get_count('on_test_handler')
+        self.assertEqual(handler([1, 2]), 2)
+        self.assertEqual(HANDLER_SECONDS.get_count('on_test_handler'), count + 1)
+        self.assertEqual(HANDLER_QUERIES.get_sum('on_test_handler'), 3 * (count + 1))
+        self.assertEqual(HANDLER_BATCH_SIZE.get_sum('on_test_handler'), 2 * (count + 1))
+
+    def test_reader_queries(self):
+        store = Store(create_database('sqlite:'))
+        store.execute('CREATE TABLE test(value INTEGER)')
+        reader = DatabaseReader(store)
+
+        def on_reader_handler(messages):
+            return [reader.query('SELECT COUNT(*) FROM test').fetchone()[0] for _ in messages]
+
+        handler = profile_handler('on_reader_handler', on_reader_handler)
+        queries = HANDLER_QUERIES.get_sum('on_reader_handler')
+        self.assertEqual(handler([1, 2]), [0, 0])
+        self.assertEqual(HANDLER_QUERIES.get_sum('on_reader_handler'), queries + 2)
+        store.close()
+
+    def test_profile_task(self):
+        def fail():
+            raise ValueError()
+
+        task = profile_task('test_task', fail)
+        count = HANDLER_SECONDS.get_count('test_task')
+        self.assertRaises(ValueError, task)
+        self.assertEqual(HANDLER_SECONDS.get_count('test_task'), count + 1)
+        self.assertEqual(HANDLER_BATCH_SIZE.get_count('test_task'), 0)
+
+    def test_sampling_profiler(self):
+        profiler = SamplingProfiler(threading.current_thread().ident, 0.001)
+        thread = threading.Thread(target=profiler.run, args=(0.2,))
+        thread.start()
+        busy_loop(0.3)
+        thread.join()
+
+        lines = profiler.get_collapsed_stacks().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any(['busy_loop (' in line for line in lines]))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+            self.assertTrue(stack.endswith(')'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest as trial_unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.database.datamanager import BlockchainDataManager, MarketDataManager
+from market.database.reader import CAMPAIGN_FILTERS, CAMPAIGN_SORT_COLUMNS, MORTGAGE_FILTERS, MORTGAGE_SORT_COLUMNS
+from market.models import ObjectType
+from market.models.block_index import BlockIndex
+from market.models.campaign import Campaign
+from market.models.house import House
+from market.models.mortgage import Mortgage, MortgageType, MortgageStatus
+from market.models.user import Role
+from market.restapi import get_list_parameters
+from market.test.util import create_block
+
+
+class TestBlockchainReads(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = BlockchainDataManager(os.path.join(mkdtemp(), 'market.db'))
+        self.data_manager.initialize()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_raw_reads(self):
+        block = create_block()
+        contract = block.contracts[0]
+        deferred = self.data_manager.add_block(block)
+        self.data_manager.add_block_index(BlockIndex(block.id, 1))
+
+        for _ in range(2):
+            # The raw reads should return the same results before and after the executor has written the block
+            header = self.data_manager.get_block_header(block.id)
+            self.assertEqual(header.id, block.id)
+            self.assertEqual(header.target_difficulty, block.target_difficulty)
+            self.assertEqual(self.data_manager.get_contract_header(contract.id).type, ObjectType.MORTGAGE)
+            self.assertEqual(self.data_manager.get_contract_ids_by_previous_hash(''), [contract.id])
+            self.assertEqual(self.data_manager.get_blockchain_block_id(contract.id), block.id)
+            header, contracts = self.data_manager.get_blocks_by_ids([block.id])[block.id]
+            self.assertEqual(header.merkle_root_hash, block.merkle_root_hash)
+            self.assertEqual([c.id for c in contracts], [contract.id])
+            self.assertEqual(self.data_manager.get_blocks_by_ids([block.id], full=False)[block.id][1], [contract.id])
+
+            yield deferred
+            self.data_manager.commit()
+
+        self.assertEqual([c.id for c in self.data_manager.get_best_chain_contracts(ObjectType.MORTGAGE)], [contract.id])
+        self.assertIsNone(self.data_manager.get_block_header('unknown'))
+        yield self.data_manager.close()
+
+
+class TestListQueries(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = MarketDataManager(os.path.join(mkdtemp(), 'market.db'))
+        self.data_manager.initialize('user', Role.BORROWER)
+
+        for mortgage_id, (postal_code, interest_rate, amount_invested) in enumerate([(u'1234AB', 2.5, 0),
+                                                                                     (u'1299CD', 3.5, 100000),
+                                                                                     (u'5678EF', 4.5, 50000)]):
+            house = House(postal_code, unicode(mortgage_id), u'Address', 200000, u'url', u'phone', u'email')
+            self.data_manager.store.add(Mortgage(mortgage_id, 'user', 'bank', house, 200000, 100000,
+                                                 MortgageType.FIXEDRATE, interest_rate, 3.5, 4.5, 30, u'A',
+                                                 MortgageStatus.ACCEPTED, mortgage_id, 'user'))
+            self.data_manager.store.add(Campaign(mortgage_id, 'user', mortgage_id, 'user', 100000, amount_invested, 0))
+
+    def get_mortgage_ids(self, args):
+        parameters = get_list_parameters(args, MORTGAGE_FILTERS, MORTGAGE_SORT_COLUMNS)
+        return [mortgage['id'] for mortgage in self.data_manager.get_mortgage_dicts(*parameters)]
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_filter_mortgages(self):
+        self.assertEqual(self.get_mortgage_ids({'min_interest_rate': ['3'], 'sort': ['id']}), [1, 2])
+        self.assertEqual(self.get_mortgage_ids({'postal_code': ['12'], 'sort': ['-interest_rate']}), [1, 0])
+        self.assertEqual(self.get_mortgage_ids({'sort': ['interest_rate'], 'limit': ['1']}), [0])
+        self.assertEqual(self.get_mortgage_ids({'mortgage_type': ['LINEAR']}), [])
+        self.assertRaises(ValueError, self.get_mortgage_ids, {'mortgage_type': ['UNKNOWN']})
+        self.assertRaises(ValueError, self.get_mortgage_ids, {'sort': ['unknown']})
+        self.assertRaises(ValueError, self.get_mortgage_ids, {'limit': ['-1']})
+        yield self.data_manager.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_filter_campaigns(self):
+        parameters = get_list_parameters({'completed': ['false'], 'max_interest_rate': ['4'], 'sort': ['-id']},
+                                         CAMPAIGN_FILTERS, CAMPAIGN_SORT_COLUMNS)
+        campaigns = self.data_manager.get_campaign_dicts(*parameters)
+        self.assertEqual(campaigns, [self.data_manager.get_campaign(0, 'user').to_dict(api_response=True)])
+        yield self.data_manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import time
+import unittest
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock, LoopingCall
+
+from market import defs
+from market.simulation.clock import VirtualTime
+from market.simulation.network import SimulatedNetwork
+from market.simulation.scenario import MarketScenario
+from market.simulation.simulator import Simulator, register_verified_bank, verified_banks
+
+
+class FakeDispersy(object):
+
+    def __init__(self):
+        self.packets = []
+
+    def on_incoming_packets(self, packets, cache=True, timestamp=0.0):
+        self.packets.extend((candidate.sock_addr, packet) for candidate, packet in packets)
+
+
+class FakeCandidate(object):
+
+    def __init__(self, sock_addr):
+        self.sock_addr = sock_addr
+
+
+class TestSimulatedNetwork(unittest.TestCase):
+
+    def create_endpoints(self, network):
+        endpoints = [network.create_endpoint(), network.create_endpoint()]
+        for endpoint in endpoints:
+            endpoint.open(FakeDispersy())
+        return endpoints
+
+    def test_latency_and_bandwidth(self):
+        clock = Clock()
+        network = SimulatedNetwork(latency=0.1, jitter=0, bandwidth=1000, clock=clock)
+        sender, receiver = self.create_endpoints(network)
+
+        # Sending 2 packets of 100 bytes takes 0.2s, after which the last packet arrives 0.1s later
+        sender.send([FakeCandidate(receiver.get_address())], ['a' * 100, 'b' * 100])
+        clock.advance(0.2)
+        self.assertEqual(receiver._dispersy.packets, [(sender.get_address(), 'a' * 100)])
+        clock.advance(0.1)
+        self.assertEqual(len(receiver._dispersy.packets), 2)
+        self.assertEqual(receiver.bytes_received, 200)
+
+    def test_loss(self):
+        clock = Clock()
+        network = SimulatedNetwork(latency=0, jitter=0, loss=1.0, clock=clock)
+        sender, receiver = self.create_endpoints(network)
+
+        sender.send([FakeCandidate(receiver.get_address())], ['packet'])
+        clock.advance(1)
+        self.assertEqual(receiver._dispersy.packets, [])
+        self.assertEqual(network.packets_lost, 1)
+
+    def test_closed_endpoint(self):
+        clock = Clock()
+        network = SimulatedNetwork(latency=0.1, jitter=0, clock=clock)
+        sender, receiver = self.create_endpoints(network)
+
+        sender.send([FakeCandidate(receiver.get_address())], ['packet'])
+        receiver.close()
+        clock.advance(1)
+        self.assertEqual(receiver._dispersy.packets, [])
+
+
+class TestVirtualTime(unittest.TestCase):
+
+    def test_virtual_time(self):
+        clock = Clock()
+        clock.advance(1000)
+        calls = []
+
+        with VirtualTime(clock):
+            self.assertEqual(time.time(), 1000)
+            looping_call = LoopingCall(lambda: calls.append(('loop', time.time())))
+            looping_call.start(10)
+            reactor.callLater(5, lambda: calls.append(('later', time.time())))
+            clock.pump([5, 5])
+            looping_call.stop()
+
+        self.assertEqual(calls, [('loop', 1000), ('later', 1005), ('loop', 1010)])
+        self.assertGreater(time.time(), 1000)
+        self.assertNotIn('callLater', vars(reactor))
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.simulator = Simulator(SimulatedNetwork(clock=self.clock))
+
+    def test_advance(self):
+        times = []
+        for delay in [3, 1, 2, 5]:
+            self.clock.callLater(delay, lambda: times.append(self.clock.seconds()))
+
+        # Every call runs at its own time, and the clock ends at the given time
+        self.assertFalse(self.simulator.advance(4))
+        self.assertEqual(times, [1, 2, 3])
+        self.assertEqual(self.clock.seconds(), 4)
+
+        self.assertTrue(self.simulator.advance(10, until=lambda: len(times) == 4))
+        self.assertEqual(self.clock.seconds(), 5)
+
+    def test_wait(self):
+        deferred = Deferred()
+        self.clock.callLater(2, deferred.callback, 'result')
+        self.assertEqual(self.simulator.wait(deferred, 10), 'result')
+        self.assertEqual(self.clock.seconds(), 2)
+
+        self.assertRaises(RuntimeError, self.simulator.wait, Deferred(), 10)
+
+    def test_verified_banks(self):
+        banks = dict(defs.VERIFIED_BANKS)
+        names = dict(defs.VERIFIED_BANK_NAMES)
+        with verified_banks():
+            register_verified_bank('Test bank', 'public key')
+            self.assertIn('Test bank', defs.VERIFIED_BANKS)
+        self.assertEqual(defs.VERIFIED_BANKS, banks)
+        self.assertEqual(defs.VERIFIED_BANK_NAMES, names)
+        self.assertNotIn('Test bank', defs.VERIFIED_BANK_IDS)
+
+
+class TestMarketScenario(unittest.TestCase):
+
+    def run_scenario(self, duration, seed=0):
+        clock = Clock()
+        clock.advance(time.time())
+        simulator = Simulator(SimulatedNetwork(latency=0.05, jitter=0.01, clock=clock, seed=seed))
+        scenario = MarketScenario(simulator, loan_request_interval=30, response_delay=2, seed=seed)
+
+        with verified_banks(), VirtualTime(clock):
+            simulator.create_nodes(2, 4, 2)
+            simulator.run(scenario, duration)
+            report = simulator.get_report()
+            simulator.stop()
+        return scenario, report
+
+    def test_run(self):
+        banks = dict(defs.VERIFIED_BANKS)
+        scenario, report = self.run_scenario(600)
+
+        # The simulated duration doesn't depend on how long the nodes took to process their work
+        self.assertEqual(report['duration'], 600)
+        self.assertEqual(report['nodes'], {'banks': 2, 'investors': 4, 'borrowers': 2})
+        self.assertEqual(len(report['per_node']), 8)
+        self.assertEqual(defs.VERIFIED_BANKS, banks)
+
+        # The borrowers should have sent loan requests, which ended up in signed contracts
+        self.assertGreater(scenario.loan_requests_sent, 0)
+        self.assertGreater(report['network']['packets_sent'], 0)
+        self.assertEqual(report['network']['packets_lost'], 0)
+        self.assertGreater(report['contracts']['signed'], 0)
+        self.assertLessEqual(report['contracts']['on_chain'], report['contracts']['signed'])
+
+        blocks = report['blocks']
+        self.assertGreater(blocks['created'], 0)
+        self.assertLessEqual(blocks['stale'], blocks['created'])
+        latency = blocks['propagation_latency']
+        if latency['mean'] is not None:
+            # Blocks take at least the latency of the network to reach the other bank
+            self.assertGreaterEqual(latency['p50'], 0.05)
+            self.assertLessEqual(latency['p50'], latency['max'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest
+
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.community.blockchain.snapshot import ChainSnapshot
+from market.database.datamanager import BlockchainDataManager
+from market.models.block_index import BlockIndex
+
+
+class TestChainSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.snapshot_fn = os.path.join(self.directory, 'market.db.snapshot')
+
+    def test_save_load(self):
+        state = {'funding': {'00ff': {'01': 1.5}}}
+        ChainSnapshot(1, ['\x00' * 32, '\xff' * 32], state).save(self.snapshot_fn)
+
+        snapshot = ChainSnapshot.load(self.snapshot_fn)
+        self.assertEqual(snapshot.height, 1)
+        self.assertEqual(snapshot.block_id, '\xff' * 32)
+        self.assertEqual(snapshot.state, state)
+        self.assertFalse(os.path.exists(self.snapshot_fn + '.tmp'))
+
+    def test_load_invalid(self):
+        self.assertIsNone(ChainSnapshot.load(self.snapshot_fn))
+
+        ChainSnapshot(0, ['\x00' * 32]).save(self.snapshot_fn)
+        with open(self.snapshot_fn, 'rb') as fp:
+            data = fp.read()
+        with open(self.snapshot_fn, 'wb') as fp:
+            fp.write(data.replace('"height": 0', '"height": 1'))
+        self.assertIsNone(ChainSnapshot.load(self.snapshot_fn))
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_initialize(self):
+        database_fn = os.path.join(self.directory, 'market.db')
+        data_manager = BlockchainDataManager(database_fn)
+        data_manager.initialize()
+        for height in range(1, 5):
+            data_manager.add_block_index(BlockIndex(chr(height) * 32, height))
+        best_chain = list(data_manager.best_chain)
+        yield data_manager.close()
+
+        # Only the block indexes above the snapshot should be read from the database
+        snapshot = ChainSnapshot(2, best_chain[:3])
+        snapshot.best_chain[0] = 'not read from the database'
+        data_manager = BlockchainDataManager(database_fn)
+        self.assertTrue(data_manager.initialize(snapshot))
+        self.assertEqual(data_manager.best_chain, snapshot.best_chain + best_chain[3:])
+        self.assertEqual(data_manager.get_block_index(best_chain[4]).height, 4)
+        yield data_manager.close()
+
+        # A snapshot of another chain should be ignored
+        data_manager = BlockchainDataManager(database_fn)
+        self.assertFalse(data_manager.initialize(ChainSnapshot(2, best_chain[:2] + ['other'])))
+        self.assertEqual(data_manager.best_chain, best_chain)
+        yield data_manager.close()
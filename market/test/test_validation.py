@@ -0,0 +1,79 @@
+from twisted.internet.defer import inlineCallbacks, gatherResults
+from twisted.trial import unittest
+
+from dispersy.crypto import LibNaCLSK
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.community.blockchain.community import BLOCK_DIFFICULTY_MIN, BLOCK_GENESIS_HASH
+from market.community.blockchain.validation import BlockValidator, get_checkpoint_data, load_checkpoints, \
+    verify_block
+from market.test.util import create_block, create_contract
+
+
+class TestBlockValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.key = LibNaCLSK()
+        self.public_key = self.key.pub().key_to_bin()
+
+    def create_block(self, num_contracts):
+        contracts = [create_contract('document %d' % index, key=self.key) for index in range(num_contracts)]
+        return create_block(contracts, BLOCK_GENESIS_HASH, self.key, BLOCK_DIFFICULTY_MIN)
+
+    def test_verify_block(self):
+        block = self.create_block(2)
+        self.assertIsNone(verify_block(block))
+
+        block.contracts[1].to_signature = block.contracts[0].to_signature
+        self.assertEqual(verify_block(block), 'invalid contract signature')
+
+        block.contracts.append(block.contracts[0])
+        block.merkle_root_hash = block.merkle_tree.build()
+        self.assertEqual(verify_block(block), 'invalid signature')
+
+    def test_verify_block_without_proof(self):
+        # The proof depends on the stake of the creator, so it is left to the community
+        block = self.create_block(1)
+        block.target_difficulty = 1
+        block.creator_signature = self.key.signature(str(block))
+        self.assertIsNone(verify_block(block))
+
+    def test_load_checkpoints(self):
+        block_id = self.create_block(0).id
+        signature = self.key.signature(get_checkpoint_data(1, block_id))
+        banks = {'bank': self.public_key}
+
+        self.assertEqual(load_checkpoints({1: (block_id, 'bank', signature)}, banks), {1: block_id})
+        # Checkpoints with a signature for another height or of an unknown bank should be ignored
+        self.assertEqual(load_checkpoints({2: (block_id, 'bank', signature)}, banks), {})
+        self.assertEqual(load_checkpoints({1: (block_id, 'other', signature)}, banks), {})
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_verify_block_inline(self):
+        validator = BlockValidator(contracts_per_task=1)
+        validator.start()
+
+        block = self.create_block(3)
+        reason = yield validator.verify_block(block.to_dict())
+        self.assertIsNone(reason)
+
+        block.contracts[2].from_signature = block.contracts[0].from_signature
+        reason = yield validator.verify_block(block.to_dict())
+        self.assertEqual(reason, 'invalid contract signature')
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_verify_block_pool(self):
+        validator = BlockValidator(processes=2, contracts_per_task=2)
+        validator.start()
+
+        valid_block = self.create_block(5)
+        # The signatures are not part of the id of a contract, so the block itself is still valid
+        invalid_block = self.create_block(3)
+        invalid_block.contracts[2].to_signature = invalid_block.contracts[0].to_signature
+        reasons = yield gatherResults([validator.verify_block(valid_block.to_dict()),
+                                       validator.verify_block(invalid_block.to_dict())])
+        self.assertEqual(reasons, [None, 'invalid contract signature'])
+
+        validator.stop()
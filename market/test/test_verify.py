@@ -0,0 +1,138 @@
+import os
+
+from base64 import urlsafe_b64encode
+from tempfile import mkdtemp
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial import unittest
+
+from dispersy.crypto import LibNaCLSK
+from dispersy.util import blocking_call_on_reactor_thread
+
+from market.community.blockchain.community import BLOCK_GENESIS_HASH, calculate_next_difficulty
+from market.community.market.community import POS_STEP
+from market.database.datamanager import BlockchainDataManager
+from market.models import ObjectType
+from market.models.block_index import BlockIndex
+from market.models.house import House
+from market.models.investment import Investment, InvestmentStatus
+from market.models.mortgage import Mortgage, MortgageStatus, MortgageType
+from market.test.util import create_block, create_contract
+from market.verify import ChainVerifier
+
+
+class TestChainVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.key = LibNaCLSK()
+        # The blocks are created by the bank, which has the minimum stake of 1
+        self.banks = {'Test bank': self.key.pub().key_to_bin()}
+        self.database_fn = os.path.join(mkdtemp(), 'market.db')
+        self.data_manager = BlockchainDataManager(self.database_fn, threaded=False)
+        self.data_manager.initialize()
+        self.blocks = []
+
+        self.mortgage_contract = self.create_mortgage(200000, 150000)
+
+    def create_mortgage(self, amount, bank_amount):
+        house = House(u'1234AB', u'1', u'Address', amount, u'url', u'phone', u'email')
+        mortgage = Mortgage(0, 'user', 'bank', house, amount, bank_amount, MortgageType.FIXEDRATE, 2.5, 3.5, 4.5, 30,
+                            u'A', MortgageStatus.ACCEPTED, 0, 'user')
+        return create_contract(mortgage.to_bin(), key=self.key)
+
+    def create_investment(self, investment_id, amount, investor_key=None):
+        investment = Investment(investment_id, 'investor', amount, 2.5, 0, 'bank', InvestmentStatus.ACCEPTED)
+        return create_contract(investment.to_bin(), ObjectType.INVESTMENT, self.mortgage_contract.id, self.key,
+                               investor_key)
+
+    def add_block(self, contracts, key=None, stake=1):
+        prev_block = self.blocks[-1] if self.blocks else None
+        block = create_block(contracts, prev_block.id if prev_block else BLOCK_GENESIS_HASH, key or self.key,
+                             calculate_next_difficulty(prev_block, None), stake)
+
+        self.data_manager.add_block(block)
+        self.data_manager.add_block_index(BlockIndex(block.id, len(self.blocks) + 1))
+        self.blocks.append(block)
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_verify(self):
+        self.add_block([self.mortgage_contract])
+        self.add_block([self.create_investment(0, 30000)])
+        yield self.data_manager.close()
+
+        for processes in [0, 2]:
+            verifier = ChainVerifier(self.database_fn, self.banks)
+            verifier.verify(processes=processes, batch_size=1)
+            self.assertEqual(verifier.best_chain, [BLOCK_GENESIS_HASH] + [block.id for block in self.blocks])
+            self.assertEqual(verifier.num_contracts, 2)
+            self.assertEqual(verifier.problems, [])
+            verifier.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_verify_stake(self):
+        investor_key = LibNaCLSK()
+        self.mortgage_contract = self.create_mortgage(10 * POS_STEP, 0)
+        self.add_block([self.mortgage_contract])
+        # Without an investment the investor has no stake, so it can't create blocks
+        self.add_block([self.create_investment(0, 3 * POS_STEP, investor_key)], investor_key)
+        # With an investment of 3 POS_STEPs, the proof only needs to be below 3 times the target
+        self.add_block([self.create_investment(1, 30000)], investor_key, 3)
+        yield self.data_manager.close()
+
+        verifier = ChainVerifier(self.database_fn, self.banks)
+        verifier.verify()
+        self.assertEqual(verifier.problems, [(2, self.blocks[1].id, 'incorrect proof')])
+        self.assertEqual(verifier.get_stake(investor_key.pub().key_to_bin()), 3)
+        verifier.close()
+
+    def write_snapshot(self):
+        with open(self.database_fn + '.snapshot', 'wb') as fp:
+            fp.write('snapshot')
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_repair(self):
+        self.add_block([self.mortgage_contract])
+        self.add_block([self.create_investment(0, 30000)])
+        self.add_block([self.create_investment(1, 30000)])
+        self.data_manager.remove_block_indexes(2)
+        yield self.data_manager.close()
+        self.write_snapshot()
+
+        verifier = ChainVerifier(self.database_fn, self.banks)
+        verifier.verify()
+        self.assertEqual(sorted(reason for _, _, reason in verifier.problems),
+                         ['block_index has no block at this height', 'block_index has no block at this height',
+                          'contract %s is an overspend' % urlsafe_b64encode(self.blocks[2].contracts[0].id)])
+        self.assertEqual(verifier.first_invalid, 3)
+
+        # The block with the overspend should not end up in block_index, and the snapshot should be kept
+        self.assertEqual(verifier.repair(), 2)
+        self.assertEqual(verifier.get_block_index(),
+                         dict(enumerate([BLOCK_GENESIS_HASH] + [block.id for block in self.blocks[:2]])))
+        self.assertTrue(os.path.exists(self.database_fn + '.snapshot'))
+        verifier.close()
+
+    @blocking_call_on_reactor_thread
+    @inlineCallbacks
+    def test_repair_valid(self):
+        self.add_block([self.mortgage_contract])
+        self.add_block([self.create_investment(0, 30000)])
+        self.data_manager.remove_block_indexes(2)
+        yield self.data_manager.close()
+        self.write_snapshot()
+
+        verifier = ChainVerifier(self.database_fn, self.banks)
+        verifier.verify()
+        self.assertIsNone(verifier.first_invalid)
+        self.assertEqual(verifier.repair(), 2)
+        self.assertFalse(os.path.exists(self.database_fn + '.snapshot'))
+        verifier.close()
+
+        # After the repair, no problems should remain
+        verifier = ChainVerifier(self.database_fn, self.banks)
+        verifier.verify()
+        self.assertEqual(verifier.problems, [])
+        verifier.close()
@@ -0,0 +1,50 @@
+import time
+
+from market.community.blockchain.validation import check_proof
+from market.models import ObjectType
+from market.models.block import Block
+from market.models.contract import Contract
+
+
+def create_contract(document='CONTRACT', contract_type=ObjectType.MORTGAGE, previous_hash='', key=None, to_key=None):
+    """
+    Create a contract. Without a key, the contract has dummy public keys and no signatures. With a key, the contract
+    is from the owner of the key to the owner of to_key (or themselves), and is signed by both sides.
+    """
+    contract = Contract()
+    contract.previous_hash = previous_hash
+    contract.document = document
+    contract.type = contract_type
+    if key is None:
+        contract.from_public_key = 'from'
+        contract.to_public_key = 'to'
+    else:
+        to_key = to_key or key
+        contract.from_public_key = key.pub().key_to_bin()
+        contract.to_public_key = to_key.pub().key_to_bin()
+        contract.time = int(time.time())
+        contract.from_signature = key.signature(str(contract))
+        contract.to_signature = to_key.signature(str(contract))
+    return contract
+
+
+def create_block(contracts=None, previous_hash='', key=None, target_difficulty=1, stake=1):
+    """
+    Create a block, by default with a single contract. Without a key, the block has a dummy creator and signature.
+    With a key, the block has a valid proof for the given stake and is signed by the owner of the key.
+    """
+    block = Block()
+    block.previous_hash = previous_hash
+    block.contracts = contracts if contracts is not None else [create_contract()]
+    block.merkle_root_hash = block.merkle_tree.build()
+    block.target_difficulty = target_difficulty
+    if key is None:
+        block.creator = 'creator'
+        block.creator_signature = 'signature'
+    else:
+        block.creator = key.pub().key_to_bin()
+        block.time = int(time.time())
+        while not check_proof(block, stake):
+            block.time += 1
+        block.creator_signature = key.signature(str(block))
+    return block
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+
+class VersionedCache(object):
+    """
+    This class caches values together with the version of the data they were created from. A cached value is only
+    returned as long as the version has not changed. When max_entries is given, the least recently used entries are
+    removed once the cache grows beyond that size.
+    """
+
+    def __init__(self, max_entries=None):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key, version, create):
+        """
+        Get a value from the cache, or create it if the cached value is missing or outdated.
+        :param key: the key of the value
+        :param version: the current version of the data the value depends on
+        :param create: a function without arguments that creates the value
+        :return: the value
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None or entry[0] != version:
+            entry = (version, create())
+        self.entries[key] = entry
+
+        if self.max_entries is not None and len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry[1]
+
+
+class LRUCache(object):
+    """
+    This class caches a bounded number of values. Once the cache is full, the least recently used value is removed.
+    """
+
+    def __init__(self, max_entries):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key, create):
+        """
+        Get a value from the cache, or create it if it is missing.
+        :param key: the key of the value
+        :param create: a function without arguments that creates the value
+        :return: the value
+        """
+        value = self.entries.pop(key, None)
+        if value is None:
+            value = create()
+        self.entries[key] = value
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
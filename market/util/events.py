@@ -0,0 +1,37 @@
+import logging
+
+# Types of events that can be sent to observers
+BLOCK_CONNECTED = 'block_connected'
+BLOCK_DISCONNECTED = 'block_disconnected'
+CAMPAIGN_UPDATED = 'campaign_updated'
+INVESTMENT_STATUS_CHANGED = 'investment_status_changed'
+LOAN_REQUEST_RECEIVED = 'loan_request_received'
+LOAN_REQUEST_STATUS_CHANGED = 'loan_request_status_changed'
+MORTGAGE_STATUS_CHANGED = 'mortgage_status_changed'
+
+
+class EventNotifier(object):
+    """
+    This class keeps track of observers that want to be informed about changes to the market (e.g., for pushing
+    them to the webapp). Observers are called on the reactor thread with the event type and a dictionary in the
+    same format as the REST API.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.observers = []
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def notify(self, event_type, data):
+        for observer in self.observers[:]:
+            try:
+                observer(event_type, data)
+            except Exception:
+                # A broken observer should not affect the community
+                self.logger.exception('Error while notifying observer about %s', event_type)
@@ -0,0 +1,204 @@
+import time
+
+from bisect import bisect_left
+from functools import wraps
+
+# Upper bounds in seconds of the buckets that are used by histograms that measure durations
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(['%s="%s"' % (name, escape_label_value(value)) for name, value in labels])
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric(object):
+    """
+    This class is the base class of the metrics. A metric has at most one label, so that updating it only takes a
+    dictionary lookup.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, label=None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+
+    def get_labels(self, label_value):
+        return [(self.label, label_value)] if self.label is not None else []
+
+    def render_samples(self):
+        raise NotImplementedError()
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation.replace('\\', '\\\\').replace('\n', '\\n')),
+                 '# TYPE %s %s' % (self.name, self.type)]
+        lines.extend(self.render_samples())
+        return lines
+
+
+class Counter(Metric):
+    """
+    This class represents a value that only goes up (e.g., the number of messages that have been received).
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, label=None):
+        super(Counter, self).__init__(name, documentation, label)
+        self.values = {}
+
+    def inc(self, label_value=None, amount=1):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def get(self, label_value=None):
+        return self.values.get(label_value, 0)
+
+    def render_samples(self):
+        if not self.values and self.label is None:
+            return ['%s %s' % (self.name, format_value(0))]
+        return ['%s%s %s' % (self.name, format_labels(self.get_labels(label_value)), format_value(value))
+                for label_value, value in sorted(self.values.iteritems())]
+
+
+class Gauge(Metric):
+    """
+    This class represents a value that can go up and down (e.g., the size of the mempool). Instead of updating the
+    value on every change, functions can be added that are called when the metrics are collected. Every community
+    in the process adds its own function, and the results are added up.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation):
+        super(Gauge, self).__init__(name, documentation)
+        self.functions = []
+
+    def add_function(self, function):
+        self.functions.append(function)
+
+    def remove_function(self, function):
+        if function in self.functions:
+            self.functions.remove(function)
+
+    def get(self):
+        return sum([function() for function in self.functions])
+
+    def render_samples(self):
+        return ['%s %s' % (self.name, format_value(self.get()))]
+
+
+class Histogram(Metric):
+    """
+    This class counts observations (e.g., the duration of a database query) in buckets.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, label=None, buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, label)
+        self.buckets = tuple(buckets)
+        # Label value -> [counts per bucket (the last one being +Inf), sum]
+        self.values = {}
+
+    def observe(self, value, label_value=None):
+        entry = self.values.get(label_value)
+        if entry is None:
+            entry = self.values[label_value] = [[0] * (len(self.buckets) + 1), 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def get_count(self, label_value=None):
+        entry = self.values.get(label_value)
+        return sum(entry[0]) if entry is not None else 0
+
+    def get_sum(self, label_value=None):
+        entry = self.values.get(label_value)
+        return entry[1] if entry is not None else 0
+
+    def render_samples(self):
+        lines = []
+        for label_value, (counts, total) in sorted(self.values.iteritems()):
+            labels = self.get_labels(label_value)
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append('%s_bucket%s %s' % (self.name, format_labels(labels + [('le', format_value(upper_bound))]),
+                                                 format_value(cumulative)))
+            lines.append('%s_sum%s %s' % (self.name, format_labels(labels), format_value(total)))
+            lines.append('%s_count%s %s' % (self.name, format_labels(labels), format_value(cumulative)))
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    This class holds the metrics of a process, and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        assert metric.name not in [m.name for m in self.metrics], 'Metric %s already exists' % metric.name
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label=None):
+        return self.register(Counter(name, documentation, label))
+
+    def gauge(self, name, documentation):
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, label=None, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram, label_value=None):
+    """
+    Decorator that observes the duration of every call in the given histogram.
+    """
+    def wrap(func):
+        @wraps(func)
+        def invoke_func(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.time() - start, label_value)
+        return invoke_func
+    return wrap
+
+
+def timed_methods(histogram):
+    """
+    Class decorator that observes the duration of every call to the public methods of a class in the given
+    histogram, using the name of the method as label value.
+    """
+    def wrap(cls):
+        for name, func in cls.__dict__.items():
+            if not name.startswith('_') and callable(func) and not isinstance(func, type):
+                setattr(cls, name, timed(histogram, name)(func))
+        return cls
+    return wrap
+
+
+# The metrics of the market are kept in a single registry per process, which is served by the /metrics endpoint
+registry = MetricsRegistry()
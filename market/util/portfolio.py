@@ -0,0 +1,159 @@
+"""
+Cash flow analytics for the positions (mortgages and investments) in a portfolio.
+
+Rates are annual percentages and durations are in months. Loans are repaid monthly, either with a fixed monthly
+payment (FIXEDRATE, i.e. an annuity) or with a fixed monthly repayment of the principal (LINEAR). An investment is
+repaid in the same way as its mortgage, at the interest rate of the investment. The default rate of the mortgage is
+used as the annual probability that the borrower defaults, after which the outstanding balance is lost.
+
+The totals of a position are computed with closed-form sums over the months of the loan, so that analysing a
+portfolio takes time proportional to the number of positions rather than the number of monthly payments.
+"""
+
+from base64 import urlsafe_b64encode
+from collections import defaultdict
+
+from market.models.mortgage import MortgageType
+
+# Ratios closer to 1 than this are treated as 1, to avoid dividing by (almost) zero
+EPSILON = 1e-9
+
+
+def geometric_sum(ratio, n):
+    # The sum of ratio^j for j in [0, n)
+    if abs(1 - ratio) < EPSILON:
+        return float(n)
+    return (1 - ratio ** n) / (1 - ratio)
+
+
+def weighted_geometric_sum(ratio, n):
+    # The sum of j * ratio^j for j in [0, n)
+    if abs(1 - ratio) < EPSILON:
+        return n * (n - 1) / 2.0
+    return (ratio - n * ratio ** n + (n - 1) * ratio ** (n + 1)) / (1 - ratio) ** 2
+
+
+def get_monthly_payment(principal, interest_rate, mortgage_type, duration):
+    """
+    :return: the payment in the first month, which is the payment in every month for FIXEDRATE loans
+    """
+    rate = interest_rate / 1200.0
+    if mortgage_type == MortgageType.FIXEDRATE and rate > 0:
+        return principal * rate / (1 - (1 + rate) ** -duration)
+    return principal / duration + principal * rate
+
+
+def get_schedule(principal, interest_rate, mortgage_type, duration):
+    """
+    Get the amortisation schedule of a loan.
+    :return: a list with a dictionary for every month
+    """
+    if principal <= 0 or duration <= 0:
+        return []
+
+    rate = interest_rate / 1200.0
+    annuity = get_monthly_payment(principal, interest_rate, mortgage_type, duration)
+    balance = principal
+    schedule = []
+    for month in range(1, duration + 1):
+        interest = balance * rate
+        if mortgage_type == MortgageType.FIXEDRATE and rate > 0:
+            repayment = annuity - interest
+        else:
+            repayment = principal / duration
+        # The last repayment is the remaining balance, which absorbs rounding errors
+        repayment = min(repayment, balance) if month < duration else balance
+        balance -= repayment
+        schedule.append({
+            'month': month,
+            'payment': interest + repayment,
+            'interest': interest,
+            'repayment': repayment,
+            'balance': balance
+        })
+    return schedule
+
+
+def analyse_position(position):
+    """
+    Compute the expected cash flows of a position.
+    :param position: a Position
+    :return: a dictionary with the position and its analytics
+    """
+    principal, duration = position.principal, position.duration
+    result = {
+        'type': position.type.name,
+        'id': position.id,
+        'user_id': urlsafe_b64encode(position.user_id),
+        'bank_id': urlsafe_b64encode(position.bank_id),
+        'principal': principal,
+        'interest_rate': position.interest_rate,
+        'mortgage_type': position.mortgage_type.name,
+        'duration': duration,
+        'default_rate': position.default_rate,
+        'monthly_payment': 0.0,
+        'scheduled_interest': 0.0,
+        'expected_interest': 0.0,
+        'expected_loss': 0.0,
+        'default_adjusted_yield': 0.0,
+        # The sum of the expected outstanding balance over all months, used to compute yields
+        'balance_months': 0.0
+    }
+    if principal <= 0 or duration <= 0:
+        return result
+
+    rate = position.interest_rate / 1200.0
+    # The probability that the borrower does not default during a month
+    survival = (1 - min(max(position.default_rate, 0.0), 100.0) / 100.0) ** (1 / 12.0)
+    payment = get_monthly_payment(principal, position.interest_rate, position.mortgage_type, duration)
+
+    # The balance after j months is a geometric series for FIXEDRATE loans, and linear in j for LINEAR loans.
+    # balance_months is the sum of survival^j * balance_j over all months.
+    if position.mortgage_type == MortgageType.FIXEDRATE and rate > 0:
+        scheduled_interest = payment * duration - principal
+        balance_months = (principal - payment / rate) * geometric_sum(survival * (1 + rate), duration) + \
+            payment / rate * geometric_sum(survival, duration)
+    else:
+        scheduled_interest = principal * rate * (duration + 1) / 2.0
+        balance_months = principal * (geometric_sum(survival, duration) -
+                                      weighted_geometric_sum(survival, duration) / duration)
+
+    # The interest of a month is received if the borrower survives the month, and the balance is lost otherwise
+    expected_interest = rate * survival * balance_months
+    expected_loss = (1 - survival) * balance_months
+    result.update({
+        'monthly_payment': payment,
+        'scheduled_interest': scheduled_interest,
+        'expected_interest': expected_interest,
+        'expected_loss': expected_loss,
+        'default_adjusted_yield': 1200 * (expected_interest - expected_loss) / balance_months,
+        'balance_months': balance_months
+    })
+    return result
+
+
+def analyse_portfolio(positions):
+    """
+    Compute the analytics of every position, the totals of the portfolio and the exposure per bank.
+    :param positions: a list with Positions
+    :return: a dictionary with positions, totals and exposure
+    """
+    analysed = [analyse_position(position) for position in positions]
+
+    totals = dict((key, sum(position[key] for position in analysed)) for key in
+                  ['principal', 'monthly_payment', 'scheduled_interest', 'expected_interest', 'expected_loss',
+                   'balance_months'])
+    totals['expected_return'] = totals['expected_interest'] - totals['expected_loss']
+    totals['default_adjusted_yield'] = 1200 * totals['expected_return'] / totals['balance_months'] \
+        if totals['balance_months'] else 0.0
+    totals['positions'] = len(analysed)
+
+    exposure = defaultdict(float)
+    for position in analysed:
+        exposure[position['bank_id']] += position['principal']
+
+    return {
+        'positions': analysed,
+        'totals': totals,
+        'exposure': [{'bank_id': bank_id, 'principal': principal} for bank_id, principal in sorted(exposure.items())]
+    }
@@ -0,0 +1,128 @@
+"""
+Tools for finding out where the reactor thread spends its time: hooks that measure every invocation of a message
+handler or periodic task, and a sampling profiler that can be started while a node is running.
+"""
+
+import sys
+import time
+import logging
+
+from collections import defaultdict
+from functools import wraps
+
+from storm.tracer import install_tracer
+from twisted.internet.threads import deferToThread
+
+from market.metrics import HANDLER_BATCH_SIZE, HANDLER_QUERIES, HANDLER_SECONDS
+
+# Invocations that take longer than this many seconds are logged, since they stall the reactor
+SLOW_INVOCATION_THRESHOLD = 0.5
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+logger = logging.getLogger('ProfilingLogger')
+
+
+class QueryCounter(object):
+    """
+    This class is a Storm tracer that counts the statements that are executed through Storm. The DatabaseReader
+    executes its queries on the raw sqlite3 connection, and increases the count itself.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def connection_raw_execute(self, connection, raw_cursor, statement, params):
+        self.count += 1
+
+
+# Tracers are global in Storm, so a single counter covers all stores in the process
+query_counter = QueryCounter()
+install_tracer(query_counter)
+
+
+def record_invocation(name, func, args, kwargs, batch_size=None):
+    queries = query_counter.count
+    start = time.time()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        duration = time.time() - start
+        queries = query_counter.count - queries
+        HANDLER_SECONDS.observe(duration, name)
+        HANDLER_QUERIES.observe(queries, name)
+        if batch_size is not None:
+            HANDLER_BATCH_SIZE.observe(batch_size, name)
+        if duration > SLOW_INVOCATION_THRESHOLD:
+            logger.warning('%s took %.3fs (%d database queries, batch size %s)', name, duration, queries, batch_size)
+
+
+def profile_handler(name, handle_callback):
+    """
+    Wrap a Dispersy message handler, so that the wall time, database queries and batch size of every invocation are
+    recorded.
+    """
+    @wraps(handle_callback)
+    def invoke_func(messages):
+        return record_invocation(name, handle_callback, (messages,), {}, len(messages))
+    return invoke_func
+
+
+def profile_task(name, func):
+    """
+    Wrap the function of a periodic task, so that the wall time and database queries of every invocation are
+    recorded. When the function returns a Deferred, only the time until it returns is measured.
+    """
+    @wraps(func)
+    def invoke_func(*args, **kwargs):
+        return record_invocation(name, func, args, kwargs)
+    return invoke_func
+
+
+def format_frame(frame):
+    code = frame.f_code
+    return '%s (%s:%d)' % (code.co_name, code.co_filename, code.co_firstlineno)
+
+
+class SamplingProfiler(object):
+    """
+    This class takes samples of the stack of a thread from another thread, and counts how often every stack occurs.
+    The result is written in the collapsed stack format that is used by flame graph tools, with one line per stack:
+
+        outer_function (file:line);inner_function (file:line) <number of samples>
+    """
+
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = defaultdict(int)
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(format_frame(frame))
+            frame = frame.f_back
+        if stack:
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def run(self, duration):
+        """
+        Take samples for the given number of seconds. This blocks, so it should not be called from the profiled thread.
+        :return: the samples in the collapsed stack format
+        """
+        end = time.time() + duration
+        while time.time() < end:
+            self.sample()
+            time.sleep(self.interval)
+        return self.get_collapsed_stacks()
+
+    def start(self, duration):
+        """
+        Take samples for the given number of seconds in a thread from the reactor thread pool.
+        :return: a Deferred that fires with the samples in the collapsed stack format
+        """
+        return deferToThread(self.run, duration)
+
+    def get_collapsed_stacks(self):
+        return ''.join(['%s %d\n' % (stack, count) for stack, count in sorted(self.stacks.iteritems())])
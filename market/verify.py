@@ -0,0 +1,380 @@
+"""
+Verify the blockchain in the database of a node offline, e.g. after an incident or to measure how fast blocks are
+validated. Every block on the best chain is checked again: its linkage, its proof and target difficulty, its merkle
+root, all signatures and the rules for the types of its contracts. The proof of a block is checked against the stake
+its creator had in the blocks below it. The proofs, signatures and merkle roots are checked in a pool of worker
+processes. Only full nodes (i.e., banks) have the contracts that are needed to verify blocks.
+
+The best chain is determined from the blocks themselves and compared with the block_index table. With --repair,
+the block_index table is rebuilt from the best chain, up to the first invalid block. The node should not be running
+while using this tool.
+
+Usage: python -m market.verify [--state DIR] [--database FILENAME] [--processes N] [--batch N] [--repair]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+from base64 import urlsafe_b64encode
+from collections import defaultdict, deque
+
+from storm.database import create_database
+
+from market.community.blockchain.community import BLOCK_GENESIS_HASH, BLOCK_TARGET_BLOCKSPAN, \
+    calculate_next_difficulty
+from market.community.blockchain.validation import check_proof, init_worker, verify_block_dict, \
+    verify_contract_dicts
+from market.community.market.community import CONTRACT_SUCCESSORS, calculate_stake
+from market.database.archive import BlockArchive
+from market.database.blockfile import BLOCK_POSITION
+from market.database.reader import BlockHeader, DatabaseReader
+from market.database.store import MarketStore
+from market.defs import BASE_DIR, VERIFIED_BANKS
+from market.models import ObjectType
+from market.models.block import Block
+
+DEFAULT_BATCH_SIZE = 100
+
+
+def verify_blocks(items):
+    """
+    Run the stateless checks of a batch of blocks. This is done in one of the worker processes.
+    :param items: a list of (block id, block dictionary, stake of the creator) tuples
+    :return: a list of (block id, reason) tuples for the blocks that are invalid
+    """
+    invalid = []
+    for block_id, block_dict, stake in items:
+        block = Block.from_dict(block_dict)
+        if block.id != block_id:
+            reason = 'block id does not match its header'
+        elif not check_proof(block, stake):
+            reason = 'incorrect proof'
+        else:
+            reason = verify_block_dict(block_dict) or verify_contract_dicts(block_dict['contracts'])
+        if reason is not None:
+            invalid.append((block_id, reason))
+    return invalid
+
+
+class ChainVerifier(object):
+    """
+    This class verifies the blockchain tables (and the archive, if there is one) of a market database.
+    """
+
+    def __init__(self, database_fn, banks=VERIFIED_BANKS):
+        self.database_fn = database_fn
+        self.banks = banks
+        blockchain_fn = '%s-blockchain%s' % os.path.splitext(database_fn)
+        # Without a DatabaseExecutor the blockchain tables are in the database file itself
+        self.blockchain_fn = blockchain_fn if os.path.exists(blockchain_fn) else database_fn
+        self.store = MarketStore(create_database('sqlite:%s' % self.blockchain_fn))
+        self.reader = DatabaseReader(self.store)
+
+        archive_dir = '%s-archive' % os.path.splitext(database_fn)[0]
+        self.archive = BlockArchive(archive_dir) if os.path.exists(archive_dir) else None
+
+        self.headers = {}
+        self.best_chain = []
+        # (height, block id, reason) tuples
+        self.problems = []
+        # Height of the first block on the best chain that is invalid or could not be read
+        self.first_invalid = None
+        self.num_contracts = 0
+
+        # State for checking the contract rules along the best chain
+        self.contract_types = {}
+        self.previous_hashes = set()
+        self.funding = defaultdict(int)
+        self.funding_limits = {}
+
+        # State for calculating the stakes of the block creators along the best chain. Only the investments in
+        # mortgages of verified banks, and the transfers and confirmations that follow them, count towards stakes.
+        self.bank_mortgages = set()
+        # Maps the id of every contract that counts to the id of the investment it descends from
+        self.investment_ids = {}
+        self.chains = {}
+        self.values = defaultdict(int)
+
+    def close(self):
+        self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def report(self, height, block_id, reason, invalid=True):
+        self.problems.append((height, block_id, reason))
+        if invalid and height is not None and (self.first_invalid is None or height < self.first_invalid):
+            self.first_invalid = height
+
+    def load_headers(self):
+        for row in self.reader.query('SELECT id, previous_hash, merkle_root_hash, creator, creator_signature, '
+                                     'target_difficulty, time FROM block'):
+            header = BlockHeader(str(row[0]), str(row[1]), str(row[2]), str(row[3]), str(row[4]), str(row[5]), row[6])
+            self.headers[header.id] = header
+
+        if self.archive is not None:
+            for key, (_, _, _, position) in self.archive.index.iteritems():
+                if position == BLOCK_POSITION and key not in self.headers:
+                    block = self.archive.get_block(key)
+                    if block is not None:
+                        self.headers[key] = BlockHeader.from_block(block)
+
+    def get_block_index(self):
+        return dict((height, str(block_id)) for block_id, height in
+                    self.reader.query('SELECT block_id, height FROM block_index'))
+
+    def find_best_chain(self, block_index):
+        """
+        Find the longest chain that starts at the genesis block. If there are multiple, prefer the one in block_index.
+        """
+        children = defaultdict(list)
+        for header in self.headers.itervalues():
+            children[header.previous_hash].append(header.id)
+
+        heights = {BLOCK_GENESIS_HASH: 0}
+        stack = [BLOCK_GENESIS_HASH]
+        while stack:
+            block_id = stack.pop()
+            for child_id in children[block_id]:
+                heights[child_id] = heights[block_id] + 1
+                stack.append(child_id)
+
+        for block_id in self.headers:
+            if block_id not in heights:
+                self.report(None, block_id, 'orphan block (chain does not start at the genesis block)')
+
+        block_id = max(heights, key=lambda b: (heights[b], block_index.get(heights[b]) == b))
+        self.best_chain = [block_id]
+        while block_id != BLOCK_GENESIS_HASH:
+            block_id = self.headers[block_id].previous_hash
+            self.best_chain.append(block_id)
+        self.best_chain.reverse()
+
+    def check_block_index(self, block_index):
+        for height, block_id in enumerate(self.best_chain):
+            if block_index.get(height) != block_id:
+                self.report(height, block_id, 'block_index has %s at this height' %
+                            (urlsafe_b64encode(block_index[height]) if height in block_index else 'no block'), False)
+        for height in sorted(block_index):
+            if height >= len(self.best_chain):
+                self.report(height, block_index[height], 'block_index is longer than the best chain', False)
+
+    def check_difficulty(self, height):
+        # Same as BlockchainCommunity.get_next_difficulty, but using the best chain
+        prev_height = height - 1
+        prev_block = self.headers.get(self.best_chain[prev_height])
+        past_blocks = None
+        if prev_height - BLOCK_TARGET_BLOCKSPAN >= 1:
+            past_blocks = [self.headers[self.best_chain[past_height]]
+                           for past_height in range(prev_height - 1, prev_height - 1 - BLOCK_TARGET_BLOCKSPAN, -1)]
+
+        if self.headers[self.best_chain[height]].target_difficulty != calculate_next_difficulty(prev_block,
+                                                                                                past_blocks):
+            self.report(height, self.best_chain[height], 'unexpected target difficulty')
+
+    def check_contracts(self, height, block_id, contracts):
+        """
+        Check the rules for the types of the contracts in a block, given the contracts in the blocks below it. Unlike
+        MarketCommunity.check_contract, this does not check the owners of investments.
+        """
+        for contract in contracts:
+            contract_id = contract.id
+            if contract_id in self.contract_types:
+                self.report(height, block_id, 'contract %s is already on the best chain' %
+                            urlsafe_b64encode(contract_id))
+                continue
+
+            if contract.previous_hash:
+                prev_type = self.contract_types.get(contract.previous_hash)
+                if prev_type is None:
+                    self.report(height, block_id, 'parent of contract %s is not on the best chain before it' %
+                                urlsafe_b64encode(contract_id))
+                elif contract.type not in CONTRACT_SUCCESSORS.get(prev_type, [contract.type]):
+                    self.report(height, block_id, 'contract %s has an unexpected type' % urlsafe_b64encode(contract_id))
+                elif contract.type not in [ObjectType.MORTGAGE, ObjectType.INVESTMENT] and \
+                        contract.previous_hash in self.previous_hashes:
+                    self.report(height, block_id, 'contract %s is a double spend' % urlsafe_b64encode(contract_id))
+                elif contract.type == ObjectType.INVESTMENT and contract.previous_hash in self.funding_limits:
+                    self.funding[contract.previous_hash] += contract.get_object().amount
+                    if self.funding[contract.previous_hash] > self.funding_limits[contract.previous_hash]:
+                        self.report(height, block_id, 'contract %s is an overspend' % urlsafe_b64encode(contract_id))
+                self.previous_hashes.add(contract.previous_hash)
+
+            if contract.type == ObjectType.MORTGAGE:
+                mortgage = contract.get_object()
+                if mortgage is not None:
+                    self.funding_limits[contract_id] = mortgage.amount - mortgage.bank_amount
+            self.contract_types[contract_id] = contract.type
+
+    def get_chain_values(self, chain):
+        """
+        Get the value that each peer owns in an investment and the contracts that follow it. As in
+        MarketCommunity.get_stake, an investment or transfer counts for the peer it was made to, if that peer is the
+        owner according to MarketCommunity.find_owner.
+        """
+        values = defaultdict(int)
+        confirmation = None
+        for contract in reversed(chain):
+            if contract.type == ObjectType.CONFIRMATION:
+                confirmation = confirmation or contract
+                continue
+
+            if confirmation is not None:
+                owner = confirmation.from_public_key
+            else:
+                owner = contract.to_public_key if contract.type == ObjectType.INVESTMENT else None
+            if owner == contract.to_public_key:
+                values[owner] += contract.get_object().amount
+        return values
+
+    def update_stakes(self, contracts):
+        """
+        Update the value that each peer owns with the contracts of a block on the best chain.
+        """
+        added = defaultdict(list)
+        for contract in contracts:
+            if contract.type == ObjectType.MORTGAGE:
+                if contract.to_public_key in self.banks.values():
+                    self.bank_mortgages.add(contract.id)
+            elif contract.type == ObjectType.INVESTMENT:
+                if contract.previous_hash in self.bank_mortgages:
+                    self.investment_ids[contract.id] = contract.id
+                    added[contract.id].append(contract)
+            elif contract.previous_hash in self.investment_ids:
+                investment_id = self.investment_ids[contract.id] = self.investment_ids[contract.previous_hash]
+                added[investment_id].append(contract)
+
+        # A new contract can change the owner of the contracts before it, so the values of the chain are recalculated
+        for investment_id, new_contracts in added.iteritems():
+            chain = self.chains.setdefault(investment_id, [])
+            for public_key, value in self.get_chain_values(chain).iteritems():
+                self.values[public_key] -= value
+            chain.extend(new_contracts)
+            for public_key, value in self.get_chain_values(chain).iteritems():
+                self.values[public_key] += value
+
+    def get_stake(self, public_key):
+        return calculate_stake(public_key, self.values[public_key], self.banks)
+
+    def get_batches(self, batch_size):
+        """
+        Load the blocks on the best chain, and check everything that depends on the blocks below them.
+        :return: a generator of lists with (block id, block dictionary, stake of the creator) tuples
+        """
+        for from_height in range(1, len(self.best_chain), batch_size):
+            block_ids = self.best_chain[from_height:from_height + batch_size]
+            blocks = self.reader.get_blocks(block_ids, full=True)
+
+            batch = []
+            for height, block_id in enumerate(block_ids, from_height):
+                if block_id in blocks:
+                    header, contracts = blocks[block_id]
+                else:
+                    block = self.archive.get_block(block_id) if self.archive is not None else None
+                    if block is None:
+                        self.report(height, block_id, 'block could not be read')
+                        continue
+                    header, contracts = self.headers[block_id], block.contracts
+
+                self.check_difficulty(height)
+                self.check_contracts(height, block_id, contracts)
+                self.num_contracts += len(contracts)
+
+                # The stake of the creator is taken before the contracts of the block itself are added
+                stake = self.get_stake(header.creator)
+                self.update_stakes(contracts)
+
+                block_dict = header.to_dict()
+                block_dict['contracts'] = [contract.to_dict() for contract in contracts]
+                batch.append((block_id, block_dict, stake))
+            yield batch
+
+    def verify(self, processes=0, batch_size=DEFAULT_BATCH_SIZE):
+        self.load_headers()
+        block_index = self.get_block_index()
+        self.find_best_chain(block_index)
+        self.check_block_index(block_index)
+
+        heights = dict((block_id, height) for height, block_id in enumerate(self.best_chain))
+
+        def on_verified(invalid):
+            for block_id, reason in invalid:
+                self.report(heights[block_id], block_id, reason)
+
+        if processes <= 0:
+            for batch in self.get_batches(batch_size):
+                on_verified(verify_blocks(batch))
+            return
+
+        # The batches are loaded on this thread, since the database connection can't be used by other threads
+        pool = multiprocessing.Pool(processes, init_worker)
+        try:
+            results = deque()
+            for batch in self.get_batches(batch_size):
+                results.append(pool.apply_async(verify_blocks, (batch,)))
+                while len(results) > 2 * processes:
+                    on_verified(results.popleft().get())
+            while results:
+                on_verified(results.popleft().get())
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def repair(self):
+        """
+        Rebuild block_index from the best chain, without the first invalid block and the blocks above it. Since the
+        snapshot is derived from block_index, it is removed if the best chain is valid. Otherwise, it is kept: the node
+        only uses it if it still matches the rebuilt block_index.
+        :return: the height of the rebuilt block_index
+        """
+        valid_chain = self.best_chain[:self.first_invalid]
+        self.store.execute('DELETE FROM block_index')
+        for height, block_id in enumerate(valid_chain):
+            self.store.execute('INSERT INTO block_index (block_id, height) VALUES (?, ?)', (block_id, height))
+        self.store.execute('REINDEX')
+        self.store.commit()
+
+        snapshot_fn = self.database_fn + '.snapshot'
+        if self.first_invalid is None and os.path.exists(snapshot_fn):
+            os.remove(snapshot_fn)
+        return len(valid_chain) - 1
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Verify the blockchain of a market database offline')
+    parser.add_argument('--state', help='State directory', default=os.path.join(BASE_DIR, 'State'))
+    parser.add_argument('--database', help='Database filename, relative to the state directory', default='market.db')
+    parser.add_argument('--processes', help='Number of worker processes (0 to verify on the main process)',
+                        type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--batch', help='Number of blocks per task', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--repair', help='Rebuild block_index from the valid part of the best chain',
+                        action='store_true')
+    args = parser.parse_args(argv)
+
+    database_fn = os.path.join(args.state, args.database)
+    if not os.path.exists(database_fn):
+        parser.error('%s does not exist' % database_fn)
+
+    verifier = ChainVerifier(database_fn)
+    start = time.time()
+    verifier.verify(args.processes, args.batch)
+    duration = max(time.time() - start, 1e-6)
+
+    num_blocks = len(verifier.best_chain) - 1
+    print 'Verified %d block(s) with %d contract(s) in %.2fs (%.1f blocks/s, %.1f contracts/s)' % \
+          (num_blocks, verifier.num_contracts, duration, num_blocks / duration, verifier.num_contracts / duration)
+    for height, block_id, reason in sorted(verifier.problems):
+        print '%8s %s %s' % (height if height is not None else '-', urlsafe_b64encode(block_id), reason)
+    print '%d problem(s) found' % len(verifier.problems)
+
+    if args.repair:
+        height = verifier.repair()
+        print 'Rebuilt block_index (height %d)' % height
+    verifier.close()
+    return 1 if verifier.problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,5 @@
 import { Component, OnInit, OnDestroy } from '@angular/core';
 import { trigger, style, animate, transition, keyframes } from '@angular/core';
-import { Observable } from 'rxjs/Rx';
 import { Block } from '../shared/block.model';
 
 import { MarketService } from '../shared/market.service';
@@ -26,11 +25,24 @@ export class BlocksComponent implements OnInit, OnDestroy {
     constructor(public marketService: MarketService) { }
 
     ngOnInit() {
-        this.subscription = Observable.timer(0, 5000).subscribe(t => {
-            this.marketService.getBlocks().subscribe(blocks => {
-                this.blocks = blocks;
+        this.loadBlocks();
+        this.subscription = this.marketService.getEvents().subscribe(event => {
+            if (event.type == 'reconnect') {
+                this.loadBlocks();
+            } else if (event.type == 'block_connected') {
+                var block = event.data.block;
+                this.blocks = [block].concat(this.blocks.filter(b => b.height < block.height));
                 this.counter += 1;
-            });
+            } else if (event.type == 'block_disconnected') {
+                this.blocks = this.blocks.filter(b => b.height < event.data.height);
+            }
+        });
+    }
+
+    loadBlocks() {
+        this.marketService.getBlocks().subscribe(blocks => {
+            this.blocks = blocks;
+            this.counter += 1;
         });
     }
 
@@ -22,9 +22,10 @@ export class BankerCampaignsComponent implements OnInit, OnDestroy {
     }
 
     ngOnInit() {
-        this.subscription = Observable.timer(0, 5000).subscribe(t => {
-            this.loadMyCampaigns();
-        });
+        this.loadMyCampaigns();
+        this.subscription = this.marketService.getEvents()
+            .filter(event => ['reconnect', 'campaign_updated', 'investment_status_changed', 'block_connected'].indexOf(event.type) >= 0)
+            .subscribe(event => this.loadMyCampaigns());
     }
 
     ngOnDestroy() {
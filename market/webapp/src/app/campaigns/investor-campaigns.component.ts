@@ -22,8 +22,19 @@ export class InvestorCampaignsComponent implements OnInit, OnDestroy {
     constructor(public marketService: MarketService) { }
 
     ngOnInit() {
-        this.subscription = Observable.timer(0, 5000).subscribe(t => {
-            this.update();
+        this.update();
+        this.subscription = this.marketService.getEvents().subscribe(event => {
+            if (event.type == 'campaign_updated') {
+                var campaign = event.data.campaign;
+                this.campaigns = this.campaigns.filter((c: any) => c.id != campaign.id || c.user_id != campaign.user_id);
+                if (campaign.amount_invested < campaign.amount) {
+                    this.campaigns.push(campaign);
+                }
+            } else if (event.type == 'reconnect') {
+                this.update();
+            } else if (['investment_status_changed', 'block_connected'].indexOf(event.type) >= 0) {
+                this.loadInvestments();
+            }
         });
     }
 
@@ -37,8 +48,7 @@ export class InvestorCampaignsComponent implements OnInit, OnDestroy {
     }
 
     loadCampaigns() {
-        this.marketService.getCampaigns()
-            .map(campaigns => campaigns.filter((campaign: any) => campaign.amount_invested < campaign.amount))
+        this.marketService.getCampaigns({completed: 'false'})
             .subscribe(campaigns => this.campaigns = campaigns);
     }
 
@@ -19,7 +19,14 @@ export class BankerMortgagesComponent implements OnInit, OnDestroy {
     constructor(public marketService: MarketService) { }
 
     ngOnInit() {
-        this.subscription = Observable.timer(0, 5000).subscribe(t => this.loadLoanRequests());
+        this.loadLoanRequests();
+        this.subscription = this.marketService.getEvents().subscribe(event => {
+            if (event.type == 'loan_request_received' && event.data.loan_request.status == 'PENDING') {
+                this.loan_requests.push(event.data.loan_request);
+            } else if (['reconnect', 'mortgage_status_changed', 'block_connected'].indexOf(event.type) >= 0) {
+                this.loadLoanRequests();
+            }
+        });
     }
 
     ngOnDestroy() {
@@ -27,8 +34,8 @@ export class BankerMortgagesComponent implements OnInit, OnDestroy {
     }
 
     loadLoanRequests() {
-        this.marketService.getLoanRequests()
-            .subscribe(loan_requests => this.loan_requests = loan_requests.filter((lr: any) => lr.status == 'PENDING'));
+        this.marketService.getLoanRequests({status: 'PENDING'})
+            .subscribe(loan_requests => this.loan_requests = loan_requests);
         this.marketService.getMortgages()
             .subscribe(mortgages => {
                 var me: any = this.marketService.me;
@@ -21,9 +21,15 @@ export class BorrowerMortgagesComponent implements OnInit, OnDestroy {
     }
 
     ngOnInit() {
-        this.subscription = Observable.timer(0, 5000).subscribe(t => {
-            this.loadMyMortgages();
-            this.loadMyLoanRequests();
+        this.loadMyMortgages();
+        this.loadMyLoanRequests();
+        this.subscription = this.marketService.getEvents().subscribe(event => {
+            if (['reconnect', 'loan_request_status_changed'].indexOf(event.type) >= 0) {
+                this.loadMyLoanRequests();
+            }
+            if (['reconnect', 'mortgage_status_changed', 'block_connected'].indexOf(event.type) >= 0) {
+                this.loadMyMortgages();
+            }
         });
     }
 
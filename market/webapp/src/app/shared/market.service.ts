@@ -1,7 +1,8 @@
-import { Http } from '@angular/http';
+import { Http, URLSearchParams } from '@angular/http';
 import { Injectable } from '@angular/core';
 import { Observable } from 'rxjs/Observable';
 import 'rxjs/add/operator/map';
+import 'rxjs/add/operator/share';
 
 import { Mortgage } from './mortgage.model';
 import { Investment } from './investment.model';
@@ -12,6 +13,8 @@ import { Contract } from './contract.model';
 export class MarketService {
     private _api_base = '/api';
 
+    private _events: Observable<any>;
+
     me = {};
     users = {};
     online_banks = [];
@@ -34,6 +37,29 @@ export class MarketService {
         });
     }
 
+    // Returns a stream of changes pushed by the backend. Since events are not buffered by the backend,
+    // a 'reconnect' event is emitted after the connection has been lost, after which the data should be reloaded.
+    getEvents(): Observable<any> {
+        if (!this._events) {
+            this._events = Observable.create(observer => {
+                var source = new EventSource(this._api_base + '/events');
+                var connected = false;
+                source.onopen = () => {
+                    if (connected) {
+                        observer.next({type: 'reconnect', data: {}});
+                    }
+                    connected = true;
+                };
+                ['block_connected', 'block_disconnected', 'campaign_updated', 'investment_status_changed',
+                 'loan_request_received', 'loan_request_status_changed', 'mortgage_status_changed'].forEach(type => {
+                    source.addEventListener(type, (event: any) => observer.next({type: type, data: JSON.parse(event.data)}));
+                });
+                return () => source.close();
+            }).share();
+        }
+        return this._events;
+    }
+
     getDisplayname(user_id): string {
         return (this.users[user_id] || {}).display_name || user_id.slice(-10);
     }
@@ -78,12 +104,12 @@ export class MarketService {
             .map(res => res.json());
     }
 
-    getMortgages(): Observable<Mortgage[]> {
-        return this._http.get(this._api_base + '/mortgages')
+    getMortgages(filters = {}): Observable<Mortgage[]> {
+        return this._http.get(this._api_base + '/mortgages', {search: this.toSearchParams(filters)})
             .map(res => res.json().mortgages);
     }
-    getLoanRequests(): Observable<Object[]> {
-        return this._http.get(this._api_base + '/loanrequests')
+    getLoanRequests(filters = {}): Observable<Object[]> {
+        return this._http.get(this._api_base + '/loanrequests', {search: this.toSearchParams(filters)})
             .map(res => res.json().loan_requests);
     }
     acceptLoanRequest(loan_request, params): Observable<String> {
@@ -100,8 +126,8 @@ export class MarketService {
         return this._http.get(this._api_base + '/you/campaigns')
             .map(res => res.json().campaigns);
     }
-    getCampaigns(): Observable<Object[]> {
-        return this._http.get(this._api_base + '/campaigns')
+    getCampaigns(filters = {}): Observable<Object[]> {
+        return this._http.get(this._api_base + '/campaigns', {search: this.toSearchParams(filters)})
             .map(res => res.json().campaigns);
     }
 
@@ -153,7 +179,7 @@ export class MarketService {
             .map(res => res.json().block);
     }
     getBlocks(): Observable<Block[]> {
-        return this._http.get(this._api_base + '/blocks')
+        return this._http.get(this._api_base + '/blocks?contracts=ids')
             .map(res => res.json().blocks);
     }
 
@@ -172,4 +198,10 @@ export class MarketService {
         return (item.transfers && item.transfers.length) ?
                item.transfers[item.transfers.length-1].confirmation_contract_id : item.contract_id;
     }
+
+    private toSearchParams(filters): URLSearchParams {
+        var params = new URLSearchParams();
+        Object.keys(filters).forEach(key => params.set(key, filters[key]));
+        return params;
+    }
 }